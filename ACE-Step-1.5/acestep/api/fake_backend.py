@@ -0,0 +1,303 @@
+"""Deterministic CPU stand-in for the DiT and 5Hz LM handlers.
+
+Serving benchmarks (queueing, ``/query_result`` polling, wrapper latency)
+should not need a GPU.  With ``ACESTEP_FAKE_BACKEND=true`` (or
+``--fake-backend``) the API server and the OpenRouter server build
+``FakeDiTHandler`` / ``FakeLLMHandler`` instead of loading weights, skip
+model downloads, and route ``generate_music`` to ``FakeBackend``, which
+sleeps according to a ``LatencyModel`` and writes silent WAV files.
+Everything around generation (queue, coalescing, LM pool, job store,
+result polling, audio serving) runs unchanged.
+
+The latency model is set with ``ACESTEP_FAKE_LATENCY`` (or
+``--fake-latency``) as comma-separated ``name=value`` pairs, e.g.
+``"base=0.3,step=0.1,batch_exp=0.5,lm=0.05,jitter=0.1,seed=0"``; see
+``LatencyModel`` for the names.  Jitter is drawn from a seeded generator,
+so a given sequence of calls always sleeps for the same durations.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import threading
+import time
+import wave
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from acestep.core.generation.handler.task_utils import TaskUtilsMixin
+from acestep.inference import GenerationResult
+
+FAKE_SAMPLE_RATE = 48000
+DEFAULT_DURATION_SECONDS = 30.0
+
+_TRUTHY = {"1", "true", "yes", "y", "on"}
+_PROGRESS_SLICES = 10
+_SKIP_LM_TASKS = {"cover", "repaint"}
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """How long each simulated operation takes, in seconds.
+
+    Attributes:
+        load: Loading one model (``initialize_service`` / LM ``initialize``).
+        base: Fixed overhead of every ``generate_music`` call.
+        step: One diffusion step for one 30 s clip.
+        batch_exp: Batch scaling exponent; a batch of ``n`` costs
+            ``n ** batch_exp`` single items (``1.0`` = no batching gain).
+        lm: LM code generation per second of audio (``thinking`` jobs).
+        lm_call: One LM sample/format/CoT-metadata call.
+        lora: Loading or unloading one LoRA adapter.
+        jitter: Relative uniform noise applied to every sleep (``0.1`` = +-10%).
+        seed: Seed of the jitter generator.
+    """
+
+    load: float = 2.0
+    base: float = 0.3
+    step: float = 0.1
+    batch_exp: float = 0.5
+    lm: float = 0.05
+    lm_call: float = 1.0
+    lora: float = 0.5
+    jitter: float = 0.1
+    seed: int = 0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Build a model from ``"name=value,..."``; unset names keep their defaults."""
+        known = {f.name for f in fields(cls)}
+        values: Dict[str, Any] = {}
+        for part in (spec or "").split(","):
+            if not part.strip():
+                continue
+            name, sep, raw = part.partition("=")
+            name = name.strip()
+            if not sep or name not in known:
+                raise ValueError(f"Unknown latency setting {part.strip()!r}; expected one of {sorted(known)}")
+            values[name] = int(raw) if name == "seed" else float(raw)
+        return cls(**values)
+
+    def dit_seconds(self, duration: float, steps: int, batch: int) -> float:
+        """Nominal DiT time for *batch* clips of *duration* seconds."""
+        scale = max(1, int(batch)) ** self.batch_exp
+        return self.base + max(1, int(steps)) * self.step * (duration / DEFAULT_DURATION_SECONDS) * scale
+
+    def describe(self) -> str:
+        """Return the model in ``parse`` syntax."""
+        return ",".join(f"{f.name}={getattr(self, f.name)}" for f in fields(self))
+
+
+class FakeBackend:
+    """Shared clock of the fake handlers and the ``generate_music`` stand-in."""
+
+    def __init__(self, latency: Optional[LatencyModel] = None, sleep: Callable[[float], None] = time.sleep):
+        self.latency = latency or LatencyModel()
+        self._sleep = sleep
+        self._rng = random.Random(self.latency.seed)
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["FakeBackend"]:
+        """Return a backend when ``ACESTEP_FAKE_BACKEND`` is set, else ``None``."""
+        if os.getenv("ACESTEP_FAKE_BACKEND", "").strip().lower() not in _TRUTHY:
+            return None
+        return cls(LatencyModel.parse(os.getenv("ACESTEP_FAKE_LATENCY", "")))
+
+    def delay(self, seconds: float, progress: Optional[Callable[..., None]] = None, desc: str = "") -> float:
+        """Sleep *seconds* with jitter, reporting progress if given; return the time slept."""
+        with self._lock:
+            noise = self._rng.uniform(-1.0, 1.0)
+        actual = max(0.0, seconds * (1.0 + self.latency.jitter * noise))
+        if progress is None:
+            self._sleep(actual)
+            return actual
+        for idx in range(_PROGRESS_SLICES):
+            self._sleep(actual / _PROGRESS_SLICES)
+            progress((idx + 1) / _PROGRESS_SLICES, desc=desc)
+        return actual
+
+    def generate_music(
+        self,
+        dit_handler: Any,
+        llm_handler: Any,
+        params: Any,
+        config: Any,
+        save_dir: Optional[str] = None,
+        progress: Optional[Callable[..., None]] = None,
+    ) -> GenerationResult:
+        """Stand-in for ``acestep.inference.generate_music``."""
+        duration = float(params.duration) if params.duration and params.duration > 0 else DEFAULT_DURATION_SECONDS
+        batch = max(1, int(config.batch_size or 1))
+        lm_ready = (
+            llm_handler is not None
+            and getattr(llm_handler, "llm_initialized", False)
+            and getattr(params, "task_type", "text2music") not in _SKIP_LM_TASKS
+        )
+
+        lm_seconds = 0.0
+        if lm_ready and params.thinking:
+            lm_seconds = self.delay(self.latency.lm * duration)
+        elif lm_ready and (params.use_cot_metas or params.use_cot_caption or params.use_cot_language):
+            lm_seconds = self.delay(self.latency.lm_call)
+        dit_seconds = self.delay(
+            self.latency.dit_seconds(duration, params.inference_steps, batch), progress, "fake diffusion",
+        )
+
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        seeds = list(config.seeds or [])
+        audio_format = "wav"
+        audios = []
+        for idx in range(batch):
+            seed = seeds[idx] if idx < len(seeds) else -1
+            key = hashlib.sha256(f"{self.latency.seed}:{call}:{idx}".encode()).hexdigest()[:32]
+            path = ""
+            if save_dir:
+                os.makedirs(save_dir, exist_ok=True)
+                path = os.path.join(save_dir, f"{key}.{audio_format}")
+                write_silence(path, duration)
+            audios.append({
+                "path": path,
+                "tensor": None,
+                "key": key,
+                "sample_rate": FAKE_SAMPLE_RATE,
+                "params": {"seed": seed, "duration": duration},
+            })
+
+        time_costs = {"dit_total_time_cost": dit_seconds, "pipeline_total_time": lm_seconds + dit_seconds}
+        if lm_seconds:
+            time_costs["lm_total_time"] = lm_seconds
+        return GenerationResult(
+            audios=audios,
+            status_message=f"Fake generation of {batch} x {duration:g}s",
+            extra_outputs={"lm_metadata": {}, "time_costs": time_costs},
+        )
+
+
+def write_silence(path: str, duration: float, sample_rate: int = FAKE_SAMPLE_RATE) -> None:
+    """Write a stereo 16-bit silent WAV of *duration* seconds."""
+    frames = int(duration * sample_rate)
+    chunk = b"\0" * (4 * sample_rate)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        while frames > 0:
+            count = min(frames, sample_rate)
+            wav.writeframes(chunk[:4 * count])
+            frames -= count
+
+
+class FakeDiTHandler(TaskUtilsMixin):
+    """``AceStepHandler`` stand-in that loads nothing."""
+
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+        self.device = "cpu"
+        self.dtype = None
+        self.model = None
+        self.vae = None
+        self.text_encoder = None
+        self.reference_library = None
+        self.last_init_params: Optional[Dict[str, Any]] = None
+        self.lora_loaded = False
+
+    def initialize_service(self, **kwargs: Any) -> Tuple[str, bool]:
+        """Pretend to load the DiT, VAE and text encoder."""
+        self.backend.delay(self.backend.latency.load)
+        self.last_init_params = dict(kwargs)
+        return "Fake DiT backend ready (no weights loaded)", True
+
+    def load_lora(self, lora_path: str) -> str:
+        """Pretend to load an adapter; any path is accepted."""
+        self.backend.delay(self.backend.latency.lora)
+        self.lora_loaded = True
+        return f"✅ Fake LoRA loaded: {lora_path}"
+
+    def unload_lora(self) -> str:
+        """Pretend to restore the base decoder."""
+        if not self.lora_loaded:
+            return "⚠️ No LoRA adapter loaded."
+        self.backend.delay(self.backend.latency.lora)
+        self.lora_loaded = False
+        return "✅ Fake LoRA unloaded"
+
+    def convert_src_audio_to_codes(self, *_args: Any, **_kwargs: Any) -> str:
+        """Audio-code extraction is not simulated."""
+        return "❌ Audio code extraction is not available with the fake backend"
+
+    def _empty_cache(self) -> None:
+        """Nothing to release."""
+
+    def _get_project_root(self) -> str:
+        """Get project root directory path."""
+        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeLLMHandler:
+    """``LLMHandler`` stand-in returning fixed metadata after a simulated delay."""
+
+    def __init__(self, backend: FakeBackend):
+        self.backend = backend
+        self.max_model_len = 4096
+        self.lm_model_path: Optional[str] = None
+        self.unload()
+
+    def initialize(self, checkpoint_dir: str = "", lm_model_path: str = "", backend: str = "fake",
+                   device: str = "cpu", offload_to_cpu: bool = False, dtype: Any = None) -> Tuple[str, bool]:
+        """Pretend to load *lm_model_path*."""
+        self.backend.delay(self.backend.latency.load)
+        self.llm_initialized = True
+        self.llm_backend = "fake"
+        self.lm_model_path = lm_model_path
+        return f"Fake LM {lm_model_path} ready (no weights loaded)", True
+
+    def unload(self) -> None:
+        """Mirror ``LLMHandler.unload``."""
+        self.llm = None
+        self.llm_tokenizer = None
+        self.llm_initialized = False
+        self.llm_backend = None
+        self.device = "cpu"
+        self.dtype = None
+        self.offload_to_cpu = False
+        self.constrained_processor = None
+        self._hf_model_for_scoring = None
+        self._mlx_model = None
+        self._mlx_model_path = None
+
+    def create_sample_from_query(self, query: str, instrumental: bool = False,
+                                 vocal_language: Optional[str] = None, **_kwargs: Any) -> Tuple[Dict[str, Any], str]:
+        """Return a fixed sample for *query*."""
+        self.backend.delay(self.backend.latency.lm_call)
+        return {
+            "caption": query or "fake sample",
+            "lyrics": "[Instrumental]" if instrumental else "[verse]\nla la la",
+            "bpm": 120,
+            "duration": DEFAULT_DURATION_SECONDS,
+            "keyscale": "C major",
+            "timesignature": "4",
+            "language": vocal_language or "en",
+            "instrumental": instrumental,
+        }, "Fake sample"
+
+    def format_sample_from_input(self, caption: str, lyrics: str, user_metadata: Optional[Dict[str, Any]] = None,
+                                 **_kwargs: Any) -> Tuple[Dict[str, Any], str]:
+        """Return the input with fixed metadata filled in."""
+        self.backend.delay(self.backend.latency.lm_call)
+        metadata = {
+            "caption": caption,
+            "lyrics": lyrics,
+            "bpm": 120,
+            "duration": DEFAULT_DURATION_SECONDS,
+            "keyscale": "C major",
+            "timesignature": "4",
+            "language": "en",
+        }
+        metadata.update(user_metadata or {})
+        return metadata, "Fake format"
@@ -0,0 +1,85 @@
+"""Unit tests for the CPU stand-in backend."""
+
+import os
+import tempfile
+import unittest
+import wave
+from types import SimpleNamespace
+from unittest import mock
+
+from acestep.api.fake_backend import FakeBackend, FakeLLMHandler, LatencyModel
+
+
+def _params(**overrides):
+    """Generation params with every LM feature off."""
+    base = dict(duration=10.0, inference_steps=8, thinking=False, use_cot_metas=False,
+                use_cot_caption=False, use_cot_language=False)
+    return SimpleNamespace(**{**base, **overrides})
+
+
+class LatencyModelTests(unittest.TestCase):
+    """Parsing and the DiT cost formula."""
+
+    def test_parse_round_trips_and_rejects_unknown_names(self):
+        """``describe`` output parses back; typos raise."""
+        model = LatencyModel.parse("step=0.2, batch_exp=1, seed=7")
+        self.assertEqual((model.step, model.batch_exp, model.seed, model.base), (0.2, 1.0, 7, 0.3))
+        self.assertEqual(LatencyModel.parse(model.describe()), model)
+        with self.assertRaises(ValueError):
+            LatencyModel.parse("steps=1")
+
+    def test_dit_seconds_scales_with_duration_steps_and_batch(self):
+        """Cost is linear in steps and duration and sublinear in batch."""
+        model = LatencyModel(base=0.0, step=1.0, batch_exp=0.5)
+        self.assertAlmostEqual(model.dit_seconds(30.0, 8, 1), 8.0)
+        self.assertAlmostEqual(model.dit_seconds(15.0, 8, 4), 8.0)
+
+    def test_from_env(self):
+        """The backend is only enabled by a truthy flag."""
+        with mock.patch.dict(os.environ, {"ACESTEP_FAKE_BACKEND": "", "ACESTEP_FAKE_LATENCY": ""}):
+            self.assertIsNone(FakeBackend.from_env())
+        with mock.patch.dict(os.environ, {"ACESTEP_FAKE_BACKEND": "true", "ACESTEP_FAKE_LATENCY": "lm=0.5"}):
+            self.assertEqual(FakeBackend.from_env().latency.lm, 0.5)
+
+
+class FakeBackendTests(unittest.TestCase):
+    """Deterministic sleeps and the ``generate_music`` stand-in."""
+
+    def test_jitter_is_seeded(self):
+        """Two backends with the same seed sleep for the same durations."""
+        slept = ([], [])
+        for record in slept:
+            backend = FakeBackend(LatencyModel(jitter=0.5, seed=3), sleep=record.append)
+            for _ in range(3):
+                backend.delay(1.0)
+        self.assertEqual(slept[0], slept[1])
+        self.assertTrue(all(0.5 <= s <= 1.5 for s in slept[0]))
+        self.assertEqual(len(set(slept[0])), 3)
+
+    def test_generate_music_writes_silent_wavs(self):
+        """One WAV per batch item, with progress reported and LM time charged."""
+        slept, progress = [], []
+        backend = FakeBackend(LatencyModel(jitter=0.0, base=0.0, step=0.1, lm_call=2.0), sleep=slept.append)
+        llm = FakeLLMHandler(backend)
+        llm.initialize(lm_model_path="lm")
+        slept.clear()
+        config = SimpleNamespace(batch_size=2, seeds=[11])
+        with tempfile.TemporaryDirectory() as out:
+            result = backend.generate_music(
+                None, llm, _params(use_cot_caption=True), config, save_dir=out,
+                progress=lambda frac, desc="": progress.append(frac),
+            )
+            self.assertTrue(result.success)
+            self.assertEqual([a["params"]["seed"] for a in result.audios], [11, -1])
+            with wave.open(result.audios[1]["path"], "rb") as wav:
+                self.assertEqual((wav.getnchannels(), wav.getnframes()), (2, 10 * 48000))
+        costs = result.extra_outputs["time_costs"]
+        self.assertAlmostEqual(costs["lm_total_time"], 2.0)
+        self.assertAlmostEqual(costs["dit_total_time_cost"], 0.8 / 3 * 2 ** 0.5)
+        self.assertAlmostEqual(sum(slept), costs["pipeline_total_time"])
+        self.assertEqual(progress[-1], 1.0)
+        self.assertNotEqual(result.audios[0]["key"], result.audios[1]["key"])
+
+
+if __name__ == "__main__":
+    unittest.main()
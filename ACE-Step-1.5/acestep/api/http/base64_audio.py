@@ -0,0 +1,123 @@
+"""Chunked base64 audio encoding and decoding for the OpenRouter-compatible endpoints.
+
+Generated tracks are returned as ``data:`` URLs and uploaded inputs arrive
+as base64 strings.  Encoding a 10-minute WAV in one go costs a full read of
+the file plus a 4/3-sized string, and ``json.dumps`` of the response copies
+it again.  These helpers work in bounded slices instead: output files are
+read and encoded a block at a time (so SSE streams can send the audio as
+several deltas and JSON bodies can be streamed around it), and uploads are
+decoded slice by slice straight into a temporary file.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import os
+import tempfile
+from typing import BinaryIO, Iterator
+
+# Raw bytes per encoded block; a multiple of 3 so blocks encode without
+# padding and can simply be concatenated.  192 KiB -> 256 KiB of text.
+ENCODE_CHUNK_BYTES = 3 * 64 * 1024
+
+# Base64 characters decoded per slice; a multiple of 4.
+DECODE_CHUNK_CHARS = 4 * 64 * 1024
+
+AUDIO_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg",
+    "m4a": "audio/mp4",
+    "aac": "audio/aac",
+}
+
+
+def audio_mime_type(audio_format: str) -> str:
+    """Return the MIME type for ``audio_format`` (``audio/mpeg`` if unknown)."""
+    return AUDIO_MIME_TYPES.get((audio_format or "").lower().lstrip("."), "audio/mpeg")
+
+
+def iter_base64_file(path: str, chunk_bytes: int = ENCODE_CHUNK_BYTES) -> Iterator[str]:
+    """Yield the base64 encoding of the file at ``path`` in concatenable pieces."""
+    if chunk_bytes <= 0 or chunk_bytes % 3:
+        raise ValueError("chunk_bytes must be a positive multiple of 3")
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            yield base64.b64encode(block).decode("ascii")
+
+
+def iter_audio_data_url(
+    path: str,
+    audio_format: str = "mp3",
+    chunk_bytes: int = ENCODE_CHUNK_BYTES,
+) -> Iterator[str]:
+    """Yield a ``data:`` URL for the audio file in pieces; the first carries the prefix."""
+    prefix = f"data:{audio_mime_type(audio_format)};base64,"
+    empty = True
+    for piece in iter_base64_file(path, chunk_bytes):
+        yield prefix + piece if empty else piece
+        empty = False
+    if empty:
+        yield prefix
+
+
+def iter_json_with_audio(
+    document: str,
+    placeholder: str,
+    path: str,
+    audio_format: str = "mp3",
+) -> Iterator[str]:
+    """Yield ``document`` with the string ``placeholder`` replaced by the audio's data URL.
+
+    The surrounding JSON is serialized once with a short placeholder value;
+    the data URL is then spliced in as it is encoded, so the full response
+    body never exists in memory.  Base64 text needs no JSON escaping.
+    """
+    head, sep, tail = document.partition(placeholder)
+    if not sep:
+        raise ValueError("placeholder not found in document")
+    yield head
+    yield from iter_audio_data_url(path, audio_format)
+    yield tail
+
+
+def decode_base64_to_file(b64_data: str, out: BinaryIO, chunk_chars: int = DECODE_CHUNK_CHARS) -> int:
+    """Decode base64 text (optionally a ``data:`` URL) into ``out``; returns bytes written.
+
+    Whitespace and line breaks are ignored.  Raises ``binascii.Error`` on
+    invalid input.
+    """
+    if chunk_chars <= 0 or chunk_chars % 4:
+        raise ValueError("chunk_chars must be a positive multiple of 4")
+    # Base64 has no commas, so anything up to the first one is a data URL header.
+    start = b64_data.find(",") + 1
+    written = 0
+    pending = ""
+    for offset in range(start, len(b64_data), chunk_chars):
+        piece = pending + "".join(b64_data[offset:offset + chunk_chars].split())
+        usable = len(piece) - len(piece) % 4
+        pending = piece[usable:]
+        if usable:
+            written += out.write(base64.b64decode(piece[:usable], validate=True))
+    if pending:
+        raise binascii.Error("base64 data is truncated")
+    return written
+
+
+def base64_to_temp_file(b64_data: str, audio_format: str = "mp3", prefix: str = "openrouter_audio_") -> str:
+    """Decode an uploaded base64 audio string into a new temporary file and return its path."""
+    suffix = f".{audio_format}" if not audio_format.startswith(".") else audio_format
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            decode_base64_to_file(b64_data, f)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,82 @@
+"""Unit tests for chunked base64 audio helpers."""
+
+import base64
+import binascii
+import glob
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from acestep.api.http.base64_audio import (
+    base64_to_temp_file,
+    decode_base64_to_file,
+    iter_audio_data_url,
+    iter_base64_file,
+    iter_json_with_audio,
+)
+
+
+class Base64AudioTests(unittest.TestCase):
+    """Encoding files in pieces and decoding uploads to disk."""
+
+    def setUp(self):
+        """Write a small binary "audio" file."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.payload = os.urandom(10_001)
+        self.path = os.path.join(self.temp_dir, "out.wav")
+        with open(self.path, "wb") as f:
+            f.write(self.payload)
+        self.encoded = base64.b64encode(self.payload).decode("ascii")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_pieces_concatenate_to_the_full_encoding(self):
+        """Each block is read separately but the joined text equals a one-shot encode."""
+        pieces = list(iter_base64_file(self.path, chunk_bytes=3 * 1024))
+        self.assertEqual(len(pieces), 4)
+        self.assertEqual("".join(pieces), self.encoded)
+        with self.assertRaises(ValueError):
+            next(iter_base64_file(self.path, chunk_bytes=1000))
+
+    def test_data_url_prefix_is_only_on_the_first_piece(self):
+        """Streamed deltas can be concatenated by the client into one data URL."""
+        pieces = list(iter_audio_data_url(self.path, "wav", chunk_bytes=3 * 1024))
+        self.assertTrue(pieces[0].startswith("data:audio/wav;base64,"))
+        self.assertFalse(any(p.startswith("data:") for p in pieces[1:]))
+        self.assertEqual("".join(pieces), "data:audio/wav;base64," + self.encoded)
+
+    def test_json_body_is_spliced_around_the_audio(self):
+        """The streamed body parses to the same JSON as the fully built response."""
+        document = json.dumps({"id": "x", "audio": [{"audio_url": {"url": "@@audio@@"}}]})
+        body = "".join(iter_json_with_audio(document, "@@audio@@", self.path, "flac"))
+        self.assertEqual(json.loads(body)["audio"][0]["audio_url"]["url"], "data:audio/flac;base64," + self.encoded)
+
+    def test_decode_accepts_data_urls_and_line_breaks(self):
+        """Wrapped base64 and data URL headers decode across slice boundaries."""
+        wrapped = "\n".join(self.encoded[i:i + 76] for i in range(0, len(self.encoded), 76))
+        for text in (self.encoded, "data:audio/wav;base64," + wrapped):
+            out = io.BytesIO()
+            self.assertEqual(decode_base64_to_file(text, out, chunk_chars=400), len(self.payload))
+            self.assertEqual(out.getvalue(), self.payload)
+        with self.assertRaises(binascii.Error):
+            decode_base64_to_file(self.encoded[:-1], io.BytesIO())
+
+    def test_temp_file_is_removed_when_the_upload_is_invalid(self):
+        """A bad upload raises and leaves no partial file behind."""
+        with mock.patch("tempfile.tempdir", self.temp_dir):
+            path = base64_to_temp_file(self.encoded, "wav")
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), self.payload)
+            with self.assertRaises(binascii.Error):
+                base64_to_temp_file(self.encoded[:800] + "*invalid*", "mp3")
+        self.assertEqual(glob.glob(os.path.join(self.temp_dir, "openrouter_audio_*")), [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,324 @@
+"""Coalescing of compatible queued generation jobs into one DiT batch.
+
+Jobs that share every batch-level DiT setting (model, duration, steps,
+guidance, schedule, output format, ...) differ only in per-item inputs
+(caption, lyrics, metadata, seeds), which the handler already accepts as
+per-item lists.  ``JobCoalescer`` pulls such jobs off the API queue,
+optionally waiting a short window for more to arrive, so the worker can
+serve several users with a single ``generate_music`` call.
+
+With LM affinity enabled the coalescer also picks which job runs next:
+among the queued jobs it prefers the oldest one that can run on the
+currently loaded 5Hz LM, so jobs naming different ``lm_model_path`` values
+are served in runs instead of forcing a model switch per job.  A job is
+passed over at most ``max_bypass`` times before it runs regardless.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Upper bound shared with ``service_generate_request.MAX_BATCH_SIZE``.
+MAX_COALESCED_BATCH = 8
+
+# Upper bounds (seconds) of the queue-wait histogram buckets.
+QUEUE_WAIT_BUCKETS: Tuple[float, ...] = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Jobs pulled off the queue per pick when looking for an LM-affine head.
+AFFINITY_LOOKAHEAD = 16
+
+QueueItem = Tuple[str, Any]
+
+
+@dataclass(frozen=True)
+class CoalesceConfig:
+    """Coalescing settings.
+
+    Attributes:
+        enabled: Whether compatible jobs may be merged at all.
+        window_seconds: How long the first job of a group waits for
+            compatible jobs to arrive once the queue is drained.
+        max_batch: Maximum combined ``batch_size`` of a merged group.
+        lm_affinity: Whether jobs on the loaded LM may run ahead of older
+            jobs that need a different one.
+        max_bypass: How many times a job may be passed over for LM
+            affinity before it runs next.
+    """
+
+    enabled: bool = True
+    window_seconds: float = 0.05
+    max_batch: int = MAX_COALESCED_BATCH
+    lm_affinity: bool = True
+    max_bypass: int = 4
+
+    @classmethod
+    def from_env(cls) -> "CoalesceConfig":
+        """Build settings from ``ACESTEP_COALESCE_*`` and ``ACESTEP_LM_AFFINITY*``."""
+        truthy = {"1", "true", "yes", "y", "on"}
+        enabled = os.getenv("ACESTEP_COALESCE_JOBS", "true").strip().lower() in truthy
+        lm_affinity = os.getenv("ACESTEP_LM_AFFINITY", "true").strip().lower() in truthy
+        try:
+            window_ms = float(os.getenv("ACESTEP_COALESCE_WINDOW_MS", "50"))
+        except ValueError:
+            window_ms = 50.0
+        try:
+            max_batch = int(os.getenv("ACESTEP_COALESCE_MAX_BATCH", str(MAX_COALESCED_BATCH)))
+        except ValueError:
+            max_batch = MAX_COALESCED_BATCH
+        try:
+            max_bypass = int(os.getenv("ACESTEP_LM_AFFINITY_MAX_BYPASS", "4"))
+        except ValueError:
+            max_bypass = 4
+        return cls(
+            enabled=enabled,
+            window_seconds=max(0.0, window_ms) / 1000.0,
+            max_batch=max(1, min(max_batch, MAX_COALESCED_BATCH)),
+            lm_affinity=lm_affinity,
+            max_bypass=max(0, max_bypass),
+        )
+
+
+def request_batch_size(req: Any) -> int:
+    """Return the number of audios a request produces (API default: 2 per track)."""
+    batch_size = getattr(req, "batch_size", None)
+    per_track = max(1, int(batch_size)) if batch_size is not None else 2
+    return per_track * max(1, len(getattr(req, "track_names", None) or ()))
+
+
+def coalesce_key(req: Any, *, lm_active: bool) -> Optional[Hashable]:
+    """
+    Return the merge key of a request, or ``None`` if it must run alone.
+
+    Only plain text2music jobs are eligible: anything needing source or
+    reference audio, LM code generation, sampling/formatting or analysis
+    runs on its own.  When the 5Hz LM is loaded it would otherwise rewrite
+    caption/language and fill metadata per job, so those jobs are only
+    eligible when CoT caption/language are off and bpm, key and time
+    signature are given explicitly (the LM pass would not change the DiT
+    inputs).
+
+    Args:
+        req: A ``GenerateMusicRequest``.
+        lm_active: Whether the 5Hz LM is initialized on the server or could
+            still be lazy-loaded by a solo job.
+
+    Returns:
+        A hashable key; jobs with equal keys can share one DiT batch.
+    """
+    if (getattr(req, "task_type", "text2music") or "text2music") != "text2music":
+        return None
+    if req.thinking or req.sample_mode or (req.sample_query or "").strip() or req.use_format:
+        return None
+    if req.analysis_only or req.full_analysis_only:
+        return None
+    if req.reference_audio_path or req.src_audio_path or getattr(req, "reference_id", None):
+        return None
+    if req.audio_duration is None or float(req.audio_duration) <= 0:
+        return None
+    if lm_active:
+        if req.use_cot_caption or req.use_cot_language:
+            return None
+        if not req.bpm or not (req.key_scale or "").strip() or not (req.time_signature or "").strip():
+            return None
+    return (
+        req.model or "",
+        getattr(req, "lora_path", None) or "",
+        round(float(req.audio_duration), 2),
+        int(req.inference_steps),
+        float(req.guidance_scale),
+        bool(req.use_adg),
+        float(req.cfg_interval_start),
+        float(req.cfg_interval_end),
+        float(req.shift),
+        req.infer_method,
+        req.timesteps or "",
+        req.audio_format,
+        req.instruction,
+    )
+
+
+def split_by_counts(items: Sequence[Any], counts: Sequence[int]) -> List[List[Any]]:
+    """Split a flat batch back into consecutive per-job slices."""
+    slices: List[List[Any]] = []
+    start = 0
+    for count in counts:
+        slices.append(list(items[start:start + count]))
+        start += count
+    return slices
+
+
+class CoalesceStats:
+    """Counters for merge rate, group sizes and queue wait times."""
+
+    def __init__(self, wait_buckets: Sequence[float] = QUEUE_WAIT_BUCKETS):
+        self.wait_buckets = tuple(wait_buckets)
+        self.jobs = 0
+        self.groups = 0
+        self.merged_jobs = 0
+        self.group_sizes: Counter = Counter()
+        self.wait_counts = [0] * (len(self.wait_buckets) + 1)
+        self.wait_sum = 0.0
+        self.lm_affinity_reorders = 0
+
+    def record_group(self, waits: Sequence[float]) -> None:
+        """Record one dispatched group given each job's queue wait in seconds."""
+        size = len(waits)
+        if size == 0:
+            return
+        self.jobs += size
+        self.groups += 1
+        self.group_sizes[size] += 1
+        if size > 1:
+            self.merged_jobs += size
+        for wait in waits:
+            wait = max(0.0, float(wait))
+            self.wait_sum += wait
+            for idx, bound in enumerate(self.wait_buckets):
+                if wait <= bound:
+                    self.wait_counts[idx] += 1
+                    break
+            else:
+                self.wait_counts[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view for ``/v1/stats``."""
+        labels = [f"le_{bound:g}s" for bound in self.wait_buckets] + ["gt_{:g}s".format(self.wait_buckets[-1])]
+        return {
+            "jobs": self.jobs,
+            "dit_passes": self.groups,
+            "dit_passes_saved": self.jobs - self.groups,
+            "merged_jobs": self.merged_jobs,
+            "merge_rate": (self.merged_jobs / self.jobs) if self.jobs else 0.0,
+            "group_size_histogram": {str(size): count for size, count in sorted(self.group_sizes.items())},
+            "queue_wait_histogram": dict(zip(labels, self.wait_counts)),
+            "avg_queue_wait_seconds": (self.wait_sum / self.jobs) if self.jobs else 0.0,
+            "lm_affinity_reorders": self.lm_affinity_reorders,
+        }
+
+
+class JobCoalescer:
+    """
+    Pull the next job group from an ``asyncio.Queue`` of ``(job_id, req)``.
+
+    Queued jobs that do not fit the current group are held in a local
+    deferred deque, in arrival order, and are served before new queue items.
+    Every item returned was obtained with exactly one ``queue.get()``, so the
+    caller still owes one ``task_done()`` per job.
+
+    ``affinity_fn(req)`` names the LM a job needs (``None`` or ``""`` when
+    any model will do) and ``preferred_fn()`` the LM currently loaded; both
+    are optional and only used when ``config.lm_affinity`` is set.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        config: CoalesceConfig,
+        key_fn: Callable[[Any], Optional[Hashable]],
+        size_fn: Callable[[Any], int] = request_batch_size,
+        affinity_fn: Optional[Callable[[Any], Optional[str]]] = None,
+        preferred_fn: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        self.queue = queue
+        self.config = config
+        self.key_fn = key_fn
+        self.size_fn = size_fn
+        self.affinity_fn = affinity_fn
+        self.preferred_fn = preferred_fn
+        self.deferred: Deque[QueueItem] = deque()
+        self.bypassed: Dict[str, int] = {}
+        self.stats = CoalesceStats()
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting, including ones deferred by this coalescer."""
+        return self.queue.qsize() + len(self.deferred)
+
+    async def next_group(self) -> List[QueueItem]:
+        """Return the next job and any compatible jobs merged with it."""
+        head = await self._next_head()
+        group = [head]
+        if not self.config.enabled:
+            return group
+        key = self.key_fn(head[1])
+        budget = self.config.max_batch - self.size_fn(head[1])
+        if key is None or budget <= 0:
+            return group
+
+        def _take(item: QueueItem) -> bool:
+            nonlocal budget
+            size = self.size_fn(item[1])
+            if size <= budget and self.key_fn(item[1]) == key:
+                group.append(item)
+                budget -= size
+                return True
+            return False
+
+        kept: Deque[QueueItem] = deque()
+        while self.deferred:
+            item = self.deferred.popleft()
+            if budget <= 0 or not _take(item):
+                kept.append(item)
+        self.deferred = kept
+
+        deadline = time.monotonic() + self.config.window_seconds
+        while budget > 0:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if not _take(item):
+                self.deferred.append(item)
+        return group
+
+    async def _next_head(self) -> QueueItem:
+        """Return the oldest job, or the oldest one affine to the loaded LM."""
+        if not self.deferred:
+            head = await self.queue.get()
+            if not self._affinity_enabled() or self.queue.empty():
+                return head
+            self.deferred.append(head)
+        if not self._affinity_enabled():
+            return self.deferred.popleft()
+
+        while len(self.deferred) < AFFINITY_LOOKAHEAD:
+            try:
+                self.deferred.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        preferred = self.preferred_fn() if self.preferred_fn else None
+        oldest = self.deferred[0]
+        if not preferred or self._fits(oldest, preferred) or self.bypassed.get(oldest[0], 0) >= self.config.max_bypass:
+            return self._take_head(0)
+        for idx, item in enumerate(self.deferred):
+            if self._fits(item, preferred):
+                for skipped, _ in list(self.deferred)[:idx]:
+                    self.bypassed[skipped] = self.bypassed.get(skipped, 0) + 1
+                self.stats.lm_affinity_reorders += 1
+                return self._take_head(idx)
+        # Nothing runs on the loaded LM: switch for the oldest job.
+        return self._take_head(0)
+
+    def _affinity_enabled(self) -> bool:
+        return self.config.lm_affinity and self.affinity_fn is not None
+
+    def _fits(self, item: QueueItem, preferred: str) -> bool:
+        """Whether *item* can run on the LM named *preferred* without a switch."""
+        wanted = self.affinity_fn(item[1]) if self.affinity_fn else None
+        return not wanted or wanted == preferred
+
+    def _take_head(self, idx: int) -> QueueItem:
+        item = self.deferred[idx]
+        del self.deferred[idx]
+        self.bypassed.pop(item[0], None)
+        return item
@@ -0,0 +1,203 @@
+"""Unit tests for queued-job coalescing."""
+
+import asyncio
+import os
+import unittest
+from unittest import mock
+from types import SimpleNamespace
+
+from acestep.api.jobs.coalescing import (
+    CoalesceConfig,
+    CoalesceStats,
+    JobCoalescer,
+    coalesce_key,
+    request_batch_size,
+    split_by_counts,
+)
+
+
+def _req(**overrides):
+    """Build a request namespace with ``GenerateMusicRequest`` defaults."""
+    fields = dict(
+        task_type="text2music", thinking=False, sample_mode=False, sample_query="", use_format=False,
+        analysis_only=False, full_analysis_only=False, reference_audio_path=None, src_audio_path=None,
+        audio_duration=30.0, use_cot_caption=True, use_cot_language=True, bpm=None, key_scale="",
+        time_signature="", model=None, inference_steps=8, guidance_scale=7.0, use_adg=False,
+        cfg_interval_start=0.0, cfg_interval_end=1.0, shift=3.0, infer_method="ode", timesteps=None,
+        audio_format="mp3", instruction="inst", batch_size=2, prompt="p",
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+class CoalesceKeyTests(unittest.TestCase):
+    """Tests for job eligibility and compatibility keys."""
+
+    def test_plain_jobs_share_key_across_prompts(self):
+        """Per-item inputs such as the prompt should not affect the key."""
+        self.assertEqual(
+            coalesce_key(_req(prompt="rock"), lm_active=False),
+            coalesce_key(_req(prompt="jazz"), lm_active=False),
+        )
+
+    def test_batch_level_settings_change_key(self):
+        """Duration, steps, model and LoRA adapter should split groups."""
+        base = coalesce_key(_req(), lm_active=False)
+        self.assertNotEqual(base, coalesce_key(_req(audio_duration=60.0), lm_active=False))
+        self.assertNotEqual(base, coalesce_key(_req(inference_steps=16), lm_active=False))
+        self.assertNotEqual(base, coalesce_key(_req(model="other"), lm_active=False))
+        self.assertNotEqual(base, coalesce_key(_req(lora_path="/loras/style"), lm_active=False))
+
+    def test_ineligible_jobs_return_none(self):
+        """Audio-conditioned, LM-driven or duration-less jobs must run alone."""
+        for overrides in (
+            {"task_type": "lego"}, {"thinking": True}, {"sample_mode": True}, {"use_format": True},
+            {"src_audio_path": "/tmp/a.wav"}, {"reference_audio_path": "/tmp/r.wav"}, {"reference_id": "house"},
+            {"audio_duration": None}, {"analysis_only": True},
+        ):
+            self.assertIsNone(coalesce_key(_req(**overrides), lm_active=False), overrides)
+
+    def test_lm_active_requires_explicit_metadata(self):
+        """With the LM loaded, only jobs the LM would not alter are eligible."""
+        self.assertIsNone(coalesce_key(_req(), lm_active=True))
+        explicit = _req(use_cot_caption=False, use_cot_language=False, bpm=120, key_scale="C major", time_signature="4")
+        self.assertIsNotNone(coalesce_key(explicit, lm_active=True))
+
+
+class SplitAndStatsTests(unittest.TestCase):
+    """Tests for result splitting and statistics."""
+
+    def test_split_by_counts(self):
+        """Outputs should be split into consecutive per-job slices."""
+        self.assertEqual(split_by_counts([1, 2, 3, 4, 5], [2, 1, 2]), [[1, 2], [3], [4, 5]])
+        self.assertEqual(split_by_counts([1, 2], [2, 2]), [[1, 2], []])
+
+    def test_request_batch_size_defaults_to_two(self):
+        """Missing batch_size should follow the API default of two audios."""
+        self.assertEqual(request_batch_size(_req(batch_size=None)), 2)
+        self.assertEqual(request_batch_size(_req(batch_size=3)), 3)
+        self.assertEqual(request_batch_size(_req(batch_size=1, track_names=["vocals", "drums"])), 2)
+
+    def test_stats_snapshot(self):
+        """Merge rate and histograms should reflect recorded groups."""
+        stats = CoalesceStats(wait_buckets=(1.0, 10.0))
+        stats.record_group([0.5, 2.0, 20.0])
+        stats.record_group([0.2])
+        snap = stats.snapshot()
+        self.assertEqual(snap["jobs"], 4)
+        self.assertEqual(snap["dit_passes"], 2)
+        self.assertEqual(snap["dit_passes_saved"], 2)
+        self.assertAlmostEqual(snap["merge_rate"], 0.75)
+        self.assertEqual(snap["group_size_histogram"], {"1": 1, "3": 1})
+        self.assertEqual(snap["queue_wait_histogram"], {"le_1s": 2, "le_10s": 1, "gt_10s": 1})
+
+
+class JobCoalescerTests(unittest.IsolatedAsyncioTestCase):
+    """Tests for pulling job groups off the queue."""
+
+    def _coalescer(self, queue, **config):
+        return JobCoalescer(queue, CoalesceConfig(**config), key_fn=lambda req: coalesce_key(req, lm_active=False))
+
+    async def test_compatible_queued_jobs_merge_and_others_keep_order(self):
+        """Compatible jobs merge; incompatible ones are served next in order."""
+        queue = asyncio.Queue()
+        items = [("a", _req()), ("b", _req(audio_duration=60.0)), ("c", _req()), ("d", _req(audio_duration=60.0))]
+        for item in items:
+            queue.put_nowait(item)
+        coalescer = self._coalescer(queue, window_seconds=0.0)
+        first = await coalescer.next_group()
+        self.assertEqual([job_id for job_id, _ in first], ["a", "c"])
+        self.assertEqual(coalescer.pending_count(), 2)
+        second = await coalescer.next_group()
+        self.assertEqual([job_id for job_id, _ in second], ["b", "d"])
+
+    async def test_group_respects_max_batch(self):
+        """Combined batch size should not exceed the configured maximum."""
+        queue = asyncio.Queue()
+        for idx in range(4):
+            queue.put_nowait((str(idx), _req(batch_size=2)))
+        coalescer = self._coalescer(queue, window_seconds=0.0, max_batch=4)
+        self.assertEqual(len(await coalescer.next_group()), 2)
+        self.assertEqual(len(await coalescer.next_group()), 2)
+
+    async def test_window_waits_for_late_jobs(self):
+        """Jobs arriving within the window should join the group."""
+        queue = asyncio.Queue()
+        queue.put_nowait(("a", _req()))
+        coalescer = self._coalescer(queue, window_seconds=0.5)
+
+        async def _late_put():
+            await asyncio.sleep(0.05)
+            await queue.put(("b", _req()))
+
+        task = asyncio.create_task(_late_put())
+        group = await coalescer.next_group()
+        await task
+        self.assertEqual([job_id for job_id, _ in group], ["a", "b"])
+
+    async def test_disabled_or_ineligible_returns_single_job(self):
+        """Disabled coalescing and ineligible heads should not merge."""
+        queue = asyncio.Queue()
+        queue.put_nowait(("a", _req()))
+        queue.put_nowait(("b", _req()))
+        self.assertEqual(len(await self._coalescer(queue, enabled=False).next_group()), 1)
+        queue.put_nowait(("c", _req(thinking=True)))
+        coalescer = self._coalescer(queue, window_seconds=0.0)
+        self.assertEqual([job_id for job_id, _ in await coalescer.next_group()], ["b"])
+
+
+class LMAffinityTests(unittest.IsolatedAsyncioTestCase):
+    """Tests for preferring jobs that run on the loaded LM."""
+
+    def _coalescer(self, queue, loaded, max_bypass=4):
+        """Build a non-merging coalescer whose loaded LM is ``loaded[0]``."""
+        return JobCoalescer(
+            queue,
+            CoalesceConfig(enabled=False, max_bypass=max_bypass),
+            key_fn=lambda req: None,
+            affinity_fn=lambda req: req.lm_model_path,
+            preferred_fn=lambda: loaded[0],
+        )
+
+    async def _order(self, coalescer, count, loaded):
+        """Pop *count* jobs, loading each job's LM as it runs."""
+        order = []
+        for _ in range(count):
+            job_id, req = (await coalescer.next_group())[0]
+            loaded[0] = req.lm_model_path or loaded[0]
+            order.append(job_id)
+        return order
+
+    async def test_jobs_on_loaded_lm_run_first_and_runs_stay_together(self):
+        """Interleaved LM jobs are served in runs; LM-agnostic jobs never wait."""
+        queue = asyncio.Queue()
+        models = {"a1": "A", "b1": "B", "a2": "A", "n": None, "b2": "B", "a3": "A"}
+        for job_id, model in models.items():
+            queue.put_nowait((job_id, _req(lm_model_path=model)))
+        loaded = ["A"]
+        coalescer = self._coalescer(queue, loaded)
+        self.assertEqual(await self._order(coalescer, 6, loaded), ["a1", "a2", "n", "a3", "b1", "b2"])
+        self.assertEqual(coalescer.stats.lm_affinity_reorders, 3)
+        self.assertEqual(coalescer.bypassed, {})
+
+    async def test_max_bypass_bounds_starvation(self):
+        """A job passed over ``max_bypass`` times runs next and forces the switch."""
+        queue = asyncio.Queue()
+        queue.put_nowait(("b1", _req(lm_model_path="B")))
+        for idx in range(4):
+            queue.put_nowait((f"a{idx}", _req(lm_model_path="A")))
+        loaded = ["A"]
+        coalescer = self._coalescer(queue, loaded, max_bypass=2)
+        self.assertEqual(await self._order(coalescer, 5, loaded), ["a0", "a1", "b1", "a2", "a3"])
+
+    def test_env_config(self):
+        """Affinity settings are read from the environment."""
+        env = {"ACESTEP_LM_AFFINITY": "off", "ACESTEP_LM_AFFINITY_MAX_BYPASS": "7"}
+        with mock.patch.dict(os.environ, env):
+            config = CoalesceConfig.from_env()
+        self.assertFalse(config.lm_affinity)
+        self.assertEqual(config.max_bypass, 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+"""Crash-safe journal of accepted jobs, kept in SQLite (WAL mode).
+
+``_JobStore`` lives in memory, so a crash or a restart for a model update
+used to drop every queued and running job while clients kept polling
+``/query_result`` until the task timeout.  ``JobJournal`` records each
+accepted request (with the paths of its uploaded inputs) and appends every
+state transition, so a restarted server can serve finished jobs from the
+journal and requeue unfinished ones in their original order.
+
+Writes are single-row inserts committed immediately; with WAL and
+``synchronous=NORMAL`` a committed row survives a process crash (only an
+OS crash or power loss can drop the last few transactions).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    env TEXT NOT NULL,
+    request TEXT NOT NULL,
+    temp_files TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    at REAL NOT NULL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS events_by_job ON events (job_id, id);
+"""
+
+
+@dataclass(frozen=True)
+class JournalConfig:
+    """Where the journal lives and how often an interrupted job is retried.
+
+    Attributes:
+        path: SQLite file; ``None`` disables the journal.
+        max_attempts: Starts after which a job that keeps being interrupted
+            by restarts is failed instead of requeued (guards against a job
+            that crashes the server every time it runs).
+    """
+
+    path: Optional[str] = None
+    max_attempts: int = 2
+
+    @classmethod
+    def from_env(cls, default_path: str) -> "JournalConfig":
+        """Build settings from ``ACESTEP_JOB_JOURNAL`` and ``ACESTEP_JOB_JOURNAL_MAX_ATTEMPTS``."""
+        raw = os.getenv("ACESTEP_JOB_JOURNAL", default_path).strip()
+        path = None if raw.lower() in {"", "0", "false", "no", "off"} else raw
+        try:
+            max_attempts = max(1, int(os.getenv("ACESTEP_JOB_JOURNAL_MAX_ATTEMPTS", str(cls.max_attempts))))
+        except ValueError:
+            max_attempts = cls.max_attempts
+        return cls(path=path, max_attempts=max_attempts)
+
+
+@dataclass
+class JournaledJob:
+    """One job as reconstructed from the journal.
+
+    Attributes:
+        job_id: Task id handed to the client.
+        created_at: Acceptance time (epoch seconds).
+        env: Record ``env`` field.
+        request: ``GenerateMusicRequest`` fields.
+        temp_files: Uploaded inputs owned by the job.
+        status: Last recorded state.
+        attempts: How many times the job was started.
+        result: Result dict of a succeeded job.
+        error: Error of a failed job.
+        finished_at: Time of the terminal transition.
+    """
+
+    job_id: str
+    created_at: float
+    env: str
+    request: Dict[str, Any]
+    temp_files: List[str]
+    status: str
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job reached a terminal state."""
+        return self.status in TERMINAL_STATES
+
+
+class JobJournal:
+    """Append-only job journal; safe to call from several threads."""
+
+    def __init__(self, path: str) -> None:
+        """Open (or create) the journal at ``path``."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._tracked = {row[0] for row in self._conn.execute("SELECT job_id FROM jobs")}
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._tracked
+
+    def add(
+        self,
+        job_id: str,
+        request: Dict[str, Any],
+        temp_files: Iterable[str] = (),
+        *,
+        created_at: Optional[float] = None,
+        env: str = "development",
+    ) -> None:
+        """Record an accepted job in state ``queued``."""
+        created_at = time.time() if created_at is None else created_at
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, created_at, env, request, temp_files) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, created_at, env, json.dumps(request, default=str), json.dumps(list(temp_files))),
+                )
+                self._conn.execute(
+                    "INSERT INTO events (job_id, status, at, data) VALUES (?, 'queued', ?, NULL)",
+                    (job_id, created_at),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._tracked.add(job_id)
+
+    def record(self, job_id: str, status: str, data: Any = None) -> None:
+        """Append a state transition; ignored for jobs that were never added."""
+        if job_id not in self._tracked:
+            return
+        payload = None if data is None else json.dumps(data, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (job_id, status, at, data) VALUES (?, ?, ?, ?)",
+                (job_id, status, time.time(), payload),
+            )
+
+    def load(self) -> List[JournaledJob]:
+        """Return every journaled job in acceptance order with its last state."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT j.job_id, j.created_at, j.env, j.request, j.temp_files, e.status, e.at, e.data,
+                       (SELECT COUNT(*) FROM events r WHERE r.job_id = j.job_id AND r.status = 'running')
+                FROM jobs j
+                JOIN events e ON e.id = (SELECT MAX(id) FROM events l WHERE l.job_id = j.job_id)
+                ORDER BY j.seq
+                """
+            ).fetchall()
+        jobs = []
+        for job_id, created_at, env, request, temp_files, status, at, data, attempts in rows:
+            job = JournaledJob(
+                job_id=job_id,
+                created_at=created_at,
+                env=env,
+                request=json.loads(request),
+                temp_files=json.loads(temp_files),
+                status=status,
+                attempts=attempts,
+            )
+            if job.finished:
+                job.finished_at = at
+                value = json.loads(data) if data is not None else None
+                if status == "succeeded":
+                    job.result = value
+                else:
+                    job.error = value
+            jobs.append(job)
+        return jobs
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete jobs that finished more than ``max_age_seconds`` ago; returns the count."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            job_ids = [
+                row[0]
+                for row in self._conn.execute(
+                    """
+                    SELECT e.job_id FROM events e
+                    WHERE e.status IN ('succeeded', 'failed') AND e.at < ?
+                      AND e.id = (SELECT MAX(id) FROM events l WHERE l.job_id = e.job_id)
+                    """,
+                    (cutoff,),
+                )
+            ]
+            if not job_ids:
+                return 0
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("DELETE FROM events WHERE job_id = ?", [(j,) for j in job_ids])
+                self._conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(j,) for j in job_ids])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._tracked.difference_update(job_ids)
+        return len(job_ids)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view for ``/v1/stats``."""
+        return {"path": self.path, "jobs": len(self._tracked)}
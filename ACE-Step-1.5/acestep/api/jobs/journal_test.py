@@ -0,0 +1,93 @@
+"""Unit tests for the SQLite job journal."""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from acestep.api.jobs.journal import JobJournal, JournalConfig
+
+
+class JobJournalTests(unittest.TestCase):
+    """Recording, reloading and pruning jobs."""
+
+    def setUp(self):
+        """Create a journal in a temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "state", "jobs.sqlite3")
+        self.journal = JobJournal(self.path)
+
+    def tearDown(self):
+        """Close the journal and remove the directory."""
+        self.journal.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_reopened_journal_restores_states_in_acceptance_order(self):
+        """A fresh connection (as after a crash) sees every committed transition."""
+        self.journal.add("done", {"prompt": "a"}, created_at=100.0)
+        self.journal.add("broken", {"prompt": "b"})
+        self.journal.add("running", {"prompt": "c"}, ["/tmp/ctx_audio.wav"], env="production")
+        self.journal.add("waiting", {"prompt": "d"})
+        for job_id in ("done", "broken", "running"):
+            self.journal.record(job_id, "running")
+        self.journal.record("done", "succeeded", {"audio_paths": ["/v1/audio?path=x"]})
+        self.journal.record("broken", "failed", "Traceback: boom")
+
+        reopened = JobJournal(self.path)
+        try:
+            jobs = {job.job_id: job for job in reopened.load()}
+            self.assertEqual(list(jobs), ["done", "broken", "running", "waiting"])
+        finally:
+            reopened.close()
+        self.assertEqual(jobs["done"].result, {"audio_paths": ["/v1/audio?path=x"]})
+        self.assertEqual((jobs["done"].created_at, jobs["done"].finished), (100.0, True))
+        self.assertEqual((jobs["broken"].status, jobs["broken"].error), ("failed", "Traceback: boom"))
+        running = jobs["running"]
+        self.assertEqual((running.status, running.attempts, running.env), ("running", 1, "production"))
+        self.assertEqual((running.request, running.temp_files), ({"prompt": "c"}, ["/tmp/ctx_audio.wav"]))
+        self.assertEqual((jobs["waiting"].status, jobs["waiting"].attempts), ("queued", 0))
+
+    def test_untracked_jobs_and_duplicates(self):
+        """Transitions of jobs never added are ignored; ids are unique."""
+        self.journal.record("openrouter-job", "running")
+        self.assertEqual(self.journal.load(), [])
+        self.journal.add("j", {})
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.journal.add("j", {})
+        self.assertEqual(len(self.journal.load()), 1)
+
+    def test_prune_removes_only_old_finished_jobs(self):
+        """Finished jobs past the age limit go; unfinished jobs stay however old."""
+        self.journal.add("old", {}, created_at=0.0)
+        self.journal.add("stuck", {}, created_at=0.0)
+        self.journal.add("recent", {})
+        with mock.patch("acestep.api.jobs.journal.time.time", return_value=time.time() - 7200):
+            self.journal.record("old", "succeeded", {})
+        self.journal.record("recent", "failed", "err")
+        self.assertEqual(self.journal.prune(3600), 1)
+        self.assertEqual([job.job_id for job in self.journal.load()], ["stuck", "recent"])
+        self.assertNotIn("old", self.journal)
+        self.assertEqual(self.journal.snapshot()["jobs"], 2)
+
+    def test_wal_mode_is_enabled(self):
+        """The database runs in write-ahead-log mode."""
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        finally:
+            conn.close()
+
+    def test_config_from_env(self):
+        """The path can be overridden or switched off."""
+        self.assertEqual(JournalConfig.from_env("/data/jobs.db").path, "/data/jobs.db")
+        env = {"ACESTEP_JOB_JOURNAL": "off", "ACESTEP_JOB_JOURNAL_MAX_ATTEMPTS": "5"}
+        with mock.patch.dict(os.environ, env):
+            config = JournalConfig.from_env("/data/jobs.db")
+        self.assertEqual((config.path, config.max_attempts), (None, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Short-lived retention of finished jobs' DiT latents.
+
+``generate_music`` returns the exact ``pred_latents`` behind every audio it
+saves.  Keeping them for the most recent jobs lets ``/v1/convert_to_codes``
+tokenize a just-finished result into 5Hz audio codes directly, instead of
+reloading, resampling and VAE-encoding the saved audio file again.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import torch
+
+DEFAULT_RETAINED_JOBS = 16
+
+
+@dataclass(frozen=True)
+class RetainedLatents:
+    """Latents kept for one finished job.
+
+    Attributes:
+        latents: CPU tensor shaped ``[num_audios, T, D]``, row ``i`` matching
+            the job's ``i``-th audio.
+        model_name: DiT model that produced the latents; codes must be
+            computed with the same model's tokenizer.
+    """
+
+    latents: torch.Tensor
+    model_name: str
+
+    def sample(self, index: int) -> Optional[torch.Tensor]:
+        """Return the ``[1, T, D]`` latents of audio ``index`` or ``None`` if out of range."""
+        if index < 0 or index >= self.latents.shape[0]:
+            return None
+        return self.latents[index:index + 1]
+
+
+class RetainedLatentCache:
+    """Thread-safe LRU of the latents of the most recently finished jobs."""
+
+    def __init__(self, capacity: int = DEFAULT_RETAINED_JOBS):
+        """Create a cache holding at most ``capacity`` jobs (``0`` disables retention)."""
+        self.capacity = max(0, int(capacity))
+        self._entries: "OrderedDict[str, RetainedLatents]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RetainedLatentCache":
+        """Build a cache sized by ``ACESTEP_RETAINED_LATENT_JOBS``."""
+        try:
+            capacity = int(os.getenv("ACESTEP_RETAINED_LATENT_JOBS", str(DEFAULT_RETAINED_JOBS)))
+        except ValueError:
+            capacity = DEFAULT_RETAINED_JOBS
+        return cls(capacity)
+
+    def put(self, job_id: str, latents: Optional[torch.Tensor], model_name: str) -> bool:
+        """Retain ``latents`` for ``job_id``; returns ``False`` when nothing was stored."""
+        if self.capacity == 0 or latents is None or latents.dim() != 3:
+            return False
+        entry = RetainedLatents(latents=latents.detach().cpu(), model_name=model_name)
+        with self._lock:
+            self._entries[job_id] = entry
+            self._entries.move_to_end(job_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return True
+
+    def get(self, job_id: str) -> Optional[RetainedLatents]:
+        """Return the retained latents of ``job_id`` and mark them recently used."""
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is not None:
+                self._entries.move_to_end(job_id)
+            return entry
+
+    def pop(self, job_id: str) -> Optional[RetainedLatents]:
+        """Drop and return the retained latents of ``job_id``."""
+        with self._lock:
+            return self._entries.pop(job_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
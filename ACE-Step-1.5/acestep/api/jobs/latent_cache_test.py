@@ -0,0 +1,44 @@
+"""Unit tests for retained job latents."""
+
+import unittest
+
+import torch
+
+from acestep.api.jobs.latent_cache import RetainedLatentCache
+
+
+class RetainedLatentCacheTests(unittest.TestCase):
+    """Tests for the LRU of finished jobs' latents."""
+
+    def test_put_get_and_sample_rows(self):
+        """Each audio index maps to its own latent row."""
+        cache = RetainedLatentCache(capacity=2)
+        latents = torch.arange(2 * 3 * 4, dtype=torch.float32).reshape(2, 3, 4)
+        self.assertTrue(cache.put("job", latents, "acestep-v15-turbo"))
+        entry = cache.get("job")
+        self.assertEqual(entry.model_name, "acestep-v15-turbo")
+        self.assertTrue(torch.equal(entry.sample(1), latents[1:2]))
+        self.assertIsNone(entry.sample(2))
+
+    def test_least_recently_used_job_is_evicted(self):
+        """Reading a job keeps it; the oldest untouched job is dropped."""
+        cache = RetainedLatentCache(capacity=2)
+        for job_id in ("a", "b"):
+            cache.put(job_id, torch.zeros(1, 2, 2), "m")
+        cache.get("a")
+        cache.put("c", torch.zeros(1, 2, 2), "m")
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(len(cache), 2)
+
+    def test_zero_capacity_and_bad_shapes_are_not_stored(self):
+        """Disabled caches and non-batched tensors keep nothing."""
+        self.assertFalse(RetainedLatentCache(capacity=0).put("a", torch.zeros(1, 2, 2), "m"))
+        cache = RetainedLatentCache(capacity=2)
+        self.assertFalse(cache.put("a", torch.zeros(2, 2), "m"))
+        self.assertFalse(cache.put("a", None, "m"))
+        self.assertIsNone(cache.pop("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,388 @@
+"""Resident pool of 5Hz LM models shared by one ``LLMHandler``.
+
+Jobs may name their own ``lm_model_path``.  Switching used to re-run
+``LLMHandler.initialize`` on every change (and again to restore the previous
+model), so alternating jobs paid a full weight load each time.  ``LMPool``
+keeps one model active in the handler and *parks* the ones switched away
+from: PyTorch-backend weights stay resident on the device (within
+``device_budget_gb``) or are moved to host RAM (within ``host_budget_gb``),
+so switching back only swaps handler state and copies weights back.
+vLLM and MLX engines own their memory and cannot be parked; they are
+unloaded and re-initialized on the next switch.
+
+Jobs hold a lease on the model they run on, so a switch waits until every
+job using the active model has finished.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+_GB = 1024 ** 3
+
+# ``LLMHandler`` attributes that together make up one loaded model.
+HANDLER_STATE_ATTRS: Tuple[str, ...] = (
+    "llm",
+    "llm_tokenizer",
+    "llm_initialized",
+    "llm_backend",
+    "max_model_len",
+    "device",
+    "dtype",
+    "offload_to_cpu",
+    "constrained_processor",
+    "_hf_model_for_scoring",
+    "_mlx_model",
+    "_mlx_model_path",
+)
+
+InitFn = Callable[[str, Dict[str, Any]], Tuple[str, bool]]
+
+
+@dataclass(frozen=True)
+class LMPoolConfig:
+    """Memory budgets for parked (inactive) LM models.
+
+    Attributes:
+        host_budget_gb: Host RAM that parked weights may occupy.  ``0``
+            disables parking in host memory.
+        device_budget_gb: Accelerator memory that parked weights may keep
+            occupying next to the active model.  ``0`` moves every parked
+            model to host RAM.
+    """
+
+    host_budget_gb: float = 8.0
+    device_budget_gb: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "LMPoolConfig":
+        """Build settings from ``ACESTEP_LM_POOL_*`` environment variables."""
+        def _gb(name: str, default: float) -> float:
+            try:
+                return max(0.0, float(os.getenv(name, str(default))))
+            except ValueError:
+                return default
+
+        return cls(
+            host_budget_gb=_gb("ACESTEP_LM_POOL_HOST_GB", cls.host_budget_gb),
+            device_budget_gb=_gb("ACESTEP_LM_POOL_DEVICE_GB", cls.device_budget_gb),
+        )
+
+
+def job_lm_model(req: Any) -> Optional[str]:
+    """
+    Return the LM a job runs on, or ``None`` if it never touches the LM.
+
+    Mirrors the ``require_llm``/``want_llm`` checks of the release-task
+    worker.  An empty string means "whichever model is active".
+    """
+    uses_lm = (
+        req.thinking
+        or req.sample_mode
+        or (req.sample_query or "").strip()
+        or req.use_format
+        or req.full_analysis_only
+        or req.use_cot_caption
+        or req.use_cot_language
+    )
+    if not uses_lm:
+        return None
+    return (getattr(req, "lm_model_path", None) or "").strip()
+
+
+def module_bytes(model: Any) -> int:
+    """Return the parameter and buffer size of a ``torch.nn.Module`` in bytes."""
+    total = 0
+    for getter in ("parameters", "buffers"):
+        tensors = getattr(model, getter, None)
+        if tensors is None:
+            continue
+        for tensor in tensors():
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def _free_accelerator_memory() -> None:
+    """Collect garbage and return cached accelerator memory to the driver."""
+    gc.collect()
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+@dataclass
+class _Parked:
+    """Handler state of an inactive model."""
+
+    state: Dict[str, Any]
+    init_params: Dict[str, Any]
+    size_bytes: int
+    on_device: bool
+
+
+class LMPoolStats:
+    """Counters for LM requests, switches and switch latency."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hits = 0
+        self.warm_switches = 0
+        self.cold_switches = 0
+        self.failed_switches = 0
+        self.evictions = 0
+        self.switch_seconds_total = 0.0
+        self.switch_seconds_max = 0.0
+        self.switch_seconds_last = 0.0
+
+    def record_switch(self, kind: str, seconds: float) -> None:
+        """Record a ``"warm"``, ``"cold"`` or ``"failed"`` switch."""
+        setattr(self, f"{kind}_switches", getattr(self, f"{kind}_switches") + 1)
+        self.switch_seconds_total += seconds
+        self.switch_seconds_max = max(self.switch_seconds_max, seconds)
+        self.switch_seconds_last = seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view for ``/v1/stats``."""
+        switches = self.warm_switches + self.cold_switches + self.failed_switches
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "switches": switches,
+            "warm_switches": self.warm_switches,
+            "cold_switches": self.cold_switches,
+            "failed_switches": self.failed_switches,
+            "evictions": self.evictions,
+            "switch_seconds_total": self.switch_seconds_total,
+            "avg_switch_seconds": (self.switch_seconds_total / switches) if switches else 0.0,
+            "max_switch_seconds": self.switch_seconds_max,
+            "last_switch_seconds": self.switch_seconds_last,
+        }
+
+
+class LMPool:
+    """
+    Switch the model loaded in one ``LLMHandler`` and keep old ones parked.
+
+    ``init_fn(lm_model_path, init_params) -> (status, ok)`` performs a cold
+    load; ``init_params`` are the keyword arguments (backend, device, ...)
+    the active model was loaded with.  Code that initializes the handler
+    directly must report it through :meth:`note_loaded` /
+    :meth:`note_unloaded` so the pool knows what is active.
+    """
+
+    def __init__(
+        self,
+        handler: Any,
+        init_fn: InitFn,
+        config: Optional[LMPoolConfig] = None,
+        size_fn: Callable[[Any], int] = module_bytes,
+    ):
+        self.handler = handler
+        self.init_fn = init_fn
+        self.config = config or LMPoolConfig()
+        self.size_fn = size_fn
+        self.stats = LMPoolStats()
+        self._cond = threading.Condition()
+        self._active: Optional[str] = None
+        self._active_params: Dict[str, Any] = {}
+        self._parked: "OrderedDict[str, _Parked]" = OrderedDict()
+        self._users = 0
+        self._switching = False
+
+    @classmethod
+    def from_env(cls, handler: Any, init_fn: InitFn) -> "LMPool":
+        """Build a pool with budgets from ``ACESTEP_LM_POOL_*``."""
+        return cls(handler, init_fn, LMPoolConfig.from_env())
+
+    @property
+    def active(self) -> Optional[str]:
+        """The model currently loaded in the handler, if known."""
+        return self._active
+
+    def note_loaded(self, lm_model_path: str, init_params: Optional[Dict[str, Any]] = None) -> None:
+        """Record that the handler was initialized with *lm_model_path* outside the pool."""
+        path = (lm_model_path or "").strip()
+        with self._cond:
+            self._active = path or None
+            if init_params is not None:
+                self._active_params = dict(init_params)
+            stale = self._parked.pop(path, None)
+            self._cond.notify_all()
+        if stale is not None:
+            _free_accelerator_memory()
+
+    def note_unloaded(self) -> None:
+        """Record that the handler's model was unloaded outside the pool."""
+        with self._cond:
+            self._active = None
+
+    def acquire(self, lm_model_path: Optional[str]) -> Optional[str]:
+        """
+        Lease the handler for a job on *lm_model_path*, switching if needed.
+
+        Blocks while other jobs hold leases on a different model.  An empty
+        path leases whichever model is active.  Returns ``None`` on success
+        (call :meth:`release` afterwards) or the error message of a failed
+        switch (no lease is held).
+        """
+        desired = (lm_model_path or "").strip()
+        with self._cond:
+            if desired:
+                self.stats.requests += 1
+            while True:
+                if self._switching:
+                    self._cond.wait()
+                    continue
+                if not self._needs_switch(desired):
+                    if desired and desired == self._active:
+                        self.stats.hits += 1
+                    self._users += 1
+                    return None
+                if self._users == 0:
+                    break
+                self._cond.wait()
+            self._switching = True
+            previous, params = self._active, dict(self._active_params)
+            target = self._parked.pop(desired, None)
+
+        error: Optional[str] = "LM switch aborted"
+        start = time.perf_counter()
+        kind = "failed"
+        try:
+            self._park_active(previous, params)
+            if target is not None:
+                self._restore(target)
+                params, kind = target.init_params, "warm"
+                error = None
+            else:
+                status, ok = self.init_fn(desired, params)
+                if ok:
+                    kind, error = "cold", None
+                else:
+                    error = status or f"Failed to load LM {desired}"
+        except Exception as exc:
+            error = f"Failed to switch LM to {desired}: {exc}"
+        finally:
+            with self._cond:
+                self.stats.record_switch(kind, time.perf_counter() - start)
+                self._switching = False
+                if error is None:
+                    self._active, self._active_params = desired, dict(params)
+                    self._users += 1
+                else:
+                    self._active = None
+                self._cond.notify_all()
+        return error
+
+    def release(self) -> None:
+        """End a lease taken by a successful :meth:`acquire`."""
+        with self._cond:
+            self._users = max(0, self._users - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def use(self, lm_model_path: Optional[str]) -> Iterator[Optional[str]]:
+        """Context-manager form of :meth:`acquire`; yields the switch error or ``None``."""
+        error = self.acquire(lm_model_path)
+        try:
+            yield error
+        finally:
+            if error is None:
+                self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the active/parked models and switch statistics."""
+        with self._cond:
+            parked = [
+                {
+                    "lm_model_path": path,
+                    "location": "device" if entry.on_device else "host",
+                    "size_gb": round(entry.size_bytes / _GB, 3),
+                }
+                for path, entry in self._parked.items()
+            ]
+            data = {
+                "active": self._active,
+                "parked": parked,
+                "host_budget_gb": self.config.host_budget_gb,
+                "device_budget_gb": self.config.device_budget_gb,
+                "leases": self._users,
+            }
+            data.update(self.stats.snapshot())
+        return data
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _needs_switch(self, desired: str) -> bool:
+        """Whether serving *desired* requires changing the handler's model."""
+        if not desired or desired == self._active:
+            return False
+        # Nothing loaded and nothing parked: let the caller's lazy init load it.
+        loaded = bool(getattr(self.handler, "llm_initialized", False))
+        return loaded or desired in self._parked
+
+    def _park_active(self, previous: Optional[str], params: Dict[str, Any]) -> None:
+        """Move the handler's model into the parked set, or unload it."""
+        handler = self.handler
+        if not getattr(handler, "llm_initialized", False):
+            return
+        state = {attr: getattr(handler, attr, None) for attr in HANDLER_STATE_ATTRS}
+        model = state["llm"]
+        parkable = previous and state["llm_backend"] == "pt" and hasattr(model, "to")
+        # The scoring copy is rebuilt lazily; never keep a stale one attached.
+        state["_hf_model_for_scoring"] = None
+        handler._hf_model_for_scoring = None
+        if not parkable:
+            handler.unload()
+            return
+
+        size = self.size_fn(model)
+        with self._cond:
+            device_used = sum(e.size_bytes for e in self._parked.values() if e.on_device)
+        on_device = (
+            not state["offload_to_cpu"]
+            and state["device"] != "cpu"
+            and device_used + size <= self.config.device_budget_gb * _GB
+        )
+        if not on_device and size > self.config.host_budget_gb * _GB:
+            with self._cond:
+                self.stats.evictions += 1
+            handler.unload()
+            return
+        if not on_device:
+            state["llm"] = model.to("cpu")
+        handler.unload()
+        with self._cond:
+            self._parked[previous] = _Parked(state, dict(params), size, on_device)
+            self._evict_over_budget()
+
+    def _evict_over_budget(self) -> None:
+        """Drop least recently parked host entries beyond the host budget."""
+        budget = self.config.host_budget_gb * _GB
+        while True:
+            host = [(path, e) for path, e in self._parked.items() if not e.on_device]
+            if sum(e.size_bytes for _, e in host) <= budget:
+                return
+            del self._parked[host[0][0]]
+            self.stats.evictions += 1
+
+    def _restore(self, entry: _Parked) -> None:
+        """Load a parked model's state back into the handler."""
+        state = dict(entry.state)
+        if not entry.on_device and not state["offload_to_cpu"]:
+            state["llm"] = state["llm"].to(state["device"])
+        for attr, value in state.items():
+            setattr(self.handler, attr, value)
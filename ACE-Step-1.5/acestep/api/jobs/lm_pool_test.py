@@ -0,0 +1,181 @@
+"""Unit tests for the resident LM pool."""
+
+import os
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import torch.nn as nn
+
+from acestep.api.jobs.lm_pool import LMPool, LMPoolConfig, job_lm_model, module_bytes
+
+
+class _FakeHandler:
+    """``LLMHandler`` stand-in that loads a tiny module per model path."""
+
+    def __init__(self, backend="pt"):
+        """Start unloaded; ``inits`` records every cold load."""
+        self.backend = backend
+        self.inits = []
+        self.unload()
+
+    def initialize(self, lm_model_path, **params):
+        """Load a fresh module tagged with *lm_model_path*."""
+        self.inits.append((lm_model_path, params))
+        if lm_model_path == "broken":
+            return "no such model", False
+        self.llm = nn.Linear(4, 4)
+        self.llm.tag = lm_model_path
+        self.llm_tokenizer = f"tok-{lm_model_path}"
+        self.llm_initialized = True
+        self.llm_backend = self.backend
+        self.device = "cpu"
+        self.offload_to_cpu = False
+        return "ok", True
+
+    def unload(self):
+        """Mirror ``LLMHandler.unload``."""
+        self.llm = None
+        self.llm_tokenizer = None
+        self.llm_initialized = False
+        self.llm_backend = None
+        self.constrained_processor = None
+        self._hf_model_for_scoring = None
+
+
+def _pool(handler, **config):
+    """Build a pool whose cold loads call ``handler.initialize``."""
+    return LMPool(handler, lambda path, params: handler.initialize(path, **params), LMPoolConfig(**config))
+
+
+def _load(pool, handler, path):
+    """Initialize *path* directly and report it, as server startup does."""
+    handler.initialize(path, backend=handler.backend)
+    pool.note_loaded(path, {"backend": handler.backend})
+
+
+class LMPoolTests(unittest.TestCase):
+    """Switching, parking, budgets and leases."""
+
+    def test_switch_back_is_warm_and_restores_the_same_weights(self):
+        """A parked PyTorch model is restored without another cold load."""
+        handler = _FakeHandler()
+        pool = _pool(handler)
+        _load(pool, handler, "A")
+        model_a = handler.llm
+
+        self.assertIsNone(pool.acquire("B"))
+        pool.release()
+        self.assertEqual(handler.llm.tag, "B")
+        self.assertEqual(handler.inits[-1], ("B", {"backend": "pt"}))
+        with pool.use("A") as error:
+            self.assertIsNone(error)
+            self.assertIs(handler.llm, model_a)
+            self.assertEqual(handler.llm_tokenizer, "tok-A")
+        with pool.use("A"):
+            pass
+
+        self.assertEqual([path for path, _ in handler.inits], ["A", "B"])
+        snap = pool.snapshot()
+        self.assertEqual(snap["active"], "A")
+        self.assertEqual([p["lm_model_path"] for p in snap["parked"]], ["B"])
+        self.assertEqual((snap["requests"], snap["hits"]), (3, 1))
+        self.assertEqual((snap["cold_switches"], snap["warm_switches"], snap["switches"]), (1, 1, 2))
+        self.assertGreaterEqual(snap["max_switch_seconds"], snap["last_switch_seconds"])
+
+    def test_unparkable_backends_are_reloaded(self):
+        """vLLM engines are unloaded on switch and cold-loaded again."""
+        handler = _FakeHandler(backend="vllm")
+        pool = _pool(handler)
+        _load(pool, handler, "A")
+        for path in ("B", "A"):
+            with pool.use(path):
+                pass
+        self.assertEqual([path for path, _ in handler.inits], ["A", "B", "A"])
+        self.assertEqual(pool.snapshot()["parked"], [])
+
+    def test_host_budget_evicts_least_recently_parked(self):
+        """Parked models beyond the host budget are dropped oldest first."""
+        handler = _FakeHandler()
+        size = module_bytes(nn.Linear(4, 4))
+        pool = _pool(handler, host_budget_gb=1.5 * size / 1024 ** 3)
+        _load(pool, handler, "A")
+        for path in ("B", "C"):
+            with pool.use(path):
+                pass
+        snap = pool.snapshot()
+        self.assertEqual([p["lm_model_path"] for p in snap["parked"]], ["B"])
+        self.assertEqual(snap["evictions"], 1)
+        with pool.use("A"):
+            pass
+        self.assertEqual(handler.inits[-1][0], "A")
+
+    def test_failed_switch_reports_error_without_lease(self):
+        """A failed cold load leaves no model active and no lease held."""
+        handler = _FakeHandler()
+        pool = _pool(handler)
+        _load(pool, handler, "A")
+        self.assertEqual(pool.acquire("broken"), "no such model")
+        snap = pool.snapshot()
+        self.assertEqual((snap["active"], snap["leases"], snap["failed_switches"]), (None, 0, 1))
+        with pool.use("A") as error:
+            self.assertIsNone(error)
+            self.assertEqual(handler.inits[-1][0], "broken")
+
+    def test_switch_waits_for_jobs_on_the_active_model(self):
+        """A different model is only loaded once current leases are released."""
+        handler = _FakeHandler()
+        pool = _pool(handler)
+        _load(pool, handler, "A")
+        self.assertIsNone(pool.acquire(""))
+        switched = threading.Event()
+
+        def _other_job():
+            with pool.use("B"):
+                switched.set()
+
+        thread = threading.Thread(target=_other_job)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(switched.is_set())
+        self.assertEqual(handler.llm.tag, "A")
+        pool.release()
+        thread.join(timeout=5)
+        self.assertTrue(switched.is_set())
+        self.assertEqual(pool.active, "B")
+
+    def test_unloaded_handler_defers_to_lazy_init(self):
+        """With nothing loaded or parked, a lease does not load anything itself."""
+        handler = _FakeHandler()
+        pool = _pool(handler)
+        with pool.use("A") as error:
+            self.assertIsNone(error)
+        self.assertEqual(handler.inits, [])
+
+
+class HelperTests(unittest.TestCase):
+    """Job classification and configuration."""
+
+    def test_job_lm_model(self):
+        """Only LM-using jobs are assigned a model; blank means the active one."""
+        base = dict(
+            thinking=False, sample_mode=False, sample_query="", use_format=False,
+            full_analysis_only=False, use_cot_caption=False, use_cot_language=False, lm_model_path=None,
+        )
+        self.assertIsNone(job_lm_model(SimpleNamespace(**base)))
+        self.assertEqual(job_lm_model(SimpleNamespace(**{**base, "thinking": True})), "")
+        req = SimpleNamespace(**{**base, "use_cot_caption": True, "lm_model_path": " acestep-5Hz-lm-1.7B "})
+        self.assertEqual(job_lm_model(req), "acestep-5Hz-lm-1.7B")
+
+    def test_config_from_env(self):
+        """Budgets are read from the environment; bad values fall back to defaults."""
+        env = {"ACESTEP_LM_POOL_HOST_GB": "12", "ACESTEP_LM_POOL_DEVICE_GB": "oops"}
+        with mock.patch.dict(os.environ, env):
+            config = LMPoolConfig.from_env()
+        self.assertEqual((config.host_budget_gb, config.device_budget_gb), (12.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,512 @@
+"""Priority and fair-share ordering of queued generation jobs.
+
+``JobScheduler`` replaces the plain FIFO ``asyncio.Queue`` of ``(job_id,
+req)`` items the API workers (through ``JobCoalescer``) consume from.  It
+keeps the queue interface the coalescer uses (``get``, ``get_nowait``,
+``put_nowait``, ``qsize``, ``empty``, ``full``, ``task_done``) and changes
+which job comes out next:
+
+* Priority classes (``high``, ``normal``, ``low``) are served strictly in
+  that order.
+* Within a class, clients share the GPU fairly using self-clocked fair
+  queueing: each job gets a virtual finish tag of ``max(class clock, the
+  client's previous tag) + predicted seconds``, and the lowest tag runs
+  first.  A client submitting one long batch job and another submitting
+  many short ones are interleaved by predicted GPU time instead of arrival
+  order, and short jobs are not stuck behind a long one from someone else.
+* A job that has waited longer than ``max_wait_seconds`` runs next
+  regardless of class, so low priority work cannot starve.
+
+Each job's run time is predicted by ``JobCostModel`` from its duration,
+diffusion steps and batch size using the DiT handler's recorded per-step
+timings, corrected by the observed wall time of finished jobs.  Queued
+jobs are also kept in an order-statistics tree (a treap whose nodes carry
+subtree sizes and cost sums), updated on every enqueue and dispatch, so
+``position`` and ``eta_seconds`` cost O(log n) however bursty the queue and
+however often clients poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+PRIORITY_CLASSES: Tuple[str, ...] = ("high", "normal", "low")
+DEFAULT_PRIORITY = "normal"
+
+# Duration assumed for jobs that let the LM pick one.
+DEFAULT_JOB_DURATION = 30.0
+
+# ``client_finish`` tags older than the class clock are dropped past this size.
+_CLIENT_TAG_PRUNE_AT = 1024
+
+QueueItem = Tuple[str, Any]
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    """Scheduling settings.
+
+    Attributes:
+        fair_share: Order jobs within a priority class by per-client fair
+            share; when off, each class is FIFO.
+        max_wait_seconds: Queue wait after which a job runs next regardless
+            of priority and fair share (``0`` disables the guard).
+        high_priority_hosts: Client addresses allowed to submit ``high``
+            jobs when the server has no API key.
+    """
+
+    fair_share: bool = True
+    max_wait_seconds: float = 600.0
+    high_priority_hosts: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        """Build settings from ``ACESTEP_FAIR_SHARE``, ``ACESTEP_QUEUE_MAX_WAIT_SECONDS`` and ``ACESTEP_HIGH_PRIORITY_HOSTS``."""
+        fair_share = os.getenv("ACESTEP_FAIR_SHARE", "true").strip().lower() in {"1", "true", "yes", "y", "on"}
+        try:
+            max_wait = float(os.getenv("ACESTEP_QUEUE_MAX_WAIT_SECONDS", "600"))
+        except ValueError:
+            max_wait = 600.0
+        hosts = tuple(h.strip() for h in os.getenv("ACESTEP_HIGH_PRIORITY_HOSTS", "").split(",") if h.strip())
+        return cls(fair_share=fair_share, max_wait_seconds=max(0.0, max_wait), high_priority_hosts=hosts)
+
+
+def job_priority(req: Any) -> str:
+    """Return the priority class of a request (unknown values count as normal)."""
+    priority = (getattr(req, "priority", None) or DEFAULT_PRIORITY).strip().lower()
+    return priority if priority in PRIORITY_CLASSES else DEFAULT_PRIORITY
+
+
+def admit_priority(priority: str, host: Optional[str], authenticated: bool, config: SchedulerConfig) -> str:
+    """
+    Return the priority class a caller may actually use.
+
+    Anyone can ask for ``normal`` or ``low``.  ``high`` is honoured for
+    callers that passed the server's API key or connect from an address in
+    ``config.high_priority_hosts``; everyone else is clamped to ``normal``,
+    so self-assigned priority cannot jump the queue or defeat fair share.
+    """
+    if priority != "high" or authenticated or (host and host in config.high_priority_hosts):
+        return priority
+    return DEFAULT_PRIORITY
+
+
+def job_client(req: Any) -> str:
+    """Return the fair-share bucket of a request."""
+    return (getattr(req, "client_id", None) or "").strip()
+
+
+def job_work_units(req: Any) -> Tuple[int, int, float]:
+    """Return ``(steps, batch, duration)`` a request will run the DiT for."""
+    steps = max(1, int(getattr(req, "inference_steps", None) or 8))
+    batch_size = getattr(req, "batch_size", None)
+    batch = max(1, int(batch_size)) if batch_size is not None else 2
+    duration = getattr(req, "audio_duration", None)
+    duration = float(duration) if duration and float(duration) > 0 else DEFAULT_JOB_DURATION
+    return steps, batch, duration
+
+
+class JobCostModel:
+    """
+    Predict a job's wall time in seconds.
+
+    The raw estimate is ``per_step * steps`` where ``per_step`` comes from
+    ``per_step_fn(steps, batch, duration)`` (the handler's recorded
+    diffusion timings).  Without a recorded timing it falls back to
+    ``initial_seconds`` for a default job, scaled linearly by steps,
+    duration and batch.  Raw estimates are multiplied by ``scale``, an
+    exponential moving average of observed / raw time over finished jobs
+    that absorbs LM, decode and encode overhead.
+    """
+
+    def __init__(
+        self,
+        per_step_fn: Optional[Callable[[int, int, Optional[float]], Optional[float]]] = None,
+        initial_seconds: float = 5.0,
+        smoothing: float = 0.2,
+    ):
+        self.per_step_fn = per_step_fn
+        steps, batch, duration = job_work_units(None)
+        self._unit_seconds = max(1e-3, initial_seconds) / (steps * batch * duration / DEFAULT_JOB_DURATION)
+        self.smoothing = smoothing
+        self.scale = 1.0
+        self.observations = 0
+
+    def raw_seconds(self, req: Any) -> float:
+        """Unscaled estimate of *req*."""
+        steps, batch, duration = job_work_units(req)
+        per_step = None
+        if self.per_step_fn is not None:
+            try:
+                per_step = self.per_step_fn(steps, batch, duration)
+            except Exception:
+                per_step = None
+        if per_step and per_step > 0:
+            return float(per_step) * steps
+        return self._unit_seconds * steps * batch * duration / DEFAULT_JOB_DURATION
+
+    def predict(self, req: Any) -> float:
+        """Predicted wall time of *req* in seconds."""
+        return self.raw_seconds(req) * self.scale
+
+    def observe(self, raw_seconds: float, actual_seconds: float) -> None:
+        """Fold one finished job (or coalesced group) into ``scale``."""
+        if raw_seconds <= 0 or actual_seconds <= 0:
+            return
+        ratio = actual_seconds / raw_seconds
+        self.scale = ratio if self.observations == 0 else (1 - self.smoothing) * self.scale + self.smoothing * ratio
+        self.observations += 1
+
+
+@dataclass
+class _Entry:
+    job_id: str
+    item: QueueItem
+    priority: int
+    client: str
+    raw_cost: float
+    cost: float
+    finish: float
+    seq: int
+    enqueued_at: float
+    started_at: float = 0.0
+
+    @property
+    def key(self) -> Tuple[int, float, int]:
+        return (self.priority, self.finish, self.seq)
+
+
+class _RankNode:
+    __slots__ = ("key", "cost", "weight", "left", "right", "size", "total")
+
+    def __init__(self, key: Tuple[int, float, int], cost: float, weight: float):
+        self.key = key
+        self.cost = cost
+        self.weight = weight
+        self.left: Optional["_RankNode"] = None
+        self.right: Optional["_RankNode"] = None
+        self.size = 1
+        self.total = cost
+
+    def update(self) -> "_RankNode":
+        self.size = 1
+        self.total = self.cost
+        for child in (self.left, self.right):
+            if child is not None:
+                self.size += child.size
+                self.total += child.total
+        return self
+
+
+class _RankIndex:
+    """
+    Order-statistics treap over queued job keys.
+
+    Each node carries the size and predicted-cost sum of its subtree, so
+    inserting, removing and asking for a key's rank and cumulative cost
+    are all O(log n) expected.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self._root: Optional[_RankNode] = None
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._root.size if self._root is not None else 0
+
+    def insert(self, key: Tuple[int, float, int], cost: float) -> None:
+        """Add a key (keys are unique: they end with the job's sequence number)."""
+        left, right = self._split(self._root, key)
+        node = _RankNode(key, cost, self._random.random())
+        self._root = self._merge(self._merge(left, node), right)
+
+    def remove(self, key: Tuple[int, float, int]) -> None:
+        """Remove a key; unknown keys are ignored."""
+        self._root = self._remove(self._root, key)
+
+    def rank(self, key: Tuple[int, float, int]) -> Tuple[int, float]:
+        """Return ``(number of keys <= key, their summed cost)``."""
+        count, total = 0, 0.0
+        node = self._root
+        while node is not None:
+            if key < node.key:
+                node = node.left
+                continue
+            count += 1
+            total += node.cost
+            if node.left is not None:
+                count += node.left.size
+                total += node.left.total
+            if key == node.key:
+                break
+            node = node.right
+        return count, total
+
+    def _split(self, node: Optional[_RankNode], key: Tuple[int, float, int]):
+        """Split into (keys < key, keys >= key)."""
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self._split(node.right, key)
+            return node.update(), right
+        left, node.left = self._split(node.left, key)
+        return left, node.update()
+
+    def _merge(self, left: Optional[_RankNode], right: Optional[_RankNode]) -> Optional[_RankNode]:
+        """Join two treaps where every key of ``left`` is below every key of ``right``."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.weight > right.weight:
+            left.right = self._merge(left.right, right)
+            return left.update()
+        right.left = self._merge(left, right.left)
+        return right.update()
+
+    def _remove(self, node: Optional[_RankNode], key: Tuple[int, float, int]) -> Optional[_RankNode]:
+        if node is None:
+            return None
+        if key == node.key:
+            return self._merge(node.left, node.right)
+        if key < node.key:
+            node.left = self._remove(node.left, key)
+        else:
+            node.right = self._remove(node.right, key)
+        return node.update()
+
+
+@dataclass
+class SchedulerStats:
+    """Counters for ``/v1/stats``."""
+
+    enqueued: Counter = field(default_factory=Counter)
+    dispatched: Counter = field(default_factory=Counter)
+    max_wait_overrides: int = 0
+
+
+class JobScheduler:
+    """
+    Queue of ``(job_id, req)`` items served by priority and fair share.
+
+    Jobs move through three states: *queued* (in the scheduler), *taken*
+    (returned by ``get`` but held by the coalescer) and *in service*
+    (between ``begin`` and ``end``).  Positions count taken jobs first,
+    since the coalescer serves them before anything still queued.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        config: Optional[SchedulerConfig] = None,
+        cost_model: Optional[JobCostModel] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.config = config or SchedulerConfig()
+        self.cost_model = cost_model or JobCostModel()
+        self.clock = clock
+        self.stats = SchedulerStats()
+        self._entries: Dict[str, _Entry] = {}  # queued, in arrival order
+        self._heap: List[Tuple[Tuple[int, float, int], str]] = []
+        self._taken: Dict[str, _Entry] = {}
+        self._in_service: Dict[str, _Entry] = {}
+        self._seq = itertools.count()
+        self._vtime = [0.0] * len(PRIORITY_CLASSES)
+        self._client_finish: Dict[Tuple[int, str], float] = {}
+        self._getters: Deque[asyncio.Future] = deque()
+        self._unfinished = 0
+        self._index = _RankIndex()
+
+    # ------------------------------------------------------------------
+    # asyncio.Queue interface
+    # ------------------------------------------------------------------
+
+    def qsize(self) -> int:
+        """Number of queued jobs (not counting taken or running ones)."""
+        return len(self._entries)
+
+    def empty(self) -> bool:
+        return not self._entries
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._entries)
+
+    def put_nowait(self, item: QueueItem) -> None:
+        """Queue ``(job_id, req)``; raises ``asyncio.QueueFull`` when full."""
+        if self.full():
+            raise asyncio.QueueFull
+        job_id, req = item
+        priority = PRIORITY_CLASSES.index(job_priority(req))
+        client = job_client(req)
+        raw = self.cost_model.raw_seconds(req)
+        cost = raw * self.cost_model.scale
+        if self.config.fair_share:
+            start = max(self._vtime[priority], self._client_finish.get((priority, client), 0.0))
+            finish = start + cost
+            self._client_finish[(priority, client)] = finish
+            if len(self._client_finish) > _CLIENT_TAG_PRUNE_AT:
+                self._prune_client_tags()
+        else:
+            finish = 0.0
+        entry = _Entry(job_id, item, priority, client, raw, cost, finish, next(self._seq), self.clock())
+        self._entries[job_id] = entry
+        heapq.heappush(self._heap, (entry.key, job_id))
+        self._index.insert(entry.key, cost)
+        self._unfinished += 1
+        self.stats.enqueued[PRIORITY_CLASSES[priority]] += 1
+        self._wake_getter()
+
+    async def put(self, item: QueueItem) -> None:
+        """Same as ``put_nowait``; callers check ``full()`` first."""
+        self.put_nowait(item)
+
+    def get_nowait(self) -> QueueItem:
+        """Remove and return the next job; raises ``asyncio.QueueEmpty``."""
+        if not self._entries:
+            raise asyncio.QueueEmpty
+        entry = self._pop()
+        self._taken[entry.job_id] = entry
+        return entry.item
+
+    async def get(self) -> QueueItem:
+        """Wait for and return the next job."""
+        while not self._entries:
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                if self._entries and not getter.cancelled():
+                    self._wake_getter()
+                raise
+        return self.get_nowait()
+
+    def task_done(self) -> None:
+        """Mark one previously taken job as processed."""
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+
+    # ------------------------------------------------------------------
+    # Service tracking, position and ETA
+    # ------------------------------------------------------------------
+
+    def begin(self, job_ids: Iterable[str]) -> None:
+        """Record that taken jobs started running (one group)."""
+        now = self.clock()
+        for job_id in job_ids:
+            entry = self._taken.pop(job_id, None)
+            if entry is not None:
+                entry.started_at = now
+                self._in_service[job_id] = entry
+
+    def end(self, job_ids: Iterable[str]) -> None:
+        """Record that a group finished and fold its run time into the cost model."""
+        entries = [e for e in (self._in_service.pop(job_id, None) for job_id in job_ids) if e is not None]
+        if entries:
+            elapsed = self.clock() - min(e.started_at for e in entries)
+            self.cost_model.observe(sum(e.raw_cost for e in entries), elapsed)
+
+    def position(self, job_id: str) -> int:
+        """1-based place in line (0 if the job is not waiting)."""
+        located = self._locate(job_id)
+        return located[0] if located else 0
+
+    def eta_seconds(self, job_id: str) -> Optional[float]:
+        """Predicted seconds until *job_id* finishes, or ``None`` if not waiting."""
+        located = self._locate(job_id)
+        if not located:
+            return None
+        now = self.clock()
+        running = sum(max(0.0, e.cost - (now - e.started_at)) for e in self._in_service.values())
+        return running + located[1]
+
+    def predicted_seconds(self, req: Any) -> float:
+        """Predicted run time of a request that is not queued yet."""
+        return self.cost_model.predict(req)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view for ``/v1/stats``."""
+        queued = Counter(PRIORITY_CLASSES[e.priority] for e in self._entries.values())
+        now = self.clock()
+        return {
+            "fair_share": self.config.fair_share,
+            "queued_by_priority": {name: queued.get(name, 0) for name in PRIORITY_CLASSES},
+            "queued_clients": len({e.client for e in self._entries.values()}),
+            "held_by_coalescer": len(self._taken),
+            "in_service": len(self._in_service),
+            "oldest_wait_seconds": (now - next(iter(self._entries.values())).enqueued_at) if self._entries else 0.0,
+            "enqueued": dict(self.stats.enqueued),
+            "dispatched": dict(self.stats.dispatched),
+            "max_wait_overrides": self.stats.max_wait_overrides,
+            "cost_scale": self.cost_model.scale,
+            "cost_observations": self.cost_model.observations,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _pop(self) -> _Entry:
+        oldest = next(iter(self._entries.values()))
+        max_wait = self.config.max_wait_seconds
+        if max_wait > 0 and self.clock() - oldest.enqueued_at > max_wait:
+            entry = oldest
+            if self._heap_top() != oldest.job_id:
+                self.stats.max_wait_overrides += 1
+        else:
+            entry = self._entries[self._heap_top()]
+        del self._entries[entry.job_id]
+        self._index.remove(entry.key)
+        self._vtime[entry.priority] = max(self._vtime[entry.priority], entry.finish)
+        self.stats.dispatched[PRIORITY_CLASSES[entry.priority]] += 1
+        return entry
+
+    def _heap_top(self) -> str:
+        """Return the lowest-key queued job, dropping heap entries already taken."""
+        while self._heap[0][1] not in self._entries:
+            heapq.heappop(self._heap)
+        return self._heap[0][1]
+
+    def _wake_getter(self) -> None:
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                return
+
+    def _prune_client_tags(self) -> None:
+        """Forget clients whose last tag is behind their class clock (they have no backlog)."""
+        self._client_finish = {
+            key: finish for key, finish in self._client_finish.items() if finish > self._vtime[key[0]]
+        }
+
+    def _locate(self, job_id: str) -> Optional[Tuple[int, float]]:
+        """Return ``(position, cumulative predicted seconds through the job)``."""
+        if job_id in self._taken:
+            ahead = sorted(self._taken.values(), key=lambda e: e.key)
+            total = 0.0
+            for idx, entry in enumerate(ahead):
+                total += entry.cost
+                if entry.job_id == job_id:
+                    return idx + 1, total
+        entry = self._entries.get(job_id)
+        if entry is None:
+            return None
+        # Taken jobs are the coalescer's small look-ahead window, not the backlog.
+        rank, cumulative = self._index.rank(entry.key)
+        return len(self._taken) + rank, sum(e.cost for e in self._taken.values()) + cumulative
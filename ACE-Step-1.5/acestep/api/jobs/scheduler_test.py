@@ -0,0 +1,200 @@
+"""Unit tests for priority and fair-share job scheduling."""
+
+import asyncio
+import os
+import random
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from acestep.api.jobs.coalescing import CoalesceConfig, JobCoalescer
+from acestep.api.jobs.scheduler import JobCostModel, JobScheduler, SchedulerConfig, admit_priority, job_priority
+
+
+def _req(client="a", priority="normal", duration=30.0, steps=8, batch=1):
+    """Minimal request carrying the fields the scheduler reads."""
+    return SimpleNamespace(client_id=client, priority=priority, audio_duration=duration,
+                           inference_steps=steps, batch_size=batch)
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+def _scheduler(**config):
+    """Scheduler whose default job (30 s, 8 steps, batch 1) is predicted at 8 s."""
+    clock = _Clock()
+    cost = JobCostModel(initial_seconds=16.0)  # default batch is 2
+    return JobScheduler(maxsize=10, config=SchedulerConfig(**config), cost_model=cost, clock=clock), clock
+
+
+def _drain(scheduler):
+    """Return job ids in dispatch order."""
+    order = []
+    while not scheduler.empty():
+        order.append(scheduler.get_nowait()[0])
+    return order
+
+
+class OrderingTests(unittest.TestCase):
+    """Priority classes, fair share and the max-wait guard."""
+
+    def test_short_jobs_are_not_stuck_behind_another_clients_long_job(self):
+        """A long batch job from one client is interleaved by predicted cost with short jobs."""
+        scheduler, _ = _scheduler()
+        scheduler.put_nowait(("long", _req("batch-user", duration=240.0, batch=8)))
+        for idx in range(3):
+            scheduler.put_nowait((f"lego{idx}", _req("lego-user", duration=10.0)))
+        self.assertEqual(scheduler.position("lego2"), 3)
+        self.assertEqual(scheduler.position("long"), 4)
+        self.assertEqual(_drain(scheduler), ["lego0", "lego1", "lego2", "long"])
+
+    def test_clients_alternate_within_a_class(self):
+        """A client with a backlog does not block a newly arriving client."""
+        scheduler, _ = _scheduler()
+        for idx in range(3):
+            scheduler.put_nowait((f"a{idx}", _req("a")))
+        scheduler.put_nowait(("b0", _req("b")))
+        self.assertEqual(_drain(scheduler), ["a0", "b0", "a1", "a2"])
+
+    def test_priority_classes_and_fifo_without_fair_share(self):
+        """High beats normal beats low; each class is FIFO when fair share is off."""
+        scheduler, _ = _scheduler(fair_share=False)
+        scheduler.put_nowait(("low", _req(priority="low", duration=5.0)))
+        scheduler.put_nowait(("n-long", _req(duration=240.0)))
+        scheduler.put_nowait(("n-short", _req(duration=5.0)))
+        scheduler.put_nowait(("high", _req(priority="HIGH")))
+        self.assertEqual(_drain(scheduler), ["high", "n-long", "n-short", "low"])
+
+    def test_max_wait_overrides_priority(self):
+        """A job waiting past the limit runs next."""
+        scheduler, clock = _scheduler(max_wait_seconds=60.0)
+        scheduler.put_nowait(("low", _req(priority="low")))
+        clock.now = 61.0
+        scheduler.put_nowait(("high", _req(priority="high")))
+        self.assertEqual(_drain(scheduler), ["low", "high"])
+        self.assertEqual(scheduler.snapshot()["max_wait_overrides"], 1)
+
+    def test_unknown_priority_is_normal(self):
+        """Unrecognized or missing priorities fall back to normal."""
+        self.assertEqual(job_priority(SimpleNamespace(priority="urgent")), "normal")
+        self.assertEqual(job_priority(SimpleNamespace()), "normal")
+
+    def test_high_priority_needs_api_key_or_allowlisted_host(self):
+        """Unauthenticated callers asking for high are clamped to normal."""
+        config = SchedulerConfig(high_priority_hosts=("10.0.0.5",))
+        self.assertEqual(admit_priority("high", "203.0.113.9", False, config), "normal")
+        self.assertEqual(admit_priority("high", None, False, config), "normal")
+        self.assertEqual(admit_priority("high", "10.0.0.5", False, config), "high")
+        self.assertEqual(admit_priority("high", "203.0.113.9", True, config), "high")
+        self.assertEqual(admit_priority("low", "203.0.113.9", False, config), "low")
+
+
+class PositionAndEtaTests(unittest.TestCase):
+    """Indexed positions and per-job ETAs."""
+
+    def test_eta_sums_predicted_costs_and_running_remainder(self):
+        """ETA counts held, queued and running work by each job's own prediction."""
+        scheduler, clock = _scheduler()
+        scheduler.put_nowait(("run", _req("x")))
+        self.assertEqual(scheduler.get_nowait()[0], "run")
+        scheduler.begin(["run"])
+        scheduler.put_nowait(("held", _req("y", duration=15.0)))
+        scheduler.put_nowait(("next", _req("z", duration=60.0, batch=2)))
+        self.assertEqual(scheduler.get_nowait()[0], "held")
+        clock.now = 3.0
+
+        self.assertEqual((scheduler.position("run"), scheduler.eta_seconds("run")), (0, None))
+        self.assertEqual(scheduler.position("held"), 1)
+        self.assertAlmostEqual(scheduler.eta_seconds("held"), 5.0 + 4.0)
+        self.assertEqual(scheduler.position("next"), 2)
+        self.assertAlmostEqual(scheduler.eta_seconds("next"), 5.0 + 4.0 + 32.0)
+
+    def test_index_tracks_enqueues_and_dispatches(self):
+        """Positions and ETAs match a full re-sort through bursts of puts and gets."""
+        scheduler, clock = _scheduler(max_wait_seconds=50.0)
+        scheduler.maxsize = 0
+        rng = random.Random(7)
+        for step in range(300):
+            clock.now += rng.random() * 3
+            if scheduler.empty() or rng.random() < 0.6:
+                priority = rng.choice(["high", "normal", "low"])
+                req = _req(rng.choice("abcd"), priority, duration=rng.choice([10.0, 30.0, 120.0]))
+                scheduler.put_nowait((f"j{step}", req))
+            else:
+                scheduler.get_nowait()
+            ordered = sorted(scheduler._entries.values(), key=lambda e: e.key)
+            held = len(scheduler._taken)
+            held_cost = sum(e.cost for e in scheduler._taken.values())
+            total = 0.0
+            for rank, entry in enumerate(ordered, start=1):
+                total += entry.cost
+                self.assertEqual(scheduler.position(entry.job_id), held + rank)
+                self.assertAlmostEqual(scheduler.eta_seconds(entry.job_id), held_cost + total)
+        self.assertEqual(len(scheduler._index), scheduler.qsize())
+        self.assertGreater(scheduler.stats.max_wait_overrides, 0)
+
+    def test_cost_model_uses_handler_timings_and_learns_overhead(self):
+        """Recorded per-step times drive predictions; finished jobs correct the scale."""
+        model = JobCostModel(per_step_fn=lambda steps, batch, duration: 0.5 * batch)
+        self.assertAlmostEqual(model.predict(_req(batch=2)), 8.0)
+        scheduler, clock = _scheduler()
+        scheduler.cost_model = model
+        scheduler.put_nowait(("j", _req(batch=2)))
+        scheduler.get_nowait()
+        scheduler.begin(["j"])
+        clock.now = 12.0
+        scheduler.end(["j"])
+        self.assertAlmostEqual(model.scale, 1.5)
+        self.assertAlmostEqual(model.predict(_req(batch=1)), 6.0)
+
+    def test_config_from_env(self):
+        """Settings are read from the environment."""
+        env = {
+            "ACESTEP_FAIR_SHARE": "false",
+            "ACESTEP_QUEUE_MAX_WAIT_SECONDS": "bad",
+            "ACESTEP_HIGH_PRIORITY_HOSTS": "127.0.0.1, 10.0.0.5,",
+        }
+        with mock.patch.dict(os.environ, env):
+            config = SchedulerConfig.from_env()
+        self.assertEqual((config.fair_share, config.max_wait_seconds), (False, 600.0))
+        self.assertEqual(config.high_priority_hosts, ("127.0.0.1", "10.0.0.5"))
+
+
+class QueueInterfaceTests(unittest.IsolatedAsyncioTestCase):
+    """The scheduler is a drop-in queue for the coalescer."""
+
+    async def test_waiting_getter_is_woken_and_coalescer_reads_in_scheduler_order(self):
+        """``get`` blocks until a put; the coalescer sees the scheduler's order."""
+        scheduler, _ = _scheduler()
+        waiter = asyncio.create_task(scheduler.get())
+        await asyncio.sleep(0)
+        scheduler.put_nowait(("first", _req("a")))
+        self.assertEqual((await asyncio.wait_for(waiter, 1))[0], "first")
+
+        coalescer = JobCoalescer(scheduler, CoalesceConfig(enabled=False), key_fn=lambda req: None)
+        scheduler.put_nowait(("a-long", _req("a", duration=240.0)))
+        scheduler.put_nowait(("b-short", _req("b", duration=10.0)))
+        self.assertEqual([job for job, _ in await coalescer.next_group()], ["b-short"])
+        self.assertEqual(coalescer.pending_count(), 1)
+
+    async def test_cancelled_getter_does_not_swallow_items(self):
+        """A timed-out ``get`` leaves the item for the next consumer."""
+        scheduler, _ = _scheduler()
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.get(), timeout=0.01)
+        scheduler.put_nowait(("j", _req()))
+        self.assertEqual((await asyncio.wait_for(scheduler.get(), 1))[0], "j")
+        self.assertTrue(scheduler.full() is False and scheduler.qsize() == 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,428 @@
+"""Multi-process worker pool fed by the front process's single job queue.
+
+One API process normally owns one ``AceStepHandler``/``LLMHandler`` pair, so
+a box with two GPUs (or one GPU large enough for two turbo instances) had to
+run separate servers, each with its own queue, behind an external load
+balancer.  ``WorkerPool`` spawns N worker processes instead, each building
+its own handlers on an assigned device, while the front process keeps the
+one queue (priorities, fair share, coalescing) and only dispatches.
+
+Dispatch prefers an idle worker whose last job had the same *affinity* (DiT
+model, LM model, LoRA adapter), then a worker that has not run anything yet,
+then the least recently used one, so model and adapter switches stay rare.
+
+Workers are built by a picklable factory ``factory(spec) -> runner``;
+``runner(jobs, emit)`` runs a list of ``(job_id, payload)`` and reports
+through ``emit(kind, job_id, data)`` with ``kind`` one of ``"progress"``
+(``data=(value, stage)``), ``"result"`` or ``"error"``.  Results travel back
+as small picklable dicts; audio stays in files on the shared local disk.
+A worker that dies fails its in-flight jobs and is respawned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from acestep.api.jobs.lm_pool import job_lm_model
+
+Emit = Callable[[str, str, Any], None]
+Runner = Callable[[Sequence[Tuple[str, Any]], Emit], None]
+ProgressFn = Callable[[str, float, str], None]
+
+# How often the event reader wakes up to check for dead workers.
+_POLL_SECONDS = 0.5
+
+
+@dataclass(frozen=True)
+class WorkerSpec:
+    """Identity of one worker process.
+
+    Attributes:
+        index: Position in the pool (stable across restarts).
+        device: Device the worker builds its handlers on (e.g. ``cuda:1``).
+    """
+
+    index: int
+    device: str
+
+
+@dataclass(frozen=True)
+class WorkerPoolConfig:
+    """Size and placement of the worker pool.
+
+    Attributes:
+        workers: Number of worker processes; ``0`` keeps the single-process
+            server.
+        devices: Device per worker, reused cyclically.  Empty spreads workers
+            over the visible CUDA devices (or ``default_device`` without CUDA).
+        start_timeout: Seconds to wait for every worker to load its models.
+        restart: Respawn workers that exit unexpectedly.
+    """
+
+    workers: int = 0
+    devices: Tuple[str, ...] = ()
+    start_timeout: float = 900.0
+    restart: bool = True
+
+    @property
+    def enabled(self) -> bool:
+        """Whether jobs run in worker processes."""
+        return self.workers > 0
+
+    @classmethod
+    def from_env(cls) -> "WorkerPoolConfig":
+        """Build settings from ``ACESTEP_GPU_WORKER*`` environment variables."""
+        try:
+            workers = max(0, int(os.getenv("ACESTEP_GPU_WORKERS", "0")))
+        except ValueError:
+            workers = 0
+        devices = tuple(d.strip() for d in os.getenv("ACESTEP_GPU_WORKER_DEVICES", "").split(",") if d.strip())
+        try:
+            start_timeout = float(os.getenv("ACESTEP_GPU_WORKER_START_TIMEOUT", str(cls.start_timeout)))
+        except ValueError:
+            start_timeout = cls.start_timeout
+        restart = os.getenv("ACESTEP_GPU_WORKER_RESTART", "true").strip().lower() in {"1", "true", "yes", "y", "on"}
+        return cls(workers=workers, devices=devices, start_timeout=start_timeout, restart=restart)
+
+    def specs(self, default_device: str = "auto") -> List[WorkerSpec]:
+        """Return one ``WorkerSpec`` per worker."""
+        devices = self.devices or _visible_cuda_devices() or (default_device,)
+        return [WorkerSpec(index=i, device=devices[i % len(devices)]) for i in range(self.workers)]
+
+
+def job_affinity(req: Any) -> Tuple[str, str, str]:
+    """Return the ``(DiT model, LM model, LoRA adapter)`` a job wants loaded on its worker.
+
+    An empty adapter means the base decoder; a worker switches to it
+    explicitly, so a job never inherits the previous job's adapter.
+    """
+    return (
+        (req.model or "").strip(),
+        job_lm_model(req) or "",
+        (getattr(req, "lora_path", None) or "").strip(),
+    )
+
+
+def _visible_cuda_devices() -> Tuple[str, ...]:
+    try:
+        import torch
+
+        count = torch.cuda.device_count() if torch.cuda.is_available() else 0
+    except Exception:
+        count = 0
+    return tuple(f"cuda:{i}" for i in range(count))
+
+
+def _worker_main(factory: Callable[[WorkerSpec], Runner], spec: WorkerSpec, tasks: Any, events: Any) -> None:
+    """Worker process entry point: build the runner, then serve tasks until ``None``."""
+    try:
+        runner = factory(spec)
+    except BaseException:
+        events.put(("failed", spec.index, None, traceback.format_exc()))
+        return
+    events.put(("ready", spec.index, None, os.getpid()))
+
+    def emit(kind: str, job_id: str, data: Any) -> None:
+        events.put((kind, spec.index, job_id, data))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, jobs = task
+        try:
+            runner(jobs, emit)
+        except BaseException:
+            message = traceback.format_exc()
+            for job_id, _ in jobs:
+                emit("error", job_id, message)
+        events.put(("idle", spec.index, task_id, None))
+
+
+@dataclass
+class _Task:
+    task_id: int
+    job_ids: List[str]
+    future: "asyncio.Future[Dict[str, Tuple[str, Any]]]"
+    on_progress: Optional[ProgressFn]
+    results: Dict[str, Tuple[str, Any]] = field(default_factory=dict)
+
+
+@dataclass
+class _Worker:
+    spec: WorkerSpec
+    process: Any = None
+    tasks: Any = None
+    ready: bool = False
+    pid: Optional[int] = None
+    affinity: Optional[Hashable] = None
+    current: Optional[_Task] = None
+    last_used: float = 0.0
+    started: Optional["asyncio.Future[None]"] = None
+    jobs: int = 0
+    restarts: int = 0
+
+    @property
+    def idle(self) -> bool:
+        return self.ready and self.current is None
+
+
+class WorkerPool:
+    """Dispatch job batches to worker processes by affinity.
+
+    ``start``/``run``/``stop`` are called from the event loop; a reader
+    thread forwards worker events to it.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[WorkerSpec], Runner],
+        specs: Sequence[WorkerSpec],
+        *,
+        start_timeout: float = WorkerPoolConfig.start_timeout,
+        restart: bool = True,
+        context: Any = None,
+    ) -> None:
+        """Create a stopped pool; ``factory`` must be importable by the spawned workers."""
+        if not specs:
+            raise ValueError("WorkerPool needs at least one worker")
+        self.factory = factory
+        self.start_timeout = start_timeout
+        self.restart = restart
+        # CUDA cannot be re-initialized in a forked child.
+        self._ctx = context or multiprocessing.get_context("spawn")
+        self._events = self._ctx.Queue()
+        self._workers = [_Worker(spec=spec) for spec in specs]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._idle: Optional[asyncio.Condition] = None
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = False
+        self._task_seq = 0
+        self.dispatched = 0
+        self.affinity_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        """Spawn every worker and wait until their models are loaded.
+
+        Raises:
+            RuntimeError: If no worker came up within ``start_timeout``.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Condition()
+        self._reader = threading.Thread(target=self._read_events, name="worker-pool-events", daemon=True)
+        self._reader.start()
+        for worker in self._workers:
+            self._spawn(worker)
+        waits = [worker.started for worker in self._workers]
+        done, pending = await asyncio.wait(waits, timeout=self.start_timeout)
+        errors = [f"worker {w.spec.index} ({w.spec.device}): did not start within {self.start_timeout:.0f}s"
+                  for w in self._workers if w.started in pending]
+        errors += [f"worker {w.spec.index} ({w.spec.device}): {w.started.exception()}"
+                   for w in self._workers if w.started in done and w.started.exception()]
+        for error in errors:
+            print(f"[Worker Pool] {error}")
+        if not any(worker.ready for worker in self._workers):
+            await self.stop()
+            raise RuntimeError("No pool worker started: " + "; ".join(errors))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Ask workers to exit, terminate stragglers and fail in-flight jobs."""
+        self._stopping = True
+        for worker in self._workers:
+            if worker.tasks is not None and worker.process is not None and worker.process.is_alive():
+                worker.tasks.put(None)
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            await asyncio.to_thread(worker.process.join, max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                await asyncio.to_thread(worker.process.join, 1.0)
+            self._fail_current(worker, "worker pool stopped")
+            worker.ready = False
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join, 2 * _POLL_SECONDS)
+
+    def _spawn(self, worker: _Worker) -> None:
+        worker.tasks = self._ctx.Queue()
+        worker.ready = False
+        worker.affinity = None
+        worker.started = self._loop.create_future()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.factory, worker.spec, worker.tasks, self._events),
+            name=f"acestep-worker-{worker.spec.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        worker.pid = worker.process.pid
+        print(f"[Worker Pool] Started worker {worker.spec.index} on {worker.spec.device} (pid {worker.process.pid})")
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    async def run(
+        self,
+        jobs: Sequence[Tuple[str, Any]],
+        affinity: Optional[Hashable] = None,
+        on_progress: Optional[ProgressFn] = None,
+    ) -> Dict[str, Tuple[str, Any]]:
+        """Run ``jobs`` on one worker and return ``{job_id: (kind, data)}``.
+
+        ``kind`` is ``"result"`` or ``"error"``; every job id is present.
+        Waits for an idle worker if all are busy.
+        """
+        async with self._idle:
+            await self._idle.wait_for(lambda: self._stopping or any(w.idle for w in self._workers))
+            if self._stopping:
+                raise RuntimeError("worker pool stopped")
+            worker = self._pick(affinity)
+            self._task_seq += 1
+            task = _Task(
+                task_id=self._task_seq,
+                job_ids=[job_id for job_id, _ in jobs],
+                future=self._loop.create_future(),
+                on_progress=on_progress,
+            )
+            if affinity is not None and worker.affinity == affinity:
+                self.affinity_hits += 1
+            worker.current = task
+            worker.affinity = affinity
+            worker.last_used = time.monotonic()
+            worker.jobs += len(jobs)
+            self.dispatched += 1
+            worker.tasks.put((task.task_id, list(jobs)))
+        return await task.future
+
+    def _pick(self, affinity: Optional[Hashable]) -> _Worker:
+        idle = [w for w in self._workers if w.idle]
+        for worker in idle:
+            if affinity is not None and worker.affinity == affinity:
+                return worker
+        fresh = [w for w in idle if w.affinity is None]
+        if fresh:
+            return fresh[0]
+        return min(idle, key=lambda w: w.last_used)
+
+    # ------------------------------------------------------------------
+    # Worker events
+    # ------------------------------------------------------------------
+
+    def _read_events(self) -> None:
+        """Reader thread: forward worker events and report each dead process once."""
+        reported = set()
+        while not (self._stopping and all(w.process is None or not w.process.is_alive() for w in self._workers)):
+            try:
+                event = self._events.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                event = None
+            except (EOFError, OSError):
+                break
+            try:
+                if event is not None:
+                    self._loop.call_soon_threadsafe(self._on_event, *event)
+                for worker in self._workers:
+                    process = worker.process
+                    if process is not None and process.pid not in reported and not process.is_alive():
+                        reported.add(process.pid)
+                        self._loop.call_soon_threadsafe(self._on_exit, worker, process)
+            except RuntimeError:
+                break  # event loop closed
+
+    def _on_event(self, kind: str, index: int, job_id: Optional[str], data: Any) -> None:
+        worker = self._workers[index]
+        task = worker.current
+        if kind == "ready":
+            worker.ready = True
+            if not worker.started.done():
+                worker.started.set_result(None)
+            self._notify_idle()
+        elif kind == "failed":
+            print(f"[Worker Pool] Worker {index} failed to start:\n{data}")
+            if not worker.started.done():
+                worker.started.set_exception(RuntimeError(str(data).strip().splitlines()[-1]))
+        elif task is None or job_id is None:
+            return
+        elif kind == "progress":
+            if task.on_progress is not None:
+                value, stage = data
+                task.on_progress(job_id, value, stage)
+        elif kind in ("result", "error"):
+            task.results[job_id] = (kind, data)
+        elif kind == "idle" and job_id == task.task_id:
+            self._finish(worker, "worker returned no result")
+
+    def _on_exit(self, worker: _Worker, process: Any) -> None:
+        if worker.process is not process or self._stopping:
+            return
+        was_ready, worker.ready = worker.ready, False
+        message = f"worker {worker.spec.index} exited with code {process.exitcode}"
+        if not worker.started.done():
+            worker.started.set_exception(RuntimeError(message))
+        if not was_ready:
+            return  # failed during startup; respawning would fail the same way
+        print(f"[Worker Pool] {message.capitalize()}")
+        self._fail_current(worker, message)
+        if self.restart:
+            worker.restarts += 1
+            self._spawn(worker)
+
+    def _fail_current(self, worker: _Worker, message: str) -> None:
+        if worker.current is not None:
+            self._finish(worker, message)
+
+    def _finish(self, worker: _Worker, missing_message: str) -> None:
+        task, worker.current = worker.current, None
+        for job_id in task.job_ids:
+            task.results.setdefault(job_id, ("error", missing_message))
+        if not task.future.done():
+            task.future.set_result(task.results)
+        self._notify_idle()
+
+    def _notify_idle(self) -> None:
+        async def _notify() -> None:
+            async with self._idle:
+                self._idle.notify_all()
+
+        self._loop.create_task(_notify())
+
+    # ------------------------------------------------------------------
+    # Observability
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable view for ``/v1/stats``."""
+        return {
+            "workers": [
+                {
+                    "index": w.spec.index,
+                    "device": w.spec.device,
+                    "pid": w.pid,
+                    "ready": w.ready,
+                    "busy": w.current is not None,
+                    "affinity": list(w.affinity) if isinstance(w.affinity, tuple) else w.affinity,
+                    "jobs": w.jobs,
+                    "restarts": w.restarts,
+                }
+                for w in self._workers
+            ],
+            "dispatched": self.dispatched,
+            "affinity_hits": self.affinity_hits,
+        }
@@ -0,0 +1,121 @@
+"""Unit tests for the multi-process worker pool, using CPU stand-in workers."""
+
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+
+from acestep.api.jobs.worker_pool import WorkerPool, WorkerPoolConfig, WorkerSpec
+
+
+def _stand_in_factory(spec):
+    """Build a runner that sleeps, reports progress and echoes its payload."""
+
+    def run(jobs, emit):
+        for job_id, payload in jobs:
+            if payload == "crash":
+                os._exit(3)
+            if payload == "raise":
+                raise ValueError("bad payload")
+            emit("progress", job_id, (0.5, "halfway"))
+            time.sleep(float(payload) if isinstance(payload, (int, float)) else 0.0)
+            emit("result", job_id, {"worker": spec.index, "device": spec.device, "pid": os.getpid()})
+
+    return run
+
+
+def _broken_factory(spec):
+    """Fail while "loading models"."""
+    raise RuntimeError(f"no device {spec.device}")
+
+
+def _specs(count):
+    """Stand-in CPU workers."""
+    return [WorkerSpec(index=i, device=f"cpu:{i}") for i in range(count)]
+
+
+class WorkerPoolTests(unittest.IsolatedAsyncioTestCase):
+    """Dispatch, affinity routing and crash recovery."""
+
+    async def asyncSetUp(self):
+        """Start a two-worker pool."""
+        self.pool = WorkerPool(_stand_in_factory, _specs(2), start_timeout=60.0)
+        await self.pool.start()
+
+    async def asyncTearDown(self):
+        """Stop the workers."""
+        await self.pool.stop()
+
+    async def test_jobs_run_in_parallel_processes_with_progress(self):
+        """Two batches overlap on separate workers and report progress."""
+        progress = []
+        t0 = time.monotonic()
+        first, second = await asyncio.gather(
+            self.pool.run([("a", 0.6)], on_progress=lambda *args: progress.append(args)),
+            self.pool.run([("b", 0.6), ("c", 0.0)]),
+        )
+        self.assertLess(time.monotonic() - t0, 1.1)
+        self.assertEqual(first["a"][0], "result")
+        self.assertNotEqual(first["a"][1]["pid"], second["b"][1]["pid"])
+        self.assertEqual(second["b"][1]["pid"], second["c"][1]["pid"])
+        self.assertNotEqual(first["a"][1]["pid"], os.getpid())
+        self.assertEqual(progress, [("a", 0.5, "halfway")])
+
+    async def test_affinity_routes_back_to_the_same_worker(self):
+        """A job goes to the worker that last ran its model, not the least busy one."""
+        key_a, key_b = ("turbo", "lm-0.6B", ""), ("sft", "lm-1.7B", "")
+        on_a = (await self.pool.run([("1", 0)], affinity=key_a))["1"][1]["worker"]
+        on_b = (await self.pool.run([("2", 0)], affinity=key_b))["2"][1]["worker"]
+        self.assertNotEqual(on_a, on_b)
+        for job_id in ("3", "4"):
+            self.assertEqual((await self.pool.run([(job_id, 0)], affinity=key_a))[job_id][1]["worker"], on_a)
+        snapshot = self.pool.snapshot()
+        self.assertEqual((snapshot["dispatched"], snapshot["affinity_hits"]), (4, 2))
+        self.assertEqual(snapshot["workers"][on_a]["affinity"], list(key_a))
+
+    async def test_runner_errors_are_reported_per_job(self):
+        """An exception in the runner fails the batch but keeps the worker."""
+        results = await self.pool.run([("x", "raise"), ("y", 0)])
+        self.assertEqual(results["x"][0], "error")
+        self.assertIn("ValueError: bad payload", results["x"][1])
+        self.assertEqual(results["y"][0], "error")
+        self.assertEqual((await self.pool.run([("z", 0)]))["z"][0], "result")
+
+    async def test_crashed_worker_fails_its_jobs_and_is_respawned(self):
+        """A dead worker's jobs fail and a replacement takes later work."""
+        results = await self.pool.run([("boom", "crash")], affinity="k")
+        self.assertEqual(results["boom"], ("error", mock.ANY))
+        self.assertIn("exited with code 3", results["boom"][1])
+        for job_id in ("after1", "after2", "after3"):
+            self.assertEqual((await self.pool.run([(job_id, 0)]))[job_id][0], "result")
+        deadline = time.monotonic() + 60.0
+        while not all(w["ready"] for w in self.pool.snapshot()["workers"]) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        workers = self.pool.snapshot()["workers"]
+        self.assertEqual(sum(w["restarts"] for w in workers), 1)
+        self.assertTrue(all(w["ready"] for w in workers))
+
+
+class WorkerPoolStartupTests(unittest.IsolatedAsyncioTestCase):
+    """Startup failures and configuration."""
+
+    async def test_start_raises_when_no_worker_loads(self):
+        """Startup errors from every worker surface as one RuntimeError."""
+        pool = WorkerPool(_broken_factory, _specs(1), start_timeout=60.0)
+        with self.assertRaisesRegex(RuntimeError, "no device cpu:0"):
+            await pool.start()
+
+    def test_config_from_env_and_device_assignment(self):
+        """Workers cycle over the configured devices."""
+        env = {"ACESTEP_GPU_WORKERS": "3", "ACESTEP_GPU_WORKER_DEVICES": "cuda:0, cuda:1"}
+        with mock.patch.dict(os.environ, env):
+            config = WorkerPoolConfig.from_env()
+        self.assertTrue(config.enabled)
+        self.assertEqual([s.device for s in config.specs()], ["cuda:0", "cuda:1", "cuda:0"])
+        with mock.patch.dict(os.environ, {"ACESTEP_GPU_WORKERS": "x"}):
+            self.assertFalse(WorkerPoolConfig.from_env().enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,353 @@
+"""Open-loop load generator for the ACE-Step serving stack.
+
+``openrouter/stress_test.py`` runs closed-loop workers: a worker only sends
+its next request after the previous one finished, so the offered load drops
+as soon as the server slows down and queues never build the way they do
+under real traffic.  This generator sends every request at its scheduled
+arrival time whether or not earlier ones have finished, and reports
+p50/p95/p99 of queue wait, time-to-result and ``/query_result`` latency
+plus throughput.
+
+Arrival modes:
+    poisson   Exponential inter-arrival times at ``--rate`` requests/s.
+    burst     ``--burst-size`` requests at once every ``--burst-interval`` s.
+    constant  Evenly spaced at ``--rate`` requests/s.
+
+Targets:
+    api         ``POST /release_task``, poll ``/query_result``, download audio.
+    openrouter  ``POST /v1/chat/completions`` (non-streaming).
+    wrapper     ``POST /lego`` with a generated silent WAV.
+
+Queue wait is only observable for the ``api`` target: it is the time from
+submission until the first poll that shows the job past ``queued``, so its
+resolution is ``--poll-interval``.  Time-to-result is measured from the
+*scheduled* arrival, so client-side lag counts against the server.
+
+Everything runs on a CPU box with no network when the servers use the fake
+backend (see ``acestep.api.fake_backend``)::
+
+    python -m acestep.api_server --fake-backend --fake-latency "step=0.05,jitter=0" &
+    python -m acestep.api.loadgen --target api --arrival poisson --rate 2 --requests 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import math
+import random
+import statistics
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+PERCENTILES = (50, 95, 99)
+
+
+# =============================================================================
+# Arrivals and statistics
+# =============================================================================
+
+def arrival_times(
+    mode: str,
+    count: Optional[int] = None,
+    duration: Optional[float] = None,
+    rate: float = 1.0,
+    burst_size: int = 10,
+    burst_interval: float = 10.0,
+    seed: int = 0,
+) -> List[float]:
+    """Return request send offsets in seconds, ending at *count* requests or *duration* seconds."""
+    if count is None and duration is None:
+        raise ValueError("Either count or duration is required")
+    if mode in ("poisson", "constant") and rate <= 0:
+        raise ValueError("rate must be positive")
+    rng = random.Random(seed)
+    times: List[float] = []
+    t = 0.0
+    while (count is None or len(times) < count) and (duration is None or t < duration):
+        if mode == "burst":
+            for _ in range(max(1, burst_size)):
+                if count is not None and len(times) >= count:
+                    break
+                times.append(t)
+            t += burst_interval
+        elif mode == "poisson":
+            times.append(t)
+            t += rng.expovariate(rate)
+        elif mode == "constant":
+            times.append(t)
+            t += 1.0 / rate
+        else:
+            raise ValueError(f"Unknown arrival mode {mode!r}")
+    return times
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Return the nearest-rank *q*-th percentile of *values* (``0.0`` if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def describe(values: Sequence[float]) -> Dict[str, float]:
+    """Return count, mean, max and the ``PERCENTILES`` of *values*."""
+    data = {"count": len(values), "mean": statistics.fmean(values) if values else 0.0, "max": max(values, default=0.0)}
+    for q in PERCENTILES:
+        data[f"p{q}"] = percentile(values, q)
+    return data
+
+
+@dataclass
+class RequestOutcome:
+    """Timings of one request, as offsets from the start of the run."""
+
+    scheduled: float
+    sent: float = 0.0
+    finished: float = 0.0
+    ok: bool = False
+    error: str = ""
+    queue_wait: Optional[float] = None
+    poll_latencies: List[float] = field(default_factory=list)
+
+    @property
+    def time_to_result(self) -> float:
+        """Scheduled arrival to result (including client-side lag)."""
+        return self.finished - self.scheduled
+
+
+def summarize(outcomes: Sequence[RequestOutcome]) -> Dict[str, Any]:
+    """Aggregate outcomes into the report printed and written by ``main``."""
+    done = [o for o in outcomes if o.ok]
+    errors: Dict[str, int] = {}
+    for o in outcomes:
+        if not o.ok:
+            errors[o.error] = errors.get(o.error, 0) + 1
+    last_arrival = max((o.scheduled for o in outcomes), default=0.0)
+    wall = max((o.finished for o in outcomes), default=0.0)
+    return {
+        "requests": len(outcomes),
+        "succeeded": len(done),
+        "failed": len(outcomes) - len(done),
+        "errors": errors,
+        "offered_rps": (len(outcomes) / last_arrival) if last_arrival > 0 else 0.0,
+        "throughput_rps": (len(done) / wall) if wall > 0 else 0.0,
+        "wall_seconds": wall,
+        "queue_wait": describe([o.queue_wait for o in done if o.queue_wait is not None]),
+        "time_to_result": describe([o.time_to_result for o in done]),
+        "query_result_latency": describe([lat for o in outcomes for lat in o.poll_latencies]),
+        "client_lag": describe([o.sent - o.scheduled for o in outcomes]),
+    }
+
+
+# =============================================================================
+# Targets
+# =============================================================================
+
+def silent_wav(seconds: float, sample_rate: int = 48000) -> bytes:
+    """Return a stereo 16-bit silent WAV file."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\0" * (4 * int(seconds * sample_rate)))
+    return buf.getvalue()
+
+
+class LoadClient:
+    """Send one request to a target and record its timings."""
+
+    def __init__(self, args: argparse.Namespace, clock: Callable[[], float]):
+        import requests
+
+        self.args = args
+        self.base_url = args.base_url.rstrip("/")
+        self.clock = clock
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=args.max_inflight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else {}
+        self._wav = silent_wav(args.audio_duration) if args.target == "wrapper" else b""
+
+    def run(self, outcome: RequestOutcome, index: int) -> None:
+        """Send request *index* and fill in *outcome*."""
+        outcome.sent = self.clock()
+        try:
+            getattr(self, f"_run_{self.args.target}")(outcome, index)
+            outcome.ok = True
+        except Exception as exc:
+            outcome.error = f"{type(exc).__name__}: {str(exc)[:80]}"
+        outcome.finished = self.clock()
+
+    def _post(self, path: str, **kwargs: Any) -> Any:
+        resp = self.session.post(f"{self.base_url}{path}", headers=self.headers, timeout=self.args.timeout, **kwargs)
+        if resp.status_code != 200:
+            raise RuntimeError(f"HTTP {resp.status_code} from {path}")
+        return resp
+
+    def _run_api(self, outcome: RequestOutcome, index: int) -> None:
+        payload = {
+            "prompt": f"load test {index}",
+            "audio_duration": self.args.audio_duration,
+            "inference_steps": self.args.inference_steps,
+            "batch_size": self.args.batch_size,
+            "thinking": False,
+            "use_cot_caption": False,
+            "use_cot_language": False,
+            "audio_format": "wav",
+            "priority": self.args.priority,
+            "client_id": f"loadgen-{index % max(1, self.args.clients)}",
+        }
+        task_id = self._post("/release_task", json=payload).json()["data"]["task_id"]
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            item = self._post("/query_result", json={"task_id_list": [task_id]}).json()["data"][0]
+            outcome.poll_latencies.append(time.perf_counter() - started)
+            status = int(item.get("status", 0))
+            try:
+                result = json.loads(item.get("result") or "[]")
+            except (TypeError, ValueError):
+                result = []
+            stage = (result[0].get("stage") if result else None) or "queued"
+            if outcome.queue_wait is None and (status != 0 or stage != "queued"):
+                outcome.queue_wait = self.clock() - outcome.sent
+            if status == 1:
+                if self.args.download and result and result[0].get("file"):
+                    resp = self.session.get(f"{self.base_url}{result[0]['file']}", headers=self.headers,
+                                            timeout=self.args.timeout)
+                    if resp.status_code != 200:
+                        raise RuntimeError(f"HTTP {resp.status_code} downloading audio")
+                return
+            if status == 2:
+                raise RuntimeError(f"job failed: {str(result)[:60]}")
+            time.sleep(self.args.poll_interval)
+        raise TimeoutError("no result before --timeout")
+
+    def _run_openrouter(self, outcome: RequestOutcome, index: int) -> None:
+        payload = {
+            "messages": [{"role": "user", "content": f"<prompt>load test {index}</prompt>"}],
+            "audio_config": {"instrumental": True, "duration": self.args.audio_duration},
+            "batch_size": self.args.batch_size,
+        }
+        self._post("/v1/chat/completions", json=payload)
+
+    def _run_wrapper(self, outcome: RequestOutcome, index: int) -> None:
+        files = {"audio_file": ("loadtest.wav", self._wav, "audio/wav")}
+        data = {"track_type": "drums", "bpm": "120", "batch_size": str(self.args.batch_size)}
+        self._post("/lego", files=files, data=data)
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def run_open_loop(
+    schedule: Sequence[float],
+    send: Callable[[RequestOutcome, int], None],
+    max_inflight: int,
+    clock: Callable[[], float],
+    progress_every: int = 0,
+) -> List[RequestOutcome]:
+    """Call ``send(outcome, index)`` at each scheduled offset on a thread pool.
+
+    Sends never wait for earlier requests; if more than *max_inflight* are
+    outstanding the excess waits client-side and shows up as ``client_lag``.
+    """
+    outcomes = [RequestOutcome(scheduled=t) for t in schedule]
+    completed = 0
+    lock = threading.Lock()
+
+    def _task(index: int) -> None:
+        nonlocal completed
+        send(outcomes[index], index)
+        with lock:
+            completed += 1
+            if progress_every and completed % progress_every == 0:
+                print(f"[loadgen] {completed}/{len(outcomes)} done at t={clock():.1f}s", flush=True)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_inflight), thread_name_prefix="loadgen") as pool:
+        for index, offset in enumerate(schedule):
+            delay = offset - clock()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_task, index)
+    return outcomes
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"\nrequests={report['requests']} ok={report['succeeded']} failed={report['failed']} "
+          f"offered={report['offered_rps']:.2f}/s throughput={report['throughput_rps']:.2f}/s "
+          f"wall={report['wall_seconds']:.1f}s")
+    for name in ("queue_wait", "time_to_result", "query_result_latency", "client_lag"):
+        stats = report[name]
+        if not stats["count"]:
+            continue
+        cells = " ".join(f"p{q}={stats[f'p{q}']:.3f}" for q in PERCENTILES)
+        print(f"  {name:<22} n={stats['count']:<5} mean={stats['mean']:.3f} {cells} max={stats['max']:.3f}")
+    for error, count in sorted(report["errors"].items(), key=lambda kv: -kv[1]):
+        print(f"  error x{count}: {error}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Run a load test from the command line and return the report."""
+    parser = argparse.ArgumentParser(description="Open-loop load generator for ACE-Step servers")
+    parser.add_argument("--target", choices=["api", "openrouter", "wrapper"], default="api")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--arrival", choices=["poisson", "burst", "constant"], default="poisson")
+    parser.add_argument("--rate", type=float, default=1.0, help="Requests/s for poisson and constant arrivals")
+    parser.add_argument("--burst-size", type=int, default=10)
+    parser.add_argument("--burst-interval", type=float, default=10.0, help="Seconds between bursts")
+    parser.add_argument("--requests", type=int, default=None, help="Number of requests (default 100 without --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Send requests for this many seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for Poisson inter-arrival times")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Client threads for outstanding requests")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between /query_result polls")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--audio-duration", type=float, default=30.0)
+    parser.add_argument("--inference-steps", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=1, help="Spread api requests over this many client ids")
+    parser.add_argument("--priority", choices=["high", "normal", "low"], default="normal")
+    parser.add_argument("--no-download", dest="download", action="store_false", help="Skip fetching result audio")
+    parser.add_argument("--json", default=None, help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    count = args.requests if args.requests is not None or args.duration is not None else 100
+    schedule = arrival_times(
+        args.arrival, count=count, duration=args.duration, rate=args.rate,
+        burst_size=args.burst_size, burst_interval=args.burst_interval, seed=args.seed,
+    )
+    start = time.perf_counter()
+
+    def clock() -> float:
+        return time.perf_counter() - start
+
+    client = LoadClient(args, clock)
+    print(f"[loadgen] {len(schedule)} {args.arrival} requests to {args.target} at {client.base_url}")
+    outcomes = run_open_loop(schedule, client.run, args.max_inflight, clock, progress_every=max(1, len(schedule) // 10))
+    report = summarize(outcomes)
+    if args.target == "api":
+        try:
+            resp = client.session.get(f"{client.base_url}/v1/stats", headers=client.headers, timeout=10)
+            report["server_stats"] = resp.json().get("data")
+        except Exception as exc:
+            report["server_stats_error"] = str(exc)
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
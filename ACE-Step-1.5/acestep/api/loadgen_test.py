@@ -0,0 +1,81 @@
+"""Unit tests for the open-loop load generator."""
+
+import time
+import unittest
+
+from acestep.api.loadgen import (
+    RequestOutcome,
+    arrival_times,
+    percentile,
+    run_open_loop,
+    summarize,
+)
+
+
+class ArrivalTests(unittest.TestCase):
+    """Arrival schedules."""
+
+    def test_poisson_is_seeded_with_the_requested_rate(self):
+        """Same seed, same schedule; mean gap is close to ``1 / rate``."""
+        times = arrival_times("poisson", count=2000, rate=4.0, seed=1)
+        self.assertEqual(times, arrival_times("poisson", count=2000, rate=4.0, seed=1))
+        self.assertEqual(times[0], 0.0)
+        self.assertAlmostEqual(times[-1] / (len(times) - 1), 0.25, delta=0.02)
+
+    def test_burst_and_duration_limits(self):
+        """Bursts share a send time; ``duration`` bounds the schedule."""
+        self.assertEqual(arrival_times("burst", count=5, burst_size=2, burst_interval=3.0),
+                         [0.0, 0.0, 3.0, 3.0, 6.0])
+        self.assertEqual(arrival_times("constant", duration=1.0, rate=4.0), [0.0, 0.25, 0.5, 0.75])
+        with self.assertRaises(ValueError):
+            arrival_times("poisson", rate=1.0)
+
+
+class ReportTests(unittest.TestCase):
+    """Percentiles and the summary."""
+
+    def test_percentile_nearest_rank(self):
+        """Nearest-rank percentiles on 1..100."""
+        values = list(range(100, 0, -1))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_summarize(self):
+        """Failures are counted by error and excluded from latency stats."""
+        outcomes = [
+            RequestOutcome(scheduled=0.0, sent=0.0, finished=2.0, ok=True, queue_wait=1.0, poll_latencies=[0.01]),
+            RequestOutcome(scheduled=1.0, sent=1.5, finished=4.0, ok=True, queue_wait=0.5),
+            RequestOutcome(scheduled=2.0, sent=2.0, finished=2.1, error="boom"),
+        ]
+        report = summarize(outcomes)
+        self.assertEqual((report["succeeded"], report["failed"], report["errors"]), (2, 1, {"boom": 1}))
+        self.assertEqual(report["time_to_result"]["p99"], 3.0)
+        self.assertEqual(report["queue_wait"]["p50"], 0.5)
+        self.assertEqual(report["client_lag"]["max"], 0.5)
+        self.assertEqual((report["offered_rps"], report["throughput_rps"]), (1.5, 0.5))
+
+
+class OpenLoopTests(unittest.TestCase):
+    """Sends follow the schedule, not completions."""
+
+    def test_slow_requests_do_not_delay_later_sends(self):
+        """Every request is sent on time even though each takes longer than the gap."""
+        start = time.perf_counter()
+
+        def clock():
+            return time.perf_counter() - start
+
+        def send(outcome, _index):
+            outcome.sent = clock()
+            time.sleep(0.2)
+            outcome.ok = True
+            outcome.finished = clock()
+
+        outcomes = run_open_loop(arrival_times("constant", count=5, rate=50.0), send, 8, clock)
+        self.assertTrue(all(o.ok for o in outcomes))
+        self.assertLess(max(o.sent - o.scheduled for o in outcomes), 0.1)
+        self.assertLess(max(o.finished for o in outcomes), 0.6)
+
+
+if __name__ == "__main__":
+    unittest.main()
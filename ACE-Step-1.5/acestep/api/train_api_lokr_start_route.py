@@ -81,6 +81,7 @@ def register_lokr_training_start_route(
                 seed=request.training_seed,
                 output_dir=request.output_dir,
                 gradient_checkpointing=request.gradient_checkpointing,
+                deferred_metrics=request.deferred_metrics,
             )
             trainer = LoKRTrainer(dit_handler=handler, lokr_config=lokr_config, training_config=training_config)
         except Exception as exc:
@@ -67,6 +67,7 @@ def register_lora_training_start_route(
                 output_dir=request.lora_output_dir,
                 use_fp8=request.use_fp8,
                 gradient_checkpointing=request.gradient_checkpointing,
+                deferred_metrics=request.deferred_metrics,
             )
             trainer = LoRATrainer(dit_handler=handler, lora_config=lora_config, training_config=training_config)
         except Exception as exc:
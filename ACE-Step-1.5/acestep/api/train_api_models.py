@@ -27,6 +27,9 @@ class StartTrainingRequest(BaseModel):
     lora_output_dir: str = Field(default="./lora_output", description="Output directory")
     use_fp8: bool = Field(default=False, description="Use FP8 training when runtime supports it")
     gradient_checkpointing: bool = Field(default=False, description="Trade compute speed for lower VRAM usage")
+    deferred_metrics: bool = Field(
+        default=False, description="Read loss and gradient checks back only at logging steps (fewer GPU syncs)"
+    )
 
 
 class StartLoKRTrainingRequest(BaseModel):
@@ -49,6 +52,9 @@ class StartLoKRTrainingRequest(BaseModel):
     training_seed: int = Field(default=42, description="Random seed")
     output_dir: str = Field(default="./lokr_output", description="Output directory")
     gradient_checkpointing: bool = Field(default=False, description="Trade compute speed for lower VRAM usage")
+    deferred_metrics: bool = Field(
+        default=False, description="Read loss and gradient checks back only at logging steps (fewer GPU syncs)"
+    )
 
 
 class ExportLoRARequest(BaseModel):
@@ -31,7 +31,7 @@ from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, List, Literal, Optional, Union
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 from uuid import uuid4
 from loguru import logger
 import torch
@@ -45,6 +45,20 @@ from fastapi import FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from starlette.datastructures import UploadFile as StarletteUploadFile
+from acestep.api.fake_backend import FakeBackend, FakeDiTHandler, FakeLLMHandler
+from acestep.api.jobs.coalescing import (
+    CoalesceConfig,
+    JobCoalescer,
+    coalesce_key,
+    request_batch_size,
+    split_by_counts,
+)
+from acestep.api.jobs.journal import JobJournal, JournalConfig
+from acestep.api.jobs.latent_cache import RetainedLatentCache
+from acestep.api.jobs.lm_pool import LMPool, job_lm_model
+from acestep.api.jobs.scheduler import PRIORITY_CLASSES, JobCostModel, JobScheduler, SchedulerConfig, admit_priority
+from acestep.api.jobs.worker_pool import WorkerPool, WorkerPoolConfig, WorkerSpec, job_affinity
+from acestep.core.generation.handler.reference_library import ReferenceLibrary
 from acestep.api.train_api_service import (
     initialize_training_state,
     register_training_api_routes,
@@ -65,6 +79,7 @@ from acestep.inference import (
 )
 from acestep.ui.gradio.events.results_handlers import _build_generation_info
 from acestep.gpu_config import (
+    check_vram_admission,
     get_gpu_config,
     set_global_gpu_config,
     get_recommended_lm_model,
@@ -353,6 +368,7 @@ PARAM_ALIASES = {
     "sample_query": ["sample_query", "sampleQuery", "description", "desc"],
     "use_format": ["use_format", "useFormat", "format"],
     "model": ["model", "model_name", "modelName", "dit_model", "ditModel"],
+    "lora_path": ["lora_path", "loraPath", "lora"],
     "key_scale": ["key_scale", "keyscale", "keyScale", "key"],
     "time_signature": ["time_signature", "timesignature", "timeSignature"],
     "audio_duration": ["audio_duration", "duration", "audioDuration", "target_duration", "targetDuration"],
@@ -365,6 +381,7 @@ PARAM_ALIASES = {
 
     "audio_cover_strength": ["audio_cover_strength", "audioCoverStrength"],
     "reference_audio_path": ["reference_audio_path", "ref_audio_path", "referenceAudioPath", "refAudioPath"],
+    "reference_id": ["reference_id", "ref_id", "referenceId", "refId"],
     "src_audio_path": ["src_audio_path", "ctx_audio_path", "sourceAudioPath", "srcAudioPath", "ctxAudioPath"],
     "task_type": ["task_type", "taskType"],
     "infer_method": ["infer_method", "inferMethod"],
@@ -377,6 +394,10 @@ PARAM_ALIASES = {
     "allow_lm_batch": ["allow_lm_batch", "allowLmBatch", "parallel_thinking"],
     "track_name": ["track_name", "trackName"],
     "track_classes": ["track_classes", "trackClasses", "instruments"],
+    "track_names": ["track_names", "trackNames"],
+    "track_captions": ["track_captions", "trackCaptions"],
+    "priority": ["priority"],
+    "client_id": ["client_id", "clientId"],
 }
 
 
@@ -471,6 +492,8 @@ class GenerateMusicRequest(BaseModel):
     use_format: bool = Field(default=False, description="Use format_sample() to enhance input (default: False)")
     # Model name for multi-model support (select which DiT model to use)
     model: Optional[str] = Field(default=None, description="Model name to use (e.g., 'acestep-v15-turbo')")
+    # LoRA adapter the job runs with; unset keeps whatever adapter the server has loaded
+    lora_path: Optional[str] = Field(default=None, description="LoRA/LoKr adapter path to load for this job")
 
     bpm: Optional[int] = None
     # Accept common client keys via manual parsing (see RequestParser).
@@ -483,6 +506,8 @@ class GenerateMusicRequest(BaseModel):
     seed: Union[int, str] = -1
 
     reference_audio_path: Optional[str] = None
+    # ID from the reference library (/v1/references); replaces reference_audio_path
+    reference_id: Optional[str] = None
     src_audio_path: Optional[str] = None
     audio_duration: Optional[float] = None
     batch_size: Optional[int] = None
@@ -527,6 +552,14 @@ class GenerateMusicRequest(BaseModel):
     allow_lm_batch: bool = True
     track_name: Optional[str] = None
     track_classes: Optional[List[str]] = None
+    # Multi-track lego/extract: one batch over the shared source with one
+    # instruction (and optionally caption) per track; batch_size is per track
+    track_names: Optional[List[str]] = None
+    track_captions: Optional[List[str]] = None
+
+    # Queue scheduling (see acestep.api.jobs.scheduler)
+    priority: str = "normal"  # "high", "normal" or "low"
+    client_id: Optional[str] = None  # fair-share bucket; defaults to X-Client-Id or the caller's address
 
     lm_temperature: float = 0.85
     lm_cfg_scale: float = 2.5
@@ -554,6 +587,11 @@ class ToggleLoRARequest(BaseModel):
     use_lora: bool = Field(..., description="Enable or disable LoRA")
 
 
+class ConvertToCodesRequest(BaseModel):
+    task_id: str = Field(..., description="ID of a finished generation job")
+    index: int = Field(default=0, ge=0, description="Which of the job's audios to convert")
+
+
 def _stop_tensorboard(app: FastAPI) -> None:
     """Stop TensorBoard process if running."""
     try:
@@ -619,102 +657,76 @@ def _start_tensorboard(app: FastAPI, logdir: str) -> Optional[str]:
         return None
 
 
-@contextmanager
-def _temporary_llm_model(app: FastAPI, llm: "LLMHandler", lm_model_path: Optional[str]):
-    """Temporarily switch LLM model for a critical section and restore afterward.
+def _load_pooled_lm(app: FastAPI, llm: "LLMHandler", lm_model_path: str, init_params: Dict[str, Any]) -> Tuple[str, bool]:
+    """Cold-load *lm_model_path* for the LM pool, reusing the active model's init params."""
+    project_root = _get_project_root()
+    checkpoint_dir = os.path.join(project_root, "checkpoints")
+    os.makedirs(checkpoint_dir, exist_ok=True)
 
-    This is intentionally best-effort and conservative:
-    - If lm_model_path is empty/None -> no-op
-    - If LLM isn't initialized -> no-op (handlers already validate this)
-    - Uses app.state._llm_init_lock to serialize LLM re-inits
-    """
-    desired = (lm_model_path or "").strip()
-    if not desired:
-        yield
-        return
+    lm_model_name = _get_model_name(lm_model_path)
+    if lm_model_name and getattr(app.state, "fake_backend", None) is None:
+        try:
+            _ensure_model_downloaded(lm_model_name, checkpoint_dir)
+        except Exception as e:
+            print(f"[API Server] Warning: Failed to download LM model {lm_model_name}: {e}")
 
-    if llm is None or not getattr(llm, "llm_initialized", False):
-        yield
-        return
+    params = {
+        "backend": os.getenv("ACESTEP_LM_BACKEND", "vllm").strip().lower() or "vllm",
+        "device": os.getenv("ACESTEP_LM_DEVICE", os.getenv("ACESTEP_DEVICE", "auto")),
+        "offload_to_cpu": _env_bool("ACESTEP_LM_OFFLOAD_TO_CPU", False),
+        "dtype": None,
+    }
+    params.update(init_params or {})
+    print(f"[API Server] Loading LM model {lm_model_path} for LM pool")
+    with app.state._llm_init_lock:
+        status, ok = llm.initialize(checkpoint_dir=checkpoint_dir, lm_model_path=lm_model_path, **params)
+    return status, ok
 
-    lock = getattr(app.state, "_llm_init_lock", None)
-    if lock is None:
-        yield
-        return
 
-    with lock:
-        prev_params = getattr(llm, "last_init_params", None)
-        prev_model = (prev_params or {}).get("lm_model_path") if isinstance(prev_params, dict) else None
-        if prev_model and prev_model.strip() == desired:
-            yield
-            return
+def _note_lm_loaded(app: FastAPI, lm_model_path: str, **init_params: Any) -> None:
+    """Tell the LM pool which model the handler was just initialized with."""
+    pool = getattr(app.state, "lm_pool", None)
+    if pool is not None:
+        pool.note_loaded(lm_model_path, init_params)
 
-        project_root = _get_project_root()
-        checkpoint_dir = os.path.join(project_root, "checkpoints")
-        os.makedirs(checkpoint_dir, exist_ok=True)
 
-        lm_model_name = _get_model_name(desired)
-        if lm_model_name:
-            try:
-                _ensure_model_downloaded(lm_model_name, checkpoint_dir)
-            except Exception:
-                pass
+@contextmanager
+def _lm_lease(app: FastAPI, lm_model_path: Optional[str]):
+    """Hold the LM pool on *lm_model_path* for a critical section, switching to it if needed.
 
-        restore_params = prev_params if isinstance(prev_params, dict) else None
+    An empty path runs on whichever model is active.  A failed switch is
+    reported through ``app.state._llm_init_error`` like a failed lazy init.
+    """
+    pool: Optional[LMPool] = getattr(app.state, "lm_pool", None)
+    if pool is None:
+        yield
+        return
+    with pool.use(lm_model_path) as error:
+        if error is not None:
+            print(f"[API Server] LM switch to {lm_model_path} failed: {error}")
+            app.state._llm_initialized = False
+            app.state._llm_init_error = error
+        elif pool.active and getattr(pool.handler, "llm_initialized", False):
+            app.state._llm_initialized = True
+            app.state._llm_init_error = None
+        yield
 
-        ok_switched = False
-        try:
-            new_params = dict(restore_params) if restore_params else {
-                "checkpoint_dir": checkpoint_dir,
-                "backend": os.getenv("ACESTEP_LM_BACKEND", "vllm").strip().lower() or "vllm",
-                "device": os.getenv("ACESTEP_LM_DEVICE", os.getenv("ACESTEP_DEVICE", "auto")),
-                "offload_to_cpu": _env_bool("ACESTEP_LM_OFFLOAD_TO_CPU", False),
-                "dtype": None,
-            }
-            new_params["checkpoint_dir"] = checkpoint_dir
-            new_params["lm_model_path"] = desired
 
-            status, ok = llm.initialize(**new_params)
-            if ok:
-                ok_switched = True
-                try:
-                    app.state._llm_initialized = True
-                    app.state._llm_init_error = None
-                except Exception:
-                    pass
-            else:
-                try:
-                    app.state._llm_initialized = False
-                    app.state._llm_init_error = status
-                except Exception:
-                    pass
-        except Exception as e:
-            try:
-                app.state._llm_initialized = False
-                app.state._llm_init_error = str(e)
-            except Exception:
-                pass
+@contextmanager
+def _temporary_llm_model(app: FastAPI, llm: "LLMHandler", lm_model_path: Optional[str]):
+    """Run a critical section on *lm_model_path* through the LM pool.
 
-        try:
-            yield
-        finally:
-            if not ok_switched:
-                return
-            if not restore_params:
-                return
-            try:
-                llm.initialize(**restore_params)
-                try:
-                    app.state._llm_initialized = True
-                    app.state._llm_init_error = None
-                except Exception:
-                    pass
-            except Exception as e:
-                try:
-                    app.state._llm_initialized = False
-                    app.state._llm_init_error = str(e)
-                except Exception:
-                    pass
+    - If lm_model_path is empty/None -> no-op
+    - If LLM isn't initialized -> no-op (handlers already validate this)
+    - The previous model is parked rather than re-initialized afterwards,
+      so the next job on it switches back warm (see ``acestep.api.jobs.lm_pool``)
+    """
+    desired = (lm_model_path or "").strip()
+    if not desired or llm is None or not getattr(llm, "llm_initialized", False):
+        yield
+        return
+    with _lm_lease(app, desired):
+        yield
 
 
 def _atomic_write_json(path: str, payload: Dict[str, Any]) -> None:
@@ -818,6 +830,8 @@ class _JobStore:
         self._lock = Lock()
         self._jobs: Dict[str, _JobRecord] = {}
         self._max_age = max_age_seconds
+        # Durable record of state transitions (set by the lifespan when enabled)
+        self.journal: Optional[JobJournal] = None
 
     def create(self) -> _JobRecord:
         job_id = str(uuid4())
@@ -855,6 +869,8 @@ class _JobStore:
             rec.progress = max(rec.progress, 0.01)
             rec.stage = "running"
             rec.updated_at = time.time()
+        if self.journal is not None:
+            self.journal.record(job_id, "running")
 
     def mark_succeeded(self, job_id: str, result: Dict[str, Any]) -> None:
         with self._lock:
@@ -866,6 +882,8 @@ class _JobStore:
             rec.progress = 1.0
             rec.stage = "succeeded"
             rec.updated_at = time.time()
+        if self.journal is not None:
+            self.journal.record(job_id, "succeeded", result)
 
     def mark_failed(self, job_id: str, error: str) -> None:
         with self._lock:
@@ -877,6 +895,8 @@ class _JobStore:
             rec.progress = rec.progress if rec.progress > 0 else 0.0
             rec.stage = "failed"
             rec.updated_at = time.time()
+        if self.journal is not None:
+            self.journal.record(job_id, "failed", error)
 
     def update_progress(self, job_id: str, progress: float, stage: Optional[str] = None) -> None:
         with self._lock:
@@ -948,6 +968,12 @@ def _env_bool(name: str, default: bool) -> bool:
     return v.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
+def _estimate_per_step(handler: Any, steps: int, batch: int, duration: Optional[float]) -> Optional[float]:
+    """Per-step diffusion seconds from the handler's recorded progress estimates, if any."""
+    estimate = getattr(handler, "_estimate_diffusion_per_step", None)
+    if estimate is None:
+        return None
+    return estimate(infer_steps=steps, batch_size=batch, duration_sec=duration)
 
 
 def _get_model_name(config_path: str) -> str:
@@ -1197,6 +1223,129 @@ class StderrLogger:
     def flush(self):
         self.original_stderr.flush()
 
+def _resolve_instruction(req: "GenerateMusicRequest") -> str:
+    """
+    Auto-select the DiT instruction for ``req.task_type``.
+
+    Custom instructions are kept; the default instruction is replaced with the
+    task's entry in TASK_INSTRUCTIONS (matching gradio behavior).
+    """
+    instruction_to_use = req.instruction
+    if instruction_to_use == DEFAULT_DIT_INSTRUCTION and req.task_type in TASK_INSTRUCTIONS:
+        raw_instruction = TASK_INSTRUCTIONS[req.task_type]
+
+        if req.task_type == "complete":
+            # Use track_classes joined by pipes
+            if req.track_classes:
+                # Join list items: ["Drums", "Bass"] -> "DRUMS | BASS"
+                classes_str = " | ".join([str(t).upper() for t in req.track_classes])
+                # Use the raw instruction template from constants
+                # Format: "Complete the track with {TRACK_CLASSES}:"
+                instruction_to_use = raw_instruction.format(TRACK_CLASSES=classes_str)
+            else:
+                # Fallback if no classes provided
+                instruction_to_use = TASK_INSTRUCTIONS.get("complete_default", raw_instruction)
+
+        elif "{TRACK_NAME}" in raw_instruction and req.track_name:
+            # Logic for extract/lego
+            instruction_to_use = raw_instruction.format(TRACK_NAME=req.track_name.upper())
+        else:
+            instruction_to_use = raw_instruction
+    return instruction_to_use
+
+
+def _resolve_track_batch(
+    req: "GenerateMusicRequest", caption: str, per_track: int
+) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Expand a multi-track request into per-item track names, instructions and captions.
+
+    Each entry of ``req.track_names`` gets ``per_track`` consecutive batch items
+    with its own lego/extract instruction.  ``req.track_captions`` overrides
+    ``caption`` per track; missing or empty entries keep the shared caption.
+    """
+    track_captions = req.track_captions or []
+    names: List[str] = []
+    instructions: List[str] = []
+    captions: List[str] = []
+    for idx, name in enumerate(req.track_names or []):
+        track_caption = (track_captions[idx] or "").strip() if idx < len(track_captions) else ""
+        names.extend([name] * per_track)
+        instructions.extend([_resolve_instruction(req.model_copy(update={"track_name": name}))] * per_track)
+        captions.extend([track_caption or caption] * per_track)
+    return names, instructions, captions
+
+
+def _resolve_request_seeds(req: "GenerateMusicRequest") -> Optional[List[int]]:
+    """Resolve ``req.seed`` into the ``GenerationConfig.seeds`` list (None = random)."""
+    resolved_seeds = None
+    if not req.use_random_seed and req.seed is not None:
+        if isinstance(req.seed, int):
+            if req.seed >= 0:
+                resolved_seeds = [req.seed]
+        elif isinstance(req.seed, str):
+            resolved_seeds = []
+            for s in req.seed.split(","):
+                s = s.strip()
+                if s and s != "-1":
+                    try:
+                        resolved_seeds.append(int(float(s)))
+                    except (ValueError, TypeError):
+                        pass
+            if not resolved_seeds:
+                resolved_seeds = None
+    return resolved_seeds
+
+
+def _apply_request_lora(h: AceStepHandler, req: "GenerateMusicRequest") -> None:
+    """
+    Put ``h`` on the adapters ``req`` should run with.
+
+    A job's ``lora_path`` swaps that adapter in for the job.  A job without
+    one runs on the server's own adapters (loaded through ``/v1/lora/load``,
+    or none), which are restored here if an earlier job replaced them, so a
+    request-scoped adapter never leaks into another tenant's job.
+    """
+    lora_path = (req.lora_path or "").strip()
+    current = getattr(h, "request_lora_path", None)
+    if lora_path == (current or ""):
+        return
+    if current is None and getattr(h, "lora_loaded", False):
+        # Remember toggles and scales of the server adapters being swapped out.
+        h.server_lora_state = {
+            "use_lora": bool(getattr(h, "use_lora", True)),
+            "scales": dict(getattr(h, "_active_loras", None) or {}),
+        }
+    if getattr(h, "lora_loaded", False):
+        h.unload_lora()
+    h.request_lora_path = None
+    if not lora_path:
+        _restore_server_lora(h)
+        return
+    message = h.load_lora(lora_path)
+    if not message.startswith("✅"):
+        if getattr(h, "lora_loaded", False):
+            h.unload_lora()
+        _restore_server_lora(h)
+        raise RuntimeError(f"LoRA load failed: {message}")
+    h.request_lora_path = lora_path
+
+
+def _restore_server_lora(h: AceStepHandler) -> None:
+    """Reload the adapters set through ``/v1/lora/load`` after a request-scoped adapter."""
+    for lora_path, adapter_name in getattr(h, "server_loras", None) or []:
+        message = h.add_lora(lora_path, adapter_name=adapter_name) if adapter_name else h.load_lora(lora_path)
+        if not message.startswith("✅"):
+            raise RuntimeError(f"Restoring server LoRA {lora_path} failed: {message}")
+    state = getattr(h, "server_lora_state", None)
+    h.server_lora_state = None
+    if state and getattr(h, "lora_loaded", False):
+        for adapter_name, scale in state["scales"].items():
+            h.set_lora_scale(adapter_name, scale)
+        if not state["use_lora"]:
+            h.set_use_lora(False)
+
+
 sys.stderr = StderrLogger(sys.stderr, log_buffer)
 
 
@@ -1256,8 +1405,16 @@ def create_app() -> FastAPI:
         os.environ.setdefault("TRITON_CACHE_DIR", triton_cache_root)
         os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", inductor_cache_root)
 
-        handler = AceStepHandler()
-        llm_handler = LLMHandler()
+        # CPU stand-ins for serving benchmarks (see acestep.api.fake_backend)
+        fake_backend = FakeBackend.from_env()
+        app.state.fake_backend = fake_backend
+        app.state.generate_music = fake_backend.generate_music if fake_backend else generate_music
+
+        def _new_dit_handler():
+            return FakeDiTHandler(fake_backend) if fake_backend else AceStepHandler()
+
+        handler = _new_dit_handler()
+        llm_handler = FakeLLMHandler(fake_backend) if fake_backend else LLMHandler()
         init_lock = asyncio.Lock()
         app.state._initialized = False
         app.state._init_error = None
@@ -1267,6 +1424,11 @@ def create_app() -> FastAPI:
         app.state._llm_initialized = False
         app.state._llm_init_error = None
         app.state._llm_init_lock = Lock()
+        # Keeps recently used LM models parked for cheap switches (see acestep.api.jobs.lm_pool)
+        app.state.lm_pool = LMPool.from_env(
+            llm_handler,
+            lambda path, params: _load_pooled_lm(app, llm_handler, path, params),
+        )
         app.state._llm_lazy_load_disabled = False  # Will be set to True if LLM skipped due to GPU config
 
         # Multi-model support: secondary DiT handlers
@@ -1276,12 +1438,21 @@ def create_app() -> FastAPI:
         config_path3 = os.getenv("ACESTEP_CONFIG_PATH3", "").strip()
 
         if config_path2:
-            handler2 = AceStepHandler()
+            handler2 = _new_dit_handler()
         if config_path3:
-            handler3 = AceStepHandler()
+            handler3 = _new_dit_handler()
 
         app.state.handler2 = handler2
         app.state.handler3 = handler3
+
+        # Reference-timbre library shared by every DiT handler (one VAE)
+        reference_library = ReferenceLibrary.from_env(
+            os.path.join(handler._get_project_root(), ".cache", "acestep", "references")
+        )
+        for h in (handler, handler2, handler3):
+            if h is not None:
+                h.reference_library = reference_library
+        app.state.reference_library = reference_library
         app.state._initialized2 = False
         app.state._initialized3 = False
         app.state._config_path = os.getenv("ACESTEP_CONFIG_PATH", "acestep-v15-turbo")
@@ -1291,15 +1462,58 @@ def create_app() -> FastAPI:
         max_workers = int(os.getenv("ACESTEP_API_WORKERS", "1"))
         executor = ThreadPoolExecutor(max_workers=max_workers)
 
+        # Optional GPU worker processes fed by this process's queue (see acestep.api.jobs.worker_pool)
+        pool_config = WorkerPoolConfig.from_env()
+        worker_pool = None
+        if pool_config.enabled:
+            worker_pool = WorkerPool(
+                _pool_worker_factory,
+                pool_config.specs(default_device=os.getenv("ACESTEP_DEVICE", "auto")),
+                start_timeout=pool_config.start_timeout,
+                restart=pool_config.restart,
+            )
+        app.state.worker_pool = worker_pool
+
         # Queue & observability
-        app.state.job_queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)  # (job_id, req)
-        app.state.pending_ids = deque()  # queued job_ids
-        app.state.pending_lock = asyncio.Lock()
+        # (job_id, req) items ordered by priority and per-client fair share
+        app.state.job_queue = JobScheduler(
+            maxsize=QUEUE_MAXSIZE,
+            config=SchedulerConfig.from_env(),
+            cost_model=JobCostModel(
+                per_step_fn=lambda steps, batch, duration: _estimate_per_step(handler, steps, batch, duration),
+                initial_seconds=INITIAL_AVG_JOB_SECONDS,
+            ),
+        )
+        def _lm_may_run() -> bool:
+            """Whether a solo job could use the 5Hz LM (loaded, or still lazy-loadable)."""
+            if getattr(app.state, "_llm_initialized", False):
+                return True
+            return not (
+                getattr(app.state, "_llm_lazy_load_disabled", False)
+                or getattr(app.state, "_llm_init_error", None) is not None
+            )
+
+        # Merges compatible queued jobs into one DiT batch (see acestep.api.jobs.coalescing).
+        # Coalesced jobs run without the LM, so while it could still be lazy-loaded
+        # only jobs the LM would not change are merged.
+        app.state.coalescer = JobCoalescer(
+            app.state.job_queue,
+            CoalesceConfig.from_env(),
+            key_fn=lambda req: coalesce_key(req, lm_active=_lm_may_run()),
+            affinity_fn=job_lm_model,
+            preferred_fn=lambda: app.state.lm_pool.active,
+        )
 
         # temp files per job (from multipart uploads)
         app.state.job_temp_files = {}  # job_id -> list[path]
+        app.state.retained_latents = RetainedLatentCache.from_env()  # job_id -> pred_latents
         app.state.job_temp_files_lock = asyncio.Lock()
 
+        # Crash-safe record of accepted jobs, replayed below (see acestep.api.jobs.journal)
+        journal_config = JournalConfig.from_env(os.path.join(cache_root, "jobs.sqlite3"))
+        journal = JobJournal(journal_config.path) if journal_config.path else None
+        app.state.job_journal = journal
+
         # stats
         app.state.stats_lock = asyncio.Lock()
         app.state.recent_durations = deque(maxlen=AVG_WINDOW)
@@ -1379,6 +1593,7 @@ def create_app() -> FastAPI:
                     seed_value = result.get("seed_value", "")
                     lm_model = result.get("lm_model", "")
                     dit_model = result.get("dit_model", "")
+                    track_names = result.get("track_names") or []
 
                     if audio_paths:
                         result_data = [
@@ -1397,8 +1612,9 @@ def create_app() -> FastAPI:
                                 "dit_model": dit_model,
                                 "progress": 1.0,
                                 "stage": "succeeded",
+                                **({"track_name": track_names[i]} if i < len(track_names) else {}),
                             }
-                            for p in audio_paths
+                            for i, p in enumerate(audio_paths)
                         ]
                     else:
                         result_data = [{
@@ -1455,16 +1671,8 @@ def create_app() -> FastAPI:
             result_key = f"{RESULT_KEY_PREFIX}{job_id}"
             local_cache.set(result_key, result_data, ex=RESULT_EXPIRE_SECONDS)
 
-        async def _run_one_job(job_id: str, req: GenerateMusicRequest) -> None:
-            job_store: _JobStore = app.state.job_store
-            llm: LLMHandler = app.state.llm_handler
-            executor: ThreadPoolExecutor = app.state.executor
-
-            await _ensure_initialized()
-            job_store.mark_running(job_id)
-            _update_local_cache_progress(job_id, 0.01, "running")
-
-            # Select DiT handler based on user's model choice
+        def _select_dit_handler(job_id: str, req: GenerateMusicRequest):
+            """Return ``(handler, model_name)`` for the DiT model requested by ``req``."""
             # Default: use primary handler
             selected_handler: AceStepHandler = app.state.handler
             selected_model_name = _get_model_name(app.state._config_path)
@@ -1498,6 +1706,124 @@ def create_app() -> FastAPI:
                         available_models.append(_get_model_name(app.state._config_path3))
                     print(f"[API Server] Job {job_id}: Model '{req.model}' not found in {available_models}, using primary: {selected_model_name}")
 
+            return selected_handler, selected_model_name
+
+        def _normalize_metas(meta: Dict[str, Any]) -> Dict[str, Any]:
+            """Ensure a stable `metas` dict (keys always present)."""
+            meta = meta or {}
+            out: Dict[str, Any] = dict(meta)
+
+            # Normalize key aliases
+            if "keyscale" not in out and "key_scale" in out:
+                out["keyscale"] = out.get("key_scale")
+            if "timesignature" not in out and "time_signature" in out:
+                out["timesignature"] = out.get("time_signature")
+
+            # Ensure required keys exist
+            for k in ["bpm", "duration", "genres", "keyscale", "timesignature"]:
+                if out.get(k) in (None, ""):
+                    out[k] = "N/A"
+            return out
+
+        def _build_job_result(
+            audios: List[Dict[str, Any]],
+            extra_outputs: Dict[str, Any],
+            status_message: str,
+            metas_out: Dict[str, Any],
+            caption: Optional[str],
+            lyrics: Optional[str],
+            inference_steps: int,
+            dit_model_name: str,
+        ) -> Dict[str, Any]:
+            """Build the stored job result from one job's generated audios."""
+            # Extract results
+            audio_paths = [audio["path"] for audio in audios if audio.get("path")]
+            first_audio = audio_paths[0] if len(audio_paths) > 0 else None
+            second_audio = audio_paths[1] if len(audio_paths) > 1 else None
+
+            # Extract seed values for response (comma-separated for multiple audios)
+            seed_values = []
+            for audio in audios:
+                audio_params = audio.get("params", {})
+                seed = audio_params.get("seed")
+                if seed is not None:
+                    seed_values.append(str(seed))
+            seed_value = ",".join(seed_values) if seed_values else ""
+
+            # Build generation_info using the helper function (like gradio_ui)
+            lm_metadata = extra_outputs.get("lm_metadata", {})
+            time_costs = extra_outputs.get("time_costs", {})
+            generation_info = _build_generation_info(
+                lm_metadata=lm_metadata,
+                time_costs=time_costs,
+                seed_value=seed_value,
+                inference_steps=inference_steps,
+                num_audios=len(audios),
+            )
+
+            def _none_if_na_str(v: Any) -> Optional[str]:
+                if v is None:
+                    return None
+                s = str(v).strip()
+                if s in {"", "N/A"}:
+                    return None
+                return s
+
+            # Get model information
+            lm_model_name = os.getenv("ACESTEP_LM_MODEL_PATH", "acestep-5Hz-lm-0.6B")
+
+            return {
+                "first_audio_path": _path_to_audio_url(first_audio) if first_audio else None,
+                "second_audio_path": _path_to_audio_url(second_audio) if second_audio else None,
+                "audio_paths": [_path_to_audio_url(p) for p in audio_paths],
+                "raw_audio_paths": list(audio_paths),
+                "generation_info": generation_info,
+                "status_message": status_message,
+                "seed_value": seed_value,
+                # Final prompt/lyrics (may be modified by thinking/format)
+                "prompt": caption or "",
+                "lyrics": lyrics or "",
+                # metas contains original user input + other metadata
+                "metas": metas_out,
+                "bpm": metas_out.get("bpm") if isinstance(metas_out.get("bpm"), int) else None,
+                "duration": metas_out.get("duration") if isinstance(metas_out.get("duration"), (int, float)) else None,
+                "genres": _none_if_na_str(metas_out.get("genres")),
+                "keyscale": _none_if_na_str(metas_out.get("keyscale")),
+                "timesignature": _none_if_na_str(metas_out.get("timesignature")),
+                "lm_model": lm_model_name,
+                "dit_model": dit_model_name,
+            }
+
+        async def _finish_generation(h: AceStepHandler, t0: float) -> None:
+            """Release cached device memory and record the generation duration."""
+            # Best-effort cache cleanup to reduce MPS memory fragmentation between jobs
+            try:
+                if hasattr(h, "_empty_cache"):
+                    h._empty_cache()
+                else:
+                    import torch
+                    if hasattr(torch, "mps") and hasattr(torch.mps, "empty_cache"):
+                        torch.mps.empty_cache()
+            except Exception:
+                pass
+            dt = max(0.0, time.time() - t0)
+            async with app.state.stats_lock:
+                app.state.recent_durations.append(dt)
+                if app.state.recent_durations:
+                    app.state.avg_job_seconds = sum(app.state.recent_durations) / len(app.state.recent_durations)
+
+        async def _run_one_job(job_id: str, req: GenerateMusicRequest) -> None:
+            job_store: _JobStore = app.state.job_store
+            llm: LLMHandler = app.state.llm_handler
+            executor: ThreadPoolExecutor = app.state.executor
+
+            await _ensure_initialized()
+            job_store.mark_running(job_id)
+            _update_local_cache_progress(job_id, 0.01, "running")
+
+            # Select DiT handler based on user's model choice
+            selected_handler, selected_model_name = _select_dit_handler(job_id, req)
+
             # Use selected handler for generation
             h: AceStepHandler = selected_handler
 
@@ -1553,23 +1879,9 @@ def create_app() -> FastAPI:
                             app.state._llm_init_error = status
                         else:
                             app.state._llm_initialized = True
-
-                def _normalize_metas(meta: Dict[str, Any]) -> Dict[str, Any]:
-                    """Ensure a stable `metas` dict (keys always present)."""
-                    meta = meta or {}
-                    out: Dict[str, Any] = dict(meta)
-
-                    # Normalize key aliases
-                    if "keyscale" not in out and "key_scale" in out:
-                        out["keyscale"] = out.get("key_scale")
-                    if "timesignature" not in out and "time_signature" in out:
-                        out["timesignature"] = out.get("time_signature")
-
-                    # Ensure required keys exist
-                    for k in ["bpm", "duration", "genres", "keyscale", "timesignature"]:
-                        if out.get(k) in (None, ""):
-                            out[k] = "N/A"
-                    return out
+                            _note_lm_loaded(
+                                app, lm_model_path, backend=backend, device=lm_device, offload_to_cpu=lm_offload,
+                            )
 
                 # Normalize LM sampling parameters
                 lm_top_k = req.lm_top_k if req.lm_top_k and req.lm_top_k > 0 else 0
@@ -1591,6 +1903,7 @@ def create_app() -> FastAPI:
                         try:
                             print("[API Server] unloading.")
                             llm.unload()
+                            app.state.lm_pool.note_unloaded()
                             app.state._llm_initialized = False
                             app.state._llm_init_error = None
                         except Exception as e:
@@ -1725,27 +2038,7 @@ def create_app() -> FastAPI:
 
                 # Auto-select instruction based on task_type if user didn't provide custom instruction
                 # This matches gradio behavior which uses TASK_INSTRUCTIONS for each task type
-                instruction_to_use = req.instruction
-                if instruction_to_use == DEFAULT_DIT_INSTRUCTION and req.task_type in TASK_INSTRUCTIONS:
-                    raw_instruction = TASK_INSTRUCTIONS[req.task_type]
-
-                    if req.task_type == "complete":
-                         #  Use track_classes joined by pipes
-                         if req.track_classes:
-                             # Join list items: ["Drums", "Bass"] -> "DRUMS | BASS"
-                             classes_str = " | ".join([str(t).upper() for t in req.track_classes])
-                             # Use the raw instruction template from constants
-                             # Format: "Complete the track with {TRACK_CLASSES}:"
-                             instruction_to_use = raw_instruction.format(TRACK_CLASSES=classes_str)
-                         else:
-                             # Fallback if no classes provided
-                             instruction_to_use = TASK_INSTRUCTIONS.get("complete_default", raw_instruction)
-
-                    elif "{TRACK_NAME}" in raw_instruction and req.track_name:
-                        # Logic for extract/lego
-                        instruction_to_use = raw_instruction.format(TRACK_NAME=req.track_name.upper())
-                    else:
-                        instruction_to_use = raw_instruction
+                instruction_to_use = _resolve_instruction(req)
 
                 # Build GenerationParams using unified interface
                 # Note: thinking controls LM code generation, sample_mode only affects CoT metas
@@ -1753,6 +2046,7 @@ def create_app() -> FastAPI:
                     task_type=req.task_type,
                     instruction=instruction_to_use,
                     reference_audio=req.reference_audio_path,
+                    reference_id=req.reference_id,
                     src_audio=req.src_audio_path,
                     audio_codes="",
                     caption=caption,
@@ -1797,22 +2091,7 @@ def create_app() -> FastAPI:
                 batch_size = req.batch_size if req.batch_size is not None else 2
 
                 # Resolve seed(s) from req.seed into List[int] for GenerationConfig.seeds
-                resolved_seeds = None
-                if not req.use_random_seed and req.seed is not None:
-                    if isinstance(req.seed, int):
-                        if req.seed >= 0:
-                            resolved_seeds = [req.seed]
-                    elif isinstance(req.seed, str):
-                        resolved_seeds = []
-                        for s in req.seed.split(","):
-                            s = s.strip()
-                            if s and s != "-1":
-                                try:
-                                    resolved_seeds.append(int(float(s)))
-                                except (ValueError, TypeError):
-                                    pass
-                        if not resolved_seeds:
-                            resolved_seeds = None
+                resolved_seeds = _resolve_request_seeds(req)
 
                 config = GenerationConfig(
                     batch_size=batch_size,
@@ -1823,6 +2102,17 @@ def create_app() -> FastAPI:
                     constrained_decoding_debug=req.constrained_decoding_debug,
                 )
 
+                # Multi-track lego/extract: every track shares the source (its
+                # VAE latents are encoded once) and runs in one DiT batch with
+                # per-item instructions and captions.  The LM only handles a
+                # single caption, so it is skipped.
+                track_names_batch: List[str] = []
+                if req.track_names:
+                    track_names_batch, params.instruction, params.caption = _resolve_track_batch(req, caption, batch_size)
+                    config.batch_size = len(track_names_batch)
+                    params.thinking = False
+                    params.use_cot_metas = params.use_cot_caption = params.use_cot_language = False
+
                 # Check LLM initialization status
                 llm_is_initialized = getattr(app.state, "_llm_initialized", False)
                 llm_to_pass = llm if llm_is_initialized else None
@@ -1958,7 +2248,7 @@ def create_app() -> FastAPI:
                     else:
                         progress_cb = _progress_cb
 
-                    result = generate_music(
+                    result = app.state.generate_music(
                         dit_handler=h,
                         llm_handler=llm_to_pass,
                         params=params,
@@ -1982,11 +2272,6 @@ def create_app() -> FastAPI:
                 if not result.success:
                     raise RuntimeError(f"Music generation failed: {result.error or result.status_message}")
 
-                # Extract results
-                audio_paths = [audio["path"] for audio in result.audios if audio.get("path")]
-                first_audio = audio_paths[0] if len(audio_paths) > 0 else None
-                second_audio = audio_paths[1] if len(audio_paths) > 1 else None
-
                 # Get metadata from LM or CoT results
                 lm_metadata = result.extra_outputs.get("lm_metadata", {})
                 metas_out = _normalize_metas(lm_metadata)
@@ -2016,64 +2301,42 @@ def create_app() -> FastAPI:
                 metas_out["prompt"] = original_prompt
                 metas_out["lyrics"] = original_lyrics
 
-                # Extract seed values for response (comma-separated for multiple audios)
-                seed_values = []
-                for audio in result.audios:
-                    audio_params = audio.get("params", {})
-                    seed = audio_params.get("seed")
-                    if seed is not None:
-                        seed_values.append(str(seed))
-                seed_value = ",".join(seed_values) if seed_values else ""
-
-                # Build generation_info using the helper function (like gradio_ui)
-                time_costs = result.extra_outputs.get("time_costs", {})
-                generation_info = _build_generation_info(
-                    lm_metadata=lm_metadata,
-                    time_costs=time_costs,
-                    seed_value=seed_value,
+                # Keep the exact latents for /v1/convert_to_codes (sequential
+                # MPS runs only report the first run's latents, so skip those)
+                pred_latents = result.extra_outputs.get("pred_latents")
+                if pred_latents is not None and pred_latents.shape[0] == len(result.audios):
+                    app.state.retained_latents.put(job_id, pred_latents, selected_model_name)
+
+                # Use selected_model_name (set at the beginning of _run_one_job)
+                job_result = _build_job_result(
+                    audios=result.audios,
+                    extra_outputs=result.extra_outputs,
+                    status_message=result.status_message,
+                    metas_out=metas_out,
+                    caption=caption,
+                    lyrics=lyrics,
                     inference_steps=req.inference_steps,
-                    num_audios=len(result.audios),
+                    dit_model_name=selected_model_name,
                 )
+                if track_names_batch:
+                    # Track of each audio, in output order (a VRAM-reduced batch keeps the leading items)
+                    job_result["track_names"] = track_names_batch[:len(result.audios)]
+                return job_result
 
-                def _none_if_na_str(v: Any) -> Optional[str]:
-                    if v is None:
-                        return None
-                    s = str(v).strip()
-                    if s in {"", "N/A"}:
-                        return None
-                    return s
+            job_lm = job_lm_model(req)
 
-                # Get model information
-                lm_model_name = os.getenv("ACESTEP_LM_MODEL_PATH", "acestep-5Hz-lm-0.6B")
-                # Use selected_model_name (set at the beginning of _run_one_job)
-                dit_model_name = selected_model_name
-
-                return {
-                    "first_audio_path": _path_to_audio_url(first_audio) if first_audio else None,
-                    "second_audio_path": _path_to_audio_url(second_audio) if second_audio else None,
-                    "audio_paths": [_path_to_audio_url(p) for p in audio_paths],
-                    "raw_audio_paths": list(audio_paths),
-                    "generation_info": generation_info,
-                    "status_message": result.status_message,
-                    "seed_value": seed_value,
-                    # Final prompt/lyrics (may be modified by thinking/format)
-                    "prompt": caption or "",
-                    "lyrics": lyrics or "",
-                    # metas contains original user input + other metadata
-                    "metas": metas_out,
-                    "bpm": metas_out.get("bpm") if isinstance(metas_out.get("bpm"), int) else None,
-                    "duration": metas_out.get("duration") if isinstance(metas_out.get("duration"), (int, float)) else None,
-                    "genres": _none_if_na_str(metas_out.get("genres")),
-                    "keyscale": _none_if_na_str(metas_out.get("keyscale")),
-                    "timesignature": _none_if_na_str(metas_out.get("timesignature")),
-                    "lm_model": lm_model_name,
-                    "dit_model": dit_model_name,
-                }
+            def _generate_on_lm() -> Dict[str, Any]:
+                """Run the job holding the LM pool on the model it names."""
+                _apply_request_lora(h, req)
+                if job_lm is None:
+                    return _blocking_generate()
+                with _lm_lease(app, job_lm):
+                    return _blocking_generate()
 
             t0 = time.time()
             try:
                 loop = asyncio.get_running_loop()
-                result = await loop.run_in_executor(executor, _blocking_generate)
+                result = await loop.run_in_executor(executor, _generate_on_lm)
                 job_store.mark_succeeded(job_id, result)
 
                 # Update local cache
@@ -2087,57 +2350,259 @@ def create_app() -> FastAPI:
                 # Update local cache
                 _update_local_cache(job_id, None, "failed")
             finally:
-                # Best-effort cache cleanup to reduce MPS memory fragmentation between jobs
-                try:
-                    if hasattr(h, "_empty_cache"):
-                        h._empty_cache()
-                    else:
-                        import torch
-                        if hasattr(torch, "mps") and hasattr(torch.mps, "empty_cache"):
-                            torch.mps.empty_cache()
-                except Exception:
-                    pass
-                dt = max(0.0, time.time() - t0)
-                async with app.state.stats_lock:
-                    app.state.recent_durations.append(dt)
-                    if app.state.recent_durations:
-                        app.state.avg_job_seconds = sum(app.state.recent_durations) / len(app.state.recent_durations)
+                await _finish_generation(h, t0)
+
+        async def _run_coalesced_jobs(group: List[Tuple[str, GenerateMusicRequest]]) -> None:
+            """
+            Run compatible jobs as one DiT batch and split the audios back per job.
+
+            Jobs are grouped by ``coalesce_key`` so they only differ in per-item
+            inputs (caption, lyrics, metadata, seeds).  A job whose audios are
+            missing from the batch output (e.g. the VRAM guard shrank the batch)
+            is rerun on its own.
+            """
+            job_store: _JobStore = app.state.job_store
+            executor: ThreadPoolExecutor = app.state.executor
+
+            await _ensure_initialized()
+            job_ids = [job_id for job_id, _ in group]
+            for job_id in job_ids:
+                job_store.mark_running(job_id)
+                _update_local_cache_progress(job_id, 0.01, "running")
+
+            first_id, first_req = group[0]
+            h, selected_model_name = _select_dit_handler(first_id, first_req)
+            counts = [request_batch_size(req) for _, req in group]
+            print(f"[API Server] Coalescing {len(group)} jobs into one DiT batch of {sum(counts)}: {job_ids}")
+
+            def _blocking_generate_group() -> Dict[str, Dict[str, Any]]:
+                _apply_request_lora(h, first_req)
+                captions: List[str] = []
+                lyrics: List[str] = []
+                vocal_languages: List[str] = []
+                bpms: List[Optional[int]] = []
+                key_scales: List[str] = []
+                time_signatures: List[str] = []
+                seeds: List[int] = []
+                for (_, req), count in zip(group, counts):
+                    resolved_seeds = _resolve_request_seeds(req)
+                    seed_str = ",".join(str(s) for s in resolved_seeds) if resolved_seeds else "-1"
+                    job_seeds, _ = h.prepare_seeds(count, seed_str, req.use_random_seed)
+                    seeds.extend(job_seeds)
+                    captions.extend([req.prompt] * count)
+                    lyrics.extend([req.lyrics] * count)
+                    vocal_languages.extend([req.vocal_language] * count)
+                    bpms.extend([req.bpm] * count)
+                    key_scales.extend([req.key_scale] * count)
+                    time_signatures.extend([req.time_signature] * count)
+
+                # Per-item lists go straight to the DiT; the LM is skipped
+                # (coalesce_key only admits jobs it would not change).
+                params = GenerationParams(
+                    task_type=first_req.task_type,
+                    instruction=_resolve_instruction(first_req),
+                    caption=captions,
+                    lyrics=lyrics,
+                    instrumental=all(_is_instrumental(text) for text in lyrics),
+                    vocal_language=vocal_languages,
+                    bpm=bpms,
+                    keyscale=key_scales,
+                    timesignature=time_signatures,
+                    duration=first_req.audio_duration,
+                    inference_steps=first_req.inference_steps,
+                    guidance_scale=first_req.guidance_scale,
+                    use_adg=first_req.use_adg,
+                    cfg_interval_start=first_req.cfg_interval_start,
+                    cfg_interval_end=first_req.cfg_interval_end,
+                    shift=first_req.shift,
+                    infer_method=first_req.infer_method,
+                    timesteps=_parse_timesteps(first_req.timesteps),
+                    thinking=False,
+                    use_cot_metas=False,
+                    use_cot_caption=False,
+                    use_cot_language=False,
+                )
+                config = GenerationConfig(
+                    batch_size=len(seeds),
+                    use_random_seed=False,
+                    seeds=seeds,
+                    audio_format=first_req.audio_format,
+                )
+
+                last_progress = {"value": -1.0, "time": 0.0, "stage": ""}
+
+                def _progress_cb(value: float, desc: str = "") -> None:
+                    now = time.time()
+                    try:
+                        value_f = max(0.0, min(1.0, float(value)))
+                    except Exception:
+                        value_f = 0.0
+                    stage = desc or last_progress["stage"] or "running"
+                    if (
+                        value_f - last_progress["value"] >= 0.01
+                        or stage != last_progress["stage"]
+                        or (now - last_progress["time"]) >= 0.5
+                    ):
+                        last_progress["value"] = value_f
+                        last_progress["time"] = now
+                        last_progress["stage"] = stage
+                        for job_id in job_ids:
+                            job_store.update_progress(job_id, value_f, stage=stage)
+                            _update_local_cache_progress(job_id, value_f, stage)
+
+                result = app.state.generate_music(
+                    dit_handler=h,
+                    llm_handler=None,
+                    params=params,
+                    config=config,
+                    save_dir=app.state.temp_audio_dir,
+                    progress=_progress_cb,
+                )
+                if not result.success:
+                    raise RuntimeError(f"Music generation failed: {result.error or result.status_message}")
+
+                job_results: Dict[str, Dict[str, Any]] = {}
+                pred_latents = result.extra_outputs.get("pred_latents")
+                if pred_latents is not None and pred_latents.shape[0] != len(result.audios):
+                    pred_latents = None
+                offset = 0
+                for (job_id, req), count, audios in zip(group, counts, split_by_counts(result.audios, counts)):
+                    job_offset, offset = offset, offset + count
+                    if len(audios) < count:
+                        continue
+                    if pred_latents is not None:
+                        app.state.retained_latents.put(
+                            job_id, pred_latents[job_offset:job_offset + count], selected_model_name
+                        )
+                    metas_out = _normalize_metas({
+                        "bpm": req.bpm,
+                        "duration": req.audio_duration,
+                        "keyscale": req.key_scale,
+                        "timesignature": req.time_signature,
+                    })
+                    metas_out["prompt"] = req.prompt or ""
+                    metas_out["lyrics"] = req.lyrics or ""
+                    job_results[job_id] = _build_job_result(
+                        audios=audios,
+                        extra_outputs=result.extra_outputs,
+                        status_message=result.status_message,
+                        metas_out=metas_out,
+                        caption=req.prompt,
+                        lyrics=req.lyrics,
+                        inference_steps=req.inference_steps,
+                        dit_model_name=selected_model_name,
+                    )
+                return job_results
+
+            t0 = time.time()
+            job_results: Dict[str, Dict[str, Any]] = {}
+            try:
+                loop = asyncio.get_running_loop()
+                job_results = await loop.run_in_executor(executor, _blocking_generate_group)
+            except Exception as e:
+                error_traceback = traceback.format_exc()
+                print(f"[API Server] Coalesced jobs {job_ids} FAILED: {e}")
+                print(f"[API Server] Traceback:\n{error_traceback}")
+                for job_id in job_ids:
+                    job_store.mark_failed(job_id, error_traceback)
+                    _update_local_cache(job_id, None, "failed")
+                return
+            finally:
+                await _finish_generation(h, t0)
+
+            for job_id, req in group:
+                if job_id in job_results:
+                    job_store.mark_succeeded(job_id, job_results[job_id])
+                    _update_local_cache(job_id, job_results[job_id], "succeeded")
+                else:
+                    print(f"[API Server] Job {job_id}: missing from coalesced batch output, running alone")
+                    await _run_one_job(job_id, req)
+
+        async def _run_pool_jobs(group: List[Tuple[str, GenerateMusicRequest]]) -> None:
+            """
+            Run a job group on a pool worker and copy the outcomes into the store.
+
+            The worker runs the group through its own queue, so compatible jobs
+            are still coalesced there; audio files land in the shared temp dir.
+            """
+            job_store: _JobStore = app.state.job_store
+            job_ids = [job_id for job_id, _ in group]
+            for job_id in job_ids:
+                job_store.mark_running(job_id)
+                _update_local_cache_progress(job_id, 0.01, "running")
+
+            def _on_progress(job_id: str, value: float, stage: str) -> None:
+                job_store.update_progress(job_id, value, stage=stage)
+                _update_local_cache_progress(job_id, value, stage)
+
+            t0 = time.time()
+            try:
+                outcomes = await app.state.worker_pool.run(
+                    [(job_id, req.model_dump()) for job_id, req in group],
+                    affinity=job_affinity(group[0][1]),
+                    on_progress=_on_progress,
+                )
+            finally:
+                await _finish_generation(app.state.handler, t0)
+
+            for job_id in job_ids:
+                kind, data = outcomes[job_id]
+                if kind == "result":
+                    job_store.mark_succeeded(job_id, data)
+                    _update_local_cache(job_id, data, "succeeded")
+                else:
+                    print(f"[API Server] Job {job_id} FAILED on pool worker:\n{data}")
+                    job_store.mark_failed(job_id, data)
+                    _update_local_cache(job_id, None, "failed")
+
+        async def _notify_job_waiters(rec: Optional[_JobRecord], error: Optional[str] = None) -> None:
+            """Notify OpenRouter waiters that a job finished (or failed with ``error``)."""
+            if not rec:
+                return
+            if rec.progress_queue:
+                if error is not None:
+                    await rec.progress_queue.put({"type": "error", "content": error})
+                elif rec.status == "succeeded" and rec.result:
+                    await rec.progress_queue.put({"type": "result", "result": rec.result})
+                elif rec.status == "failed":
+                    await rec.progress_queue.put({"type": "error", "content": rec.error or "Generation failed"})
+                await rec.progress_queue.put({"type": "done"})
+            if rec.done_event:
+                rec.done_event.set()
 
         async def _queue_worker(worker_idx: int) -> None:
+            coalescer: JobCoalescer = app.state.coalescer
             while True:
-                job_id, req = await app.state.job_queue.get()
-                rec = store.get(job_id)
+                group = await coalescer.next_group()
+                job_ids = [job_id for job_id, _ in group]
+                recs = [store.get(job_id) for job_id in job_ids]
+                app.state.job_queue.begin(job_ids)
                 try:
-                    async with app.state.pending_lock:
-                        try:
-                            app.state.pending_ids.remove(job_id)
-                        except ValueError:
-                            pass
+                    now = time.time()
+                    coalescer.stats.record_group([now - rec.created_at if rec else 0.0 for rec in recs])
 
-                    await _run_one_job(job_id, req)
+                    if worker_pool is not None:
+                        await _run_pool_jobs(group)
+                    elif len(group) == 1:
+                        await _run_one_job(*group[0])
+                    else:
+                        await _run_coalesced_jobs(group)
 
                     # Notify OpenRouter waiters after job completion
-                    if rec and rec.progress_queue:
-                        if rec.status == "succeeded" and rec.result:
-                            await rec.progress_queue.put({"type": "result", "result": rec.result})
-                        elif rec.status == "failed":
-                            await rec.progress_queue.put({"type": "error", "content": rec.error or "Generation failed"})
-                        await rec.progress_queue.put({"type": "done"})
-                    if rec and rec.done_event:
-                        rec.done_event.set()
+                    for rec in recs:
+                        await _notify_job_waiters(rec)
 
                 except Exception as exc:
                     # _run_one_job raised (e.g. _ensure_initialized failed)
-                    if rec and rec.status not in ("succeeded", "failed"):
-                        store.mark_failed(job_id, str(exc))
-                    if rec and rec.progress_queue:
-                        await rec.progress_queue.put({"type": "error", "content": str(exc)})
-                        await rec.progress_queue.put({"type": "done"})
-                    if rec and rec.done_event:
-                        rec.done_event.set()
+                    for job_id, rec in zip(job_ids, recs):
+                        if rec and rec.status not in ("succeeded", "failed"):
+                            store.mark_failed(job_id, str(exc))
+                        await _notify_job_waiters(rec, error=str(exc))
                 finally:
-                    await _cleanup_job_temp_files(job_id)
-                    app.state.job_queue.task_done()
+                    app.state.job_queue.end(job_ids)
+                    for job_id in job_ids:
+                        await _cleanup_job_temp_files(job_id)
+                        app.state.job_queue.task_done()
 
         async def _job_store_cleanup_worker() -> None:
             """Background task to periodically clean up old completed jobs."""
@@ -2145,6 +2610,8 @@ def create_app() -> FastAPI:
                 try:
                     await asyncio.sleep(JOB_STORE_CLEANUP_INTERVAL)
                     removed = store.cleanup_old_jobs()
+                    if journal is not None:
+                        journal.prune(JOB_STORE_MAX_AGE_SECONDS)
                     if removed > 0:
                         stats = store.get_stats()
                         print(f"[API Server] Cleaned up {removed} old jobs. Current stats: {stats}")
@@ -2153,7 +2620,56 @@ def create_app() -> FastAPI:
                 except Exception as e:
                     print(f"[API Server] Job cleanup error: {e}")
 
-        worker_count = max(1, WORKER_COUNT)
+        def _recover_journaled_jobs() -> None:
+            """Serve finished journaled jobs again and requeue unfinished ones in acceptance order."""
+            restored = requeued = abandoned = 0
+            for job in journal.load():
+                rec = store.create_with_id(job.job_id, env=job.env)
+                rec.created_at = job.created_at
+                if job.status == "succeeded":
+                    store.mark_succeeded(job.job_id, job.result or {})
+                    rec.finished_at = job.finished_at
+                    restored += 1
+                    continue
+                if job.status == "failed":
+                    store.mark_failed(job.job_id, job.error or "Generation failed")
+                    rec.finished_at = job.finished_at
+                    restored += 1
+                    continue
+
+                error = None
+                missing = [p for p in job.temp_files if not os.path.exists(p)]
+                if job.attempts >= journal_config.max_attempts:
+                    error = f"Job was interrupted by {job.attempts} server restarts while running; not retried"
+                elif missing:
+                    error = f"Uploaded input lost across a server restart: {missing[0]}"
+                else:
+                    try:
+                        app.state.job_queue.put_nowait((job.job_id, GenerateMusicRequest(**job.request)))
+                    except Exception as exc:
+                        error = f"Could not requeue job after a server restart: {exc}"
+                if error is not None:
+                    store.mark_failed(job.job_id, error)
+                    journal.record(job.job_id, "failed", error)
+                    _update_local_cache(job.job_id, None, "failed")
+                    abandoned += 1
+                    continue
+                if job.temp_files:
+                    app.state.job_temp_files[job.job_id] = list(job.temp_files)
+                requeued += 1
+            app.state.journal_recovery = {"restored": restored, "requeued": requeued, "abandoned": abandoned}
+            if restored or requeued or abandoned:
+                print(
+                    f"[API Server] Job journal: requeued {requeued} unfinished jobs, "
+                    f"restored {restored} finished, abandoned {abandoned}"
+                )
+
+        app.state.journal_recovery = None
+        if journal is not None:
+            _recover_journaled_jobs()
+            store.journal = journal
+
+        worker_count = len(worker_pool) if worker_pool is not None else max(1, WORKER_COUNT)
         workers = [asyncio.create_task(_queue_worker(i)) for i in range(worker_count)]
         cleanup_task = asyncio.create_task(_job_store_cleanup_worker())
         app.state.worker_tasks = workers
@@ -2188,10 +2704,31 @@ def create_app() -> FastAPI:
         print(f"  Available LM Models: {gpu_config.available_lm_models or 'None'}")
         print(f"{'='*60}\n")
 
-        if no_init:
+        if worker_pool is not None:
+            print(f"[API Server] Starting {len(worker_pool)} GPU worker processes; models load in the workers")
+            await worker_pool.start()
+            app.state._initialized = True
+            app.state._initialized2 = bool(config_path2)
+            app.state._initialized3 = bool(config_path3)
+        elif no_init:
             print("[API Server] --no-init mode: Skipping all model loading at startup")
             print("[API Server] Models will be lazy-loaded on first request")
             print("[API Server] Server is ready to accept requests (models not loaded yet)")
+        elif fake_backend is not None:
+            print(f"[API Server] Fake backend enabled ({fake_backend.latency.describe()}); no models are loaded")
+            handler.initialize_service(config_path=app.state._config_path)
+            app.state._initialized = True
+            if handler2:
+                app.state._initialized2 = handler2.initialize_service(config_path=config_path2)[1]
+            if handler3:
+                app.state._initialized3 = handler3.initialize_service(config_path=config_path3)[1]
+            if _env_bool("ACESTEP_INIT_LLM", True):
+                lm_model_path = os.getenv("ACESTEP_LM_MODEL_PATH", "acestep-5Hz-lm-0.6B").strip()
+                _, llm_ok = llm_handler.initialize(lm_model_path=lm_model_path, backend="fake")
+                app.state._llm_initialized = llm_ok
+                _note_lm_loaded(app, lm_model_path, backend="fake")
+            else:
+                app.state._llm_lazy_load_disabled = True
         else:
             print("[API Server] Initializing models at startup...")
 
@@ -2403,6 +2940,9 @@ def create_app() -> FastAPI:
                 )
                 if llm_ok:
                     app.state._llm_initialized = True
+                    _note_lm_loaded(
+                        app, lm_model_path, backend=lm_backend, device=lm_device, offload_to_cpu=lm_offload,
+                    )
                     print(f"[API Server] LLM model loaded: {lm_model_path}")
                 else:
                     app.state._llm_init_error = llm_status
@@ -2424,7 +2964,12 @@ def create_app() -> FastAPI:
             cleanup_task.cancel()
             for t in workers:
                 t.cancel()
+            if worker_pool is not None:
+                await worker_pool.stop()
             executor.shutdown(wait=False, cancel_futures=True)
+            if journal is not None:
+                store.journal = None
+                journal.close()
 
     app = FastAPI(title="ACE-Step API", version="1.0", lifespan=lifespan)
 
@@ -2435,7 +2980,7 @@ def create_app() -> FastAPI:
         allow_origins=["null", "http://localhost", "http://127.0.0.1"],
         allow_origin_regex=r"^https?://(localhost|127\.0\.0\.1)(:\d+)?$",
         allow_methods=["GET", "POST", "OPTIONS"],
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", "X-Client-Id"],
     )
 
     # Mount OpenRouter-compatible endpoints (/v1/chat/completions, /v1/models)
@@ -2443,19 +2988,29 @@ def create_app() -> FastAPI:
     openrouter_router = create_openrouter_router(lambda: app.state)
     app.include_router(openrouter_router)
 
-    async def _queue_position(job_id: str) -> int:
-        async with app.state.pending_lock:
-            try:
-                return list(app.state.pending_ids).index(job_id) + 1
-            except ValueError:
-                return 0
-
-    async def _eta_seconds_for_position(pos: int) -> Optional[float]:
+    def _queue_status(job_id: str) -> Dict[str, Any]:
+        """Return ``queue_position`` and ``eta_seconds`` of a waiting job (empty once it runs)."""
+        scheduler: JobScheduler = app.state.job_queue
+        pos = scheduler.position(job_id)
         if pos <= 0:
+            return {}
+        eta = scheduler.eta_seconds(job_id)
+        return {"queue_position": pos, "eta_seconds": round(eta, 1) if eta is not None else None}
+
+    def _vram_admission_error(req: GenerateMusicRequest) -> Optional[str]:
+        """Return an error message if ``req`` cannot fit in VRAM per the calibrated profile."""
+        gpu_config = getattr(app.state, "gpu_config", None)
+        if gpu_config is None or not req.audio_duration:
             return None
-        async with app.state.stats_lock:
-            avg = float(getattr(app.state, "avg_job_seconds", INITIAL_AVG_JOB_SECONDS))
-        return pos * avg
+        model_name = req.model or _get_model_name(getattr(app.state, "_config_path", ""))
+        lm_model_name = None
+        if getattr(app.state, "_llm_initialized", False):
+            lm_model_name = req.lm_model_path or os.getenv("ACESTEP_LM_MODEL_PATH", "acestep-5Hz-lm-0.6B")
+        batch_size = request_batch_size(req)
+        ok, message = check_vram_admission(
+            batch_size, float(req.audio_duration), gpu_config, model_name, lm_model_name
+        )
+        return None if ok else message
 
     @app.post("/release_task")
     async def create_music_generate_job(request: Request, authorization: Optional[str] = Header(None)):
@@ -2473,6 +3028,14 @@ def create_app() -> FastAPI:
             if t_classes is not None and isinstance(t_classes, str):
                 t_classes = [t_classes]
 
+            # A single form value may list several tracks: "vocals,drums"
+            t_names = p.get("track_names")
+            if isinstance(t_names, str):
+                t_names = [name.strip() for name in t_names.split(",") if name.strip()]
+            t_captions = p.get("track_captions")
+            if isinstance(t_captions, str):
+                t_captions = [t_captions]
+
             return GenerateMusicRequest(
                 prompt=p.str("prompt"),
                 lyrics=p.str("lyrics"),
@@ -2483,6 +3046,7 @@ def create_app() -> FastAPI:
                 sample_query=p.str("sample_query"),
                 use_format=p.bool("use_format"),
                 model=p.str("model") or None,
+                lora_path=p.str("lora_path") or None,
                 bpm=p.int("bpm"),
                 key_scale=p.str("key_scale"),
                 time_signature=p.str("time_signature"),
@@ -2498,6 +3062,7 @@ def create_app() -> FastAPI:
                 instruction=p.str("instruction", DEFAULT_DIT_INSTRUCTION),
                 audio_cover_strength=p.float("audio_cover_strength", 1.0),
                 reference_audio_path=ref_audio,
+                reference_id=p.str("reference_id") or None,
                 src_audio_path=src_audio,
                 task_type=p.str("task_type", "text2music"),
                 use_adg=p.bool("use_adg"),
@@ -2523,6 +3088,10 @@ def create_app() -> FastAPI:
                 allow_lm_batch=p.bool("allow_lm_batch", True),
                 track_name=p.str("track_name"),
                 track_classes=t_classes,
+                track_names=t_names or None,
+                track_captions=t_captions,
+                priority=p.str("priority", "normal").strip().lower() or "normal",
+                client_id=p.str("client_id") or None,
                 **kwargs,
             )
 
@@ -2649,9 +3218,43 @@ def create_app() -> FastAPI:
                     ),
                 )
 
+        admission_error = _vram_admission_error(req)
+        if not admission_error and req.reference_id and req.reference_id not in app.state.reference_library:
+            admission_error = f"Unknown reference_id '{req.reference_id}'"
+        if admission_error:
+            for p in temp_files:
+                try:
+                    os.remove(p)
+                except Exception:
+                    pass
+            raise HTTPException(status_code=400, detail=admission_error)
+
+        if req.priority not in PRIORITY_CLASSES:
+            for p in temp_files:
+                try:
+                    os.remove(p)
+                except Exception:
+                    pass
+            raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(PRIORITY_CLASSES)}")
+        req.priority = admit_priority(
+            req.priority,
+            request.client.host if request.client else None,
+            authenticated=_api_key is not None,
+            config=app.state.job_queue.config,
+        )
+        if req.track_names and req.task_type not in ("lego", "extract"):
+            for p in temp_files:
+                try:
+                    os.remove(p)
+                except Exception:
+                    pass
+            raise HTTPException(status_code=400, detail="track_names is only supported for task_type 'lego' or 'extract'")
+        if not req.client_id:
+            req.client_id = request.headers.get("x-client-id") or (request.client.host if request.client else None)
+
         rec = store.create()
 
-        q: asyncio.Queue = app.state.job_queue
+        q: JobScheduler = app.state.job_queue
         if q.full():
             for p in temp_files:
                 try:
@@ -2664,12 +3267,14 @@ def create_app() -> FastAPI:
             async with app.state.job_temp_files_lock:
                 app.state.job_temp_files[rec.job_id] = temp_files
 
-        async with app.state.pending_lock:
-            app.state.pending_ids.append(rec.job_id)
-            position = len(app.state.pending_ids)
+        if store.journal is not None:
+            try:
+                store.journal.add(rec.job_id, req.model_dump(), temp_files, created_at=rec.created_at, env=rec.env)
+            except Exception as exc:
+                print(f"[API Server] Warning: job {rec.job_id} not journaled: {exc}")
 
         await q.put((rec.job_id, req))
-        return _wrap_response({"task_id": rec.job_id, "status": "queued", "queue_position": position})
+        return _wrap_response({"task_id": rec.job_id, "status": "queued", **_queue_status(rec.job_id)})
 
     @app.post("/query_result")
     async def query_result(request: Request, authorization: Optional[str] = Header(None)):
@@ -2722,7 +3327,8 @@ def create_app() -> FastAPI:
                                 "task_id": task_id,
                                 "result": data,
                                 "status": int(status) if status is not None else 1,
-                                "progress_text": log_buffer.last_message
+                                "progress_text": log_buffer.last_message,
+                                **(_queue_status(task_id) if status == 0 else {}),
                             })
                     continue
 
@@ -2740,6 +3346,7 @@ def create_app() -> FastAPI:
                     else:
                         audio_paths = rec.result.get("audio_paths", [])
                         metas = rec.result.get("metas", {}) or {}
+                        track_names = rec.result.get("track_names") or []
                         result_data = [
                             {
                                 "file": p, "wave": "", "status": status_int,
@@ -2752,9 +3359,10 @@ def create_app() -> FastAPI:
                                     "genres": metas.get("genres", ""),
                                     "keyscale": metas.get("keyscale", ""),
                                     "timesignature": metas.get("timesignature", ""),
-                                }
+                                },
+                                **({"track_name": track_names[i]} if i < len(track_names) else {}),
                             }
-                            for p in audio_paths
+                            for i, p in enumerate(audio_paths)
                         ] if audio_paths else [{
                             "file": "", "wave": "", "status": status_int,
                             "create_time": int(create_time), "env": env,
@@ -2784,7 +3392,8 @@ def create_app() -> FastAPI:
                     "task_id": task_id,
                     "result": json.dumps(result_data, ensure_ascii=False),
                     "status": status_int,
-                    "progress_text": current_log
+                    "progress_text": current_log,
+                    **(_queue_status(task_id) if status_int == 0 else {}),
                 })
             else:
                 data_list.append({"task_id": task_id, "result": "[]", "status": 0})
@@ -2808,9 +3417,17 @@ def create_app() -> FastAPI:
             avg_job_seconds = getattr(app.state, "avg_job_seconds", INITIAL_AVG_JOB_SECONDS)
         return _wrap_response({
             "jobs": job_stats,
-            "queue_size": app.state.job_queue.qsize(),
+            "queue_size": app.state.coalescer.pending_count(),
             "queue_maxsize": QUEUE_MAXSIZE,
             "avg_job_seconds": avg_job_seconds,
+            "coalescing": app.state.coalescer.stats.snapshot(),
+            "scheduler": app.state.job_queue.snapshot(),
+            "lm_pool": app.state.lm_pool.snapshot(),
+            "worker_pool": app.state.worker_pool.snapshot() if app.state.worker_pool is not None else None,
+            "journal": (
+                {**app.state.job_journal.snapshot(), "recovered": app.state.journal_recovery}
+                if app.state.job_journal is not None else None
+            ),
         })
 
     @app.get("/v1/models")
@@ -2850,6 +3467,23 @@ def create_app() -> FastAPI:
             "default_model": models[0]["name"] if models else None,
         })
 
+    def _reject_in_pool_mode(detail: str) -> None:
+        """Refuse endpoints that would use this process's models when jobs run in pool workers.
+
+        In worker-pool mode the server process never loads its handlers; the
+        models, retained latents and adapters live in the workers.
+        """
+        if app.state.worker_pool is not None:
+            raise HTTPException(status_code=409, detail=f"{detail} is not available in worker-pool mode")
+
+    def _reject_lora_in_pool_mode() -> None:
+        """Server-wide adapters cannot be set when jobs run in pool workers."""
+        if app.state.worker_pool is not None:
+            raise HTTPException(
+                status_code=409,
+                detail="LoRA adapters are loaded per job in worker-pool mode; pass lora_path with the request",
+            )
+
     @app.post("/create_random_sample")
     async def create_random_sample_endpoint(request: Request, authorization: Optional[str] = Header(None)):
         """
@@ -2896,6 +3530,7 @@ def create_app() -> FastAPI:
             body = {k: v for k, v in form.items()}
 
         verify_token_from_request(body, authorization)
+        _reject_in_pool_mode("/format_input")
         llm: LLMHandler = app.state.llm_handler
 
         # Initialize LLM if needed
@@ -2940,6 +3575,7 @@ def create_app() -> FastAPI:
                     app.state._llm_init_error = status
                     raise HTTPException(status_code=500, detail=f"LLM init failed: {status}")
                 app.state._llm_initialized = True
+                _note_lm_loaded(app, lm_model_path, backend=backend, device=lm_device, offload_to_cpu=lm_offload)
 
         # Parse parameters
         prompt = body.get("prompt", "") or ""
@@ -3011,15 +3647,142 @@ def create_app() -> FastAPI:
         except Exception as e:
             return _wrap_response(None, code=500, error=f"format_sample error: {str(e)}")
 
+    @app.post("/v1/convert_to_codes")
+    async def convert_to_codes_endpoint(request: ConvertToCodesRequest, _: None = Depends(verify_api_key)):
+        """Convert one audio of a finished job into 5Hz LM audio codes.
+
+        Uses the job's retained DiT latents when still available and falls back
+        to VAE-encoding the saved audio file otherwise.
+        """
+        _reject_in_pool_mode("/v1/convert_to_codes")
+        rec = app.state.job_store.get(request.task_id)
+        if rec is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if rec.status != "succeeded" or not rec.result:
+            raise HTTPException(status_code=409, detail=f"Job is {rec.status}, not succeeded")
+
+        handlers = {_get_model_name(app.state._config_path): app.state.handler}
+        if app.state.handler2 and getattr(app.state, "_initialized2", False):
+            handlers[_get_model_name(app.state._config_path2)] = app.state.handler2
+        if app.state.handler3 and getattr(app.state, "_initialized3", False):
+            handlers[_get_model_name(app.state._config_path3)] = app.state.handler3
+
+        pred_latents = None
+        handler: AceStepHandler = handlers.get(rec.result.get("dit_model")) or app.state.handler
+        retained = app.state.retained_latents.get(request.task_id)
+        if retained is not None and retained.model_name in handlers:
+            handler = handlers[retained.model_name]
+            pred_latents = retained.sample(request.index)
+
+        audio_file = None
+        if pred_latents is None:
+            raw_paths = rec.result.get("raw_audio_paths") or []
+            if request.index >= len(raw_paths):
+                raise HTTPException(status_code=404, detail=f"Job has no audio at index {request.index}")
+            audio_file = raw_paths[request.index]
+            if not os.path.exists(audio_file):
+                raise HTTPException(status_code=410, detail="Audio file is no longer available")
+
+        if handler is None or handler.model is None:
+            raise HTTPException(status_code=500, detail="Model not initialized")
+
+        loop = asyncio.get_running_loop()
+        codes = await loop.run_in_executor(
+            app.state.executor,
+            lambda: handler.convert_result_to_codes(pred_latents=pred_latents, audio_file=audio_file),
+        )
+        if not codes or codes.startswith("❌"):
+            raise HTTPException(status_code=500, detail=codes or "Failed to convert audio to codes")
+        return _wrap_response({
+            "task_id": request.task_id,
+            "index": request.index,
+            "codes": codes,
+            "source": "latents" if pred_latents is not None else "audio_file",
+        })
+
+    @app.post("/v1/references")
+    async def register_reference_endpoint(request: Request, _: None = Depends(verify_api_key)):
+        """Register a reference-timbre clip in the reference library.
+
+        Accepts multipart form data with an ``audio`` upload (or
+        ``audio_path``) or a JSON body with ``audio_path``; ``reference_id``
+        and ``name`` are optional.  The clip is VAE-encoded once and later
+        requests pass ``reference_id`` instead of the audio.
+        """
+        _reject_in_pool_mode("Registering references")
+        content_type = (request.headers.get("content-type") or "").lower()
+        temp_path = None
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("audio") or form.get("reference_audio") or form.get("ref_audio")
+            if isinstance(upload, StarletteUploadFile):
+                temp_path = await _save_upload_to_temp(upload, prefix="reference")
+                audio_path = temp_path
+            else:
+                audio_path = _validate_audio_path(str(form.get("audio_path") or "").strip() or None)
+            p = RequestParser({k: v for k, v in form.items() if not hasattr(v, "read")})
+        else:
+            try:
+                body = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid JSON body")
+            if not isinstance(body, dict):
+                raise HTTPException(status_code=400, detail="JSON payload must be an object")
+            p = RequestParser(body)
+            audio_path = _validate_audio_path(p.str("audio_path") or None)
+
+        try:
+            if not audio_path:
+                raise HTTPException(status_code=400, detail="Provide an 'audio' upload or 'audio_path'")
+            handler: AceStepHandler = app.state.handler
+            if handler is None or handler.vae is None:
+                raise HTTPException(status_code=500, detail="Model not initialized")
+            loop = asyncio.get_running_loop()
+            entry, error = await loop.run_in_executor(
+                app.state.executor,
+                lambda: handler.register_reference(
+                    audio_path,
+                    reference_id=p.str("reference_id") or None,
+                    name=p.str("name") or None,
+                ),
+            )
+            if error:
+                raise HTTPException(status_code=400, detail=error)
+            return _wrap_response(entry)
+        finally:
+            if temp_path:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    @app.get("/v1/references")
+    async def list_references_endpoint(_: None = Depends(verify_api_key)):
+        """List registered reference-library entries."""
+        return _wrap_response({"references": app.state.reference_library.list()})
+
+    @app.delete("/v1/references/{reference_id}")
+    async def delete_reference_endpoint(reference_id: str, _: None = Depends(verify_api_key)):
+        """Delete a reference-library entry."""
+        if not app.state.reference_library.delete(reference_id):
+            raise HTTPException(status_code=404, detail="Reference not found")
+        return _wrap_response({"reference_id": reference_id, "deleted": True})
+
     @app.post("/v1/lora/load")
     async def load_lora_endpoint(request: LoadLoRARequest, _: None = Depends(verify_api_key)):
         """Load LoRA adapter into the primary model."""
         handler: AceStepHandler = app.state.handler
 
+        _reject_lora_in_pool_mode()
         if handler is None or handler.model is None:
             raise HTTPException(status_code=500, detail="Model not initialized")
 
         try:
+            if getattr(handler, "request_lora_path", None) is not None:
+                # Put the server adapters back before changing them.
+                handler.unload_lora()
+                handler.request_lora_path = None
+                _restore_server_lora(handler)
             adapter_name = request.adapter_name.strip() if isinstance(request.adapter_name, str) else None
             if adapter_name:
                 result = handler.add_lora(request.lora_path, adapter_name=adapter_name)
@@ -3027,6 +3790,9 @@ def create_app() -> FastAPI:
                 result = handler.load_lora(request.lora_path)
 
             if result.startswith("✅"):
+                # Adapters jobs without a lora_path run with (see _apply_request_lora)
+                server_loras = list(getattr(handler, "server_loras", None) or []) if adapter_name else []
+                handler.server_loras = server_loras + [(request.lora_path, adapter_name)]
                 response_data = {"message": result, "lora_path": request.lora_path}
                 if adapter_name:
                     response_data["adapter_name"] = adapter_name
@@ -3043,10 +3809,14 @@ def create_app() -> FastAPI:
         """Unload LoRA adapter and restore base model."""
         handler: AceStepHandler = app.state.handler
 
+        _reject_lora_in_pool_mode()
         if handler is None or handler.model is None:
             raise HTTPException(status_code=500, detail="Model not initialized")
 
         try:
+            handler.request_lora_path = None
+            handler.server_loras = []
+            handler.server_lora_state = None
             result = handler.unload_lora()
 
             if result.startswith("✅") or result.startswith("⚠️"):
@@ -3063,6 +3833,7 @@ def create_app() -> FastAPI:
         """Enable or disable LoRA adapter for inference."""
         handler: AceStepHandler = app.state.handler
 
+        _reject_lora_in_pool_mode()
         if handler is None or handler.model is None:
             raise HTTPException(status_code=500, detail="Model not initialized")
 
@@ -3081,6 +3852,7 @@ def create_app() -> FastAPI:
         """Set LoRA adapter scale/strength (0.0-1.0)."""
         handler: AceStepHandler = app.state.handler
 
+        _reject_lora_in_pool_mode()
         if handler is None or handler.model is None:
             raise HTTPException(status_code=500, detail="Model not initialized")
 
@@ -3106,6 +3878,7 @@ def create_app() -> FastAPI:
         """Get current LoRA/LoKr adapter state for the primary handler."""
         handler: AceStepHandler = app.state.handler
 
+        _reject_lora_in_pool_mode()
         if handler is None or handler.model is None:
             raise HTTPException(status_code=500, detail="Model not initialized")
 
@@ -3126,6 +3899,7 @@ def create_app() -> FastAPI:
     @app.post("/v1/reinitialize")
     async def reinitialize_service(_: None = Depends(verify_api_key)):
         """Reinitialize components that were unloaded during training/preprocessing."""
+        _reject_in_pool_mode("/v1/reinitialize")
         handler: AceStepHandler = app.state.handler
         llm: LLMHandler = app.state.llm_handler
 
@@ -3178,6 +3952,11 @@ def create_app() -> FastAPI:
                 status, ok = llm.initialize(**llm_params)
                 if ok:
                     reloaded.append("LLM")
+                    _note_lm_loaded(
+                        app,
+                        llm_params["lm_model_path"],
+                        **{k: v for k, v in llm_params.items() if k not in ("checkpoint_dir", "lm_model_path")},
+                    )
                     try:
                         app.state._llm_initialized = True
                         app.state._llm_init_error = None
@@ -3227,6 +4006,7 @@ def create_app() -> FastAPI:
     async def load_model(_: None = Depends(verify_api_key)):
         """Load the DiT model onto the GPU. No-op if already loaded.
         Used by the T4 wrapper to load on demand before generation."""
+        _reject_in_pool_mode("/v1/load")
         handler: AceStepHandler = app.state.handler
         if getattr(app.state, "_initialized", False):
             return _wrap_response({"status": "already_loaded"})
@@ -3261,6 +4041,7 @@ def create_app() -> FastAPI:
     async def unload_model(_: None = Depends(verify_api_key)):
         """Unload the DiT model from GPU and free VRAM. Sets server back to
         uninitialised state. Use /v1/load to reload before the next generation."""
+        _reject_in_pool_mode("/v1/unload")
         import gc
         handler: AceStepHandler = app.state.handler
         try:
@@ -3310,6 +4091,57 @@ def create_app() -> FastAPI:
     return app
 
 
+def _pool_worker_factory(spec: WorkerSpec):
+    """Build a pool worker: a headless copy of this server bound to ``spec.device``."""
+    os.environ["ACESTEP_DEVICE"] = spec.device
+    if os.getenv("ACESTEP_LM_DEVICE", "").strip().lower() != "cpu":
+        os.environ["ACESTEP_LM_DEVICE"] = spec.device
+    os.environ["ACESTEP_GPU_WORKERS"] = "0"
+    os.environ["ACESTEP_JOB_JOURNAL"] = "off"  # the server process journals and requeues
+    return _HeadlessJobRunner(create_app())
+
+
+class _HeadlessJobRunner:
+    """Runs pool jobs through a worker process's own app state and queue."""
+
+    def __init__(self, worker_app: FastAPI) -> None:
+        """Enter the app lifespan, which loads the models on this worker's device."""
+        self.app = worker_app
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._lifespan = worker_app.router.lifespan_context(worker_app)
+        self.loop.run_until_complete(self._lifespan.__aenter__())
+
+    def __call__(self, jobs: List[Tuple[str, Dict[str, Any]]], emit) -> None:
+        """Run ``jobs`` to completion, forwarding progress and results through ``emit``."""
+        self.loop.run_until_complete(self._run(jobs, emit))
+
+    async def _run(self, jobs: List[Tuple[str, Dict[str, Any]]], emit) -> None:
+        store: _JobStore = self.app.state.job_store
+        records = []
+        for job_id, payload in jobs:
+            rec = store.create_with_id(job_id)
+            rec.done_event = asyncio.Event()
+            self.app.state.job_queue.put_nowait((job_id, GenerateMusicRequest(**payload)))
+            records.append(rec)
+
+        reported: Dict[str, Tuple[float, str]] = {}
+        while True:
+            for rec in records:
+                if rec.status == "running" and reported.get(rec.job_id) != (rec.progress, rec.stage):
+                    reported[rec.job_id] = (rec.progress, rec.stage)
+                    emit("progress", rec.job_id, (rec.progress, rec.stage))
+            if all(rec.done_event.is_set() for rec in records):
+                break
+            await asyncio.sleep(0.2)
+
+        for rec in records:
+            if rec.status == "succeeded":
+                emit("result", rec.job_id, rec.result)
+            else:
+                emit("error", rec.job_id, rec.error or "Generation failed")
+
+
 app = create_app()
 
 
@@ -3362,6 +4194,26 @@ def main() -> None:
         help="Skip model loading at startup (models will be lazy-loaded on first request). "
              "Can also be set via ACESTEP_NO_INIT=true environment variable.",
     )
+    parser.add_argument(
+        "--fake-backend",
+        action="store_true",
+        default=_env_bool("ACESTEP_FAKE_BACKEND", False),
+        help="Serve with CPU stand-in handlers that sleep instead of generating (for load tests). "
+             "Can also be set via ACESTEP_FAKE_BACKEND=true environment variable.",
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=str,
+        default=os.getenv("ACESTEP_FAKE_LATENCY", ""),
+        help="Fake backend latency model, e.g. 'base=0.3,step=0.1,jitter=0.1' (see acestep.api.fake_backend).",
+    )
+    parser.add_argument(
+        "--gpu-workers",
+        type=int,
+        default=int(os.getenv("ACESTEP_GPU_WORKERS", "0") or 0),
+        help="Run jobs in N worker processes, each with its own models (default from ACESTEP_GPU_WORKERS; "
+             "devices from ACESTEP_GPU_WORKER_DEVICES).",
+    )
     args = parser.parse_args()
 
     # Set API key from command line argument
@@ -3388,6 +4240,17 @@ def main() -> None:
         os.environ["ACESTEP_NO_INIT"] = "true"
         print("[API Server] --no-init: Models will NOT be loaded at startup (lazy load on first request)")
 
+    # Set fake backend (load testing without a GPU)
+    if args.fake_backend:
+        os.environ["ACESTEP_FAKE_BACKEND"] = "true"
+        os.environ["ACESTEP_FAKE_LATENCY"] = args.fake_latency
+        print("[API Server] --fake-backend: generation is simulated, no models will be loaded")
+
+    # GPU worker processes are spawned by the lifespan and share its single queue
+    if args.gpu_workers > 0:
+        os.environ["ACESTEP_GPU_WORKERS"] = str(args.gpu_workers)
+        print(f"[API Server] --gpu-workers: jobs run in {args.gpu_workers} worker processes")
+
     # IMPORTANT: in-memory queue/store -> workers MUST be 1
     uvicorn.run(
         "acestep.api_server:app",
@@ -0,0 +1,224 @@
+"""
+Concurrent in-memory audio encoding
+
+Encodes a batch of PCM clips into one or more formats at once, returning the
+encoded files as bytes so callers decide whether anything touches the disk.
+
+- MP3 / Opus / AAC go to an ``ffmpeg`` subprocess per clip when the binary is
+  available, so a batch runs on as many cores as there are pool workers.
+- FLAC / WAV (and MP3 / Opus without ffmpeg) are encoded in-process with
+  libsndfile, which releases the GIL while it works.
+- AAC without ffmpeg falls back to ``torchaudio.save`` through a temp file.
+
+Each clip is converted to interleaved float32 PCM once and shared by every
+requested format.
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+SUPPORTED_FORMATS = ("flac", "wav", "mp3", "wav32", "opus", "aac")
+FFMPEG_FORMATS = ("mp3", "opus", "aac")
+
+# format -> (soundfile container, subtype)
+_SOUNDFILE_FORMATS = {
+    "flac": ("FLAC", None),
+    "wav": ("WAV", "PCM_16"),
+    "wav32": ("WAV", "FLOAT"),
+    "mp3": ("MP3", None),
+    "opus": ("OGG", "OPUS"),
+}
+
+# format -> (ffmpeg muxer, encoder); muxers must not need a seekable output
+_FFMPEG_CODECS = {
+    "mp3": ("mp3", "libmp3lame"),
+    "opus": ("ogg", "libopus"),
+    "aac": ("adts", "aac"),
+}
+
+# libopus only accepts these input rates
+_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+def file_extension(format: str) -> str:
+    """Return the file extension (without dot) used for *format*."""
+    return "wav" if format == "wav32" else format
+
+
+@dataclass
+class EncodedAudio:
+    """Encoded files of one clip: format -> bytes, and format -> error for failures."""
+
+    buffers: Dict[str, bytes] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+
+
+def _ffmpeg_binary() -> Optional[str]:
+    return shutil.which(os.getenv("ACESTEP_FFMPEG", "ffmpeg"))
+
+
+def _encode_ffmpeg(ffmpeg: str, pcm: np.ndarray, sample_rate: int, format: str) -> bytes:
+    muxer, codec = _FFMPEG_CODECS[format]
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-f", "f32le", "-ar", str(sample_rate), "-ac", str(pcm.shape[1]), "-i", "pipe:0",
+    ]
+    if format == "opus" and sample_rate not in _OPUS_RATES:
+        cmd += ["-ar", "48000"]
+    cmd += ["-c:a", codec, "-f", muxer, "pipe:1"]
+    proc = subprocess.run(cmd, input=pcm.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg {format} encode failed: {proc.stderr.decode(errors='replace').strip()[:200]}")
+    return proc.stdout
+
+
+def _encode_soundfile(pcm: np.ndarray, sample_rate: int, format: str) -> bytes:
+    import soundfile as sf
+
+    container, subtype = _SOUNDFILE_FORMATS[format]
+    buf = io.BytesIO()
+    sf.write(buf, pcm, sample_rate, format=container, subtype=subtype)
+    return buf.getvalue()
+
+
+def _encode_torchaudio(pcm: np.ndarray, sample_rate: int, format: str) -> bytes:
+    import torch
+    import torchaudio
+
+    fd, path = tempfile.mkstemp(suffix=f".{file_extension(format)}")
+    os.close(fd)
+    try:
+        torchaudio.save(path, torch.from_numpy(pcm.T.copy()), sample_rate, channels_first=True)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(path)
+
+
+def encode_pcm(pcm: np.ndarray, sample_rate: int, format: str, ffmpeg: Optional[str] = None) -> bytes:
+    """
+    Encode one clip into an in-memory audio file
+
+    Args:
+        pcm: float32 audio, [samples, channels], C-contiguous
+        sample_rate: Sample rate
+        format: One of ``SUPPORTED_FORMATS``
+        ffmpeg: ffmpeg binary to use for MP3/Opus/AAC (None = in-process)
+
+    Returns:
+        Encoded file contents
+    """
+    if format not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format {format}")
+    if ffmpeg and format in FFMPEG_FORMATS:
+        return _encode_ffmpeg(ffmpeg, pcm, sample_rate, format)
+    if format in _SOUNDFILE_FORMATS:
+        return _encode_soundfile(pcm, sample_rate, format)
+    return _encode_torchaudio(pcm, sample_rate, format)
+
+
+class AudioEncodePool:
+    """Thread pool that encodes clips x formats concurrently"""
+
+    def __init__(self, max_workers: Optional[int] = None, use_ffmpeg: bool = True):
+        """
+        Args:
+            max_workers: Concurrent encodes (default ``ACESTEP_AUDIO_ENCODE_WORKERS``
+                or ``min(8, cpu_count)``)
+            use_ffmpeg: Use an ffmpeg subprocess for MP3/Opus/AAC when available
+        """
+        if max_workers is None:
+            try:
+                max_workers = int(os.getenv("ACESTEP_AUDIO_ENCODE_WORKERS", "0"))
+            except ValueError:
+                max_workers = 0
+        self.max_workers = max_workers if max_workers > 0 else min(8, os.cpu_count() or 1)
+        self.ffmpeg = _ffmpeg_binary() if use_ffmpeg else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="audio-encode")
+            return self._executor
+
+    def _timed_encode(self, pcm: np.ndarray, sample_rate: int, format: str):
+        """Return (bytes, seconds), or the exception raised by the encoder."""
+        start = time.perf_counter()
+        try:
+            data = encode_pcm(pcm, sample_rate, format, self.ffmpeg)
+        except Exception as exc:
+            return exc
+        return data, time.perf_counter() - start
+
+    def encode(
+        self,
+        clips: Sequence[np.ndarray],
+        sample_rate: int,
+        formats: Sequence[str],
+    ) -> Tuple[List[EncodedAudio], Dict[str, float]]:
+        """
+        Encode every clip into every format
+
+        Args:
+            clips: float32 PCM arrays, [samples, channels]
+            sample_rate: Sample rate shared by all clips
+            formats: Formats to produce for each clip
+
+        Returns:
+            (one EncodedAudio per clip, time costs). Time costs hold the summed
+            encode seconds per format (``audio_encode_<format>``) and the wall
+            time of the whole batch (``audio_encode_wall_time``).
+        """
+        start = time.perf_counter()
+        results = [EncodedAudio() for _ in clips]
+        time_costs = {f"audio_encode_{fmt}": 0.0 for fmt in formats}
+        jobs = [(idx, fmt) for idx in range(len(clips)) for fmt in formats]
+        if len(jobs) <= 1 or self.max_workers == 1:
+            outcomes = [self._timed_encode(clips[idx], sample_rate, fmt) for idx, fmt in jobs]
+        else:
+            pool = self._pool()
+            futures = [pool.submit(self._timed_encode, clips[idx], sample_rate, fmt) for idx, fmt in jobs]
+            outcomes = [future.result() for future in futures]
+        for (idx, fmt), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"[AudioEncodePool] Failed to encode clip {idx} as {fmt}: {outcome}")
+                results[idx].errors[fmt] = outcome
+                continue
+            data, seconds = outcome
+            results[idx].buffers[fmt] = data
+            time_costs[f"audio_encode_{fmt}"] += seconds
+        time_costs["audio_encode_wall_time"] = time.perf_counter() - start
+        return results, time_costs
+
+    def shutdown(self) -> None:
+        """Stop the worker threads (a later encode starts new ones)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_default_pool: Optional[AudioEncodePool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_encode_pool() -> AudioEncodePool:
+    """Return the process-wide encode pool, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = AudioEncodePool()
+        return _default_pool
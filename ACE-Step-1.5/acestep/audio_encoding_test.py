@@ -0,0 +1,100 @@
+"""Unit tests for the concurrent in-memory audio encoder."""
+
+import io
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import soundfile as sf
+
+from acestep.audio_encoding import AudioEncodePool, encode_pcm
+
+
+def _clip(seconds=0.25, sample_rate=48000, seed=0):
+    """Return a quiet stereo noise clip as [samples, channels] float32 PCM."""
+    rng = np.random.default_rng(seed)
+    return (0.1 * rng.standard_normal((int(seconds * sample_rate), 2))).astype(np.float32)
+
+
+class EncodePcmTests(unittest.TestCase):
+    """Single-clip encoding."""
+
+    def test_lossless_formats_round_trip(self):
+        """FLAC and 32-bit WAV decode back to the input; 16-bit WAV within one LSB."""
+        pcm = _clip()
+        for fmt, atol in (("flac", 1 / 32768), ("wav", 1 / 32768), ("wav32", 0.0)):
+            decoded, sr = sf.read(io.BytesIO(encode_pcm(pcm, 48000, fmt)), dtype="float32")
+            self.assertEqual(sr, 48000)
+            self.assertEqual(decoded.shape, pcm.shape)
+            self.assertTrue(np.allclose(decoded, pcm, atol=atol + 1e-7), fmt)
+
+    def test_unsupported_format_raises(self):
+        """Unknown formats are rejected."""
+        with self.assertRaises(ValueError):
+            encode_pcm(_clip(), 48000, "ogg")
+
+
+class AudioEncodePoolTests(unittest.TestCase):
+    """Batch x format fan-out, timing and error reporting."""
+
+    def test_batch_and_formats_from_one_call(self):
+        """Every clip gets every format, with per-format encode times."""
+        pool = AudioEncodePool(max_workers=4, use_ffmpeg=False)
+        self.addCleanup(pool.shutdown)
+        clips = [_clip(seed=i) for i in range(3)]
+        results, costs = pool.encode(clips, 48000, ["flac", "mp3"])
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertEqual(set(result.buffers), {"flac", "mp3"})
+            self.assertEqual(result.errors, {})
+            info = sf.info(io.BytesIO(result.buffers["mp3"]))
+            self.assertEqual((info.samplerate, info.channels), (48000, 2))
+        self.assertEqual(set(costs), {"audio_encode_flac", "audio_encode_mp3", "audio_encode_wall_time"})
+        self.assertGreater(costs["audio_encode_mp3"], 0.0)
+
+    def test_encodes_run_concurrently(self):
+        """Slow encodes overlap instead of running back to back."""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def _slow_encode(pcm, sample_rate, fmt, ffmpeg=None):
+            """Track how many encodes are in flight."""
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.1)
+            with lock:
+                active[0] -= 1
+            return b"x"
+
+        pool = AudioEncodePool(max_workers=4, use_ffmpeg=False)
+        self.addCleanup(pool.shutdown)
+        with patch("acestep.audio_encoding.encode_pcm", side_effect=_slow_encode):
+            results, costs = pool.encode([_clip()] * 4, 48000, ["mp3"])
+        self.assertEqual(peak[0], 4)
+        self.assertAlmostEqual(costs["audio_encode_mp3"], 0.4, delta=0.1)
+        self.assertLess(costs["audio_encode_wall_time"], 0.3)
+        self.assertTrue(all(r.buffers["mp3"] == b"x" for r in results))
+
+    def test_failures_are_reported_per_clip(self):
+        """One failing encode does not lose the others."""
+        real = encode_pcm
+
+        def _flaky(pcm, sample_rate, fmt, ffmpeg=None):
+            """Fail for the second clip only."""
+            if pcm.shape[0] == 100:
+                raise RuntimeError("boom")
+            return real(pcm, sample_rate, fmt, ffmpeg)
+
+        pool = AudioEncodePool(max_workers=2, use_ffmpeg=False)
+        self.addCleanup(pool.shutdown)
+        with patch("acestep.audio_encoding.encode_pcm", side_effect=_flaky):
+            results, _ = pool.encode([_clip(), _clip()[:100]], 48000, ["wav"])
+        self.assertIn("wav", results[0].buffers)
+        self.assertEqual(str(results[1].errors["wav"]), "boom")
+
+
+if __name__ == "__main__":
+    unittest.main()
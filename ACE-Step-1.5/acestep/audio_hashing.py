@@ -0,0 +1,134 @@
+"""
+Streaming, memoized hashing of audio files and waveforms
+
+Uploaded sources and references are identified by the SHA-256 of their
+content.  Reading a 10-minute 48 kHz stereo upload into memory just to hash
+it, or copying a waveform tensor to a fresh numpy buffer first, briefly
+doubles the memory held for that audio.
+
+- Files are read and hashed in fixed-size chunks.  Digests are memoized by
+  ``(path, size, mtime, inode)``, so repeated jobs over the same upload read
+  it once; a rewritten or replaced file gets a new key.
+- CPU tensors and numpy arrays are hashed through a byte view of their
+  storage.  CUDA tensors are copied to the host a chunk at a time.
+
+Digests match ``hashlib.sha256(array.tobytes())`` / a whole-file read.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+HASH_CHUNK_BYTES = 1 << 20
+DEFAULT_MEMO_ENTRIES = 256
+
+_FileKey = Tuple[str, int, int, int]
+
+
+def _file_key(path: str, st: os.stat_result) -> _FileKey:
+    return (os.path.realpath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def _update_from_tensor(digest, tensor: torch.Tensor, chunk_bytes: int) -> None:
+    """Feed the C-order bytes of ``tensor`` to ``digest`` without a full host copy."""
+    flat = tensor.detach().reshape(-1)
+    if flat.numel() == 0:
+        return
+    if flat.device.type == "cpu":
+        # Zero-copy byte view; also covers dtypes numpy lacks (bfloat16).
+        digest.update(flat.view(torch.uint8).numpy())
+        return
+    step = max(1, chunk_bytes // flat.element_size())
+    for start in range(0, flat.numel(), step):
+        digest.update(flat[start:start + step].cpu().view(torch.uint8).numpy())
+
+
+class AudioHasher:
+    """SHA-256 of audio files and waveforms, with a per-file LRU memo"""
+
+    def __init__(self, max_entries: Optional[int] = None, chunk_bytes: int = HASH_CHUNK_BYTES):
+        """
+        Args:
+            max_entries: Memoized file digests (default ``ACESTEP_AUDIO_HASH_CACHE``
+                or 256; ``0`` disables memoization)
+            chunk_bytes: Bytes read from disk / copied from the GPU per update
+        """
+        if max_entries is None:
+            try:
+                max_entries = int(os.getenv("ACESTEP_AUDIO_HASH_CACHE", str(DEFAULT_MEMO_ENTRIES)))
+            except ValueError:
+                max_entries = DEFAULT_MEMO_ENTRIES
+        self.max_entries = max(0, max_entries)
+        self.chunk_bytes = max(1, int(chunk_bytes))
+        self._memo: "OrderedDict[_FileKey, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hash_file(self, path: str) -> str:
+        """
+        Return the SHA-256 hex digest of the file at ``path``
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read
+        """
+        st = os.stat(path)
+        key = _file_key(path, st)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_bytes), b""):
+                digest.update(chunk)
+            after = os.fstat(f.fileno())
+        result = digest.hexdigest()
+        # Only remember digests of files that did not change while being read.
+        if self.max_entries and _file_key(path, after) == key:
+            with self._lock:
+                self._memo[key] = result
+                self._memo.move_to_end(key)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return result
+
+    def hash_array(self, data: Union[torch.Tensor, np.ndarray]) -> str:
+        """Return the SHA-256 hex digest of a waveform's C-order bytes"""
+        digest = hashlib.sha256()
+        if isinstance(data, torch.Tensor):
+            _update_from_tensor(digest, data, self.chunk_bytes)
+        else:
+            digest.update(np.ascontiguousarray(data).reshape(-1).view(np.uint8))
+        return digest.hexdigest()
+
+    def clear(self) -> None:
+        """Forget every memoized file digest"""
+        with self._lock:
+            self._memo.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return memo size and hit / miss counters"""
+        with self._lock:
+            return {"entries": len(self._memo), "hits": self.hits, "misses": self.misses}
+
+
+_default_hasher: Optional[AudioHasher] = None
+_default_hasher_lock = threading.Lock()
+
+
+def get_audio_hasher() -> AudioHasher:
+    """Return the process-wide audio hasher, creating it on first use."""
+    global _default_hasher
+    with _default_hasher_lock:
+        if _default_hasher is None:
+            _default_hasher = AudioHasher()
+        return _default_hasher
@@ -0,0 +1,120 @@
+"""Unit tests for streaming, memoized audio hashing."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+
+from acestep.audio_hashing import AudioHasher
+from acestep.audio_utils import generate_uuid_from_audio_data, get_audio_file_hash
+
+
+class AudioHasherFileTests(unittest.TestCase):
+    """Chunked file hashing and the (path, size, mtime, inode) memo."""
+
+    def setUp(self):
+        """Write a small upload and create a hasher with tiny chunks."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "upload.wav")
+        self.payload = os.urandom(10_000)
+        with open(self.path, "wb") as f:
+            f.write(self.payload)
+        self.hasher = AudioHasher(max_entries=2, chunk_bytes=1024)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_streamed_digest_matches_whole_read_and_is_memoized(self):
+        """The second request for an unchanged file is served from the memo."""
+        expected = hashlib.sha256(self.payload).hexdigest()
+        self.assertEqual(self.hasher.hash_file(self.path), expected)
+        with mock.patch("builtins.open", side_effect=AssertionError("file re-read")):
+            self.assertEqual(self.hasher.hash_file(self.path), expected)
+        self.assertEqual(self.hasher.snapshot(), {"entries": 1, "hits": 1, "misses": 1})
+
+    def test_rewritten_file_is_hashed_again(self):
+        """A new size or mtime changes the key, so stale digests are never returned."""
+        self.hasher.hash_file(self.path)
+        with open(self.path, "wb") as f:
+            f.write(b"new audio")
+        os.utime(self.path, ns=(0, 12345))
+        self.assertEqual(self.hasher.hash_file(self.path), hashlib.sha256(b"new audio").hexdigest())
+        self.assertEqual(self.hasher.misses, 2)
+
+    def test_memo_is_bounded_and_can_be_disabled(self):
+        """Least recently used entries are evicted; ``max_entries=0`` keeps none."""
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.temp_dir, name)
+            with open(path, "wb") as f:
+                f.write(name.encode())
+            self.hasher.hash_file(path)
+        self.assertEqual(self.hasher.snapshot()["entries"], 2)
+        uncached = AudioHasher(max_entries=0)
+        uncached.hash_file(self.path)
+        uncached.hash_file(self.path)
+        self.assertEqual(uncached.snapshot(), {"entries": 0, "hits": 0, "misses": 2})
+
+    def test_get_audio_file_hash_keeps_its_fallbacks(self):
+        """Existing paths hash their content; other values hash their text."""
+        self.assertEqual(get_audio_file_hash(self.path), hashlib.sha256(self.payload).hexdigest())
+        missing = os.path.join(self.temp_dir, "missing.wav")
+        self.assertEqual(get_audio_file_hash(missing), hashlib.sha256(missing.encode()).hexdigest())
+        self.assertEqual(get_audio_file_hash(None), "")
+
+
+class AudioHasherArrayTests(unittest.TestCase):
+    """Hashing waveforms through byte views."""
+
+    def test_digests_match_tobytes(self):
+        """Tensors and arrays, contiguous or not, hash like their C-order bytes."""
+        hasher = AudioHasher()
+        wave = torch.randn(2, 4800)
+        for data, reference in (
+            (wave, wave.numpy()),
+            (wave.numpy(), wave.numpy()),
+            (wave.t(), wave.numpy().T),
+            (wave.numpy().T, wave.numpy().T),
+            (wave.clone().requires_grad_(), wave.numpy()),
+            (wave.to(torch.bfloat16), wave.to(torch.bfloat16).view(torch.int16).numpy()),
+        ):
+            expected = hashlib.sha256(np.ascontiguousarray(reference).tobytes()).hexdigest()
+            self.assertEqual(hasher.hash_array(data), expected)
+        self.assertEqual(hasher.hash_array(torch.empty(0)), hashlib.sha256(b"").hexdigest())
+
+    def test_device_tensors_are_copied_in_chunks(self):
+        """Non-CPU tensors reach the host one bounded slice at a time."""
+        hasher = AudioHasher(chunk_bytes=4 * 1000)
+        wave = torch.randn(2, 4800)
+        slices = []
+        original_cpu = torch.Tensor.cpu
+
+        def _record(tensor, *args, **kwargs):
+            slices.append(tensor.numel())
+            return original_cpu(tensor, *args, **kwargs)
+
+        fake_device = mock.PropertyMock(return_value=torch.device("meta"))
+        with mock.patch.object(torch.Tensor, "device", fake_device), mock.patch.object(torch.Tensor, "cpu", _record):
+            digest = hasher.hash_array(wave)
+        self.assertEqual(digest, hashlib.sha256(wave.numpy().tobytes()).hexdigest())
+        self.assertEqual(max(slices), 1000)
+        self.assertEqual(sum(slices), wave.numel())
+
+    def test_uuid_from_audio_data_is_unchanged(self):
+        """The uuid helper still hashes the raw samples, optionally with the seed."""
+        wave = np.arange(16, dtype=np.float32)
+        data_hash = hashlib.sha256(wave.tobytes()).hexdigest()
+        self.assertEqual(generate_uuid_from_audio_data(torch.from_numpy(wave)), data_hash)
+        self.assertEqual(
+            generate_uuid_from_audio_data(wave, seed=7),
+            hashlib.sha256(f"{data_hash}_7".encode()).hexdigest(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,12 +14,15 @@ import os
 import subprocess
 import hashlib
 from pathlib import Path
-from typing import Union, Optional, List, Tuple
+from typing import Dict, Union, Optional, List, Sequence, Tuple
 import torch
 import numpy as np
 import torchaudio
 from loguru import logger
 
+from acestep.audio_encoding import AudioEncodePool, EncodedAudio, file_extension, get_encode_pool
+from acestep.audio_hashing import get_audio_hasher
+
 
 def normalize_audio(audio_data: Union[torch.Tensor, np.ndarray], target_db: float = -1.0) -> Union[torch.Tensor, np.ndarray]:
     """
@@ -78,6 +81,31 @@ class AudioSaver:
             logger.warning(f"Unsupported format {default_format}, using 'flac'")
             self.default_format = "flac"
     
+    @staticmethod
+    def _to_tensor(audio_data: Union[torch.Tensor, np.ndarray], channels_first: bool = True) -> torch.Tensor:
+        """Return audio as a contiguous float32 CPU tensor [channels, samples]"""
+        # Convert to torch tensor
+        if isinstance(audio_data, np.ndarray):
+            if channels_first:
+                # numpy already [channels, samples]
+                audio_tensor = torch.from_numpy(audio_data).float()
+            else:
+                # numpy [samples, channels] -> tensor [samples, channels] -> [channels, samples] (if transposed)
+                audio_tensor = torch.from_numpy(audio_data).float()
+                if audio_tensor.dim() == 2 and audio_tensor.shape[0] > audio_tensor.shape[1]:
+                     # Assume [samples, channels] if dim0 > dim1 (heuristic)
+                     audio_tensor = audio_tensor.T
+        else:
+            # torch tensor
+            audio_tensor = audio_data.cpu().float()
+            if not channels_first and audio_tensor.dim() == 2:
+                # [samples, channels] -> [channels, samples]
+                if audio_tensor.shape[0] > audio_tensor.shape[1]:
+                    audio_tensor = audio_tensor.T
+        
+        # Ensure memory is contiguous
+        return audio_tensor.contiguous()
+
     def save_audio(
         self,
         audio_data: Union[torch.Tensor, np.ndarray],
@@ -119,27 +147,7 @@ class AudioSaver:
              # Allow .m4a as valid extension for AAC (it's a container format for AAC)
              pass
         
-        # Convert to torch tensor
-        if isinstance(audio_data, np.ndarray):
-            if channels_first:
-                # numpy already [channels, samples]
-                audio_tensor = torch.from_numpy(audio_data).float()
-            else:
-                # numpy [samples, channels] -> tensor [samples, channels] -> [channels, samples] (if transposed)
-                audio_tensor = torch.from_numpy(audio_data).float()
-                if audio_tensor.dim() == 2 and audio_tensor.shape[0] > audio_tensor.shape[1]:
-                     # Assume [samples, channels] if dim0 > dim1 (heuristic)
-                     audio_tensor = audio_tensor.T
-        else:
-            # torch tensor
-            audio_tensor = audio_data.cpu().float()
-            if not channels_first and audio_tensor.dim() == 2:
-                # [samples, channels] -> [channels, samples]
-                if audio_tensor.shape[0] > audio_tensor.shape[1]:
-                    audio_tensor = audio_tensor.T
-        
-        # Ensure memory is contiguous
-        audio_tensor = audio_tensor.contiguous()
+        audio_tensor = self._to_tensor(audio_data, channels_first)
         
         # Select backend and save
         try:
@@ -254,6 +262,86 @@ class AudioSaver:
         
         return output_path
     
+    def _resolve_formats(self, formats: Optional[Union[str, Sequence[str]]]) -> List[str]:
+        """Normalize a format or list of formats, dropping unsupported ones"""
+        if formats is None:
+            formats = [self.default_format]
+        elif isinstance(formats, str):
+            formats = [formats]
+        resolved = []
+        for fmt in formats:
+            fmt = fmt.lower()
+            if fmt not in ["flac", "wav", "mp3", "wav32", "opus", "aac"]:
+                logger.warning(f"Unsupported format {fmt}, using {self.default_format}")
+                fmt = self.default_format
+            if fmt not in resolved:
+                resolved.append(fmt)
+        return resolved
+
+    def encode_audio(
+        self,
+        audio_data: Union[torch.Tensor, np.ndarray],
+        sample_rate: int = 48000,
+        format: Optional[str] = None,
+        channels_first: bool = True,
+    ) -> bytes:
+        """
+        Encode audio into an in-memory file
+        
+        Args:
+            audio_data: Audio data, torch.Tensor [channels, samples] or numpy.ndarray
+            sample_rate: Sample rate
+            format: Audio format, defaults to default_format
+            channels_first: If True, tensor format is [channels, samples], else [samples, channels]
+        
+        Returns:
+            Encoded file contents
+        """
+        format = self._resolve_formats(format)[0]
+        encoded, _ = self.encode_batch([audio_data], sample_rate=sample_rate, formats=[format],
+                                       channels_first=channels_first)
+        if format in encoded[0].errors:
+            raise encoded[0].errors[format]
+        return encoded[0].buffers[format]
+
+    def encode_batch(
+        self,
+        audio_batch: Union[List[torch.Tensor], torch.Tensor],
+        sample_rate: int = 48000,
+        formats: Optional[Union[str, Sequence[str]]] = None,
+        channels_first: bool = True,
+        pool: Optional[AudioEncodePool] = None,
+    ) -> Tuple[List[EncodedAudio], Dict[str, float]]:
+        """
+        Encode a batch concurrently into one or more formats, in memory
+        
+        Each clip is converted to PCM once and shared by all formats.
+        
+        Args:
+            audio_batch: Audio batch, List[tensor] or tensor [batch, channels, samples]
+            sample_rate: Sample rate
+            formats: Format or list of formats, defaults to default_format
+            channels_first: Tensor format flag
+            pool: Encode pool (default: the shared pool)
+        
+        Returns:
+            (one EncodedAudio per clip, time costs with per-format encode
+            seconds ``audio_encode_<format>`` and ``audio_encode_wall_time``)
+        """
+        if isinstance(audio_batch, torch.Tensor) and audio_batch.dim() == 3:
+            audio_list = [audio_batch[i] for i in range(audio_batch.shape[0])]
+        elif isinstance(audio_batch, list):
+            audio_list = audio_batch
+        else:
+            audio_list = [audio_batch]
+        clips = []
+        for audio in audio_list:
+            audio_tensor = self._to_tensor(audio, channels_first)
+            if audio_tensor.dim() == 1:
+                audio_tensor = audio_tensor.unsqueeze(0)
+            clips.append(np.ascontiguousarray(audio_tensor.numpy().T))
+        return (pool or get_encode_pool()).encode(clips, sample_rate, self._resolve_formats(formats))
+
     def save_batch(
         self,
         audio_batch: Union[List[torch.Tensor], torch.Tensor],
@@ -262,10 +350,13 @@ class AudioSaver:
         sample_rate: int = 48000,
         format: Optional[str] = None,
         channels_first: bool = True,
+        time_costs: Optional[Dict[str, float]] = None,
     ) -> List[str]:
         """
         Save audio batch
         
+        Clips are encoded concurrently in memory and then written out.
+        
         Args:
             audio_batch: Audio batch, List[tensor] or tensor [batch, channels, samples]
             output_dir: Output directory
@@ -273,33 +364,28 @@ class AudioSaver:
             sample_rate: Sample rate
             format: Audio format
             channels_first: Tensor format flag
+            time_costs: If given, updated with the encode time costs
         
         Returns:
             List of saved file paths
         """
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
+        format = self._resolve_formats(format)[0]
         
-        # Process batch
-        if isinstance(audio_batch, torch.Tensor) and audio_batch.dim() == 3:
-            # [batch, channels, samples]
-            audio_list = [audio_batch[i] for i in range(audio_batch.shape[0])]
-        elif isinstance(audio_batch, list):
-            audio_list = audio_batch
-        else:
-            audio_list = [audio_batch]
+        encoded, costs = self.encode_batch(audio_batch, sample_rate=sample_rate, formats=[format],
+                                           channels_first=channels_first)
+        if time_costs is not None:
+            time_costs.update(costs)
         
         saved_paths = []
-        for i, audio in enumerate(audio_list):
-            output_path = output_dir / f"{file_prefix}_{i:04d}"
-            saved_path = self.save_audio(
-                audio,
-                output_path,
-                sample_rate=sample_rate,
-                format=format,
-                channels_first=channels_first
-            )
-            saved_paths.append(saved_path)
+        for i, item in enumerate(encoded):
+            if format in item.errors:
+                raise item.errors[format]
+            output_path = output_dir / f"{file_prefix}_{i:04d}.{file_extension(format)}"
+            output_path.write_bytes(item.buffers[format])
+            logger.debug(f"[AudioSaver] Saved audio to {output_path} ({format}, {sample_rate}Hz)")
+            saved_paths.append(str(output_path))
         
         return saved_paths
 
@@ -367,6 +453,9 @@ def get_lora_weights_hash(dit_handler) -> str:
 def get_audio_file_hash(audio_file) -> str:
     """
     Get hash identifier for an audio file.
+
+    Existing files are hashed in chunks and memoized by path, size, mtime
+    and inode, so repeated jobs over the same upload read it once.
     
     Args:
         audio_file: Path to audio file (str) or file-like object
@@ -380,8 +469,7 @@ def get_audio_file_hash(audio_file) -> str:
     try:
         if isinstance(audio_file, str):
             if os.path.exists(audio_file):
-                with open(audio_file, 'rb') as f:
-                    return hashlib.sha256(f.read()).hexdigest()
+                return get_audio_hasher().hash_file(audio_file)
             return hashlib.sha256(audio_file.encode('utf-8')).hexdigest()
         elif hasattr(audio_file, 'name'):
             return hashlib.sha256(str(audio_file.name).encode('utf-8')).hexdigest()
@@ -423,14 +511,8 @@ def generate_uuid_from_audio_data(
     Returns:
         UUID string
     """
-    if isinstance(audio_data, torch.Tensor):
-        # Convert to numpy and calculate hash
-        audio_np = audio_data.cpu().numpy()
-    else:
-        audio_np = audio_data
-    
-    # Calculate data hash
-    data_hash = hashlib.sha256(audio_np.tobytes()).hexdigest()
+    # Hashes the tensor/array storage in place instead of a tobytes() copy
+    data_hash = get_audio_hasher().hash_array(audio_data)
     
     if seed is not None:
         combined = f"{data_hash}_{seed}"
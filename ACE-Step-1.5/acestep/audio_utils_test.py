@@ -231,5 +231,48 @@ class AudioSaverFormatTests(unittest.TestCase):
             self.assertTrue(result.endswith('.aac'))
 
 
+class AudioSaverBatchTests(unittest.TestCase):
+    """Tests for pooled, in-memory batch encoding."""
+
+    def setUp(self):
+        """Set up temporary directory and a small batch."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.batch = 0.1 * torch.randn(3, 2, 4800)
+
+    def tearDown(self):
+        """Clean up temporary directory."""
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_encode_batch_emits_several_formats_without_writing(self):
+        """One call yields every format for every clip and leaves the disk alone."""
+        import io
+        import soundfile as sf
+
+        saver = AudioSaver(default_format="flac")
+        encoded, time_costs = saver.encode_batch(self.batch, formats=["wav32", "mp3", "wav32"])
+        self.assertEqual(len(encoded), 3)
+        for idx, item in enumerate(encoded):
+            self.assertEqual(list(item.buffers), ["wav32", "mp3"])
+            decoded, _ = sf.read(io.BytesIO(item.buffers["wav32"]), dtype="float32")
+            self.assertTrue(np.allclose(decoded.T, self.batch[idx].numpy()))
+        self.assertIn("audio_encode_mp3", time_costs)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_save_batch_writes_files_and_reports_encode_time(self):
+        """save_batch names files by index and fills time_costs."""
+        time_costs = {}
+        paths = AudioSaver().save_batch(self.batch, self.temp_dir, file_prefix="take", format="wav32",
+                                        time_costs=time_costs)
+        self.assertEqual([Path(p).name for p in paths], ["take_0000.wav", "take_0001.wav", "take_0002.wav"])
+        self.assertTrue(all(os.path.getsize(p) > 4800 * 2 * 4 for p in paths))
+        self.assertGreater(time_costs["audio_encode_wav32"], 0.0)
+
+    def test_encode_audio_returns_bytes(self):
+        """encode_audio encodes a single numpy clip."""
+        data = AudioSaver(default_format="flac").encode_audio(self.batch[0].numpy())
+        self.assertEqual(data[:4], b"fLaC")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -27,6 +27,7 @@ from .mlx_vae_init import MlxVaeInitMixin
 from .padding_utils import PaddingMixin
 from .prompt_utils import PromptMixin
 from .progress import ProgressMixin
+from .reference_library import ReferenceLibraryMixin
 from .service_generate_execute import ServiceGenerateExecuteMixin
 from .service_generate_outputs import ServiceGenerateOutputsMixin
 from .service_generate_request import ServiceGenerateRequestMixin
@@ -66,6 +67,7 @@ __all__ = [
     "PaddingMixin",
     "PromptMixin",
     "ProgressMixin",
+    "ReferenceLibraryMixin",
     "ServiceGenerateExecuteMixin",
     "ServiceGenerateMixin",
     "ServiceGenerateOutputsMixin",
@@ -65,6 +65,65 @@ class AudioCodesMixin:
             lm_hints_25hz = detokenizer(quantized)
             return lm_hints_25hz
 
+    def _latents_to_code_string(self, latents: torch.Tensor) -> str:
+        """Quantize 25Hz latents shaped ``[T, D]`` into serialized 5Hz code tokens."""
+        latents = latents.to(device=self.device, dtype=self.dtype)
+        attention_mask = torch.ones(latents.shape[0], dtype=torch.bool, device=self.device)
+        with self._load_model_context("model"):
+            _, indices, _ = self.model.tokenize(
+                latents.unsqueeze(0), self.silence_latent, attention_mask.unsqueeze(0)
+            )
+        indices_flat = indices.flatten().cpu().tolist()
+        return "".join([f"<|audio_code_{idx}|>" for idx in indices_flat])
+
+    def convert_latents_to_codes(self, latents: torch.Tensor) -> str:
+        """Convert retained generation latents into serialized audio code tokens.
+
+        Skips the decode/reload/VAE-encode round trip of
+        :meth:`convert_src_audio_to_codes` by tokenizing the DiT output latents
+        directly.
+
+        Args:
+            latents: One sample's latents shaped ``[T, D]`` or ``[1, T, D]``.
+
+        Returns:
+            str: Code string, or an error message prefixed with ``❌``.
+        """
+        if latents is None:
+            return "❌ No latents available"
+        if self.model is None:
+            return "❌ Model not initialized. Please initialize the service first."
+        if latents.dim() == 3:
+            if latents.shape[0] != 1:
+                return f"❌ Expected latents for a single sample, got batch of {latents.shape[0]}"
+            latents = latents[0]
+        if latents.dim() != 2:
+            return f"❌ Expected latents shaped [T, D], got {tuple(latents.shape)}"
+
+        try:
+            with torch.inference_mode():
+                codes_string = self._latents_to_code_string(latents)
+            logger.info(f"[convert_latents_to_codes] Generated {codes_string.count('<|audio_code_')} audio codes")
+            return codes_string
+        except Exception as e:
+            error_msg = f"❌ Error converting latents to codes: {str(e)}\n{traceback.format_exc()}"
+            logger.exception("[convert_latents_to_codes] Error converting latents to codes")
+            return error_msg
+
+    def convert_result_to_codes(self, pred_latents: Optional[torch.Tensor] = None, audio_file=None) -> str:
+        """Convert a generated result to codes, preferring its retained latents.
+
+        Args:
+            pred_latents: Retained ``pred_latents`` for the sample, if any.
+            audio_file: Saved audio used as fallback when no latents are retained.
+
+        Returns:
+            str: Code string, or an error message prefixed with ``❌``.
+        """
+        if pred_latents is not None:
+            return self.convert_latents_to_codes(pred_latents)
+        return self.convert_src_audio_to_codes(audio_file)
+
     def convert_src_audio_to_codes(self, audio_file) -> str:
         """Convert uploaded source audio into serialized audio code tokens."""
         if audio_file is None:
@@ -83,16 +142,9 @@ class AudioCodesMixin:
                         return "❌ Audio file appears to be silent"
                     latents = self._encode_audio_to_latents(processed_audio)
 
-                attention_mask = torch.ones(latents.shape[0], dtype=torch.bool, device=self.device)
-                with self._load_model_context("model"):
-                    hidden_states = latents.unsqueeze(0)
-                    _, indices, _ = self.model.tokenize(
-                        hidden_states, self.silence_latent, attention_mask.unsqueeze(0)
-                    )
-                    indices_flat = indices.flatten().cpu().tolist()
-                    codes_string = "".join([f"<|audio_code_{idx}|>" for idx in indices_flat])
-                    logger.info(f"[convert_src_audio_to_codes] Generated {len(indices_flat)} audio codes")
-                    return codes_string
+                codes_string = self._latents_to_code_string(latents)
+                logger.info(f"[convert_src_audio_to_codes] Generated {codes_string.count('<|audio_code_')} audio codes")
+                return codes_string
         except Exception as e:
             error_msg = f"❌ Error converting audio to codes: {str(e)}\n{traceback.format_exc()}"
             logger.exception("[convert_src_audio_to_codes] Error converting audio to codes")
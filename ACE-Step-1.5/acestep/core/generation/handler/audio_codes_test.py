@@ -0,0 +1,83 @@
+"""Unit tests for the audio-code conversion mixin."""
+
+import unittest
+from contextlib import contextmanager
+
+import torch
+
+from acestep.core.generation.handler.audio_codes import AudioCodesMixin
+
+
+class _Model:
+    """Model stub whose tokenizer pools 5 latent frames into one code."""
+
+    def __init__(self):
+        """Record tokenize calls for assertions."""
+        self.calls = []
+
+    def tokenize(self, hidden_states, silence_latent, attention_mask):
+        """Return one code per 5 frames: the rounded mean of the first channel."""
+        self.calls.append((hidden_states.shape, hidden_states.dtype, attention_mask.shape))
+        frames = hidden_states[0, :, 0].reshape(-1, 5).mean(dim=-1)
+        return None, frames.round().long().view(1, -1, 1), None
+
+
+class _Host(AudioCodesMixin):
+    """Host providing the members the mixin depends on."""
+
+    def __init__(self):
+        """Use a stub model and count file-based conversions."""
+        self.model = _Model()
+        self.vae = object()
+        self.device = "cpu"
+        self.dtype = torch.float32
+        self.silence_latent = torch.zeros(1, 10, 4)
+        self.encoded_files = []
+
+    @contextmanager
+    def _load_model_context(self, _name):
+        """No offloading in tests."""
+        yield
+
+    def process_src_audio(self, audio_file):
+        """Pretend to load ``audio_file`` and record it."""
+        self.encoded_files.append(audio_file)
+        return torch.zeros(2, 48000)
+
+    def is_silence(self, _audio):
+        """Treat every input as audible."""
+        return False
+
+    def _encode_audio_to_latents(self, _audio):
+        """Return fixed latents for the fallback path."""
+        return torch.full((10, 4), 7.0)
+
+
+class AudioCodesMixinTests(unittest.TestCase):
+    """Latents should be tokenized directly without the audio round trip."""
+
+    def test_retained_latents_skip_audio_encoding(self):
+        """Batched ``[1, T, D]`` latents go straight through the tokenizer."""
+        host = _Host()
+        latents = torch.cat([torch.full((1, 5, 4), 3.0), torch.full((1, 5, 4), 12.0)], dim=1).half()
+        codes = host.convert_result_to_codes(pred_latents=latents, audio_file="song.flac")
+        self.assertEqual(codes, "<|audio_code_3|><|audio_code_12|>")
+        self.assertEqual(host.encoded_files, [])
+        self.assertEqual(host.model.calls, [(torch.Size([1, 10, 4]), torch.float32, torch.Size([1, 10]))])
+
+    def test_falls_back_to_audio_file_without_latents(self):
+        """Without retained latents the saved file is VAE-encoded as before."""
+        host = _Host()
+        codes = host.convert_result_to_codes(pred_latents=None, audio_file="song.flac")
+        self.assertEqual(codes, "<|audio_code_7|><|audio_code_7|>")
+        self.assertEqual(host.encoded_files, ["song.flac"])
+
+    def test_rejects_multi_sample_latents(self):
+        """Only one sample's latents may be converted at a time."""
+        host = _Host()
+        self.assertTrue(host.convert_latents_to_codes(torch.zeros(2, 5, 4)).startswith("❌"))
+        self.assertEqual(host.model.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -75,6 +75,21 @@ class BatchPrepMixin:
             latents = latents.squeeze(0)
         return latents
 
+    def _expand_per_item(self, value, batch_size: int) -> List:
+        """Return ``value`` as a batch-length list.
+
+        Lists are taken as per-item values (e.g. several coalesced requests
+        in one batch): extra items are dropped when the batch was reduced and
+        the last item is repeated when the list is short.  Scalars are
+        repeated for every item.
+        """
+        if isinstance(value, (list, tuple)):
+            if not value:
+                return [None] * batch_size
+            items = list(value[:batch_size])
+            return items + [items[-1]] * (batch_size - len(items))
+        return [value] * batch_size
+
     def prepare_batch_data(
         self,
         actual_batch_size,
@@ -88,12 +103,19 @@ class BatchPrepMixin:
         key_scale,
         time_signature,
     ):
-        """Prepare repeated batch-level caption/instruction/metadata values."""
-        pure_caption = self.extract_caption_from_sft_format(captions)
-        captions_batch = [pure_caption] * actual_batch_size
-        instructions_batch = [instruction] * actual_batch_size
-        lyrics_batch = [lyrics] * actual_batch_size
-        vocal_languages_batch = [vocal_language] * actual_batch_size
+        """Prepare batch-level caption/instruction/metadata values.
+
+        ``captions``, ``instruction``, ``lyrics``, ``vocal_language``, ``bpm``,
+        ``key_scale`` and ``time_signature`` may each be a single value shared
+        by the whole batch or a list with one value per batch item.
+        """
+        captions_batch = [
+            self.extract_caption_from_sft_format(caption)
+            for caption in self._expand_per_item(captions, actual_batch_size)
+        ]
+        instructions_batch = self._expand_per_item(instruction, actual_batch_size)
+        lyrics_batch = self._expand_per_item(lyrics, actual_batch_size)
+        vocal_languages_batch = self._expand_per_item(vocal_language, actual_batch_size)
 
         calculated_duration = None
         if processed_src_audio is not None:
@@ -101,8 +123,12 @@ class BatchPrepMixin:
         elif audio_duration is not None and float(audio_duration) > 0:
             calculated_duration = float(audio_duration)
 
-        metadata_dict: Dict[str, Union[str, int]] = self._build_metadata_dict(
-            bpm, key_scale, time_signature, calculated_duration
-        )
-        metas_batch = [metadata_dict.copy() for _ in range(actual_batch_size)]
+        metas_batch: List[Dict[str, Union[str, int]]] = [
+            self._build_metadata_dict(item_bpm, item_key_scale, item_time_signature, calculated_duration)
+            for item_bpm, item_key_scale, item_time_signature in zip(
+                self._expand_per_item(bpm, actual_batch_size),
+                self._expand_per_item(key_scale, actual_batch_size),
+                self._expand_per_item(time_signature, actual_batch_size),
+            )
+        ]
         return captions_batch, instructions_batch, lyrics_batch, vocal_languages_batch, metas_batch
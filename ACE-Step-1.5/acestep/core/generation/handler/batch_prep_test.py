@@ -0,0 +1,72 @@
+"""Unit tests for batch preparation helpers."""
+
+import unittest
+
+import torch
+
+from acestep.core.generation.handler.batch_prep import BatchPrepMixin
+from acestep.core.generation.handler.metadata_utils import MetadataMixin
+from acestep.core.generation.handler.prompt_utils import PromptMixin
+
+
+class _Host(BatchPrepMixin, MetadataMixin, PromptMixin):
+    """Minimal host providing BatchPrepMixin dependencies."""
+
+    def __init__(self):
+        self.device = "cpu"
+        self.dtype = torch.float32
+
+
+class PrepareBatchDataTests(unittest.TestCase):
+    """Tests for ``prepare_batch_data`` shared and per-item inputs."""
+
+    def setUp(self):
+        self.host = _Host()
+
+    def test_scalar_inputs_are_repeated(self):
+        """Single values should be shared by every batch item."""
+        captions, instructions, lyrics, languages, metas = self.host.prepare_batch_data(
+            2, None, 30.0, "calm piano", "[Instrumental]", "en", "inst", 90, "C major", "4",
+        )
+        self.assertEqual(captions, ["calm piano", "calm piano"])
+        self.assertEqual(instructions, ["inst", "inst"])
+        self.assertEqual(lyrics, ["[Instrumental]", "[Instrumental]"])
+        self.assertEqual(languages, ["en", "en"])
+        self.assertEqual(metas[0], metas[1])
+        self.assertIsNot(metas[0], metas[1])
+        self.assertEqual(metas[0]["duration"], "30 seconds")
+
+    def test_per_item_lists_are_kept_in_order(self):
+        """Lists with one value per item should map onto batch items."""
+        captions, _, lyrics, languages, metas = self.host.prepare_batch_data(
+            3, None, 20.0,
+            ["rock", "jazz", "jazz"], ["la", "", ""], ["en", "fr", "fr"], "inst",
+            [120, 90, 90], ["A minor", "", ""], ["4", "3", "3"],
+        )
+        self.assertEqual(captions, ["rock", "jazz", "jazz"])
+        self.assertEqual(lyrics, ["la", "", ""])
+        self.assertEqual(languages, ["en", "fr", "fr"])
+        self.assertEqual([m["bpm"] for m in metas], [120, 90, 90])
+        self.assertEqual([m["keyscale"] for m in metas], ["A minor", "N/A", "N/A"])
+        self.assertEqual([m["timesignature"] for m in metas], ["4", "3", "3"])
+
+    def test_per_item_instructions(self):
+        """One instruction per item lets several lego tracks share a batch."""
+        captions, instructions, _, _, _ = self.host.prepare_batch_data(
+            4, None, 10.0, ["voice", "voice", "kit", "kit"], "", "en",
+            ["Generate the VOCALS track:"] * 2 + ["Generate the DRUMS track:"] * 2, 120, "", "4",
+        )
+        self.assertEqual(instructions, ["Generate the VOCALS track:"] * 2 + ["Generate the DRUMS track:"] * 2)
+        self.assertEqual(captions, ["voice", "voice", "kit", "kit"])
+
+    def test_lists_follow_reduced_batch_size(self):
+        """A batch reduced below the list length should keep the leading items."""
+        captions, _, lyrics, _, _ = self.host.prepare_batch_data(
+            2, None, 10.0, ["a", "b", "c", "d"], ["1", "2", "3", "4"], "en", "inst", None, "", "",
+        )
+        self.assertEqual(captions, ["a", "b"])
+        self.assertEqual(lyrics, ["1", "2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,32 @@ from typing import Dict, List, Tuple
 import torch
 from loguru import logger
 
+from acestep.core.generation.handler.reference_library import ReferenceLatent
+
+
+def _normalize_audio_2d(a: torch.Tensor) -> torch.Tensor:
+    """Return reference audio as a stereo ``[2, samples]`` tensor."""
+    if not isinstance(a, torch.Tensor):
+        raise TypeError(f"refer_audio must be a torch.Tensor, got {type(a)!r}")
+    if a.dim() == 3 and a.shape[0] == 1:
+        a = a.squeeze(0)
+    if a.dim() == 1:
+        a = a.unsqueeze(0)
+    if a.dim() != 2:
+        raise ValueError(f"refer_audio must be 1D/2D/3D(1,2,T); got shape={tuple(a.shape)}")
+    if a.shape[0] == 1:
+        a = torch.cat([a, a], dim=0)
+    return a[:2]
+
+
+def _ensure_latent_3d(z: torch.Tensor) -> torch.Tensor:
+    """Return a latent as ``[1, T, D]``."""
+    if z.dim() == 4 and z.shape[0] == 1:
+        z = z.squeeze(0)
+    if z.dim() == 2:
+        z = z.unsqueeze(0)
+    return z
+
 
 class ConditioningEmbedMixin:
     """Mixin containing reference/text embedding preprocessing steps.
@@ -15,52 +41,47 @@ class ConditioningEmbedMixin:
       ``tiled_encode``.
     """
 
+    def encode_reference_latent(self, refer_audio: torch.Tensor) -> torch.Tensor:
+        """VAE-encode one reference clip into a ``[1, T, D]`` latent on ``self.device``."""
+        refer_audio = _normalize_audio_2d(refer_audio)
+        with torch.inference_mode():
+            refer_audio_latent = self.tiled_encode(refer_audio, offload_latent_to_cpu=True)
+        refer_audio_latent = refer_audio_latent.to(self.device).to(self.dtype)
+        if refer_audio_latent.dim() == 2:
+            refer_audio_latent = refer_audio_latent.unsqueeze(0)
+        return _ensure_latent_3d(refer_audio_latent.transpose(1, 2))
+
     def infer_refer_latent(self, refer_audioss: List[List[torch.Tensor]]) -> Tuple[torch.Tensor, torch.Tensor]:
-        """Infer packed reference-audio latents and order mask."""
+        """Infer packed reference-audio latents and order mask.
+
+        Entries may also be :class:`ReferenceLatent` objects from the
+        reference library, which are used as-is without VAE encoding.
+        """
         refer_audio_order_mask = []
         refer_audio_latents = []
         self._ensure_silence_latent_on_device()
 
-        def _normalize_audio_2d(a: torch.Tensor) -> torch.Tensor:
-            if not isinstance(a, torch.Tensor):
-                raise TypeError(f"refer_audio must be a torch.Tensor, got {type(a)!r}")
-            if a.dim() == 3 and a.shape[0] == 1:
-                a = a.squeeze(0)
-            if a.dim() == 1:
-                a = a.unsqueeze(0)
-            if a.dim() != 2:
-                raise ValueError(f"refer_audio must be 1D/2D/3D(1,2,T); got shape={tuple(a.shape)}")
-            if a.shape[0] == 1:
-                a = torch.cat([a, a], dim=0)
-            return a[:2]
-
-        def _ensure_latent_3d(z: torch.Tensor) -> torch.Tensor:
-            if z.dim() == 4 and z.shape[0] == 1:
-                z = z.squeeze(0)
-            if z.dim() == 2:
-                z = z.unsqueeze(0)
-            return z
-
         refer_encode_cache: Dict[int, torch.Tensor] = {}
         for batch_idx, refer_audios in enumerate(refer_audioss):
-            if len(refer_audios) == 1 and torch.all(refer_audios[0] == 0.0):
+            if (
+                len(refer_audios) == 1
+                and isinstance(refer_audios[0], torch.Tensor)
+                and torch.all(refer_audios[0] == 0.0)
+            ):
                 refer_audio_latent = _ensure_latent_3d(self.silence_latent[:, :750, :])
                 refer_audio_latents.append(refer_audio_latent)
                 refer_audio_order_mask.append(batch_idx)
             else:
                 for refer_audio in refer_audios:
-                    cache_key = refer_audio.data_ptr()
-                    if cache_key in refer_encode_cache:
-                        refer_audio_latent = refer_encode_cache[cache_key].clone()
+                    if isinstance(refer_audio, ReferenceLatent):
+                        refer_audio_latent = _ensure_latent_3d(refer_audio.latent.to(self.device).to(self.dtype))
                     else:
-                        refer_audio = _normalize_audio_2d(refer_audio)
-                        with torch.inference_mode():
-                            refer_audio_latent = self.tiled_encode(refer_audio, offload_latent_to_cpu=True)
-                        refer_audio_latent = refer_audio_latent.to(self.device).to(self.dtype)
-                        if refer_audio_latent.dim() == 2:
-                            refer_audio_latent = refer_audio_latent.unsqueeze(0)
-                        refer_audio_latent = _ensure_latent_3d(refer_audio_latent.transpose(1, 2))
-                        refer_encode_cache[cache_key] = refer_audio_latent
+                        cache_key = refer_audio.data_ptr()
+                        if cache_key in refer_encode_cache:
+                            refer_audio_latent = refer_encode_cache[cache_key].clone()
+                        else:
+                            refer_audio_latent = self.encode_reference_latent(refer_audio)
+                            refer_encode_cache[cache_key] = refer_audio_latent
                     refer_audio_latents.append(refer_audio_latent)
                     refer_audio_order_mask.append(batch_idx)
 
@@ -6,6 +6,7 @@ import unittest
 import torch
 
 from acestep.core.generation.handler.conditioning_embed import ConditioningEmbedMixin
+from acestep.core.generation.handler.reference_library import ReferenceLatent
 
 
 class _FakeTextEncoder:
@@ -85,6 +86,16 @@ class ConditioningEmbedMixinTests(unittest.TestCase):
         self.assertEqual(latents.shape[0], 2)
         self.assertEqual(order_mask.tolist(), [0, 0])
 
+    def test_infer_refer_latent_uses_library_latents_without_encoding(self):
+        """Precomputed library latents are packed as-is next to encoded clips."""
+        host = _Host()
+        stored = ReferenceLatent(torch.full((50, 6), 2.0, dtype=torch.float16))
+        latents, order_mask = host.infer_refer_latent([[stored], [torch.ones(2, 96000)]])
+        self.assertEqual(host.tiled_encode_calls, 1)
+        self.assertEqual(order_mask.tolist(), [0, 1])
+        self.assertEqual(latents.dtype, torch.float32)
+        self.assertTrue(torch.equal(latents[0], torch.full((50, 6), 2.0)))
+
     def test_preprocess_batch_returns_expected_tuple_shape(self):
         """Preprocess batch and return full model-input tuple contract."""
         host = _Host()
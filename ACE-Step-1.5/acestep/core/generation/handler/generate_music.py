@@ -21,12 +21,12 @@ class GenerateMusicMixin:
 
     def generate_music(
         self,
-        captions: str,
-        lyrics: str,
-        bpm: Optional[int] = None,
-        key_scale: str = "",
-        time_signature: str = "",
-        vocal_language: str = "en",
+        captions: Union[str, List[str]],
+        lyrics: Union[str, List[str]],
+        bpm: Union[Optional[int], List[Optional[int]]] = None,
+        key_scale: Union[str, List[str]] = "",
+        time_signature: Union[str, List[str]] = "",
+        vocal_language: Union[str, List[str]] = "en",
         inference_steps: int = 8,
         guidance_scale: float = 7.0,
         use_random_seed: bool = True,
@@ -38,7 +38,7 @@ class GenerateMusicMixin:
         audio_code_string: Union[str, List[str]] = "",
         repainting_start: float = 0.0,
         repainting_end: Optional[float] = None,
-        instruction: str = DEFAULT_DIT_INSTRUCTION,
+        instruction: Union[str, List[str]] = DEFAULT_DIT_INSTRUCTION,
         audio_cover_strength: float = 1.0,
         cover_noise_strength: float = 0.0,
         task_type: str = "text2music",
@@ -52,13 +52,20 @@ class GenerateMusicMixin:
         latent_shift: float = 0.0,
         latent_rescale: float = 1.0,
         progress=None,
+        reference_id: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Generate audio from text/reference inputs and return response payload.
 
         Args:
-            captions: Text prompt describing requested music.
-            lyrics: Lyric text used for conditioning.
+            captions: Text prompt describing requested music, or one prompt
+                per batch item.
+            lyrics: Lyric text used for conditioning, or one text per batch item.
+                ``bpm``, ``key_scale``, ``time_signature``, ``vocal_language``
+                and ``instruction`` accept per-item lists the same way (e.g.
+                one lego instruction per requested track over a shared source).
             reference_audio: Optional reference-audio payload.
+            reference_id: Optional reference-library ID used instead of
+                ``reference_audio``.
             src_audio: Optional source audio for repaint/cover.
             inference_steps: Diffusion step count.
             guidance_scale: CFG guidance value.
@@ -114,6 +121,7 @@ class GenerateMusicMixin:
                 audio_code_string=audio_code_string,
                 actual_batch_size=actual_batch_size,
                 task_type=task_type,
+                reference_id=reference_id,
             )
             if audio_error is not None:
                 return audio_error
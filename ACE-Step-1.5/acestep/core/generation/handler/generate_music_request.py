@@ -48,8 +48,8 @@ class GenerateMusicRequestMixin:
         self,
         task_type: str,
         audio_code_string: Union[str, List[str]],
-        instruction: str,
-    ) -> Tuple[str, str]:
+        instruction: Union[str, List[str]],
+    ) -> Tuple[str, Union[str, List[str]]]:
         """Auto-switch text2music to cover task when audio codes are provided."""
         if task_type == "text2music" and self._has_non_empty_audio_codes(audio_code_string):
             return "cover", TASK_INSTRUCTIONS["cover"]
@@ -90,9 +90,27 @@ class GenerateMusicRequestMixin:
         audio_code_string: Union[str, List[str]],
         actual_batch_size: int,
         task_type: str,
-    ) -> Tuple[Optional[List[List[torch.Tensor]]], Optional[torch.Tensor], Optional[Dict[str, Any]]]:
-        """Prepare reference/source audio tensors and return early error payload when invalid."""
-        if reference_audio is not None:
+        reference_id: Optional[str] = None,
+    ) -> Tuple[Optional[List[List[Any]]], Optional[torch.Tensor], Optional[Dict[str, Any]]]:
+        """Prepare reference/source audio tensors and return early error payload when invalid.
+
+        A ``reference_id`` from the reference library takes the place of
+        ``reference_audio`` and skips loading and VAE-encoding the clip.
+        """
+        if reference_id:
+            if reference_audio is not None:
+                logger.info("[generate_music] reference_id provided, ignoring reference_audio")
+            reference_latent = self.resolve_reference_latent(reference_id)
+            if reference_latent is None:
+                return None, None, {
+                    "audios": [],
+                    "status_message": f"Unknown reference_id '{reference_id}'. Register the reference first.",
+                    "extra_outputs": {},
+                    "success": False,
+                    "error": "Unknown reference_id",
+                }
+            refer_audios = [[reference_latent] for _ in range(actual_batch_size)]
+        elif reference_audio is not None:
             logger.info("[generate_music] Processing reference audio...")
             processed_ref_audio = self.process_reference_audio(reference_audio)
             if processed_ref_audio is None:
@@ -140,13 +158,13 @@ class GenerateMusicRequestMixin:
         actual_batch_size: int,
         processed_src_audio: Optional[torch.Tensor],
         audio_duration: Optional[float],
-        captions: str,
-        lyrics: str,
-        vocal_language: str,
-        instruction: str,
-        bpm: Optional[int],
-        key_scale: str,
-        time_signature: str,
+        captions: Union[str, List[str]],
+        lyrics: Union[str, List[str]],
+        vocal_language: Union[str, List[str]],
+        instruction: Union[str, List[str]],
+        bpm: Union[Optional[int], List[Optional[int]]],
+        key_scale: Union[str, List[str]],
+        time_signature: Union[str, List[str]],
         task_type: str,
         audio_code_string: Union[str, List[str]],
         repainting_start: float,
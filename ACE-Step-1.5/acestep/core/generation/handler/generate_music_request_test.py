@@ -111,6 +111,33 @@ class GenerateMusicRequestMixinTests(unittest.TestCase):
         self.assertFalse(error["success"])
         self.assertEqual(error["error"], "Invalid source audio")
 
+    def test_prepare_reference_uses_library_entry_for_reference_id(self):
+        """A known reference_id replaces the uploaded clip without loading it."""
+        host = _Host()
+        loaded = []
+        host.process_reference_audio = lambda ref: loaded.append(ref)
+        host.resolve_reference_latent = lambda rid: "latent:" + rid if rid == "house" else None
+        refer_audios, _, error = host._prepare_reference_and_source_audio(
+            reference_audio="ignored.wav",
+            src_audio=None,
+            audio_code_string="",
+            actual_batch_size=2,
+            task_type="text2music",
+            reference_id="house",
+        )
+        self.assertIsNone(error)
+        self.assertEqual(refer_audios, [["latent:house"], ["latent:house"]])
+        self.assertEqual(loaded, [])
+        _, _, error = host._prepare_reference_and_source_audio(
+            reference_audio=None,
+            src_audio=None,
+            audio_code_string="",
+            actual_batch_size=1,
+            task_type="text2music",
+            reference_id="missing",
+        )
+        self.assertEqual(error["error"], "Unknown reference_id")
+
 
 if __name__ == "__main__":
     unittest.main()
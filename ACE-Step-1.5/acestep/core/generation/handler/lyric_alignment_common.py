@@ -70,6 +70,22 @@ class LyricAlignmentCommonMixin:
         pure_lyric_ids = list(raw_lyric_ids[start_idx:end_idx])
         return raw_lyric_ids, pure_lyric_ids, start_idx, end_idx
 
+    def _stack_probed_heads(
+        self, probes: Optional[Dict[int, torch.Tensor]]
+    ) -> Tuple[Optional[torch.Tensor], Dict[int, List[int]]]:
+        """Stack decoder attention probes into the aligner matrix layout.
+
+        Probes already hold only the configured heads, restricted to the lyric
+        keys, so they are concatenated into one pseudo-layer shaped
+        ``[1, B, Heads, Tokens, Frames]`` and paired with a config selecting
+        every head of that layer.
+        """
+        if not probes:
+            return None, {}
+        heads = torch.cat([probes[layer] for layer in probes], dim=1)
+        matrix = heads.transpose(-1, -2).unsqueeze(0)
+        return matrix, {0: list(range(heads.shape[1]))}
+
     def _lyric_timestamp_error(self, message: str) -> Dict[str, Any]:
         """Build the standard timestamp error payload."""
         return {
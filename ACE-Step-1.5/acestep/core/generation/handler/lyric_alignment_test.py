@@ -19,21 +19,27 @@ class _Tokenizer:
         _ = add_special_tokens
         return [1, 2]
 
+    def decode(self, token_ids, skip_special_tokens=False):
+        """Decode ids to letters, with id 10 as a newline."""
+        _ = skip_special_tokens
+        return "".join("\n" if t == 10 else chr(97 + t % 26) for t in token_ids)
+
 
 class _Decoder:
-    """Minimal decoder stub returning configured cross-attention outputs."""
+    """Minimal decoder stub returning configured attention probes."""
 
-    def __init__(self, cross_attns):
+    def __init__(self, probes):
         """Store decoder output tuple index-2 payload."""
-        self._cross_attns = cross_attns
+        self._probes = probes
+        self.calls = []
 
     def eval(self):
         """Mirror torch module API used by score mixin."""
 
     def __call__(self, **kwargs):
-        """Return an output tuple compatible with handler expectations."""
-        _ = kwargs
-        return (None, None, self._cross_attns)
+        """Record call kwargs and return an output tuple compatible with handler expectations."""
+        self.calls.append(kwargs)
+        return (None, None, self._probes)
 
 
 class _Model:
@@ -74,9 +80,10 @@ class LyricAlignmentMixinTests(unittest.TestCase):
 
     def test_get_lyric_timestamp_success(self):
         """Timestamp generation should return successful payload with aligner output."""
-        decoder = _Decoder(cross_attns=[torch.randn(1, 2, 7, 6)])
+        decoder = _Decoder(probes={2: torch.rand(1, 1, 4, 3)})
         host = _Host(decoder=decoder)
         pred, enc, enc_mask, ctx, lyric_ids = self._sample_inputs()
+        seen = {}
 
         class _FakeStampsAligner:
             """Fake aligner used to isolate timestamp mixin behavior."""
@@ -86,7 +93,7 @@ class LyricAlignmentMixinTests(unittest.TestCase):
 
             def stamps_align_info(self, **kwargs):
                 """Return a non-empty calc matrix to simulate valid alignment."""
-                _ = kwargs
+                seen.update(kwargs)
                 return {"calc_matrix": torch.ones(2, 2)}
 
             def get_timestamps_and_lrc(self, **kwargs):
@@ -113,10 +120,16 @@ class LyricAlignmentMixinTests(unittest.TestCase):
         self.assertTrue(result["success"])
         self.assertEqual(result["lrc_text"], "[00:00.00]hello")
         self.assertIsNone(result["error"])
+        call = decoder.calls[0]
+        self.assertEqual(call["attention_probes"], {2: [6]})
+        self.assertEqual(call["attention_probe_span"], (2, 5))
+        self.assertNotIn("output_attentions", call)
+        self.assertEqual(tuple(seen["attention_matrix"].shape), (1, 1, 3, 4))
+        self.assertEqual(seen["custom_config"], {0: [0]})
 
     def test_get_lyric_score_success(self):
         """Score generation should return LM and DiT scores from the scorer output."""
-        decoder = _Decoder(cross_attns=[torch.randn(2, 2, 7, 6)])
+        decoder = _Decoder(probes={2: torch.rand(2, 1, 4, 3), 3: torch.rand(2, 2, 4, 3)})
         host = _Host(decoder=decoder)
         pred, enc, enc_mask, ctx, lyric_ids = self._sample_inputs()
 
@@ -128,13 +141,19 @@ class LyricAlignmentMixinTests(unittest.TestCase):
 
             def lyrics_alignment_info(self, **kwargs):
                 """Return deterministic alignment info for downstream scoring."""
-                _ = kwargs
+                self.assert_layout(kwargs)
                 return {
                     "energy_matrix": torch.ones(2, 2),
                     "type_mask": torch.ones(2, 2),
                     "path_coords": [(0, 0)],
                 }
 
+            @staticmethod
+            def assert_layout(kwargs):
+                """Each half of the doubled batch should carry every probed head."""
+                assert tuple(kwargs["attention_matrix"].shape) == (1, 3, 3, 4)
+                assert kwargs["custom_config"] == {0: [0, 1, 2]}
+
             def calculate_score(self, **kwargs):
                 """Return a stable numeric score for assertions."""
                 _ = kwargs
@@ -158,7 +177,7 @@ class LyricAlignmentMixinTests(unittest.TestCase):
 
     def test_get_lyric_timestamp_returns_error_when_attentions_missing(self):
         """Timestamp generation should fail clearly when decoder returns no attentions."""
-        decoder = _Decoder(cross_attns=None)
+        decoder = _Decoder(probes=None)
         host = _Host(decoder=decoder)
         pred, enc, enc_mask, ctx, lyric_ids = self._sample_inputs()
 
@@ -176,7 +195,7 @@ class LyricAlignmentMixinTests(unittest.TestCase):
 
     def test_get_lyric_score_returns_error_when_attentions_missing(self):
         """Score generation should fail clearly when decoder returns no attentions."""
-        decoder = _Decoder(cross_attns=None)
+        decoder = _Decoder(probes=None)
         host = _Host(decoder=decoder)
         pred, enc, enc_mask, ctx, lyric_ids = self._sample_inputs()
 
@@ -192,5 +211,87 @@ class LyricAlignmentMixinTests(unittest.TestCase):
         self.assertEqual(result["error"], "Model did not return attentions")
 
 
+class DecoderAttentionProbeTests(unittest.TestCase):
+    """Probes on a tiny real DiT decoder must match eager attention weights."""
+
+    def setUp(self):
+        """Build a small decoder and shared forward inputs."""
+        from acestep.models.turbo.configuration_acestep_v15 import AceStepConfig
+        from acestep.models.turbo.modeling_acestep_v15_turbo import AceStepDiTModel
+
+        torch.manual_seed(0)
+        config = AceStepConfig(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=3, num_attention_heads=4,
+            num_key_value_heads=2, head_dim=8, text_hidden_dim=16, in_channels=16 + 8,
+            audio_acoustic_hidden_dim=8, sliding_window=2,
+        )
+        config._attn_implementation = "sdpa"
+        self.decoder = AceStepDiTModel(config).eval()
+        t = torch.full((2,), 0.5)
+        self.inputs = dict(
+            hidden_states=torch.randn(2, 8, 8), timestep=t, timestep_r=t, attention_mask=torch.ones(2, 8),
+            encoder_hidden_states=torch.randn(2, 7, 32), encoder_attention_mask=torch.ones(2, 7),
+            context_latents=torch.randn(2, 8, 16), use_cache=False,
+        )
+
+    def test_probes_match_eager_weights_without_eager_kernel(self):
+        """Probed heads equal the sliced eager weights while attention stays fused."""
+        from acestep.models.turbo import modeling_acestep_v15_turbo as modeling
+
+        with torch.no_grad():
+            full = self.decoder(output_attentions=True, **self.inputs)
+            with patch.object(modeling, "eager_attention_forward", side_effect=AssertionError("eager used")):
+                probed = self.decoder(
+                    attention_probes={0: [1], 1: [0, 3, 9]}, attention_probe_span=(2, 5), **self.inputs
+                )
+
+        torch.testing.assert_close(probed[0], full[0])
+        self.assertEqual(sorted(probed[2]), [0, 1])
+        torch.testing.assert_close(probed[2][0], full[2][0][:, [1], :, 2:5])
+        torch.testing.assert_close(probed[2][1], full[2][1][:, [0, 3], :, 2:5])
+
+    def test_batched_timestamps_match_single_sample_calls(self):
+        """One batched probe pass yields the same LRC as per-sample calls."""
+        host = _Host(decoder=self.decoder)
+        host.custom_layers_config = {0: [1, 2], 2: [3]}
+        eos = 151643
+        lyric_ids = torch.tensor([
+            [1, 2, 11, 12, 10, 13, 14, eos],
+            [1, 2, 15, 10, 16, eos, eos, eos],
+        ])
+        inputs = dict(
+            pred_latent=self.inputs["hidden_states"],
+            encoder_hidden_states=torch.randn(2, 9, 32),
+            encoder_attention_mask=torch.ones(2, 9),
+            context_latents=self.inputs["context_latents"],
+        )
+
+        batch = host.get_lyric_timestamps_batch(
+            lyric_token_ids=lyric_ids, total_duration_seconds=[4.0, 3.0], max_workers=2, **inputs
+        )
+        for i, duration in enumerate((4.0, 3.0)):
+            single = host.get_lyric_timestamp(
+                lyric_token_ids=lyric_ids[i:i + 1],
+                total_duration_seconds=duration,
+                **{key: value[i:i + 1] for key, value in inputs.items()},
+            )
+            self.assertTrue(batch[i]["success"], batch[i]["error"])
+            self.assertEqual(batch[i]["lrc_text"], single["lrc_text"])
+            self.assertEqual(
+                [(s.start, s.end) for s in batch[i]["token_timestamps"]],
+                [(s.start, s.end) for s in single["token_timestamps"]],
+            )
+
+    def test_early_exit_stops_after_last_probed_layer(self):
+        """Early exit returns probes without running the output projection."""
+        with torch.no_grad():
+            full = self.decoder(output_attentions=True, **self.inputs)
+            probed = self.decoder(
+                attention_probes={1: [2]}, attention_probe_span=(0, 7), enable_early_exit=True, **self.inputs
+            )
+        self.assertIsNone(probed[0])
+        torch.testing.assert_close(probed[2][1], full[2][1][:, [2]])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -9,7 +9,7 @@ from acestep.core.generation.handler.lyric_alignment_common import LyricAlignmen
 
 
 class LyricScoreMixin(LyricAlignmentCommonMixin):
-    """Provide LM/DiT lyric alignment scoring from decoder attentions."""
+    """Provide LM/DiT lyric alignment scoring from decoder attention probes."""
 
     @torch.inference_mode()
     def get_lyric_score(
@@ -60,6 +60,10 @@ class LyricScoreMixin(LyricAlignmentCommonMixin):
                 encoder_attention_mask=encoder_attention_mask,
                 context_latents=context_latents,
             )
+            _, pure_lyric_ids, start_idx, end_idx = self._extract_lyric_segment(
+                lyric_token_ids=lyric_token_ids,
+                vocal_language=vocal_language,
+            )
 
             bsz = pred_latent.shape[0]
             if not isinstance(inference_steps, int) or inference_steps <= 0:
@@ -104,38 +108,25 @@ class LyricScoreMixin(LyricAlignmentCommonMixin):
                     past_key_values=None,
                     encoder_attention_mask=encoder_attention_mask_in,
                     context_latents=context_latents_in,
-                    output_attentions=True,
-                    custom_layers_config=custom_layers_config,
+                    attention_probes=custom_layers_config,
+                    attention_probe_span=(start_idx, end_idx),
                     enable_early_exit=True,
                 )
 
             if decoder_outputs[2] is None:
                 return self._lyric_score_error("Model did not return attentions")
 
-            captured_layers = []
-            for layer_attn in decoder_outputs[2]:
-                if layer_attn is None:
-                    continue
-                captured_layers.append(layer_attn.transpose(-1, -2))
-            if not captured_layers:
+            stacked, probe_config = self._stack_probed_heads(decoder_outputs[2])
+            if stacked is None:
                 return self._lyric_score_error("No valid attention layers returned")
-
-            stacked = torch.stack(captured_layers)
-            all_layers_matrix_lm = stacked[:, :bsz, ...]
-            all_layers_matrix_dit = stacked[:, bsz:, ...]
-            if bsz == 1:
-                all_layers_matrix_lm = all_layers_matrix_lm.squeeze(1)
-                all_layers_matrix_dit = all_layers_matrix_dit.squeeze(1)
-
-            _, pure_lyric_ids, start_idx, end_idx = self._extract_lyric_segment(
-                lyric_token_ids=lyric_token_ids,
-                vocal_language=vocal_language,
-            )
-            if start_idx >= all_layers_matrix_lm.shape[-2]:
+            if stacked.shape[-2] == 0:
                 return self._lyric_score_error("Lyrics indices out of bounds")
 
-            pure_matrix_lm = all_layers_matrix_lm[..., start_idx:end_idx, :]
-            pure_matrix_dit = all_layers_matrix_dit[..., start_idx:end_idx, :]
+            pure_matrix_lm = stacked[:, :bsz, ...]
+            pure_matrix_dit = stacked[:, bsz:, ...]
+            if bsz == 1:
+                pure_matrix_lm = pure_matrix_lm.squeeze(1)
+                pure_matrix_dit = pure_matrix_dit.squeeze(1)
 
             from acestep.core.scoring.dit_score import MusicLyricScorer
 
@@ -144,13 +135,13 @@ class LyricScoreMixin(LyricAlignmentCommonMixin):
                 aligner=aligner,
                 matrix=pure_matrix_lm,
                 pure_lyric_ids=pure_lyric_ids,
-                custom_layers_config=custom_layers_config,
+                custom_layers_config=probe_config,
             )
             dit_score = self._calculate_single_lyric_score(
                 aligner=aligner,
                 matrix=pure_matrix_dit,
                 pure_lyric_ids=pure_lyric_ids,
-                custom_layers_config=custom_layers_config,
+                custom_layers_config=probe_config,
             )
             return {
                 "lm_score": lm_score,
@@ -1,6 +1,6 @@
 """Lyric timestamp generation mixin for the main handler."""
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import torch
 from loguru import logger
@@ -9,7 +9,7 @@ from acestep.core.generation.handler.lyric_alignment_common import LyricAlignmen
 
 
 class LyricTimestampMixin(LyricAlignmentCommonMixin):
-    """Provide cross-attention based lyric timestamp generation."""
+    """Provide cross-attention probe based lyric timestamp generation."""
 
     @torch.inference_mode()
     def get_lyric_timestamp(
@@ -62,53 +62,33 @@ class LyricTimestampMixin(LyricAlignmentCommonMixin):
                 encoder_attention_mask=encoder_attention_mask,
                 context_latents=context_latents,
             )
+            _, pure_lyric_ids, start_idx, end_idx = self._extract_lyric_segment(
+                lyric_token_ids=lyric_token_ids,
+                vocal_language=vocal_language,
+            )
             bsz = pred_latent.shape[0]
             if not isinstance(inference_steps, int) or inference_steps <= 0:
                 return self._lyric_timestamp_error(
                     f"inference_steps must be a positive non-zero integer, got {inference_steps!r}"
                 )
 
-            t_last_val = 1.0 / inference_steps
-            t_tensor = torch.tensor([t_last_val] * bsz, device=pred_latent.device, dtype=pred_latent.dtype)
-            noise = self._sample_noise_like(pred_latent, seed)
-            xt = t_last_val * noise + (1.0 - t_last_val) * pred_latent
-            attention_mask = torch.ones(bsz, pred_latent.shape[1], device=pred_latent.device, dtype=pred_latent.dtype)
-
-            with self._load_model_context("model"):
-                decoder_outputs = self.model.decoder(
-                    hidden_states=xt,
-                    timestep=t_tensor,
-                    timestep_r=t_tensor,
-                    attention_mask=attention_mask,
-                    encoder_hidden_states=encoder_hidden_states,
-                    use_cache=False,
-                    past_key_values=None,
-                    encoder_attention_mask=encoder_attention_mask,
-                    context_latents=context_latents,
-                    output_attentions=True,
-                    custom_layers_config=custom_layers_config,
-                    enable_early_exit=True,
-                )
-
-            if decoder_outputs[2] is None:
+            probes = self._probe_timestamp_attention(
+                pred_latent=pred_latent,
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=encoder_attention_mask,
+                context_latents=context_latents,
+                noise=self._sample_noise_like(pred_latent, seed),
+                inference_steps=inference_steps,
+                custom_layers_config=custom_layers_config,
+                probe_span=(start_idx, end_idx),
+            )
+            if probes is None:
                 return self._lyric_timestamp_error("Model did not return attentions")
 
-            captured_layers = []
-            for layer_attn in decoder_outputs[2]:
-                if layer_attn is None:
-                    continue
-                captured_layers.append(layer_attn[:bsz].transpose(-1, -2))
-            if not captured_layers:
+            stacked, probe_config = self._stack_probed_heads(probes)
+            if stacked is None:
                 return self._lyric_timestamp_error("No valid attention layers returned")
-
-            stacked = torch.stack(captured_layers)
-            all_layers_matrix = stacked.squeeze(1) if bsz == 1 else stacked
-
-            _, pure_lyric_ids, start_idx, end_idx = self._extract_lyric_segment(
-                lyric_token_ids=lyric_token_ids,
-                vocal_language=vocal_language,
-            )
-            pure_lyric_matrix = all_layers_matrix[:, :, start_idx:end_idx, :]
+            pure_lyric_matrix = stacked.squeeze(1) if bsz == 1 else stacked
 
             from acestep.core.scoring.dit_alignment import MusicStampsAligner
 
@@ -117,7 +97,7 @@ class LyricTimestampMixin(LyricAlignmentCommonMixin):
                 attention_matrix=pure_lyric_matrix,
                 lyrics_tokens=pure_lyric_ids,
                 total_duration_seconds=total_duration_seconds,
-                custom_config=custom_layers_config,
+                custom_config=probe_config,
                 return_matrices=False,
                 violence_level=2.0,
                 medfilt_width=1,
@@ -145,3 +125,178 @@ class LyricTimestampMixin(LyricAlignmentCommonMixin):
         except Exception:
             logger.exception("[get_lyric_timestamp] Unexpected failure")
             raise
+
+    @torch.inference_mode()
+    def get_lyric_timestamps_batch(
+        self,
+        pred_latent: torch.Tensor,
+        encoder_hidden_states: torch.Tensor,
+        encoder_attention_mask: torch.Tensor,
+        context_latents: torch.Tensor,
+        lyric_token_ids: torch.Tensor,
+        total_duration_seconds: Union[float, Sequence[float]],
+        vocal_language: str = "en",
+        inference_steps: int = 8,
+        seed: int = 42,
+        custom_layers_config: Optional[Dict[int, List[int]]] = None,
+        max_workers: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Generate LRC timestamps for every sample of a batch with one decoder probe pass.
+
+        Each sample gets the same noise as a single-sample :meth:`get_lyric_timestamp`
+        call with ``seed``, consensus denoising runs batched over samples that share a
+        lyric length, and DTW runs in parallel across cores.
+
+        Args:
+            pred_latent (torch.Tensor): Generated latents shaped ``[B, T, D]``.
+            encoder_hidden_states (torch.Tensor): Decoder conditioning states for all samples.
+            encoder_attention_mask (torch.Tensor): Conditioning attention masks.
+            context_latents (torch.Tensor): Context latents aligned to ``pred_latent``.
+            lyric_token_ids (torch.Tensor): Tokenized lyric sequences ``[B, L]`` including header tokens.
+            total_duration_seconds (Union[float, Sequence[float]]): Duration shared by all samples or one per sample.
+            vocal_language (str): Language tag used to locate lyric header boundary.
+            inference_steps (int): Positive diffusion step count for ``t_last``.
+            seed (int): Noise seed applied to each sample.
+            custom_layers_config (Optional[Dict[int, List[int]]]): Optional attention layer/head map.
+            max_workers (Optional[int]): DTW worker threads (defaults to one per CPU).
+
+        Returns:
+            List[Dict[str, Any]]: One :meth:`get_lyric_timestamp` payload per sample.
+
+        Raises:
+            Exception: Unexpected runtime failures are re-raised after logging.
+        """
+        bsz = pred_latent.shape[0]
+        if self.model is None:
+            return [self._lyric_timestamp_error("Model not initialized")] * bsz
+        if not isinstance(inference_steps, int) or inference_steps <= 0:
+            message = f"inference_steps must be a positive non-zero integer, got {inference_steps!r}"
+            return [self._lyric_timestamp_error(message)] * bsz
+        if isinstance(total_duration_seconds, (int, float)):
+            durations = [float(total_duration_seconds)] * bsz
+        else:
+            durations = [float(d) for d in total_duration_seconds]
+
+        custom_layers_config = self._resolve_custom_layers_config(custom_layers_config)
+
+        try:
+            (
+                pred_latent,
+                encoder_hidden_states,
+                encoder_attention_mask,
+                context_latents,
+            ) = self._move_alignment_inputs_to_runtime(
+                pred_latent=pred_latent,
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=encoder_attention_mask,
+                context_latents=context_latents,
+            )
+            segments = [
+                self._extract_lyric_segment(
+                    lyric_token_ids=lyric_token_ids[i:i + 1],
+                    vocal_language=vocal_language,
+                )[1:]
+                for i in range(bsz)
+            ]
+            span_start = min(start for _, start, _ in segments)
+            span_end = max(end for _, _, end in segments)
+            noise = torch.cat(
+                [self._sample_noise_like(pred_latent[i:i + 1], seed) for i in range(bsz)], dim=0
+            )
+
+            probes = self._probe_timestamp_attention(
+                pred_latent=pred_latent,
+                encoder_hidden_states=encoder_hidden_states,
+                encoder_attention_mask=encoder_attention_mask,
+                context_latents=context_latents,
+                noise=noise,
+                inference_steps=inference_steps,
+                custom_layers_config=custom_layers_config,
+                probe_span=(span_start, span_end),
+            )
+            if probes is None:
+                return [self._lyric_timestamp_error("Model did not return attentions")] * bsz
+
+            stacked, probe_config = self._stack_probed_heads(probes)
+            if stacked is None:
+                return [self._lyric_timestamp_error("No valid attention layers returned")] * bsz
+
+            matrices = [
+                stacked[:, i, :, start - span_start:end - span_start, :]
+                for i, (_, start, end) in enumerate(segments)
+            ]
+            lyric_ids = [ids for ids, _, _ in segments]
+
+            from acestep.core.scoring.dit_alignment import MusicStampsAligner
+
+            aligner = MusicStampsAligner(self.text_tokenizer)
+            align_infos = aligner.stamps_align_info_batch(
+                attention_matrices=matrices,
+                lyrics_tokens_list=lyric_ids,
+                total_duration_seconds=durations,
+                custom_config=probe_config,
+                violence_level=2.0,
+                medfilt_width=1,
+            )
+            valid = [i for i, info in enumerate(align_infos) if info.get("calc_matrix") is not None]
+            lrc_results = aligner.get_timestamps_and_lrc_batch(
+                calc_matrices=[align_infos[i]["calc_matrix"] for i in valid],
+                lyrics_tokens_list=[lyric_ids[i] for i in valid],
+                total_duration_seconds=[durations[i] for i in valid],
+                max_workers=max_workers,
+            )
+
+            results = [
+                self._lyric_timestamp_error(info.get("error", "Failed to process attention matrix"))
+                for info in align_infos
+            ]
+            for i, result in zip(valid, lrc_results):
+                results[i] = {
+                    "lrc_text": result["lrc_text"],
+                    "sentence_timestamps": result["sentence_timestamps"],
+                    "token_timestamps": result["token_timestamps"],
+                    "success": True,
+                    "error": None,
+                }
+            return results
+        except (ValueError, KeyError, RuntimeError, OSError) as exc:
+            logger.exception("[get_lyric_timestamps_batch] Failed")
+            return [self._lyric_timestamp_error(f"Error generating timestamps: {exc}")] * bsz
+        except Exception:
+            logger.exception("[get_lyric_timestamps_batch] Unexpected failure")
+            raise
+
+    def _probe_timestamp_attention(
+        self,
+        pred_latent: torch.Tensor,
+        encoder_hidden_states: torch.Tensor,
+        encoder_attention_mask: torch.Tensor,
+        context_latents: torch.Tensor,
+        noise: torch.Tensor,
+        inference_steps: int,
+        custom_layers_config: Dict[int, List[int]],
+        probe_span: tuple,
+    ) -> Optional[Dict[int, torch.Tensor]]:
+        """Run one decoder pass at ``t_last`` and return the lyric-span attention probes."""
+        bsz = pred_latent.shape[0]
+        t_last_val = 1.0 / inference_steps
+        t_tensor = torch.tensor([t_last_val] * bsz, device=pred_latent.device, dtype=pred_latent.dtype)
+        xt = t_last_val * noise + (1.0 - t_last_val) * pred_latent
+        attention_mask = torch.ones(bsz, pred_latent.shape[1], device=pred_latent.device, dtype=pred_latent.dtype)
+
+        with self._load_model_context("model"):
+            decoder_outputs = self.model.decoder(
+                hidden_states=xt,
+                timestep=t_tensor,
+                timestep_r=t_tensor,
+                attention_mask=attention_mask,
+                encoder_hidden_states=encoder_hidden_states,
+                use_cache=False,
+                past_key_values=None,
+                encoder_attention_mask=encoder_attention_mask,
+                context_latents=context_latents,
+                attention_probes=custom_layers_config,
+                attention_probe_span=probe_span,
+                enable_early_exit=True,
+            )
+        return decoder_outputs[2]
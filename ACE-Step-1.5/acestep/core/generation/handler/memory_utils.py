@@ -6,7 +6,11 @@ from typing import Optional
 import torch
 from loguru import logger
 
-from acestep.gpu_config import get_effective_free_vram_gb, get_global_gpu_config
+from acestep.gpu_config import (
+    get_calibrated_max_batch_size,
+    get_effective_free_vram_gb,
+    get_global_gpu_config,
+)
 
 
 class MemoryUtilsMixin:
@@ -133,13 +137,27 @@ class MemoryUtilsMixin:
             return batch_size
 
         duration_sec = float(audio_duration) if audio_duration and float(audio_duration) > 0 else 60.0
+        safety_margin_gb = 1.5
+
+        # Prefer the traced per-model profile (scripts/calibrate_vram.py) over the heuristic below.
+        profile_model_name = os.path.basename(str(getattr(self, "config_path", "") or "").rstrip("/\\"))
+        calibrated_batch = get_calibrated_max_batch_size(
+            profile_model_name, duration_sec, free_gb - safety_margin_gb, max_batch=batch_size
+        )
+        if calibrated_batch is not None:
+            if calibrated_batch < batch_size:
+                logger.warning(
+                    f"[VRAM guard] Calibrated profile for {profile_model_name}: free VRAM {free_gb:.1f} GB fits "
+                    f"{calibrated_batch} samples (requested {batch_size}). Reducing batch_size."
+                )
+            return calibrated_batch
+
         per_sample_gb = 0.5 + max(0.0, 0.15 * (duration_sec - 60.0) / 60.0)
         if hasattr(self, "model") and self.model is not None:
             model_name = getattr(self, "config_path", "") or ""
             if "base" in model_name.lower():
                 per_sample_gb *= 2.0
 
-        safety_margin_gb = 1.5
         available_for_batch = free_gb - safety_margin_gb
         if available_for_batch <= 0:
             logger.warning(f"[VRAM guard] Only {free_gb:.1f} GB free — reducing batch_size to 1")
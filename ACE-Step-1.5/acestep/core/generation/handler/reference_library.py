@@ -0,0 +1,245 @@
+"""Persistent library of VAE-encoded reference-timbre latents.
+
+``infer_refer_latent`` VAE-encodes reference clips on every request, and its
+per-call cache cannot help across requests.  Registering a clip once stores
+its ``tiled_encode`` latent on disk under a reference ID; requests pass that
+ID instead of re-uploading the audio, and hot entries are kept in an
+in-memory LRU.
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+from loguru import logger
+
+DEFAULT_REFERENCE_CACHE_SIZE = 8
+_REFERENCE_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+_SUFFIX = ".safetensors"
+
+
+class ReferenceLatent:
+    """Precomputed ``[1, T, D]`` reference latent standing in for a reference clip.
+
+    It travels through ``refer_audios`` like an audio tensor; ``to`` keeps the
+    device/dtype moves of the batch preparation working.
+    """
+
+    def __init__(self, latent: torch.Tensor, reference_id: Optional[str] = None):
+        """Wrap ``latent`` (``[T, D]`` or ``[1, T, D]``)."""
+        self.latent = latent.unsqueeze(0) if latent.dim() == 2 else latent
+        self.reference_id = reference_id
+
+    def to(self, *args, **kwargs) -> "ReferenceLatent":
+        """Return a copy with the latent moved like ``torch.Tensor.to``."""
+        return ReferenceLatent(self.latent.to(*args, **kwargs), self.reference_id)
+
+
+def is_valid_reference_id(reference_id: Any) -> bool:
+    """Return whether ``reference_id`` is safe to use as a file name."""
+    return isinstance(reference_id, str) and bool(_REFERENCE_ID_RE.match(reference_id))
+
+
+class ReferenceLibrary:
+    """Thread-safe on-disk store of reference latents with an in-memory LRU.
+
+    Each entry is ``<root>/<reference_id>.safetensors`` holding a ``latent``
+    tensor ``[T, D]``; name, source file and creation time are kept in the
+    safetensors metadata so listing never loads tensors.
+    """
+
+    def __init__(self, root: str, cache_size: int = DEFAULT_REFERENCE_CACHE_SIZE):
+        """Create a library under ``root`` keeping ``cache_size`` latents in memory."""
+        self.root = root
+        self.cache_size = max(0, int(cache_size))
+        self._cache: "OrderedDict[str, torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, default_root: str) -> "ReferenceLibrary":
+        """Build a library from ``ACESTEP_REFERENCE_DIR`` and ``ACESTEP_REFERENCE_CACHE_SIZE``."""
+        root = os.getenv("ACESTEP_REFERENCE_DIR") or default_root
+        try:
+            cache_size = int(os.getenv("ACESTEP_REFERENCE_CACHE_SIZE", str(DEFAULT_REFERENCE_CACHE_SIZE)))
+        except ValueError:
+            cache_size = DEFAULT_REFERENCE_CACHE_SIZE
+        return cls(root, cache_size)
+
+    def _path(self, reference_id: str) -> str:
+        """Return the file backing ``reference_id``."""
+        if not is_valid_reference_id(reference_id):
+            raise ValueError(f"Invalid reference_id: {reference_id!r}")
+        return os.path.join(self.root, reference_id + _SUFFIX)
+
+    def _remember(self, reference_id: str, latent: torch.Tensor) -> None:
+        """Insert ``latent`` into the LRU; caller holds the lock."""
+        if self.cache_size == 0:
+            return
+        self._cache[reference_id] = latent
+        self._cache.move_to_end(reference_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def add(
+        self,
+        latent: torch.Tensor,
+        reference_id: Optional[str] = None,
+        name: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Store ``latent`` (``[T, D]`` or ``[1, T, D]``) and return its entry.
+
+        A new ID is generated when ``reference_id`` is omitted; an existing
+        ID is overwritten.
+        """
+        from safetensors.torch import save_file
+
+        if latent.dim() == 3 and latent.shape[0] == 1:
+            latent = latent.squeeze(0)
+        if latent.dim() != 2:
+            raise ValueError(f"reference latent must be [T, D]; got shape={tuple(latent.shape)}")
+        reference_id = reference_id or uuid.uuid4().hex[:12]
+        path = self._path(reference_id)
+        latent = latent.detach().to("cpu").contiguous()
+        metadata = {
+            "name": name or reference_id,
+            "source": source or "",
+            "created_at": str(int(time.time())),
+        }
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        try:
+            save_file({"latent": latent}, tmp_path, metadata=metadata)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._remember(reference_id, latent)
+        logger.info(f"[ReferenceLibrary] Registered reference '{reference_id}' ({latent.shape[0]} latent frames)")
+        return self._entry(reference_id, metadata, latent.shape[0])
+
+    def get(self, reference_id: str) -> Optional[torch.Tensor]:
+        """Return the ``[T, D]`` CPU latent of ``reference_id`` or ``None`` if unknown."""
+        if not is_valid_reference_id(reference_id):
+            return None
+        with self._lock:
+            latent = self._cache.get(reference_id)
+            if latent is not None:
+                self._cache.move_to_end(reference_id)
+                return latent
+        path = self._path(reference_id)
+        if not os.path.isfile(path):
+            return None
+        from safetensors.torch import load_file
+
+        latent = load_file(path)["latent"]
+        with self._lock:
+            self._remember(reference_id, latent)
+        return latent
+
+    def __contains__(self, reference_id: str) -> bool:
+        """Return whether ``reference_id`` is registered."""
+        return is_valid_reference_id(reference_id) and os.path.isfile(self._path(reference_id))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return every registered entry, oldest first."""
+        from safetensors import safe_open
+
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for file_name in os.listdir(self.root):
+            reference_id = file_name[: -len(_SUFFIX)]
+            if not file_name.endswith(_SUFFIX) or not is_valid_reference_id(reference_id):
+                continue
+            try:
+                with safe_open(os.path.join(self.root, file_name), framework="pt") as handle:
+                    metadata = handle.metadata() or {}
+                    frames = handle.get_slice("latent").get_shape()[0]
+            except (OSError, RuntimeError, KeyError) as exc:
+                logger.warning(f"[ReferenceLibrary] Skipping unreadable reference {file_name}: {exc}")
+                continue
+            entries.append(self._entry(reference_id, metadata, frames))
+        entries.sort(key=lambda entry: (entry["created_at"], entry["reference_id"]))
+        return entries
+
+    def delete(self, reference_id: str) -> bool:
+        """Remove ``reference_id``; return whether it existed."""
+        if not is_valid_reference_id(reference_id):
+            return False
+        with self._lock:
+            self._cache.pop(reference_id, None)
+        try:
+            os.remove(self._path(reference_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    @staticmethod
+    def _entry(reference_id: str, metadata: Dict[str, str], frames: int) -> Dict[str, Any]:
+        """Build the public description of one entry."""
+        return {
+            "reference_id": reference_id,
+            "name": metadata.get("name") or reference_id,
+            "source": metadata.get("source") or None,
+            "created_at": int(metadata.get("created_at") or 0),
+            "latent_frames": int(frames),
+        }
+
+
+class ReferenceLibraryMixin:
+    """Handler methods for registering and resolving library references.
+
+    Depends on host members:
+    - Methods: ``process_reference_audio``, ``encode_reference_latent``,
+      ``_load_model_context``, ``_get_project_root``.
+    - Optional attribute: ``reference_library`` (shared instance injected by
+      servers); created lazily from the environment otherwise.
+    """
+
+    def get_reference_library(self) -> ReferenceLibrary:
+        """Return the handler's reference library, creating it on first use."""
+        library = getattr(self, "reference_library", None)
+        if library is None:
+            default_root = os.path.join(self._get_project_root(), ".cache", "acestep", "references")
+            library = ReferenceLibrary.from_env(default_root)
+            self.reference_library = library
+        return library
+
+    def register_reference(
+        self,
+        audio_file: str,
+        reference_id: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Encode ``audio_file`` once and store it in the reference library.
+
+        Returns:
+            ``(entry, None)`` on success, ``(None, error_message)`` otherwise.
+        """
+        if reference_id is not None and not is_valid_reference_id(reference_id):
+            return None, "reference_id must be 1-64 characters of letters, digits, '_', '-' or '.'"
+        if getattr(self, "vae", None) is None:
+            return None, "Model not initialized"
+        refer_audio = self.process_reference_audio(audio_file)
+        if refer_audio is None:
+            return None, "Reference audio is invalid, unreadable, or silent."
+        with self._load_model_context("vae"):
+            latent = self.encode_reference_latent(refer_audio)
+        entry = self.get_reference_library().add(
+            latent, reference_id=reference_id, name=name, source=os.path.basename(audio_file),
+        )
+        return entry, None
+
+    def resolve_reference_latent(self, reference_id: str) -> Optional[ReferenceLatent]:
+        """Return the library latent for ``reference_id`` or ``None`` if unknown."""
+        latent = self.get_reference_library().get(reference_id)
+        if latent is None:
+            return None
+        return ReferenceLatent(latent, reference_id)
@@ -0,0 +1,121 @@
+"""Unit tests for the persistent reference-timbre library."""
+
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+
+import torch
+
+from acestep.core.generation.handler.reference_library import (
+    ReferenceLatent,
+    ReferenceLibrary,
+    ReferenceLibraryMixin,
+)
+
+
+class ReferenceLibraryTests(unittest.TestCase):
+    """Storage, listing, deletion and the in-memory LRU."""
+
+    def setUp(self):
+        """Use a temporary library root."""
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, "references")
+
+    def tearDown(self):
+        """Remove the temporary root."""
+        self._tmp.cleanup()
+
+    def test_add_persists_latent_and_metadata(self):
+        """A fresh library instance reads back what another one stored."""
+        latent = torch.randn(1, 750, 64)
+        entry = ReferenceLibrary(self.root).add(latent, reference_id="house-pad", name="House pad", source="pad.wav")
+        self.assertEqual(entry["reference_id"], "house-pad")
+        self.assertEqual(entry["latent_frames"], 750)
+        reopened = ReferenceLibrary(self.root)
+        self.assertIn("house-pad", reopened)
+        self.assertTrue(torch.equal(reopened.get("house-pad"), latent[0]))
+        listed = reopened.list()
+        self.assertEqual([(e["reference_id"], e["name"], e["source"]) for e in listed], [("house-pad", "House pad", "pad.wav")])
+
+    def test_generated_ids_and_delete(self):
+        """IDs are generated when omitted and deleted entries disappear."""
+        library = ReferenceLibrary(self.root)
+        reference_id = library.add(torch.zeros(10, 4))["reference_id"]
+        self.assertTrue(library.delete(reference_id))
+        self.assertFalse(library.delete(reference_id))
+        self.assertIsNone(library.get(reference_id))
+        self.assertEqual(library.list(), [])
+
+    def test_lru_keeps_hot_entries_in_memory(self):
+        """Only ``cache_size`` latents stay resident; others reload from disk."""
+        library = ReferenceLibrary(self.root, cache_size=1)
+        library.add(torch.zeros(2, 4), reference_id="a")
+        library.add(torch.ones(2, 4), reference_id="b")
+        self.assertEqual(list(library._cache), ["b"])
+        self.assertTrue(torch.equal(library.get("a"), torch.zeros(2, 4)))
+        self.assertEqual(list(library._cache), ["a"])
+
+    def test_rejects_unsafe_ids_and_bad_shapes(self):
+        """Path-like IDs and batched latents are refused."""
+        library = ReferenceLibrary(self.root)
+        with self.assertRaises(ValueError):
+            library.add(torch.zeros(2, 4), reference_id="../escape")
+        with self.assertRaises(ValueError):
+            library.add(torch.zeros(2, 3, 4))
+        self.assertIsNone(library.get("../escape"))
+        self.assertNotIn("../escape", library)
+
+
+class _Host(ReferenceLibraryMixin):
+    """Host with stubbed audio loading and VAE encoding."""
+
+    def __init__(self, root):
+        """Inject a library and count encodes."""
+        self.vae = object()
+        self.reference_library = ReferenceLibrary(root)
+        self.encoded = 0
+
+    @contextmanager
+    def _load_model_context(self, _name):
+        """No offloading in tests."""
+        yield
+
+    def process_reference_audio(self, audio_file):
+        """Return silence-free audio unless the file is marked bad."""
+        return None if audio_file == "bad.wav" else torch.ones(2, 48000)
+
+    def encode_reference_latent(self, _audio):
+        """Return a fixed ``[1, T, D]`` latent."""
+        self.encoded += 1
+        return torch.full((1, 25, 8), 0.5)
+
+
+class ReferenceLibraryMixinTests(unittest.TestCase):
+    """Registering encodes once; resolving reuses the stored latent."""
+
+    def test_register_then_resolve_without_reencoding(self):
+        """The registered latent comes back wrapped for ``infer_refer_latent``."""
+        with tempfile.TemporaryDirectory() as root:
+            host = _Host(root)
+            entry, error = host.register_reference("/tmp/voice.wav", reference_id="voice")
+            self.assertIsNone(error)
+            self.assertEqual(entry["source"], "voice.wav")
+            resolved = host.resolve_reference_latent("voice")
+            self.assertIsInstance(resolved, ReferenceLatent)
+            self.assertEqual(tuple(resolved.latent.shape), (1, 25, 8))
+            self.assertEqual(resolved.to(torch.float16).latent.dtype, torch.float16)
+            self.assertEqual(host.encoded, 1)
+            self.assertIsNone(host.resolve_reference_latent("missing"))
+
+    def test_register_reports_invalid_audio_and_ids(self):
+        """Unreadable clips and unsafe IDs return an error message."""
+        with tempfile.TemporaryDirectory() as root:
+            host = _Host(root)
+            self.assertIsNotNone(host.register_reference("bad.wav")[1])
+            self.assertIsNotNone(host.register_reference("ok.wav", reference_id="a/b")[1])
+            self.assertEqual(host.encoded, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,13 +3,17 @@ DTW and signal-processing utilities shared by DiT scoring modules.
 
 Provides Numba-optimized Dynamic Time Warping and a median filter helper.
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
 import numba
 import numpy as np
 import torch
 import torch.nn.functional as F
 
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, nogil=True)
 def dtw_cpu(x: np.ndarray):
     """
     Dynamic Time Warping algorithm optimized with Numba.
@@ -45,7 +49,7 @@ def dtw_cpu(x: np.ndarray):
     return _backtrace(trace, N, M)
 
 
-@numba.jit(nopython=True)
+@numba.jit(nopython=True, nogil=True)
 def _backtrace(trace: np.ndarray, N: int, M: int):
     """
     Optimized backtrace function for DTW.
@@ -87,6 +91,30 @@ def _backtrace(trace: np.ndarray, N: int, M: int):
     return path[:, path_idx + 1:max_path_len]
 
 
+def dtw_cpu_batch(cost_matrices: Sequence[np.ndarray], max_workers: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Run :func:`dtw_cpu` on several cost matrices in parallel.
+
+    The Numba kernels release the GIL, so a thread pool spreads independent
+    alignments across cores without copying the matrices.
+
+    Args:
+        cost_matrices: Cost matrices, each of shape [N_i, M_i]
+        max_workers: Worker threads (defaults to one per CPU, capped by the batch)
+
+    Returns:
+        List of path arrays as returned by :func:`dtw_cpu`, in input order
+    """
+    matrices = [np.ascontiguousarray(m) for m in cost_matrices]
+    if len(matrices) <= 1:
+        return [dtw_cpu(m) for m in matrices]
+    workers = min(len(matrices), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [dtw_cpu(m) for m in matrices]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(dtw_cpu, matrices))
+
+
 def median_filter(x: torch.Tensor, filter_width: int) -> torch.Tensor:
     """
     Apply median filter to tensor.
@@ -9,9 +9,25 @@ import numpy as np
 import torch
 import torch.nn.functional as F
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 
-from acestep.core.scoring._dtw import dtw_cpu, median_filter
+from acestep.core.scoring._dtw import dtw_cpu, dtw_cpu_batch, median_filter
+from acestep.core.scoring.token_spans import decode_token_pieces
+
+
+def _median(x: torch.Tensor, dim: int) -> torch.Tensor:
+    """
+    Median along *dim* (keepdim), equal to ``torch.quantile(x, 0.5, dim)``.
+
+    Sort-based so it also works past ``torch.quantile``'s input size limit,
+    which batched attention stacks easily exceed.
+    """
+    n = x.shape[dim]
+    ordered = x.sort(dim=dim).values
+    pos = (n - 1) * 0.5
+    low = int(pos)
+    high = min(low + 1, n - 1)
+    return torch.lerp(ordered.narrow(dim, low, 1), ordered.narrow(dim, high, 1), pos - low)
 
 
 # ================= Data Classes =================
@@ -52,22 +68,25 @@ class MusicStampsAligner:
         """
         self.tokenizer = tokenizer
 
-    def _apply_bidirectional_consensus(
+    def _consensus_batch(
         self,
         weights_stack: torch.Tensor,
         violence_level: float,
         medfilt_width: int
     ) -> tuple:
         """
-        Core denoising logic using bidirectional consensus.
+        Bidirectional consensus denoising over a batch of same-shaped samples.
+
+        Every statistic (medians, z-score) is taken per sample, so a sample's
+        result does not depend on the rest of the batch.
 
         Args:
-            weights_stack: Attention weights [Heads, Tokens, Frames]
+            weights_stack: Attention weights [Samples, Heads, Tokens, Frames]
             violence_level: Denoising strength coefficient
             medfilt_width: Median filter width
 
         Returns:
-            Tuple of (calc_matrix, energy_matrix) as numpy arrays
+            Tuple of (calc_matrix, energy_matrix) tensors [Samples, Tokens, Frames]
         """
         # A. Bidirectional Consensus
         row_prob = F.softmax(weights_stack, dim=-1)  # Token -> Frame
@@ -75,12 +94,12 @@ class MusicStampsAligner:
         processed = row_prob * col_prob
 
         # 1. Row suppression (kill horizontal crossing lines)
-        row_medians = torch.quantile(processed, 0.5, dim=-1, keepdim=True)
+        row_medians = _median(processed, dim=-1)
         processed = processed - (violence_level * row_medians)
         processed = torch.relu(processed)
 
         # 2. Column suppression (kill vertical crossing lines)
-        col_medians = torch.quantile(processed, 0.5, dim=-2, keepdim=True)
+        col_medians = _median(processed, dim=-2)
         processed = processed - (violence_level * col_medians)
         processed = torch.relu(processed)
 
@@ -88,36 +107,58 @@ class MusicStampsAligner:
         processed = processed ** 2
 
         # Energy matrix for confidence
-        energy_matrix = processed.mean(dim=0).cpu().numpy()
+        energy_matrix = processed.mean(dim=1)
 
-        # D. Z-Score normalization
-        std, mean = torch.std_mean(processed, unbiased=False)
+        # D. Z-Score normalization (per sample)
+        std, mean = torch.std_mean(processed, dim=(1, 2, 3), unbiased=False, keepdim=True)
         weights_processed = (processed - mean) / (std + 1e-9)
 
         # E. Median filtering
-        weights_processed = median_filter(weights_processed, filter_width=medfilt_width)
-        calc_matrix = weights_processed.mean(dim=0).numpy()
+        n_samples, n_heads, n_tokens, n_frames = weights_processed.shape
+        filtered = median_filter(
+            weights_processed.reshape(n_samples * n_heads, n_tokens, n_frames), filter_width=medfilt_width
+        )
+        weights_processed = filtered.reshape(n_samples, n_heads, n_tokens, -1)
+        calc_matrix = weights_processed.mean(dim=1)
 
         return calc_matrix, energy_matrix
 
-    def _preprocess_attention(
+    def _apply_bidirectional_consensus(
         self,
-        attention_matrix: torch.Tensor,
-        custom_config: Dict[int, List[int]],
+        weights_stack: torch.Tensor,
         violence_level: float,
-        medfilt_width: int = 7
+        medfilt_width: int
     ) -> tuple:
         """
-        Preprocess attention matrix for alignment.
+        Core denoising logic using bidirectional consensus.
+
+        Args:
+            weights_stack: Attention weights [Heads, Tokens, Frames]
+            violence_level: Denoising strength coefficient
+            medfilt_width: Median filter width
+
+        Returns:
+            Tuple of (calc_matrix, energy_matrix) as numpy arrays
+        """
+        calc_matrix, energy_matrix = self._consensus_batch(
+            weights_stack.unsqueeze(0), violence_level, medfilt_width
+        )
+        return calc_matrix[0].numpy(), energy_matrix[0].cpu().numpy()
+
+    def _select_heads(
+        self,
+        attention_matrix: torch.Tensor,
+        custom_config: Dict[int, List[int]]
+    ) -> Optional[torch.Tensor]:
+        """
+        Stack the configured heads of one attention matrix.
 
         Args:
             attention_matrix: Attention tensor [Layers, Heads, Tokens, Frames]
             custom_config: Dict mapping layer indices to head indices
-            violence_level: Denoising strength
-            medfilt_width: Median filter width
 
         Returns:
-            Tuple of (calc_matrix, energy_matrix, visual_matrix)
+            Float CPU tensor [Heads, Tokens, Frames], or None if no head matched
         """
         if not isinstance(attention_matrix, torch.Tensor):
             weights = torch.tensor(attention_matrix)
@@ -134,10 +175,33 @@ class MusicStampsAligner:
                     selected_tensors.append(head_matrix)
 
         if not selected_tensors:
-            return None, None, None
+            return None
+        return torch.stack(selected_tensors, dim=0)
+
+    def _preprocess_attention(
+        self,
+        attention_matrix: torch.Tensor,
+        custom_config: Dict[int, List[int]],
+        violence_level: float,
+        medfilt_width: int = 7
+    ) -> tuple:
+        """
+        Preprocess attention matrix for alignment.
 
+        Args:
+            attention_matrix: Attention tensor [Layers, Heads, Tokens, Frames]
+            custom_config: Dict mapping layer indices to head indices
+            violence_level: Denoising strength
+            medfilt_width: Median filter width
+
+        Returns:
+            Tuple of (calc_matrix, energy_matrix, visual_matrix)
+        """
         # Stack selected heads: [Heads, Tokens, Frames]
-        weights_stack = torch.stack(selected_tensors, dim=0)
+        weights_stack = self._select_heads(attention_matrix, custom_config)
+        if weights_stack is None:
+            return None, None, None
+
         visual_matrix = weights_stack.mean(dim=0).numpy()
 
         calc_matrix, energy_matrix = self._apply_bidirectional_consensus(
@@ -196,14 +260,69 @@ class MusicStampsAligner:
 
         return return_dict
 
+    def stamps_align_info_batch(
+        self,
+        attention_matrices: Sequence[torch.Tensor],
+        lyrics_tokens_list: Sequence[List[int]],
+        total_duration_seconds: Sequence[float],
+        custom_config: Dict[int, List[int]],
+        violence_level: float = 2.0,
+        medfilt_width: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched :meth:`stamps_align_info` for several samples.
+
+        Samples whose selected heads have the same shape (e.g. a batch sharing
+        one lyric) are denoised together in one set of tensor ops; results are
+        identical to calling :meth:`stamps_align_info` per sample.
+
+        Args:
+            attention_matrices: Per-sample cross-attention [Layers, Heads, Tokens, Frames]
+            lyrics_tokens_list: Per-sample lyrics token IDs
+            total_duration_seconds: Per-sample audio durations in seconds
+            custom_config: Dict mapping layer indices to head indices
+            violence_level: Denoising strength
+            medfilt_width: Median filter width
+
+        Returns:
+            List of dicts shaped like :meth:`stamps_align_info` results
+        """
+        results: List[Dict[str, Any]] = []
+        groups: Dict[tuple, List[int]] = {}
+        stacks: List[Optional[torch.Tensor]] = []
+        for idx, (matrix, tokens, duration) in enumerate(
+            zip(attention_matrices, lyrics_tokens_list, total_duration_seconds)
+        ):
+            stack = self._select_heads(matrix, custom_config)
+            stacks.append(stack)
+            results.append({
+                "calc_matrix": None,
+                "lyrics_tokens": tokens,
+                "total_duration_seconds": duration,
+            })
+            if stack is None:
+                results[-1]["error"] = "No valid attention heads found"
+            else:
+                groups.setdefault(tuple(stack.shape), []).append(idx)
+
+        for indices in groups.values():
+            calc_matrix, _ = self._consensus_batch(
+                torch.stack([stacks[i] for i in indices]), violence_level, medfilt_width
+            )
+            calc_matrix = calc_matrix.numpy()
+            for row, idx in enumerate(indices):
+                results[idx]["calc_matrix"] = calc_matrix[row]
+
+        return results
+
     def _decode_tokens_incrementally(self, token_ids: List[int]) -> List[str]:
         """
-        Decode tokens incrementally to properly handle multi-byte UTF-8 characters.
+        Decode the text each token contributes, handling multi-byte UTF-8 characters.
 
         For Chinese and other multi-byte characters, the tokenizer may split them
         into multiple byte-level tokens. Decoding each token individually produces
-        invalid UTF-8 sequences (showing as \ufffd). This method uses byte-level comparison
-        to correctly track which characters each token contributes.
+        invalid UTF-8 sequences (showing as \ufffd). Token bytes are streamed in a
+        single pass instead, and a token gets the characters it completes.
 
         Args:
             token_ids: List of token IDs
@@ -211,31 +330,7 @@ class MusicStampsAligner:
         Returns:
             List of decoded text for each token position
         """
-        decoded_tokens = []
-        prev_bytes = b""
-
-        for i in range(len(token_ids)):
-            # Decode tokens from start to current position
-            current_text = self.tokenizer.decode(token_ids[:i+1], skip_special_tokens=False)
-            current_bytes = current_text.encode('utf-8', errors='surrogatepass')
-
-            # The contribution of current token is the new bytes added
-            if len(current_bytes) >= len(prev_bytes):
-                new_bytes = current_bytes[len(prev_bytes):]
-                # Try to decode the new bytes; if incomplete, use empty string
-                try:
-                    token_text = new_bytes.decode('utf-8')
-                except UnicodeDecodeError:
-                    # Incomplete UTF-8 sequence, this token doesn't complete a character
-                    token_text = ""
-            else:
-                # Edge case: current decode is shorter (shouldn't happen normally)
-                token_text = ""
-
-            decoded_tokens.append(token_text)
-            prev_bytes = current_bytes
-
-        return decoded_tokens
+        return decode_token_pieces(token_ids, self.tokenizer)
 
     def token_timestamps(
         self,
@@ -254,9 +349,31 @@ class MusicStampsAligner:
         Returns:
             List of TokenTimestamp objects
         """
-        n_frames = calc_matrix.shape[-1]
-        text_indices, time_indices = dtw_cpu(-calc_matrix.astype(np.float64))
+        path = dtw_cpu(-calc_matrix.astype(np.float64))
+        return self._token_timestamps_from_path(
+            path, calc_matrix.shape[-1], lyrics_tokens, total_duration_seconds
+        )
+
+    def _token_timestamps_from_path(
+        self,
+        path: np.ndarray,
+        n_frames: int,
+        lyrics_tokens: List[int],
+        total_duration_seconds: float
+    ) -> List[TokenTimestamp]:
+        """
+        Convert a DTW path into per-token timestamps.
+
+        Args:
+            path: DTW path [2, Steps] of (text index, frame index)
+            n_frames: Number of attention frames
+            lyrics_tokens: List of token IDs
+            total_duration_seconds: Total audio duration
 
+        Returns:
+            List of TokenTimestamp objects
+        """
+        text_indices, time_indices = path
         seconds_per_frame = total_duration_seconds / n_frames
         alignment_results = []
 
@@ -408,6 +525,17 @@ class MusicStampsAligner:
 
         return "\n".join(lines)
 
+    def _timestamps_and_lrc_from_tokens(self, token_stamps: List[TokenTimestamp]) -> Dict[str, Any]:
+        """Group token timestamps into sentences and format the LRC payload."""
+        sentence_stamps = self.sentence_timestamps(token_stamps)
+        lrc_text = self.format_lrc(sentence_stamps)
+
+        return {
+            "token_timestamps": token_stamps,
+            "sentence_timestamps": sentence_stamps,
+            "lrc_text": lrc_text
+        }
+
     def get_timestamps_and_lrc(
         self,
         calc_matrix: np.ndarray,
@@ -431,11 +559,35 @@ class MusicStampsAligner:
             total_duration_seconds=total_duration_seconds
         )
 
-        sentence_stamps = self.sentence_timestamps(token_stamps)
-        lrc_text = self.format_lrc(sentence_stamps)
+        return self._timestamps_and_lrc_from_tokens(token_stamps)
 
-        return {
-            "token_timestamps": token_stamps,
-            "sentence_timestamps": sentence_stamps,
-            "lrc_text": lrc_text
-        }
+    def get_timestamps_and_lrc_batch(
+        self,
+        calc_matrices: Sequence[np.ndarray],
+        lyrics_tokens_list: Sequence[List[int]],
+        total_duration_seconds: Sequence[float],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batched :meth:`get_timestamps_and_lrc`; DTW runs in parallel across cores.
+
+        Args:
+            calc_matrices: Per-sample processed attention matrices
+            lyrics_tokens_list: Per-sample token IDs
+            total_duration_seconds: Per-sample audio durations
+            max_workers: DTW worker threads (defaults to one per CPU)
+
+        Returns:
+            List of dicts shaped like :meth:`get_timestamps_and_lrc` results
+        """
+        paths = dtw_cpu_batch(
+            [-np.asarray(m).astype(np.float64) for m in calc_matrices], max_workers=max_workers
+        )
+        return [
+            self._timestamps_and_lrc_from_tokens(
+                self._token_timestamps_from_path(path, matrix.shape[-1], tokens, duration)
+            )
+            for path, matrix, tokens, duration in zip(
+                paths, calc_matrices, lyrics_tokens_list, total_duration_seconds
+            )
+        ]
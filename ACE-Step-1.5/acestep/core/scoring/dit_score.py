@@ -10,6 +10,7 @@ import torch
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from acestep.core.scoring._dtw import dtw_cpu, median_filter
+from acestep.core.scoring.token_spans import get_token_byte_table
 
 
 class MusicLyricScorer:
@@ -32,7 +33,8 @@ class MusicLyricScorer:
     def _generate_token_type_mask(self, token_ids: List[int]) -> np.ndarray:
         """
         Generate a mask distinguishing lyrics (1) from structural tags (0).
-        Uses self.tokenizer to decode tokens.
+        Brackets are ASCII, so they are looked up in the raw token bytes from
+        the shared per-tokenizer byte table.
 
         Args:
             token_ids: List of token IDs.
@@ -40,16 +42,17 @@ class MusicLyricScorer:
         Returns:
             Numpy array of shape [len(token_ids)] with 1 or 0.
         """
-        decoded_tokens = [self.tokenizer.decode([tid]) for tid in token_ids]
+        table = get_token_byte_table(self.tokenizer)
         mask = np.ones(len(token_ids), dtype=np.int32)
         in_bracket = False
 
-        for i, token_str in enumerate(decoded_tokens):
-            if '[' in token_str:
+        for i, tid in enumerate(token_ids):
+            token_bytes = table[tid]
+            if b'[' in token_bytes:
                 in_bracket = True
             if in_bracket:
                 mask[i] = 0
-            if ']' in token_str:
+            if b']' in token_bytes:
                 in_bracket = False
                 mask[i] = 0
         return mask
@@ -113,6 +113,23 @@ def _load_scoring_model_context(llm_handler):
                 torch.mps.empty_cache()
 
 
+def _resolve_scoring_device(llm_handler, model):
+    """
+    Return the device scoring inputs should be placed on.
+
+    The model may currently be on CPU if offload_to_cpu is active --
+    _load_scoring_model_context will move it to the accelerator before the
+    forward pass, so inputs go to the handler's target device.
+    """
+    backend = getattr(llm_handler, "llm_backend", "pt")
+    if backend == "pt":
+        return llm_handler.device
+    # For vllm/mlx the scoring model may be on CPU right now;
+    # use the handler's target device so tensors land on the right device
+    # once the model is moved there by the context manager.
+    return llm_handler.device if hasattr(llm_handler, "device") else next(model.parameters()).device
+
+
 def _get_logits_and_target_for_scoring(llm_handler, formatted_prompt: str,
                                        target_text: str) -> Tuple[torch.Tensor, torch.Tensor]:
     """
@@ -128,18 +145,7 @@ def _get_logits_and_target_for_scoring(llm_handler, formatted_prompt: str,
     """
     model = llm_handler.get_hf_model_for_scoring()
     tokenizer = llm_handler.llm_tokenizer
-
-    # Determine the device the model is *currently* on (it may be on CPU
-    # if offload_to_cpu is active -- _load_scoring_model_context will move
-    # it to the accelerator before the forward pass).
-    backend = getattr(llm_handler, "llm_backend", "pt")
-    if backend == "pt":
-        device = llm_handler.device
-    else:
-        # For vllm/mlx the scoring model may be on CPU right now;
-        # use the handler's target device so tensors land on the right device
-        # once the model is moved there by the context manager.
-        device = llm_handler.device if hasattr(llm_handler, "device") else next(model.parameters()).device
+    device = _resolve_scoring_device(llm_handler, model)
 
     # 1. Tokenize prompt ONLY to get its length (used for slicing later).
     #    We must ensure special tokens are added to count the offset correctly.
@@ -188,7 +194,23 @@ def _calculate_topk_recall(llm_handler,
     """
     # Use the fixed helper to get aligned logits/labels
     pred_logits, target_ids = _get_logits_and_target_for_scoring(llm_handler, formatted_prompt, target_text)
+    return _topk_recall_from_logits(pred_logits, target_ids, topk=topk)
+
 
+def _topk_recall_from_logits(pred_logits: torch.Tensor,
+                             target_ids: torch.Tensor,
+                             topk: int = 10) -> Tuple[float, Dict[int, float]]:
+    """
+    Compute position-weighted top-k recall from already-aligned logits.
+
+    Args:
+        pred_logits: [target_len, vocab_size] logits predicting each target token.
+        target_ids: [target_len] ground truth token IDs.
+        topk: Number of top candidates considered at each position.
+
+    Returns:
+        Tuple of (average_recall, recall_per_k).
+    """
     if target_ids.shape[0] == 0:
         return 0.0, {}
 
@@ -270,7 +292,15 @@ def _calculate_log_prob(
     Calculate average log probability of target text given prompt.
     """
     pred_logits, target_ids = _get_logits_and_target_for_scoring(llm_handler, formatted_prompt, target_text)
+    return _mean_log_prob_from_logits(pred_logits, target_ids)
 
+
+def _mean_log_prob_from_logits(pred_logits: torch.Tensor, target_ids: torch.Tensor) -> float:
+    """
+    Average log probability of ``target_ids`` under already-aligned logits.
+
+    Returns ``-inf`` when the target span is empty.
+    """
     if target_ids.shape[0] == 0:
         return float('-inf')
 
@@ -394,11 +424,18 @@ def calculate_pmi_score_per_condition(
     temperature: float = 1.0,
     topk: int = 10,
     score_scale: float = 0.1,
+    batched: bool = True,
+    max_batch_tokens: Optional[int] = None,
 ) -> Tuple[Dict[str, float], float, str]:
     """
     Calculate quality score separately for each condition.
     - Metadata: Uses Top-k Recall.
     - Caption/Lyrics: Uses PMI (Normalized).
+
+    When ``batched`` is True (default) all conditional and unconditional
+    target spans are scored together in as few LM forward passes as
+    ``max_batch_tokens`` allows (see ``lm_score_batched``).  ``batched=False``
+    keeps the original one-forward-per-field path.
     """
     if not llm_handler.llm_initialized:
         return {}, 0.0, "❌ LLM not initialized"
@@ -411,41 +448,58 @@ def calculate_pmi_score_per_condition(
 
     formatted_prompt = llm_handler.build_formatted_prompt_for_understanding(audio_codes=audio_codes, is_negative_prompt=False)
     prompt_uncond = llm_handler.build_formatted_prompt_for_understanding(audio_codes="NO USER INPUT", is_negative_prompt=False)
+    # Define which fields use which metric
+    metadata_recall_keys = ['bpm', 'duration', 'genres', 'keyscale', 'language', 'timesignature']
+    metadata_pmi_keys = ['caption']
     try:
-        # 1. Calculate Recall for Metadata Fields
-        if metadata and isinstance(metadata, dict):
-            scores = {}
-            # Define which fields use which metric
-            metadata_recall_keys = ['bpm', 'duration', 'genres', 'keyscale', 'language', 'timesignature']
-            metadata_pmi_keys = ['caption']
-            for key in metadata_recall_keys:
-                if key in metadata and metadata[key] is not None:
-                    recall_metadata = {key: metadata[key]}
-                    field_scores = _calculate_metadata_recall(llm_handler, formatted_prompt, recall_metadata, topk=topk)
-                    scores.update(field_scores)
-
-            # 2. Calculate PMI for Caption
-            for key in metadata_pmi_keys:
-                if key in metadata and metadata[key] is not None:
-                    cot_yaml = yaml.dump({key: metadata[key]}, allow_unicode=True, sort_keys=True).strip()
-                    target_text = f"<think>\n{cot_yaml}\n</think>\n"
-
-                    log_prob_cond = _calculate_log_prob(llm_handler, formatted_prompt, target_text)
-                    log_prob_uncond = _calculate_log_prob(llm_handler, prompt_uncond, target_text)
-
-                    pmi_normalized = pmi_to_normalized_score(log_prob_cond - log_prob_uncond, scale=score_scale)
-                    scores[key] = pmi_normalized
-
-        # 3. Calculate PMI for Lyrics
-        if lyrics:
-            target_text = f"<think>\n</think>\n# Lyric\n{lyrics}\n"
-
-            log_prob_cond = _calculate_log_prob(llm_handler, formatted_prompt, target_text)
-
-            prompt_uncond = llm_handler.build_formatted_prompt_for_understanding(audio_codes="NO USER INPUT", is_negative_prompt=False)
-            log_prob_uncond = _calculate_log_prob(llm_handler, prompt_uncond, target_text)
-
-            scores['lyrics'] = pmi_to_normalized_score(log_prob_cond - log_prob_uncond, scale=score_scale)
+        scores = {}
+        if batched:
+            from acestep.core.scoring.lm_score_batched import (
+                DEFAULT_MAX_BATCH_TOKENS,
+                score_conditions_batched,
+            )
+
+            scores = score_conditions_batched(
+                llm_handler,
+                formatted_prompt,
+                prompt_uncond,
+                metadata,
+                lyrics,
+                recall_keys=metadata_recall_keys,
+                pmi_keys=metadata_pmi_keys,
+                topk=topk,
+                score_scale=score_scale,
+                max_batch_tokens=max_batch_tokens or DEFAULT_MAX_BATCH_TOKENS,
+            )
+        else:
+            # 1. Calculate Recall for Metadata Fields
+            if metadata and isinstance(metadata, dict):
+                for key in metadata_recall_keys:
+                    if key in metadata and metadata[key] is not None:
+                        recall_metadata = {key: metadata[key]}
+                        field_scores = _calculate_metadata_recall(llm_handler, formatted_prompt, recall_metadata, topk=topk)
+                        scores.update(field_scores)
+
+                # 2. Calculate PMI for Caption
+                for key in metadata_pmi_keys:
+                    if key in metadata and metadata[key] is not None:
+                        cot_yaml = yaml.dump({key: metadata[key]}, allow_unicode=True, sort_keys=True).strip()
+                        target_text = f"<think>\n{cot_yaml}\n</think>\n"
+
+                        log_prob_cond = _calculate_log_prob(llm_handler, formatted_prompt, target_text)
+                        log_prob_uncond = _calculate_log_prob(llm_handler, prompt_uncond, target_text)
+
+                        pmi_normalized = pmi_to_normalized_score(log_prob_cond - log_prob_uncond, scale=score_scale)
+                        scores[key] = pmi_normalized
+
+            # 3. Calculate PMI for Lyrics
+            if lyrics:
+                target_text = f"<think>\n</think>\n# Lyric\n{lyrics}\n"
+
+                log_prob_cond = _calculate_log_prob(llm_handler, formatted_prompt, target_text)
+                log_prob_uncond = _calculate_log_prob(llm_handler, prompt_uncond, target_text)
+
+                scores['lyrics'] = pmi_to_normalized_score(log_prob_cond - log_prob_uncond, scale=score_scale)
 
         if not scores:
             return {}, 0.0, "❌ No conditions to evaluate"
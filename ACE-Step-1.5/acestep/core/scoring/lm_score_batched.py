@@ -0,0 +1,269 @@
+"""
+Batched LM PMI / Metadata Scoring
+
+Packs every condition's conditional and unconditional target spans into
+left-padded batches so that per-field log-likelihoods and top-k recalls
+come from a single LM forward pass (or a few, for long inputs) instead of
+one forward per field and per prompt variant.
+
+Each span is tokenized exactly like the sequential path in
+``lm_score._get_logits_and_target_for_scoring`` so both paths score the
+same token ids; only the forward pass is shared.
+"""
+import inspect
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import torch
+import yaml
+from loguru import logger
+
+from acestep.core.scoring.lm_score import (
+    _load_scoring_model_context,
+    _mean_log_prob_from_logits,
+    _resolve_scoring_device,
+    _topk_recall_from_logits,
+    pmi_to_normalized_score,
+)
+
+# Upper bound on padded tokens (rows * longest row) per forward pass.
+# Inputs exceeding it are split into several forwards.
+DEFAULT_MAX_BATCH_TOKENS = 16384
+
+
+class ScoringSpan(NamedTuple):
+    """One (prompt, target) pair to score with teacher forcing."""
+
+    key: str
+    role: str  # "recall", "cond" or "uncond"
+    prompt: str
+    target_text: str
+
+
+def metadata_target_text(key: str, value: Any) -> str:
+    """Return the ``<think>`` block target used to score a metadata field."""
+    field_yaml = yaml.dump({key: value}, allow_unicode=True, sort_keys=True).strip()
+    return f"<think>\n{field_yaml}\n</think>\n"
+
+
+def lyrics_target_text(lyrics: str) -> str:
+    """Return the lyrics target used for lyrics PMI scoring."""
+    return f"<think>\n</think>\n# Lyric\n{lyrics}\n"
+
+
+def build_condition_spans(
+    formatted_prompt: str,
+    prompt_uncond: str,
+    metadata: Optional[Dict[str, Any]],
+    lyrics: str,
+    recall_keys: Sequence[str],
+    pmi_keys: Sequence[str],
+) -> List[ScoringSpan]:
+    """
+    Build the list of spans needed to score every condition.
+
+    Recall fields contribute one conditional span each; PMI fields (caption,
+    lyrics) contribute a conditional and an unconditional span.  Order
+    matches the sequential scorer so result dicts are built identically.
+    """
+    spans: List[ScoringSpan] = []
+    if metadata and isinstance(metadata, dict):
+        for key in recall_keys:
+            if key in metadata and metadata[key] is not None:
+                spans.append(ScoringSpan(key, "recall", formatted_prompt,
+                                         metadata_target_text(key, metadata[key])))
+        for key in pmi_keys:
+            if key in metadata and metadata[key] is not None:
+                target_text = metadata_target_text(key, metadata[key])
+                spans.append(ScoringSpan(key, "cond", formatted_prompt, target_text))
+                spans.append(ScoringSpan(key, "uncond", prompt_uncond, target_text))
+    if lyrics:
+        target_text = lyrics_target_text(lyrics)
+        spans.append(ScoringSpan("lyrics", "cond", formatted_prompt, target_text))
+        spans.append(ScoringSpan("lyrics", "uncond", prompt_uncond, target_text))
+    return spans
+
+
+def _tokenize_spans(tokenizer, spans: Sequence[ScoringSpan]) -> List[Tuple[List[int], int]]:
+    """
+    Tokenize each span as ``prompt + target`` and return ``(ids, target_len)``.
+
+    Prompt lengths are computed once per distinct prompt, so the shared
+    conditional / unconditional prefixes are only tokenized twice in total.
+    """
+    prompt_lens: Dict[str, int] = {}
+    tokenized = []
+    for span in spans:
+        if span.prompt not in prompt_lens:
+            prompt_ids = tokenizer(span.prompt, return_tensors="pt", add_special_tokens=True)["input_ids"]
+            prompt_lens[span.prompt] = prompt_ids.shape[1]
+        full = tokenizer(span.prompt + span.target_text, return_tensors="pt", padding=False,
+                         truncation=True, add_special_tokens=True)
+        ids = full["input_ids"][0].tolist()
+        tokenized.append((ids, max(len(ids) - prompt_lens[span.prompt], 0)))
+    return tokenized
+
+
+def _pack_batches(lengths: Sequence[int], max_batch_tokens: int) -> List[List[int]]:
+    """
+    Group row indices into batches whose padded size stays within budget.
+
+    Rows are sorted by length so rows sharing a prompt (and therefore a
+    similar length) land in the same batch and padding stays small.  A row
+    longer than the budget still gets a batch of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for idx in order:
+        longest = max([lengths[i] for i in current] + [lengths[idx]])
+        if current and longest * (len(current) + 1) > max_batch_tokens:
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _logits_kwarg(model) -> Optional[str]:
+    """Return the forward kwarg limiting computed logits, if the model has one."""
+    try:
+        params = inspect.signature(model.forward).parameters
+    except (TypeError, ValueError):
+        return None
+    for name in ("logits_to_keep", "num_logits_to_keep"):
+        if name in params:
+            return name
+    return None
+
+
+def _forward_target_logits(
+    model,
+    rows: Sequence[Tuple[List[int], int]],
+    pad_token_id: int,
+    device,
+) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+    """
+    Run one left-padded forward pass and slice each row's target logits.
+
+    Left padding aligns every target span to the right edge, so only the
+    last ``max_target_len + 1`` positions need vocab-sized logits.  Explicit
+    position ids keep each row's positions identical to an unpadded pass.
+
+    Returns:
+        One ``(target_logits, target_ids)`` pair per row, on CPU, in the
+        same layout as ``_get_logits_and_target_for_scoring``.
+    """
+    seq_len = max(len(ids) for ids, _ in rows)
+    input_ids = torch.full((len(rows), seq_len), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(rows), seq_len), dtype=torch.long)
+    for row, (ids, _) in enumerate(rows):
+        input_ids[row, seq_len - len(ids):] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[row, seq_len - len(ids):] = 1
+    position_ids = (attention_mask.cumsum(dim=-1) - 1).clamp(min=0)
+
+    max_target_len = max(target_len for _, target_len in rows)
+    keep = min(max_target_len + 1, seq_len)
+    forward_kwargs = {}
+    logits_kwarg = _logits_kwarg(model)
+    if logits_kwarg is not None:
+        forward_kwargs[logits_kwarg] = keep
+
+    outputs = model(
+        input_ids=input_ids.to(device),
+        attention_mask=attention_mask.to(device),
+        position_ids=position_ids.to(device),
+        **forward_kwargs,
+    )
+    logits = outputs.logits[:, -keep:, :]  # [rows, keep, vocab_size]
+
+    results = []
+    for row, (_, target_len) in enumerate(rows):
+        if target_len == 0:
+            results.append((torch.empty(0), torch.empty(0)))
+            continue
+        target_logits = logits[row, keep - target_len - 1:keep - 1, :].cpu()
+        target_ids = input_ids[row, seq_len - target_len:]
+        results.append((target_logits, target_ids))
+    return results
+
+
+def score_spans_batched(
+    llm_handler,
+    spans: Sequence[ScoringSpan],
+    topk: int = 10,
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> List[float]:
+    """
+    Score spans with as few LM forward passes as the token budget allows.
+
+    Args:
+        llm_handler: Handler exposing ``get_hf_model_for_scoring`` and ``llm_tokenizer``.
+        spans: Spans to score.
+        topk: Top-k used for ``recall`` spans.
+        max_batch_tokens: Maximum padded tokens per forward pass.
+
+    Returns:
+        One value per span: average top-k recall for ``recall`` spans,
+        mean target log probability for ``cond`` / ``uncond`` spans.
+    """
+    if not spans:
+        return []
+
+    model = llm_handler.get_hf_model_for_scoring()
+    tokenizer = llm_handler.llm_tokenizer
+    device = _resolve_scoring_device(llm_handler, model)
+    pad_token_id = getattr(tokenizer, "pad_token_id", None)
+    if pad_token_id is None:
+        pad_token_id = 0
+
+    tokenized = _tokenize_spans(tokenizer, spans)
+    batches = _pack_batches([len(ids) for ids, _ in tokenized], max_batch_tokens)
+
+    values: List[Optional[float]] = [None] * len(spans)
+    with torch.no_grad():
+        with _load_scoring_model_context(llm_handler):
+            for batch in batches:
+                aligned = _forward_target_logits(model, [tokenized[i] for i in batch], pad_token_id, device)
+                for idx, (pred_logits, target_ids) in zip(batch, aligned):
+                    if spans[idx].role == "recall":
+                        values[idx], _ = _topk_recall_from_logits(pred_logits, target_ids, topk=topk)
+                    else:
+                        values[idx] = _mean_log_prob_from_logits(pred_logits, target_ids)
+    logger.debug(f"[scoring] Scored {len(spans)} spans in {len(batches)} forward pass(es)")
+    return values
+
+
+def score_conditions_batched(
+    llm_handler,
+    formatted_prompt: str,
+    prompt_uncond: str,
+    metadata: Optional[Dict[str, Any]],
+    lyrics: str,
+    recall_keys: Sequence[str],
+    pmi_keys: Sequence[str],
+    topk: int = 10,
+    score_scale: float = 0.1,
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+) -> Dict[str, float]:
+    """
+    Batched equivalent of the per-field loop in ``calculate_pmi_score_per_condition``.
+
+    Returns:
+        Dict of per-condition scores in [0, 1]: top-k recall for metadata
+        fields, normalized PMI for caption and lyrics.
+    """
+    spans = build_condition_spans(formatted_prompt, prompt_uncond, metadata, lyrics, recall_keys, pmi_keys)
+    values = score_spans_batched(llm_handler, spans, topk=topk, max_batch_tokens=max_batch_tokens)
+
+    scores: Dict[str, float] = {}
+    cond_log_probs: Dict[str, float] = {}
+    for span, value in zip(spans, values):
+        if span.role == "recall":
+            scores[span.key] = value
+            logger.debug(f"Recall for {span.key}: {value:.4f}")
+        elif span.role == "cond":
+            cond_log_probs[span.key] = value
+        else:
+            scores[span.key] = pmi_to_normalized_score(cond_log_probs[span.key] - value, scale=score_scale)
+    return scores
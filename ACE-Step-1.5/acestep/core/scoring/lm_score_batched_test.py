@@ -0,0 +1,180 @@
+"""Correctness tests comparing batched LM scoring against the per-field path."""
+
+import contextlib
+import unittest
+
+import torch
+from transformers import BatchEncoding, Qwen3Config, Qwen3ForCausalLM
+
+from acestep.core.scoring.lm_score import (
+    _calculate_log_prob,
+    _calculate_topk_recall,
+    calculate_pmi_score_per_condition,
+)
+from acestep.core.scoring.lm_score_batched import (
+    ScoringSpan,
+    _pack_batches,
+    build_condition_spans,
+    score_spans_batched,
+)
+
+_VOCAB_SIZE = 97
+
+
+class _CharTokenizer:
+    """Deterministic character-level tokenizer with a BOS token."""
+
+    pad_token_id = 0
+    bos_token_id = 1
+
+    def __call__(self, text, return_tensors="pt", padding=False, truncation=True, add_special_tokens=True):
+        ids = [self.bos_token_id] if add_special_tokens else []
+        ids += [2 + (ord(ch) % (_VOCAB_SIZE - 2)) for ch in text]
+        input_ids = torch.tensor([ids], dtype=torch.long)
+        return BatchEncoding({"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)})
+
+
+class _FakeLLMHandler:
+    """Minimal stand-in for ``LLMHandler`` driving a tiny random Qwen3 model."""
+
+    def __init__(self):
+        torch.manual_seed(0)
+        config = Qwen3Config(
+            vocab_size=_VOCAB_SIZE,
+            hidden_size=32,
+            intermediate_size=64,
+            num_hidden_layers=2,
+            num_attention_heads=4,
+            num_key_value_heads=2,
+            head_dim=8,
+            max_position_embeddings=512,
+        )
+        self.llm = Qwen3ForCausalLM(config).eval()
+        self.llm_tokenizer = _CharTokenizer()
+        self.llm_initialized = True
+        self.llm_backend = "pt"
+        self.device = "cpu"
+        self.forward_calls = 0
+        original_forward = self.llm.forward
+
+        def counting_forward(*args, **kwargs):
+            self.forward_calls += 1
+            return original_forward(*args, **kwargs)
+
+        self.llm.forward = counting_forward
+
+    def get_hf_model_for_scoring(self):
+        return self.llm
+
+    @contextlib.contextmanager
+    def _load_model_context(self):
+        yield
+
+    def build_formatted_prompt_for_understanding(self, audio_codes, is_negative_prompt=False):
+        return f"<|im_start|>user\n{audio_codes}<|im_end|>\n<|im_start|>assistant\n"
+
+
+def _metadata():
+    return {
+        "bpm": 120,
+        "duration": 30,
+        "genres": "synthwave",
+        "keyscale": "A minor",
+        "language": "en",
+        "timesignature": "4",
+        "caption": "dreamy synthwave with gated drums",
+    }
+
+
+class BatchedScoringEquivalenceTests(unittest.TestCase):
+    """Batched scores must match the sequential per-field scores."""
+
+    def setUp(self):
+        self.handler = _FakeLLMHandler()
+        self.codes = "".join(f"<|audio_code_{i}|>" for i in range(40))
+        self.lyrics = "[Verse]\nNeon lights on the highway\n[Chorus]\nDrive all night"
+
+    def _score(self, batched, **kwargs):
+        return calculate_pmi_score_per_condition(
+            self.handler, self.codes, caption="", lyrics=self.lyrics,
+            metadata=_metadata(), batched=batched, **kwargs,
+        )
+
+    def test_scores_match_sequential_path(self):
+        """Every per-condition score and the global score should agree."""
+        seq_scores, seq_global, _ = self._score(batched=False)
+        bat_scores, bat_global, _ = self._score(batched=True)
+        self.assertEqual(list(seq_scores.keys()), list(bat_scores.keys()))
+        for key, value in seq_scores.items():
+            self.assertAlmostEqual(value, bat_scores[key], places=4, msg=key)
+        self.assertAlmostEqual(seq_global, bat_global, places=4)
+
+    def test_single_forward_when_within_budget(self):
+        """All spans should be scored in exactly one forward pass."""
+        self.handler.forward_calls = 0
+        self._score(batched=True)
+        self.assertEqual(self.handler.forward_calls, 1)
+
+    def test_small_budget_splits_forwards_without_changing_scores(self):
+        """A tight token budget should use several forwards with equal results."""
+        bat_scores, _, _ = self._score(batched=True)
+        self.handler.forward_calls = 0
+        split_scores, _, _ = self._score(batched=True, max_batch_tokens=1)
+        self.assertGreater(self.handler.forward_calls, 1)
+        for key, value in bat_scores.items():
+            self.assertAlmostEqual(value, split_scores[key], places=4, msg=key)
+
+    def test_span_values_match_helpers(self):
+        """Raw span values should equal recall / log-prob from the helpers."""
+        prompt = self.handler.build_formatted_prompt_for_understanding(self.codes)
+        spans = [
+            ScoringSpan("bpm", "recall", prompt, "<think>\nbpm: 120\n</think>\n"),
+            ScoringSpan("caption", "cond", prompt, "<think>\ncaption: calm\n</think>\n"),
+            ScoringSpan("caption", "uncond", "short", "<think>\ncaption: calm\n</think>\n"),
+        ]
+        values = score_spans_batched(self.handler, spans, topk=5)
+        expected_recall, _ = _calculate_topk_recall(self.handler, spans[0].prompt, spans[0].target_text, topk=5)
+        self.assertAlmostEqual(values[0], expected_recall, places=5)
+        for span, value in zip(spans[1:], values[1:]):
+            self.assertAlmostEqual(value, _calculate_log_prob(self.handler, span.prompt, span.target_text), places=4)
+
+
+class BuildConditionSpansTests(unittest.TestCase):
+    """Tests for span planning."""
+
+    def test_pmi_fields_get_cond_and_uncond_spans(self):
+        """Caption and lyrics should each contribute two spans."""
+        spans = build_condition_spans("P", "U", {"bpm": 90, "caption": "c"}, "la la",
+                                      recall_keys=["bpm"], pmi_keys=["caption"])
+        self.assertEqual([(s.key, s.role) for s in spans], [
+            ("bpm", "recall"),
+            ("caption", "cond"), ("caption", "uncond"),
+            ("lyrics", "cond"), ("lyrics", "uncond"),
+        ])
+        self.assertEqual(spans[2].prompt, "U")
+
+    def test_none_values_are_skipped(self):
+        """Fields whose value is None should not be scored."""
+        spans = build_condition_spans("P", "U", {"bpm": None}, "", recall_keys=["bpm"], pmi_keys=[])
+        self.assertEqual(spans, [])
+
+
+class PackBatchesTests(unittest.TestCase):
+    """Tests for token-budget batch packing."""
+
+    def test_all_rows_fit_in_one_batch(self):
+        """Rows within budget should share a single batch."""
+        self.assertEqual(_pack_batches([10, 12, 11], max_batch_tokens=100), [[0, 2, 1]])
+
+    def test_budget_splits_and_keeps_every_row(self):
+        """Every row index should appear exactly once across batches."""
+        batches = _pack_batches([50, 10, 40, 10], max_batch_tokens=60)
+        self.assertGreater(len(batches), 1)
+        self.assertEqual(sorted(i for b in batches for i in b), [0, 1, 2, 3])
+        for batch in batches:
+            if len(batch) > 1:
+                self.assertLessEqual(len(batch) * max([50, 10, 40, 10][i] for i in batch), 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,7 +6,8 @@ import unittest
 import numpy as np
 import torch
 
-from acestep.core.scoring._dtw import dtw_cpu, median_filter
+from acestep.core.scoring._dtw import dtw_cpu, dtw_cpu_batch, median_filter
+from acestep.core.scoring.dit_alignment import MusicStampsAligner, _median
 from acestep.core.scoring.lm_score import (
     pmi_score,
     pmi_to_normalized_score,
@@ -43,6 +44,63 @@ class DtwCpuTests(unittest.TestCase):
         self.assertIn(1, text_idx)
         self.assertEqual(time_idx[-1], 4)
 
+    def test_batch_matches_single_calls(self):
+        """Parallel DTW should return the same paths, in input order."""
+        rng = np.random.default_rng(0)
+        costs = [rng.random((n, m)) for n, m in ((5, 9), (3, 4), (7, 7), (2, 11))]
+        paths = dtw_cpu_batch(costs, max_workers=3)
+        for cost, path in zip(costs, paths):
+            np.testing.assert_array_equal(path, dtw_cpu(cost))
+
+
+class _DigitTokenizer:
+    """Tokenizer stub: id 0 is a newline, other ids map to letters."""
+
+    def decode(self, token_ids, skip_special_tokens=False):
+        """Decode ids to text."""
+        _ = skip_special_tokens
+        return "".join("\n" if t == 0 else chr(96 + t % 26) for t in token_ids)
+
+
+class StampsAlignBatchTests(unittest.TestCase):
+    """Batched alignment must reproduce per-sample results exactly."""
+
+    def test_median_matches_quantile(self):
+        """Sort-based median equals torch.quantile(0.5) along either axis."""
+        x = torch.rand(3, 5, 8) ** 3
+        for dim in (-1, -2):
+            self.assertTrue(torch.equal(_median(x, dim), torch.quantile(x, 0.5, dim=dim, keepdim=True)))
+
+    def test_batch_matches_per_sample(self):
+        """Grouped consensus and parallel DTW give identical LRC per sample."""
+        torch.manual_seed(0)
+        aligner = MusicStampsAligner(_DigitTokenizer())
+        config = {0: [0, 2], 1: [1]}
+        tokens = [[3, 4, 0, 5, 6, 7, 0, 8], [9, 10, 0, 11, 12], [1, 2, 0, 3, 4, 5, 0, 6]]
+        matrices = [torch.rand(2, 3, len(t), 40) for t in tokens]
+        durations = [12.0, 8.0, 12.0]
+
+        infos = aligner.stamps_align_info_batch(matrices, tokens, durations, config, medfilt_width=3)
+        batch = aligner.get_timestamps_and_lrc_batch(
+            [info["calc_matrix"] for info in infos], tokens, durations, max_workers=2
+        )
+        for matrix, ids, duration, info, result in zip(matrices, tokens, durations, infos, batch):
+            single = aligner.stamps_align_info(matrix, ids, duration, config, medfilt_width=3)
+            np.testing.assert_array_equal(info["calc_matrix"], single["calc_matrix"])
+            expected = aligner.get_timestamps_and_lrc(single["calc_matrix"], ids, duration)
+            self.assertEqual(result["lrc_text"], expected["lrc_text"])
+            self.assertEqual(
+                [(s.start, s.end, s.confidence) for s in result["sentence_timestamps"]],
+                [(s.start, s.end, s.confidence) for s in expected["sentence_timestamps"]],
+            )
+
+    def test_missing_heads_reported_per_sample(self):
+        """Samples without configured heads get an error entry, not an exception."""
+        aligner = MusicStampsAligner(_DigitTokenizer())
+        infos = aligner.stamps_align_info_batch([torch.rand(1, 1, 3, 5)], [[1, 2, 3]], [1.0], {4: [0]})
+        self.assertIsNone(infos[0]["calc_matrix"])
+        self.assertIn("error", infos[0])
+
 
 class MedianFilterTests(unittest.TestCase):
     """Tests for the median filter utility."""
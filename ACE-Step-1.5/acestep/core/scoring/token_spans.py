@@ -0,0 +1,165 @@
+"""
+Token-to-Text Span Mapping
+
+Maps lyric token ids to the text each token contributes in a single pass.
+
+Byte-level BPE tokenizers (Qwen, GPT-2) split multi-byte UTF-8 characters
+across tokens, so decoding tokens one at a time yields ``\\ufffd`` and
+re-decoding every prefix is quadratic in lyric length.  Instead, each
+tokenizer gets a byte table (token id -> raw bytes) built once, and the
+token bytes are streamed through a UTF-8 boundary check: a token owns the
+characters whose final byte it emits.
+"""
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_TABLE_CACHE: "weakref.WeakKeyDictionary[Any, TokenByteTable]" = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=1)
+def _byte_decoder() -> Dict[str, int]:
+    """Return the GPT-2 byte-level alphabet mapping (unicode char -> byte)."""
+    printable = (
+        list(range(ord("!"), ord("~") + 1))
+        + list(range(ord("¡"), ord("¬") + 1))
+        + list(range(ord("®"), ord("ÿ") + 1))
+    )
+    chars = printable[:]
+    extra = 0
+    for b in range(256):
+        if b not in printable:
+            printable.append(b)
+            chars.append(256 + extra)
+            extra += 1
+    return {chr(c): b for b, c in zip(printable, chars)}
+
+
+def _utf8_complete_length(buffer: bytes) -> int:
+    """Return the length of the longest prefix of *buffer* that ends on a character boundary."""
+    end = len(buffer)
+    # A UTF-8 character is at most 4 bytes: inspect the last lead byte only.
+    for back in range(1, min(4, end) + 1):
+        byte = buffer[end - back]
+        if byte & 0xC0 == 0x80:
+            continue  # continuation byte
+        if byte < 0x80:
+            needed = 1
+        elif byte & 0xE0 == 0xC0:
+            needed = 2
+        elif byte & 0xF0 == 0xE0:
+            needed = 3
+        elif byte & 0xF8 == 0xF0:
+            needed = 4
+        else:
+            return end  # invalid lead byte; let the decoder replace it
+        return end if back >= needed else end - back
+    return end
+
+
+class TokenByteTable:
+    """Raw bytes of every token id for one tokenizer.
+
+    Byte-level BPE vocabularies are converted up front from their byte
+    alphabet; added/special tokens and non byte-level tokenizers fall back to
+    ``tokenizer.decode([id])`` and are cached on first use.
+    """
+
+    def __init__(self, tokenizer: Any):
+        """
+        Build the table.
+
+        Args:
+            tokenizer: Tokenizer implementing ``decode``; ``get_vocab`` and
+                ``get_added_vocab`` enable the precomputed byte-level table.
+        """
+        self.tokenizer = tokenizer
+        self._bytes: Dict[int, bytes] = {}
+        self.byte_level = False
+
+        get_vocab = getattr(tokenizer, "get_vocab", None)
+        if get_vocab is None:
+            return
+        vocab = get_vocab()
+        decoder = _byte_decoder()
+        if not all(ch in vocab for ch in decoder):
+            return
+        get_added_vocab = getattr(tokenizer, "get_added_vocab", None)
+        added_ids = set(get_added_vocab().values()) if get_added_vocab is not None else set()
+        for token, token_id in vocab.items():
+            if token_id in added_ids:
+                continue
+            try:
+                self._bytes[token_id] = bytes(decoder[ch] for ch in token)
+            except KeyError:
+                continue
+        self.byte_level = True
+
+    def __getitem__(self, token_id: int) -> bytes:
+        """Return the raw bytes emitted by *token_id*."""
+        token_id = int(token_id)
+        data = self._bytes.get(token_id)
+        if data is None:
+            text = self.tokenizer.decode([token_id], skip_special_tokens=False)
+            data = text.encode("utf-8", errors="surrogatepass")
+            self._bytes[token_id] = data
+        return data
+
+
+def get_token_byte_table(tokenizer: Any) -> TokenByteTable:
+    """Return the cached :class:`TokenByteTable` for *tokenizer*."""
+    try:
+        table = _TABLE_CACHE.get(tokenizer)
+    except TypeError:
+        return TokenByteTable(tokenizer)
+    if table is None:
+        table = TokenByteTable(tokenizer)
+        _TABLE_CACHE[tokenizer] = table
+    return table
+
+
+def token_char_spans(
+    token_ids: Sequence[int],
+    tokenizer: Any,
+    table: Optional[TokenByteTable] = None,
+) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Map every token to the ``[start, end)`` character span it completes.
+
+    A token that only emits part of a multi-byte character gets an empty
+    span; the token emitting the final byte owns the whole character.
+
+    Args:
+        token_ids: Token ids to map
+        tokenizer: Tokenizer the ids belong to
+        table: Optional byte table (defaults to the cached one)
+
+    Returns:
+        Tuple of (decoded text, list of per-token character spans)
+    """
+    table = table if table is not None else get_token_byte_table(tokenizer)
+    pieces: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    pending = b""
+    offset = 0
+    for token_id in token_ids:
+        pending += table[token_id]
+        complete = _utf8_complete_length(pending)
+        text = pending[:complete].decode("utf-8", errors="replace")
+        pending = pending[complete:]
+        pieces.append(text)
+        spans.append((offset, offset + len(text)))
+        offset += len(text)
+    if pending:
+        pieces.append(pending.decode("utf-8", errors="replace"))
+    return "".join(pieces), spans
+
+
+def decode_token_pieces(
+    token_ids: Sequence[int],
+    tokenizer: Any,
+    table: Optional[TokenByteTable] = None,
+) -> List[str]:
+    """Return the text contributed by each token (empty for partial characters)."""
+    text, spans = token_char_spans(token_ids, tokenizer, table)
+    return [text[start:end] for start, end in spans]
@@ -0,0 +1,113 @@
+"""Tests for single-pass token-to-text span mapping."""
+
+import unittest
+
+from acestep.core.scoring.dit_score import MusicLyricScorer
+from acestep.core.scoring.token_spans import (
+    TokenByteTable,
+    decode_token_pieces,
+    get_token_byte_table,
+    token_char_spans,
+)
+
+_CORPUS = [
+    "[Verse]\nHello darling, dance with me tonight",
+    "[Chorus]\n我们一起唱歌 夜晚的星星",
+    "日本語の歌詞です 愛してる",
+    "café naïve résumé",
+]
+
+
+def _byte_level_tokenizer():
+    """Train a tiny byte-level BPE so multi-byte characters span several tokens."""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tok = Tokenizer(models.BPE())
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=300,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+        special_tokens=["<|endoftext|>"],
+    )
+    tok.train_from_iterator(_CORPUS * 10, trainer)
+    return PreTrainedTokenizerFast(tokenizer_object=tok)
+
+
+def _prefix_decode_pieces(tokenizer, token_ids):
+    """Reference: the previous quadratic prefix-decoding implementation."""
+    pieces, prev = [], b""
+    for i in range(len(token_ids)):
+        current = tokenizer.decode(token_ids[:i + 1], skip_special_tokens=False).encode("utf-8")
+        try:
+            pieces.append(current[len(prev):].decode("utf-8"))
+        except UnicodeDecodeError:
+            pieces.append("")
+        prev = current
+    return pieces
+
+
+class _CharTokenizer:
+    """Non byte-level tokenizer: one character per token id."""
+
+    def decode(self, token_ids, skip_special_tokens=False):
+        """Map ids straight to code points."""
+        _ = skip_special_tokens
+        return "".join(chr(t) for t in token_ids)
+
+
+class TokenSpanTests(unittest.TestCase):
+    """Span mapping must agree with the tokenizer's own decoding."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Build the shared tokenizer once."""
+        cls.tokenizer = _byte_level_tokenizer()
+
+    def _ids(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def test_byte_level_table_is_precomputed(self):
+        """Byte-level vocabularies are converted without calling decode."""
+        table = TokenByteTable(self.tokenizer)
+        self.assertTrue(table.byte_level)
+        self.assertGreaterEqual(len(table._bytes), 256)
+        self.assertIs(get_token_byte_table(self.tokenizer), get_token_byte_table(self.tokenizer))
+
+    def test_latin_matches_prefix_decoding(self):
+        """Single-byte text gives exactly the previous per-token pieces."""
+        ids = self._ids("[Verse]\nHello darling, café tonight<|endoftext|>")
+        self.assertEqual(decode_token_pieces(ids, self.tokenizer), _prefix_decode_pieces(self.tokenizer, ids))
+
+    def test_cjk_characters_go_to_completing_token(self):
+        """Split characters appear once, on the token that emits their last byte."""
+        ids = self._ids("[Chorus]\n我们一起唱歌 星空")
+        text, spans = token_char_spans(ids, self.tokenizer)
+        self.assertEqual(text, self.tokenizer.decode(ids))
+        pieces = [text[s:e] for s, e in spans]
+        self.assertNotIn("�", "".join(pieces))
+        self.assertIn("", pieces)
+        self.assertEqual(spans[-1][1], len(text))
+
+    def test_token_type_mask_matches_per_token_decode(self):
+        """Bracket detection from raw bytes equals decoding each token."""
+        ids = self._ids("[Verse]\n我们 dance [Chorus]\n星星")
+        mask = MusicLyricScorer(self.tokenizer)._generate_token_type_mask(ids)
+        expected, in_bracket = [], False
+        for tid in ids:
+            piece = self.tokenizer.decode([tid])
+            in_bracket = in_bracket or "[" in piece
+            expected.append(0 if in_bracket else 1)
+            if "]" in piece:
+                in_bracket = False
+        self.assertEqual(mask.tolist(), expected)
+
+    def test_non_byte_level_tokenizer_falls_back_to_decode(self):
+        """Tokenizers without a byte-level vocab decode each id once."""
+        ids = [ord(c) for c in "añ歌"]
+        self.assertEqual(decode_token_pieces(ids, _CharTokenizer()), ["a", "ñ", "歌"])
+
+
+if __name__ == "__main__":
+    unittest.main()
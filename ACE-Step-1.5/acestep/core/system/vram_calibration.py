@@ -0,0 +1,392 @@
+"""Calibrated VRAM profiles traced on fake tensors.
+
+Instead of the hand-tuned constants in ``gpu_config``, the DiT decoder
+forward, the VAE decode and the LM forward are executed under
+``FakeTensorMode``: no memory is allocated and no GPU is needed, but every
+intermediate tensor is seen by a dispatch-mode tracker that records the peak
+bytes held by live activations.  Tracing each component at batch sizes 1 and
+2 over a grid of durations yields a per-model profile
+
+    activation_bytes(batch, duration) = fixed(duration) + batch * per_item(duration)
+
+(piecewise-linear in duration), stored as JSON and consulted by
+``gpu_config.estimate_inference_vram`` and the API admission check.
+
+Profiles are written by ``scripts/calibrate_vram.py``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import weakref
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from loguru import logger
+from torch.utils._python_dispatch import TorchDispatchMode
+from torch.utils._pytree import tree_flatten
+
+PROFILE_VERSION = 1
+
+# Latent frames per second (48 kHz audio, VAE hop 1920).
+LATENT_FPS = 25
+# LM audio-code rate (5 Hz) plus a fixed prompt allowance (caption, lyrics, CoT).
+LM_CODES_PER_SECOND = 5
+LM_PROMPT_TOKENS = 1024
+# Encoder sequence length assumed for DiT cross-attention (text + lyrics + timbre).
+DIT_ENCODER_TOKENS = 1024
+# Longest VAE decode tile: default chunk plus overlap on both sides.
+VAE_TRACE_CHUNK_FRAMES = 512 + 2 * 64
+
+DEFAULT_DURATIONS: Tuple[float, ...] = (30.0, 60.0, 120.0, 240.0, 480.0, 600.0)
+
+_GB = 1024 ** 3
+
+
+class PeakMemoryTracker(TorchDispatchMode):
+    """Track live and peak bytes of tensors produced inside the mode.
+
+    Only freshly allocated outputs are counted (outputs that alias an input,
+    such as views and in-place results, are skipped); bytes are released when
+    the output tensor is garbage collected.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.live_bytes = 0
+        self.peak_bytes = 0
+
+    def _release(self, nbytes: int) -> None:
+        self.live_bytes -= nbytes
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        out = func(*args, **(kwargs or {}))
+        returns = func._schema.returns
+        outputs, _ = tree_flatten(out)
+        for idx, tensor in enumerate(outputs):
+            if not isinstance(tensor, torch.Tensor):
+                continue
+            if idx < len(returns) and returns[idx].alias_info is not None:
+                continue
+            nbytes = tensor.untyped_storage().nbytes()
+            self.live_bytes += nbytes
+            weakref.finalize(tensor, self._release, nbytes)
+        self.peak_bytes = max(self.peak_bytes, self.live_bytes)
+        return out
+
+
+def _fake_mode():
+    from torch._subclasses.fake_tensor import FakeTensorMode
+
+    return FakeTensorMode(allow_non_fake_inputs=True)
+
+
+def trace_peak_bytes(fake_mode, run: Callable[[], Any]) -> int:
+    """Return the peak activation bytes of ``run()`` executed under ``fake_mode``."""
+    tracker = PeakMemoryTracker()
+    with fake_mode, torch.no_grad(), tracker:
+        result = run()
+        del result
+    return int(tracker.peak_bytes)
+
+
+def module_weight_bytes(module: torch.nn.Module) -> int:
+    """Return the bytes held by a module's parameters and buffers."""
+    tensors = list(module.parameters()) + list(module.buffers())
+    return int(sum(t.numel() * t.element_size() for t in tensors))
+
+
+@dataclass
+class ComponentProfile:
+    """Traced memory of one model component.
+
+    Attributes:
+        weight_bytes: Parameter and buffer bytes.
+        durations: Traced durations in seconds, ascending.
+        fixed_bytes: Batch-independent activation bytes at each duration.
+        per_item_bytes: Additional activation bytes per batch item.
+    """
+
+    weight_bytes: int
+    durations: List[float] = field(default_factory=list)
+    fixed_bytes: List[float] = field(default_factory=list)
+    per_item_bytes: List[float] = field(default_factory=list)
+
+    def _interp(self, values: Sequence[float], duration_s: float) -> float:
+        xs = self.durations
+        if len(xs) == 1:
+            return float(values[0]) * max(duration_s, 0.0) / xs[0] if xs[0] > 0 else float(values[0])
+        if duration_s <= xs[0]:
+            return float(values[0])
+        # Linear interpolation inside the grid, extrapolation from the last segment beyond it.
+        hi = next((i for i in range(1, len(xs)) if duration_s <= xs[i]), len(xs) - 1)
+        lo = hi - 1
+        slope = (values[hi] - values[lo]) / (xs[hi] - xs[lo])
+        return float(values[lo] + slope * (duration_s - xs[lo]))
+
+    def activation_bytes(self, batch_size: int, duration_s: float) -> float:
+        """Estimated peak activation bytes for ``batch_size`` items of ``duration_s``."""
+        if not self.durations:
+            return 0.0
+        fixed = self._interp(self.fixed_bytes, duration_s)
+        per_item = self._interp(self.per_item_bytes, duration_s)
+        return max(0.0, fixed + max(1, int(batch_size)) * per_item)
+
+
+@dataclass
+class VRAMProfile:
+    """Calibrated memory profile of one model (DiT + VAE, or an LM)."""
+
+    model_name: str
+    dtype: str
+    components: Dict[str, ComponentProfile]
+    created_at: float = 0.0
+    torch_version: str = ""
+    version: int = PROFILE_VERSION
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert the profile to a JSON-serializable dict."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VRAMProfile":
+        """Build a profile from ``to_dict`` output."""
+        components = {name: ComponentProfile(**comp) for name, comp in data.get("components", {}).items()}
+        return cls(
+            model_name=data["model_name"],
+            dtype=data.get("dtype", ""),
+            components=components,
+            created_at=float(data.get("created_at", 0.0)),
+            torch_version=data.get("torch_version", ""),
+            version=int(data.get("version", PROFILE_VERSION)),
+        )
+
+    def weight_gb(self) -> float:
+        """Total traced weight memory in GB."""
+        return sum(comp.weight_bytes for comp in self.components.values()) / _GB
+
+    def activation_gb(self, batch_size: int, duration_s: float, use_cfg: bool = False) -> float:
+        """
+        Peak activation memory in GB for one generation request.
+
+        The DiT runs the conditional and unconditional branches in one
+        doubled batch when CFG is used; DiT sampling, VAE decode and the LM
+        run one after another, so the peak is the largest of the three.
+        """
+        peaks = []
+        dit = self.components.get("dit")
+        if dit is not None:
+            peaks.append(dit.activation_bytes(batch_size * (2 if use_cfg else 1), duration_s))
+        vae = self.components.get("vae_decode")
+        if vae is not None:
+            peaks.append(vae.activation_bytes(batch_size, duration_s))
+        lm = self.components.get("lm")
+        if lm is not None:
+            peaks.append(lm.activation_bytes(batch_size, duration_s))
+        return max(peaks, default=0.0) / _GB
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------------
+
+def trace_component(
+    fake_mode,
+    module: torch.nn.Module,
+    make_inputs: Callable[[int, float], Dict[str, Any]],
+    run: Callable[[torch.nn.Module, Dict[str, Any]], Any],
+    durations: Sequence[float] = DEFAULT_DURATIONS,
+) -> ComponentProfile:
+    """
+    Trace a fake-tensor module at batch 1 and 2 over ``durations``.
+
+    Args:
+        fake_mode: ``FakeTensorMode`` the module was built under.
+        module: Module whose parameters are fake tensors.
+        make_inputs: ``(batch_size, duration_s) -> kwargs`` creating fake inputs.
+        run: ``(module, kwargs) -> output`` running one forward.
+        durations: Durations in seconds to trace.
+    """
+    profile = ComponentProfile(weight_bytes=module_weight_bytes(module))
+    for duration_s in sorted(durations):
+        peaks = []
+        for batch_size in (1, 2):
+            with fake_mode:
+                inputs = make_inputs(batch_size, duration_s)
+            peaks.append(trace_peak_bytes(fake_mode, lambda: run(module, inputs)))
+        per_item = max(0, peaks[1] - peaks[0])
+        profile.durations.append(float(duration_s))
+        profile.per_item_bytes.append(float(per_item))
+        profile.fixed_bytes.append(float(max(0, peaks[0] - per_item)))
+    return profile
+
+
+def trace_dit_decoder(fake_mode, decoder, durations=DEFAULT_DURATIONS) -> ComponentProfile:
+    """Trace one ``AceStepDiTModel`` forward (a single diffusion step)."""
+    config = decoder.config
+    dtype = next(decoder.parameters()).dtype
+    acoustic_dim = config.audio_acoustic_hidden_dim
+    context_dim = config.in_channels - acoustic_dim
+
+    def make_inputs(batch_size: int, duration_s: float) -> Dict[str, Any]:
+        frames = max(1, int(duration_s * LATENT_FPS))
+        return {
+            "hidden_states": torch.empty(batch_size, frames, acoustic_dim, dtype=dtype),
+            "context_latents": torch.empty(batch_size, frames, context_dim, dtype=dtype),
+            "timestep": torch.empty(batch_size, dtype=dtype),
+            "timestep_r": torch.empty(batch_size, dtype=dtype),
+            "attention_mask": torch.ones(batch_size, frames, dtype=dtype),
+            "encoder_hidden_states": torch.empty(batch_size, DIT_ENCODER_TOKENS, config.hidden_size, dtype=dtype),
+            "encoder_attention_mask": torch.ones(batch_size, DIT_ENCODER_TOKENS, dtype=dtype),
+        }
+
+    return trace_component(fake_mode, decoder, make_inputs, lambda m, kw: m(use_cache=False, **kw), durations)
+
+
+def trace_vae_decode(fake_mode, vae, durations=DEFAULT_DURATIONS) -> ComponentProfile:
+    """Trace ``vae.decode`` on one tile (tiled decode bounds the tile length)."""
+    dtype = next(vae.parameters()).dtype
+    latent_channels = vae.config.decoder_input_channels
+
+    def make_inputs(batch_size: int, duration_s: float) -> Dict[str, Any]:
+        frames = max(1, min(int(duration_s * LATENT_FPS), VAE_TRACE_CHUNK_FRAMES))
+        return {"z": torch.empty(batch_size, latent_channels, frames, dtype=dtype)}
+
+    return trace_component(fake_mode, vae, make_inputs, lambda m, kw: m.decode(kw["z"]), durations)
+
+
+def trace_lm_forward(fake_mode, lm, durations=DEFAULT_DURATIONS) -> ComponentProfile:
+    """Trace an LM prefill over the prompt plus all audio codes (KV cache included)."""
+
+    def make_inputs(batch_size: int, duration_s: float) -> Dict[str, Any]:
+        tokens = LM_PROMPT_TOKENS + int(duration_s * LM_CODES_PER_SECOND)
+        return {"input_ids": torch.zeros(batch_size, tokens, dtype=torch.long)}
+
+    return trace_component(
+        fake_mode, lm, make_inputs,
+        lambda m, kw: m(input_ids=kw["input_ids"], use_cache=True, logits_to_keep=1),
+        durations,
+    )
+
+
+def calibrate_checkpoints(
+    checkpoint_dir: str,
+    model_name: str,
+    dtype: torch.dtype = torch.bfloat16,
+    durations: Sequence[float] = DEFAULT_DURATIONS,
+    is_lm: bool = False,
+) -> VRAMProfile:
+    """
+    Build a profile for a checkpoint by tracing it under ``FakeTensorMode``.
+
+    Only the configs are read from disk; weights are never loaded.
+
+    Args:
+        checkpoint_dir: Directory holding model folders (and ``vae`` for DiT models).
+        model_name: DiT or LM model folder name, e.g. ``acestep-v15-turbo``.
+        dtype: Inference dtype of the weights.
+        durations: Durations in seconds to trace.
+        is_lm: Trace ``model_name`` as a causal LM instead of a DiT.
+    """
+    from transformers import AutoConfig, AutoModel, AutoModelForCausalLM
+
+    model_path = os.path.join(checkpoint_dir, model_name)
+    fake_mode = _fake_mode()
+    components: Dict[str, ComponentProfile] = {}
+    if is_lm:
+        config = AutoConfig.from_pretrained(model_path)
+        config._attn_implementation = "sdpa"
+        with fake_mode:
+            lm = AutoModelForCausalLM.from_config(config, torch_dtype=dtype).eval()
+        components["lm"] = trace_lm_forward(fake_mode, lm, durations)
+    else:
+        from diffusers.models import AutoencoderOobleck
+
+        config = AutoConfig.from_pretrained(model_path, trust_remote_code=True)
+        # SDPA without flash attention materializes masks: the consumer-GPU worst case.
+        config._attn_implementation = "sdpa"
+        with fake_mode:
+            model = AutoModel.from_config(config, trust_remote_code=True, torch_dtype=dtype).eval()
+        components["dit"] = trace_dit_decoder(fake_mode, model.decoder, durations)
+        # Encoder and tokenizer weights stay resident; count them with the DiT.
+        components["dit"].weight_bytes = module_weight_bytes(model)
+
+        vae_config = AutoencoderOobleck.load_config(os.path.join(checkpoint_dir, "vae"))
+        with fake_mode:
+            vae = AutoencoderOobleck.from_config(vae_config).to(dtype).eval()
+        components["vae_decode"] = trace_vae_decode(fake_mode, vae, durations)
+
+    return VRAMProfile(
+        model_name=model_name,
+        dtype=str(dtype).replace("torch.", ""),
+        components=components,
+        created_at=time.time(),
+        torch_version=torch.__version__,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+_PROFILE_CACHE: Dict[str, Tuple[float, Optional[VRAMProfile]]] = {}
+
+
+def get_profile_dir() -> str:
+    """Return the profile directory (``ACESTEP_VRAM_PROFILE_DIR`` or ``.cache/acestep/vram_profiles``)."""
+    override = os.environ.get("ACESTEP_VRAM_PROFILE_DIR")
+    if override:
+        return override
+    project_root = Path(__file__).resolve().parents[3]
+    return str(project_root / ".cache" / "acestep" / "vram_profiles")
+
+
+def _profile_path(model_name: str, profile_dir: Optional[str] = None) -> str:
+    safe_name = os.path.basename(model_name.rstrip("/\\")) or "model"
+    return os.path.join(profile_dir or get_profile_dir(), f"{safe_name}.json")
+
+
+def save_vram_profile(profile: VRAMProfile, profile_dir: Optional[str] = None) -> str:
+    """Write ``profile`` as JSON and return its path."""
+    path = _profile_path(profile.model_name, profile_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+    _PROFILE_CACHE.pop(path, None)
+    return path
+
+
+def load_vram_profile(model_name: Optional[str], profile_dir: Optional[str] = None) -> Optional[VRAMProfile]:
+    """
+    Load the calibrated profile for ``model_name``, or ``None`` when absent.
+
+    Results are cached per file and reloaded when the file changes.
+    """
+    if not model_name:
+        return None
+    path = _profile_path(model_name, profile_dir)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _PROFILE_CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    profile = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if int(data.get("version", 0)) == PROFILE_VERSION:
+            profile = VRAMProfile.from_dict(data)
+        else:
+            logger.warning(f"[vram_calibration] Ignoring outdated profile {path}; re-run scripts/calibrate_vram.py")
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        logger.warning(f"[vram_calibration] Failed to read profile {path}: {exc}")
+    _PROFILE_CACHE[path] = (mtime, profile)
+    return profile
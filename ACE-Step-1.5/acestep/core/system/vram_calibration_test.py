@@ -0,0 +1,180 @@
+"""CPU tests for fake-tensor VRAM calibration."""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+
+from acestep.core.system.vram_calibration import (
+    ComponentProfile,
+    PeakMemoryTracker,
+    VRAMProfile,
+    _fake_mode,
+    load_vram_profile,
+    save_vram_profile,
+    trace_dit_decoder,
+    trace_lm_forward,
+    trace_peak_bytes,
+    trace_vae_decode,
+)
+
+_DURATIONS = (2.0, 4.0)
+
+
+def _tiny_dit(fake_mode):
+    from acestep.models.turbo.configuration_acestep_v15 import AceStepConfig
+    from acestep.models.turbo.modeling_acestep_v15_turbo import AceStepDiTModel
+
+    config = AceStepConfig(
+        hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=4,
+        num_key_value_heads=2, head_dim=8, text_hidden_dim=16, in_channels=192,
+    )
+    config._attn_implementation = "sdpa"
+    with fake_mode:
+        return AceStepDiTModel(config).eval()
+
+
+class PeakMemoryTrackerTests(unittest.TestCase):
+    """Tests for the dispatch-mode activation tracker."""
+
+    def test_counts_live_outputs_and_skips_views(self):
+        """Peak should cover simultaneously live outputs but not views."""
+        fake_mode = _fake_mode()
+        with fake_mode:
+            x = torch.empty(256, dtype=torch.float32)
+
+        def run():
+            a = x * 2            # 1 KiB
+            b = a.view(16, 16)   # view: no new storage
+            c = b + 1            # 1 KiB, a still alive
+            return c.sum()
+
+        self.assertEqual(trace_peak_bytes(fake_mode, run), 2048 + 4)
+
+    def test_freed_outputs_lower_live_bytes(self):
+        """Temporaries freed before the next op should not accumulate."""
+        tracker = PeakMemoryTracker()
+        with tracker:
+            for _ in range(4):
+                y = torch.ones(64) * 3
+                del y
+        self.assertEqual(tracker.live_bytes, 0)
+        self.assertLessEqual(tracker.peak_bytes, 2 * 64 * 4)
+
+
+class ComponentProfileTests(unittest.TestCase):
+    """Tests for profile interpolation."""
+
+    def setUp(self):
+        self.profile = ComponentProfile(
+            weight_bytes=0, durations=[10.0, 20.0], fixed_bytes=[100.0, 200.0], per_item_bytes=[10.0, 30.0],
+        )
+
+    def test_interpolates_and_scales_with_batch(self):
+        """Values inside the grid are interpolated and per-item bytes scale with batch."""
+        self.assertAlmostEqual(self.profile.activation_bytes(1, 10.0), 110.0)
+        self.assertAlmostEqual(self.profile.activation_bytes(2, 15.0), 150.0 + 2 * 20.0)
+
+    def test_extrapolates_beyond_grid(self):
+        """Durations beyond the grid follow the last segment."""
+        self.assertAlmostEqual(self.profile.activation_bytes(1, 30.0), 300.0 + 50.0)
+
+    def test_cfg_doubles_dit_batch(self):
+        """CFG should trace the DiT at twice the batch size."""
+        profile = VRAMProfile("m", "bfloat16", {"dit": self.profile})
+        self.assertAlmostEqual(
+            profile.activation_gb(2, 10.0, use_cfg=True), profile.activation_gb(4, 10.0, use_cfg=False)
+        )
+
+
+class TraceComponentsTests(unittest.TestCase):
+    """Trace tiny real modules on fake tensors (no GPU, no weights)."""
+
+    def _check_profile(self, profile):
+        self.assertEqual(profile.durations, list(_DURATIONS))
+        self.assertGreater(profile.weight_bytes, 0)
+        self.assertGreater(profile.activation_bytes(1, _DURATIONS[0]), 0)
+        self.assertGreater(profile.activation_bytes(4, _DURATIONS[0]), profile.activation_bytes(1, _DURATIONS[0]))
+
+    def test_dit_decoder_grows_with_duration(self):
+        """Longer audio should need more DiT activation memory."""
+        fake_mode = _fake_mode()
+        profile = trace_dit_decoder(fake_mode, _tiny_dit(fake_mode), durations=_DURATIONS)
+        self._check_profile(profile)
+        self.assertGreater(profile.activation_bytes(1, 4.0), profile.activation_bytes(1, 2.0))
+
+    def test_vae_decode(self):
+        """VAE decode tracing should produce a usable profile."""
+        from diffusers.models import AutoencoderOobleck
+
+        fake_mode = _fake_mode()
+        with fake_mode:
+            vae = AutoencoderOobleck(
+                encoder_hidden_size=8, downsampling_ratios=[2, 2], channel_multiples=[1, 2],
+                decoder_channels=8, decoder_input_channels=4, audio_channels=2,
+            ).eval()
+        self._check_profile(trace_vae_decode(fake_mode, vae, durations=_DURATIONS))
+
+    def test_lm_forward(self):
+        """LM prefill tracing should produce a usable profile."""
+        from transformers import Qwen3Config, Qwen3ForCausalLM
+
+        config = Qwen3Config(
+            vocab_size=128, hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+            num_attention_heads=4, num_key_value_heads=2, head_dim=8, max_position_embeddings=4096,
+        )
+        config._attn_implementation = "sdpa"
+        fake_mode = _fake_mode()
+        with fake_mode:
+            lm = Qwen3ForCausalLM(config).eval()
+        self._check_profile(trace_lm_forward(fake_mode, lm, durations=_DURATIONS))
+
+
+class ProfileStorageTests(unittest.TestCase):
+    """Tests for saving, loading and consulting profiles."""
+
+    def _profile(self, name="acestep-v15-turbo"):
+        comp = ComponentProfile(
+            weight_bytes=2 * 1024 ** 3, durations=[60.0, 120.0],
+            fixed_bytes=[0.5 * 1024 ** 3, 1024 ** 3], per_item_bytes=[1024 ** 3, 2 * 1024 ** 3],
+        )
+        return VRAMProfile(model_name=name, dtype="bfloat16", components={"dit": comp})
+
+    def test_round_trip(self):
+        """A saved profile should load back unchanged."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = save_vram_profile(self._profile(), tmp)
+            self.assertTrue(os.path.exists(path))
+            loaded = load_vram_profile("acestep-v15-turbo", tmp)
+            self.assertEqual(loaded.to_dict(), self._profile().to_dict())
+            self.assertIsNone(load_vram_profile("missing-model", tmp))
+
+    def test_gpu_config_consults_profile(self):
+        """Estimates, batch limits and admission should follow the profile."""
+        from acestep import gpu_config
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(os.environ, {"ACESTEP_VRAM_PROFILE_DIR": tmp}):
+            save_vram_profile(self._profile(), tmp)
+            estimate = gpu_config.estimate_inference_vram(2, 60.0, model_name="acestep-v15-turbo")
+            base = (
+                gpu_config.MODEL_VRAM["text_encoder"] + gpu_config.MODEL_VRAM["cuda_context"]
+                + gpu_config.MODEL_VRAM["silence_latent"] + gpu_config.VRAM_SAFETY_MARGIN_GB
+            )
+            self.assertAlmostEqual(estimate, base + 2.0 + 0.5 + 2 * 1.0)
+            self.assertEqual(gpu_config.get_calibrated_max_batch_size("acestep-v15-turbo", 60.0, 3.6), 3)
+            self.assertIsNone(gpu_config.get_calibrated_max_batch_size("uncalibrated", 60.0, 3.6))
+
+            config = gpu_config.get_gpu_config_for_tier("tier6")
+            config.gpu_memory_gb = 8.0
+            ok, _ = gpu_config.check_vram_admission(1, 60.0, config, "acestep-v15-turbo")
+            self.assertTrue(ok)
+            ok, message = gpu_config.check_vram_admission(8, 120.0, config, "acestep-v15-turbo")
+            self.assertFalse(ok)
+            self.assertIn("Reduce batch_size", message)
+            self.assertTrue(gpu_config.check_vram_admission(8, 120.0, config, "uncalibrated")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
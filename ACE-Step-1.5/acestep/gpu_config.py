@@ -966,12 +966,94 @@ def get_available_vram_gb() -> float:
     return get_effective_free_vram_gb()
 
 
+def _load_calibrated_profile(model_name: Optional[str]):
+    """Return the calibrated VRAM profile for ``model_name`` (None when not calibrated)."""
+    if not model_name:
+        return None
+    try:
+        from acestep.core.system.vram_calibration import load_vram_profile
+        return load_vram_profile(model_name)
+    except Exception as exc:
+        logger.debug(f"[gpu_config] No calibrated VRAM profile for {model_name}: {exc}")
+        return None
+
+
+def estimate_calibrated_vram(
+    batch_size: int,
+    duration_s: float,
+    model_name: Optional[str],
+    lm_model_name: Optional[str] = None,
+) -> Optional[float]:
+    """
+    Estimate total VRAM from calibrated profiles (see scripts/calibrate_vram.py).
+
+    Args:
+        batch_size: Number of samples to generate
+        duration_s: Audio duration in seconds
+        model_name: DiT model name, e.g. "acestep-v15-turbo"
+        lm_model_name: LM model name when the LM is loaded
+
+    Returns:
+        Estimated VRAM in GB, or None if ``model_name`` has no profile
+    """
+    profile = _load_calibrated_profile(model_name)
+    if profile is None:
+        return None
+    # Turbo models are distilled and run without CFG; the others double the DiT batch.
+    use_cfg = "turbo" not in (model_name or "").lower()
+    weights = profile.weight_gb()
+    activations = profile.activation_gb(batch_size, duration_s, use_cfg=use_cfg)
+    if lm_model_name:
+        lm_profile = _load_calibrated_profile(lm_model_name)
+        if lm_profile is not None:
+            weights += lm_profile.weight_gb()
+            activations = max(activations, lm_profile.activation_gb(batch_size, duration_s))
+        else:
+            lm_info = LM_VRAM.get(get_lm_model_size(lm_model_name))
+            if lm_info:
+                weights += lm_info["weights"] + lm_info["kv_cache_4k"]
+    # Text encoder weights are not traced; keep the measured constants for them.
+    base = MODEL_VRAM["text_encoder"] + MODEL_VRAM["cuda_context"] + MODEL_VRAM["silence_latent"]
+    return base + weights + activations + VRAM_SAFETY_MARGIN_GB
+
+
+def get_calibrated_max_batch_size(
+    model_name: Optional[str],
+    duration_s: float,
+    available_gb: float,
+    max_batch: int = 8,
+) -> Optional[int]:
+    """
+    Largest batch whose calibrated activations fit in ``available_gb``.
+
+    Args:
+        model_name: DiT model name
+        duration_s: Audio duration in seconds
+        available_gb: VRAM left for activations (weights already loaded)
+        max_batch: Upper bound to search
+
+    Returns:
+        Batch size (at least 1), or None if ``model_name`` has no profile
+    """
+    profile = _load_calibrated_profile(model_name)
+    if profile is None:
+        return None
+    use_cfg = "turbo" not in (model_name or "").lower()
+    best = 1
+    for batch_size in range(1, max(1, max_batch) + 1):
+        if profile.activation_gb(batch_size, duration_s, use_cfg=use_cfg) > available_gb:
+            break
+        best = batch_size
+    return best
+
+
 def estimate_inference_vram(
     batch_size: int,
     duration_s: float,
     dit_type: str = "turbo",
     with_lm: bool = False,
     lm_size: str = "0.6B",
+    model_name: Optional[str] = None,
 ) -> float:
     """
     Estimate total VRAM needed for a generation request.
@@ -982,10 +1064,17 @@ def estimate_inference_vram(
         dit_type: "turbo" or "base"
         with_lm: Whether LM is loaded
         lm_size: LM model size if with_lm is True
+        model_name: DiT model name; its calibrated profile is used when present
         
     Returns:
         Estimated VRAM in GB
     """
+    if model_name:
+        lm_model_name = f"acestep-5Hz-lm-{lm_size}" if with_lm else None
+        calibrated = estimate_calibrated_vram(batch_size, duration_s, model_name, lm_model_name)
+        if calibrated is not None:
+            return calibrated
+
     # Base model weights
     dit_key = f"dit_{dit_type}" if f"dit_{dit_type}" in MODEL_VRAM else "dit_turbo"
     base = (
@@ -1070,6 +1159,41 @@ def check_batch_size_limit(
     return True, ""
 
 
+def check_vram_admission(
+    batch_size: int,
+    duration: float,
+    gpu_config: GPUConfig,
+    model_name: Optional[str],
+    lm_model_name: Optional[str] = None,
+) -> Tuple[bool, str]:
+    """
+    Check whether a request fits in GPU memory according to calibrated profiles.
+
+    Requests are always admitted when the GPU size is unknown or the model
+    has no calibrated profile (the tier limits above still apply).
+
+    Args:
+        batch_size: Requested batch size
+        duration: Requested duration in seconds
+        gpu_config: Current GPU configuration
+        model_name: DiT model serving the request
+        lm_model_name: LM model name when the LM is loaded
+
+    Returns:
+        Tuple of (is_valid, error_message)
+    """
+    if gpu_config.gpu_memory_gb <= 0 or duration <= 0:
+        return True, ""
+    estimate = estimate_calibrated_vram(batch_size, duration, model_name, lm_model_name)
+    if estimate is None or estimate <= gpu_config.gpu_memory_gb:
+        return True, ""
+    return False, (
+        f"Request needs ~{estimate:.1f}GB VRAM (batch size {batch_size}, {duration:.0f}s) "
+        f"but the GPU has {gpu_config.gpu_memory_gb:.1f}GB. "
+        f"Reduce batch_size or audio_duration."
+    )
+
+
 def is_lm_model_supported(model_path: str, gpu_config: GPUConfig) -> Tuple[bool, str]:
     """
     Check if the specified LM model is supported for current GPU configuration.
@@ -42,6 +42,7 @@ from acestep.core.generation.handler import (
     PaddingMixin,
     ProgressMixin,
     PromptMixin,
+    ReferenceLibraryMixin,
     ServiceGenerateMixin,
     TrainingPresetMixin,
     TaskUtilsMixin,
@@ -86,6 +87,7 @@ class AceStepHandler(
     PaddingMixin,
     ProgressMixin,
     PromptMixin,
+    ReferenceLibraryMixin,
     ServiceGenerateMixin,
     TrainingPresetMixin,
     TaskUtilsMixin,
@@ -158,6 +160,9 @@ class AceStepHandler(
         self._lora_adapter_registry = {}  # adapter_name -> explicit scaling targets
         self._lora_active_adapter = None
 
+        # Reference-timbre library (created lazily; servers may inject a shared one)
+        self.reference_library = None
+
         # MLX DiT acceleration (macOS Apple Silicon only)
         self.mlx_decoder = None
         self.use_mlx_dit = False
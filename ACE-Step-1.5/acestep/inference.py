@@ -72,6 +72,7 @@ class GenerationParams:
         # Task-Specific Parameters
         task_type: Type of generation task. One of: "text2music", "cover", "repaint", "lego", "extract", "complete".
         reference_audio: Path to a reference audio file for style transfer or cover tasks.
+        reference_id: ID of a registered reference-library entry, used instead of reference_audio.
         src_audio: Path to a source audio file for audio-to-audio tasks.
         audio_codes: Audio semantic codes as a string (advanced use, for code-control generation).
         repainting_start: For repaint/lego tasks: start time in seconds for region to repaint.
@@ -96,6 +97,7 @@ class GenerationParams:
 
     # Audio Uploads
     reference_audio: Optional[str] = None
+    reference_id: Optional[str] = None
     src_audio: Optional[str] = None
 
     # LM Codes Hints
@@ -611,6 +613,7 @@ def generate_music(
             latent_shift=params.latent_shift,
             latent_rescale=params.latent_rescale,
             progress=progress,
+            reference_id=params.reference_id,
         )
 
         # Check if generation failed
@@ -697,26 +700,8 @@ def generate_music(
 
             audio_key = generate_uuid_from_params(audio_params)
 
-            # Save audio file (handled outside handler)
-            audio_path = None
-            if audio_tensor is not None and save_dir is not None:
-
-                try:
-                    # Handle wav32 special case for extension
-                    file_ext = "wav" if audio_format == "wav32" else audio_format
-                    audio_file = os.path.join(save_dir, f"{audio_key}.{file_ext}")
-                    
-                    audio_path = audio_saver.save_audio(audio_tensor,
-                                                        audio_file,
-                                                        sample_rate=sample_rate,
-                                                        format=audio_format,
-                                                        channels_first=True)
-                except Exception as e:
-                    logger.error(f"[generate_music] Failed to save audio file: {e}")
-                    audio_path = ""  # Fallback to empty path
-
             audio_dict = {
-                "path": audio_path or "",  # File path (saved here, not in handler)
+                "path": "",  # File path (saved below, not in handler)
                 "tensor": audio_tensor,  # Audio tensor [channels, samples], CPU, float32
                 "key": audio_key,
                 "sample_rate": sample_rate,
@@ -725,6 +710,34 @@ def generate_music(
 
             audios.append(audio_dict)
 
+        # Save audio files (handled outside handler): the whole batch is encoded
+        # concurrently in memory, then written
+        encode_time_costs = {}
+        if save_dir is not None:
+            file_ext = "wav" if audio_format == "wav32" else audio_format
+            to_save = [a for a in audios if a["tensor"] is not None]
+            for sample_rate in sorted({a["sample_rate"] for a in to_save}):
+                group = [a for a in to_save if a["sample_rate"] == sample_rate]
+                try:
+                    encoded, costs = audio_saver.encode_batch(
+                        [a["tensor"] for a in group], sample_rate=sample_rate, formats=[audio_format],
+                    )
+                except Exception as e:
+                    logger.error(f"[generate_music] Failed to encode audio files: {e}")
+                    continue
+                for key, value in costs.items():
+                    encode_time_costs[key] = encode_time_costs.get(key, 0.0) + value
+                for audio_dict, item in zip(group, encoded):
+                    if audio_format not in item.buffers:
+                        continue  # error already logged by the encode pool
+                    try:
+                        audio_file = os.path.join(save_dir, f"{audio_dict['key']}.{file_ext}")
+                        with open(audio_file, "wb") as f:
+                            f.write(item.buffers[audio_format])
+                        audio_dict["path"] = audio_file
+                    except Exception as e:
+                        logger.error(f"[generate_music] Failed to save audio file: {e}")
+
         # Merge extra_outputs: include dit_extra_outputs (latents, masks) and add LM metadata
         extra_outputs = dit_extra_outputs.copy()
         extra_outputs["lm_metadata"] = lm_generated_metadata
@@ -749,6 +762,9 @@ def generate_music(
             dit_total = unified_time_costs.get("dit_total_time_cost", 0.0)
             unified_time_costs["pipeline_total_time"] = lm_total + dit_total
 
+        # Add per-format encode times (outside pipeline_total_time)
+        unified_time_costs.update(encode_time_costs)
+
         # Update extra_outputs with unified time_costs
         extra_outputs["time_costs"] = unified_time_costs
 
@@ -135,6 +135,95 @@ def create_4d_mask(
     return mask_tensor
 
 
+def create_packed_4d_masks(
+    segment_ids: torch.Tensor,
+    encoder_segment_ids: torch.Tensor,
+    patch_size: int,
+    seq_len: int,
+    sliding_window: Optional[int],
+    dtype: torch.dtype,
+):
+    """
+    Attention masks and position ids for packed rows (several clips per row).
+
+    Args:
+        segment_ids: [Batch, Frames] clip number (1..N) of every latent frame, 0 for padding.
+            Clip boundaries must be aligned to ``patch_size``.
+        encoder_segment_ids: [Batch, Enc_Len] clip number of every encoder token, 0 for padding.
+        patch_size: Latent frames per DiT patch.
+        seq_len: Number of patches after patchify.
+        sliding_window: Local window (in patches) for sliding layers, or None.
+        dtype: Dtype of the additive masks.
+
+    Returns:
+        (full_mask, sliding_mask, cross_mask, position_ids): [Batch, 1, seq_len, *] additive
+        masks that only let a patch see its own clip, and positions restarting at 0 per clip.
+    """
+    device = segment_ids.device
+    pad = seq_len * patch_size - segment_ids.shape[1]
+    if pad > 0:
+        segment_ids = F.pad(segment_ids, (0, pad), value=0)
+    patch_segments = segment_ids[:, : seq_len * patch_size : patch_size].long()
+    encoder_segments = encoder_segment_ids.long()
+    min_dtype = torch.finfo(dtype).min
+
+    def _additive(valid):
+        return torch.zeros(valid.shape, dtype=dtype, device=device).masked_fill_(~valid, min_dtype).unsqueeze(1)
+
+    same_clip = (patch_segments.unsqueeze(2) == patch_segments.unsqueeze(1)) & (patch_segments != 0).unsqueeze(1)
+    sliding_mask = None
+    if sliding_window is not None:
+        indices = torch.arange(seq_len, device=device)
+        local = (indices.unsqueeze(1) - indices.unsqueeze(0)).abs() <= sliding_window
+        sliding_mask = _additive(same_clip & local)
+    cross_valid = (patch_segments.unsqueeze(2) == encoder_segments.unsqueeze(1)) & (encoder_segments != 0).unsqueeze(1)
+
+    # Restart RoPE positions at every clip boundary
+    indices = torch.arange(seq_len, device=device).expand_as(patch_segments)
+    starts = torch.ones_like(patch_segments, dtype=torch.bool)
+    starts[:, 1:] = patch_segments[:, 1:] != patch_segments[:, :-1]
+    start_index = torch.cummax(torch.where(starts, indices, torch.zeros_like(indices)), dim=1).values
+    position_ids = indices - start_index
+    return _additive(same_clip), sliding_mask, _additive(cross_valid), position_ids
+
+
+def probe_attention_weights(
+    query_states: torch.Tensor,
+    key_states: torch.Tensor,
+    attention_mask: Optional[torch.Tensor],
+    heads: List[int],
+    key_span: tuple,
+    scaling: float,
+) -> torch.Tensor:
+    """
+    Compute softmax attention weights for a few heads, keeping only a span of keys.
+
+    Rows are normalized over all keys exactly like eager attention, but only the
+    selected heads are materialized and only ``key_span`` columns are returned.
+
+    Args:
+        query_states: [Batch, Heads, Q_Len, Head_Dim]
+        key_states: [Batch, KV_Heads, K_Len, Head_Dim] (grouped-query layout)
+        attention_mask: Optional additive mask broadcastable to [Batch, 1, Q_Len, K_Len]
+        heads: Query head indices to probe
+        key_span: (start, end) key range to keep
+        scaling: Softmax scaling factor
+
+    Returns:
+        Attention weights of shape [Batch, len(heads), Q_Len, end - start]
+    """
+    num_kv_groups = query_states.shape[1] // key_states.shape[1]
+    head_index = torch.as_tensor(heads, dtype=torch.long, device=query_states.device)
+    query = query_states.index_select(1, head_index).float()
+    key = key_states.index_select(1, head_index // num_kv_groups).float()
+    logits = torch.matmul(query, key.transpose(-1, -2)) * scaling
+    if attention_mask is not None:
+        logits = logits + attention_mask[:, :, :, : key.shape[-2]].float()
+    log_norm = torch.logsumexp(logits, dim=-1, keepdim=True)
+    start, end = key_span
+    return torch.exp(logits[..., start:end] - log_norm).to(query_states.dtype)
+
+
 def pack_sequences(hidden1: torch.Tensor, hidden2: torch.Tensor, mask1: torch.Tensor, mask2: torch.Tensor):
     """
     Pack two sequences by concatenating and sorting them based on mask values.
@@ -295,6 +384,7 @@ class AceStepAttention(nn.Module):
         encoder_hidden_states: Optional[torch.Tensor] = None,
         position_embeddings: tuple[torch.Tensor, torch.Tensor] = None,
         output_attentions: Optional[bool] = False,
+        attention_probe: Optional[tuple] = None,
         **kwargs: Unpack[FlashAttentionKwargs],
     ) -> tuple[torch.Tensor, Optional[torch.Tensor], Optional[tuple[torch.Tensor]]]:
         input_shape = hidden_states.shape[:-1]
@@ -366,6 +456,13 @@ class AceStepAttention(nn.Module):
             **kwargs,
         )
 
+        # Probe: return only the requested heads/keys while the output stays on the fused kernel
+        if attention_probe is not None and is_cross_attention:
+            probe_heads, probe_span = attention_probe
+            attn_weights = probe_attention_weights(
+                query_states, key_states, attention_mask, probe_heads, probe_span, self.scaling
+            )
+
         attn_output = attn_output.reshape(*input_shape, -1).contiguous()
         attn_output = self.o_proj(attn_output)
         return attn_output, attn_weights
@@ -485,6 +582,7 @@ class AceStepDiTLayer(GradientCheckpointingLayer):
         cache_position: Optional[torch.LongTensor] = None,
         encoder_hidden_states: Optional[torch.Tensor] = None,
         encoder_attention_mask: Optional[torch.Tensor] = None,
+        attention_probe: Optional[tuple] = None,
         **kwargs,
     ) -> torch.Tensor:
 
@@ -511,6 +609,7 @@ class AceStepDiTLayer(GradientCheckpointingLayer):
         hidden_states = (hidden_states + attn_output * gate_msa).type_as(hidden_states)
 
         # Step 2: Cross-attention (if enabled) for conditioning on encoder outputs
+        cross_attn_weights = None
         if self.use_cross_attention:
             norm_hidden_states = self.cross_attn_norm(hidden_states).type_as(hidden_states)
             attn_output, cross_attn_weights = self.cross_attn(
@@ -520,6 +619,7 @@ class AceStepDiTLayer(GradientCheckpointingLayer):
                 past_key_value=past_key_value,
                 output_attentions=output_attentions,
                 use_cache=use_cache,
+                attention_probe=attention_probe,
                 **kwargs,
             )
             # Standard residual connection for cross-attention
@@ -535,6 +635,8 @@ class AceStepDiTLayer(GradientCheckpointingLayer):
         outputs = (hidden_states,)
         if output_attentions:
             outputs += (self_attn_weights, cross_attn_weights)
+        elif attention_probe is not None:
+            outputs += (None, cross_attn_weights)
 
         return outputs
 
@@ -1317,8 +1419,24 @@ class AceStepDiTModel(AceStepPreTrainedModel):
         return_hidden_states: int = None,
         custom_layers_config: Optional[dict] = None,
         enable_early_exit: bool = False,
+        segment_ids: Optional[torch.Tensor] = None,
+        encoder_segment_ids: Optional[torch.Tensor] = None,
+        attention_probes: Optional[dict] = None,
+        attention_probe_span: Optional[tuple] = None,
         **flash_attn_kwargs: Unpack[FlashAttentionKwargs],
     ):
+        """
+        Attention probes:
+            ``attention_probes`` maps decoder layer index -> cross-attention head indices.
+            Probed layers still run the configured (fused) attention kernel and
+            additionally return softmax weights for just those heads, restricted to
+            the encoder keys in ``attention_probe_span`` (start, end). The third output
+            is then a dict ``{layer: [B, len(heads), T_patches, end - start]}``.
+            With ``enable_early_exit`` the forward stops after the last probed layer
+            and returns ``(None, past_key_values, probes)``.
+        """
+        if attention_probes is not None and output_attentions:
+            raise ValueError("attention_probes cannot be combined with output_attentions")
 
         use_cache = use_cache if use_cache is not None else self.config.use_cache
 
@@ -1439,6 +1557,19 @@ class AceStepDiTModel(AceStepPreTrainedModel):
                     is_causal=False                # <--- 关键：双向注意力
                 )
 
+        if segment_ids is not None:
+            # Packed training rows: keep attention inside each clip
+            if is_flash_attn:
+                raise ValueError("Packed sequences (segment_ids) require sdpa or eager attention")
+            full_attn_mask, sliding_attn_mask, encoder_attention_mask, position_ids = create_packed_4d_masks(
+                segment_ids=segment_ids,
+                encoder_segment_ids=encoder_segment_ids,
+                patch_size=self.patch_size,
+                seq_len=seq_len,
+                sliding_window=self.config.sliding_window if self.config.use_sliding_window else None,
+                dtype=dtype,
+            )
+
         # 构建 Mapping
         self_attn_mask_mapping = {
             "full_attention": full_attn_mask,
@@ -1459,8 +1590,20 @@ class AceStepDiTModel(AceStepPreTrainedModel):
             if all_cross_attentions is None:
                 all_cross_attentions = ()
 
+        probed_attentions = {} if attention_probes is not None else None
+        last_probe_layer = max(attention_probes.keys(), default=-1) if attention_probes else -1
+        probe_span = tuple(attention_probe_span) if attention_probe_span is not None else (0, encoder_seq_len)
+
         # Process through transformer layers
         for index_block, layer_module in enumerate(self.layers):
+            attention_probe = None
+            if probed_attentions is not None and layer_module.use_cross_attention:
+                probe_heads = [
+                    int(h) for h in attention_probes.get(index_block, ())
+                    if 0 <= int(h) < self.config.num_attention_heads
+                ]
+                if probe_heads:
+                    attention_probe = (probe_heads, probe_span)
 
             layer_outputs = layer_module(
                 hidden_states,
@@ -1474,10 +1617,16 @@ class AceStepDiTModel(AceStepPreTrainedModel):
                 cache_position,
                 encoder_hidden_states,
                 self_attn_mask_mapping["encoder_attention_mask"],
+                attention_probe=attention_probe,
                 **flash_attn_kwargs,
             )
             hidden_states = layer_outputs[0]
 
+            if attention_probe is not None:
+                probed_attentions[index_block] = layer_outputs[2]
+                if enable_early_exit and index_block >= last_probe_layer:
+                    return (None, past_key_values, probed_attentions)
+
             if output_attentions and self.layers[index_block].use_cross_attention:
                 # layer_outputs structure: (hidden_states, self_attn_weights, cross_attn_weights)
                 # Extract the last element which is cross_attn_weights
@@ -1504,6 +1653,8 @@ class AceStepDiTModel(AceStepPreTrainedModel):
 
         if output_attentions:
             outputs += (all_cross_attentions,)
+        elif probed_attentions is not None:
+            outputs += (probed_attentions,)
         return outputs
 
 class AceStepConditionEncoder(AceStepPreTrainedModel):
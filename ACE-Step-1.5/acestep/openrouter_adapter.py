@@ -14,18 +14,21 @@ Endpoints:
 from __future__ import annotations
 
 import asyncio
-import base64
 import json
 import os
 import re
-import tempfile
 import time
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from acestep.api.http.base64_audio import (
+    base64_to_temp_file,
+    iter_audio_data_url,
+    iter_json_with_audio,
+)
 from acestep.openrouter_models import (
     AudioConfig,
     ChatCompletionRequest,
@@ -67,28 +70,6 @@ def _parse_model_name(model_id: str) -> str:
     return model_id
 
 
-def _audio_to_base64_url(audio_path: str, audio_format: str = "mp3") -> str:
-    """Convert audio file to base64 data URL."""
-    if not audio_path or not os.path.exists(audio_path):
-        return ""
-
-    mime_types = {
-        "mp3": "audio/mpeg",
-        "wav": "audio/wav",
-        "flac": "audio/flac",
-        "ogg": "audio/ogg",
-        "m4a": "audio/mp4",
-        "aac": "audio/aac",
-    }
-    mime_type = mime_types.get(audio_format.lower(), "audio/mpeg")
-
-    with open(audio_path, "rb") as f:
-        audio_data = f.read()
-
-    b64_data = base64.b64encode(audio_data).decode("utf-8")
-    return f"data:{mime_type};base64,{b64_data}"
-
-
 def _format_lm_content(result: Dict[str, Any]) -> str:
     """Format generation result as content string with metadata and lyrics."""
     metas = result.get("metas", {})
@@ -123,22 +104,6 @@ def _format_lm_content(result: Dict[str, Any]) -> str:
         return "Music generated successfully."
 
 
-def _base64_to_temp_file(b64_data: str, audio_format: str = "mp3") -> str:
-    """Save base64 audio data to temporary file."""
-    if "," in b64_data:
-        b64_data = b64_data.split(",", 1)[1]
-
-    audio_bytes = base64.b64decode(b64_data)
-    suffix = f".{audio_format}" if not audio_format.startswith(".") else audio_format
-    fd, path = tempfile.mkstemp(suffix=suffix, prefix="openrouter_audio_")
-    os.close(fd)
-
-    with open(path, "wb") as f:
-        f.write(audio_bytes)
-
-    return path
-
-
 def _extract_tagged_content(text: str) -> Tuple[Optional[str], Optional[str], str]:
     """
     Extract content from <prompt> and <lyrics> tags.
@@ -274,7 +239,7 @@ def _parse_messages(messages: List[Any]) -> Tuple[str, str, List[str], Optional[
                             audio_format = audio_data.get("format", "mp3")
                             if b64_data:
                                 try:
-                                    path = _base64_to_temp_file(b64_data, audio_format)
+                                    path = base64_to_temp_file(b64_data, audio_format)
                                     audio_paths.append(path)
                                 except Exception:
                                     pass
@@ -303,7 +268,7 @@ def _parse_messages(messages: List[Any]) -> Tuple[str, str, List[str], Optional[
                             audio_format = getattr(audio_data, "format", "mp3")
                             if b64_data:
                                 try:
-                                    path = _base64_to_temp_file(b64_data, audio_format)
+                                    path = base64_to_temp_file(b64_data, audio_format)
                                     audio_paths.append(path)
                                 except Exception:
                                     pass
@@ -424,8 +389,12 @@ def _build_openrouter_response(
     rec: Any,
     model_id: str,
     audio_format: str,
-) -> JSONResponse:
-    """Build OpenRouter non-streaming response from a completed JobRecord."""
+) -> Response:
+    """Build OpenRouter non-streaming response from a completed JobRecord.
+
+    The audio data URL is spliced into the serialized JSON while it is being
+    encoded, so the body is streamed instead of held in memory as one string.
+    """
     if rec.status != "succeeded" or not rec.result:
         error_msg = rec.error or "Generation failed"
         raise HTTPException(status_code=500, detail=error_msg)
@@ -436,18 +405,17 @@ def _build_openrouter_response(
 
     text_content = _format_lm_content(result)
 
-    # Encode audio
+    # Audio is encoded while the body streams; reserve its spot with a placeholder
     audio_obj = None
+    audio_path = None
+    placeholder = f"__audio_url_{uuid4().hex}__"
     raw_audio_paths = result.get("raw_audio_paths", [])
-    if raw_audio_paths:
+    if raw_audio_paths and raw_audio_paths[0] and os.path.exists(raw_audio_paths[0]):
         audio_path = raw_audio_paths[0]
-        if audio_path and os.path.exists(audio_path):
-            b64_url = _audio_to_base64_url(audio_path, audio_format)
-            if b64_url:
-                audio_obj = [{
-                    "type": "audio_url",
-                    "audio_url": {"url": b64_url},
-                }]
+        audio_obj = [{
+            "type": "audio_url",
+            "audio_url": {"url": placeholder},
+        }]
 
     response_data = {
         "id": completion_id,
@@ -470,7 +438,12 @@ def _build_openrouter_response(
         },
     }
 
-    return JSONResponse(content=response_data)
+    if audio_path is None:
+        return JSONResponse(content=response_data)
+    return StreamingResponse(
+        iter_json_with_audio(json.dumps(response_data), placeholder, audio_path, audio_format),
+        media_type="application/json",
+    )
 
 
 async def _openrouter_stream_generator(
@@ -546,18 +519,16 @@ async def _openrouter_stream_generator(
             yield _make_chunk(content=f"\n\n{lm_content}")
             await asyncio.sleep(0)
 
-            # Send audio
+            # Send audio as consecutive deltas whose urls concatenate to the data URL
             raw_audio_paths = result.get("raw_audio_paths", [])
             if raw_audio_paths:
                 audio_path = raw_audio_paths[0]
                 if audio_path and os.path.exists(audio_path):
-                    b64_url = _audio_to_base64_url(audio_path, audio_format)
-                    if b64_url:
-                        audio_list = [{
+                    for piece in iter_audio_data_url(audio_path, audio_format):
+                        yield _make_chunk(audio=[{
                             "type": "audio_url",
-                            "audio_url": {"url": b64_url},
-                        }]
-                        yield _make_chunk(audio=audio_list)
+                            "audio_url": {"url": piece},
+                        }])
                         await asyncio.sleep(0)
 
     # Finish
@@ -722,6 +693,9 @@ def create_openrouter_router(app_state_getter) -> APIRouter:
             req, prompt, lyrics, sample_query, reference_audio_path, src_audio_path
         )
 
+        # Fair-share bucket for the queue scheduler
+        gen_request.client_id = request.headers.get("x-client-id") or (request.client.host if request.client else None)
+
         # Check queue capacity
         job_queue = state.job_queue
         if job_queue.full():
@@ -744,9 +718,6 @@ def create_openrouter_router(app_state_getter) -> APIRouter:
             # Streaming: use progress_queue
             rec.progress_queue = asyncio.Queue()
 
-            async with state.pending_lock:
-                state.pending_ids.append(rec.job_id)
-
             await job_queue.put((rec.job_id, gen_request))
 
             return StreamingResponse(
@@ -757,9 +728,6 @@ def create_openrouter_router(app_state_getter) -> APIRouter:
             # Non-streaming: use done_event
             rec.done_event = asyncio.Event()
 
-            async with state.pending_lock:
-                state.pending_ids.append(rec.job_id)
-
             await job_queue.put((rec.job_id, gen_request))
 
             # Wait for completion with timeout
@@ -25,12 +25,23 @@ from acestep.training.data_module import (
     PreprocessedTensorDataset,
     PreprocessedDataModule,
     collate_preprocessed_batch,
+    open_preprocessed_dataset,
     # Legacy (raw audio)
     AceStepTrainingDataset,
     AceStepDataModule,
     collate_training_batch,
     load_dataset_from_json,
 )
+from acestep.training.batch_sampling import (
+    LengthBucketBatchSampler,
+    PackedBatchSampler,
+    collate_packed_batch,
+)
+from acestep.training.sharded_dataset import (
+    ShardedDatasetWriter,
+    ShardedTensorDataset,
+    convert_pt_dir_to_shards,
+)
 from acestep.training.trainer import (
     LoRATrainer,
     LoKRTrainer,
@@ -66,6 +77,15 @@ __all__ = [
     "PreprocessedTensorDataset",
     "PreprocessedDataModule",
     "collate_preprocessed_batch",
+    "open_preprocessed_dataset",
+    # Length-aware batching
+    "LengthBucketBatchSampler",
+    "PackedBatchSampler",
+    "collate_packed_batch",
+    # Sharded dataset
+    "ShardedDatasetWriter",
+    "ShardedTensorDataset",
+    "convert_pt_dir_to_shards",
     # Data Module (Legacy)
     "AceStepTrainingDataset",
     "AceStepDataModule",
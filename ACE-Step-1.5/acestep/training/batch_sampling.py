@@ -0,0 +1,311 @@
+"""
+Length-aware batching for preprocessed training tensors.
+
+``collate_preprocessed_batch`` pads every item to the longest latent in the
+batch, so mixing 10 s and 4 min clips wastes most DiT compute on padding.
+Two alternatives:
+
+* :class:`LengthBucketBatchSampler` -- "sortish" batching: each epoch the
+  dataset is shuffled, cut into large pools, each pool is sorted by length
+  and split into batches, and the batch order is shuffled again.  Batches
+  hold similar lengths while epochs stay randomised.
+* :class:`PackedBatchSampler` + :func:`collate_packed_batch` -- concatenate
+  several short clips into one row of at most ``pack_length`` frames.
+  Rows carry ``segment_ids`` / ``encoder_segment_ids`` so the DiT decoder
+  keeps attention inside each clip and restarts positions per clip.
+"""
+
+import math
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import torch
+from torch.utils.data import Dataset, Sampler, Subset
+
+# Latent frames per DiT patch; packed clip boundaries are aligned to it.
+DIT_PATCH_SIZE = 2
+
+
+def dataset_latent_lengths(dataset: Dataset) -> List[int]:
+    """Return the latent length of every item, following ``Subset`` wrappers.
+
+    Datasets expose lengths through a ``latent_lengths`` attribute, which
+    both ``PreprocessedTensorDataset`` and ``ShardedTensorDataset`` provide.
+    """
+    if isinstance(dataset, Subset):
+        base = dataset_latent_lengths(dataset.dataset)
+        return [base[i] for i in dataset.indices]
+    lengths = getattr(dataset, "latent_lengths", None)
+    if lengths is None:
+        raise TypeError(f"{type(dataset).__name__} does not expose latent_lengths")
+    return list(lengths)
+
+
+def _aligned(length: int, multiple: int = DIT_PATCH_SIZE) -> int:
+    return int(math.ceil(length / multiple) * multiple)
+
+
+def _sortish_order(lengths: Sequence[int], pool_size: int, generator: torch.Generator) -> List[int]:
+    """Shuffle indices, then sort each pool of *pool_size* by length (descending)."""
+    order = torch.randperm(len(lengths), generator=generator).tolist()
+    sorted_order: List[int] = []
+    for start in range(0, len(order), pool_size):
+        pool = order[start:start + pool_size]
+        sorted_order.extend(sorted(pool, key=lambda i: lengths[i], reverse=True))
+    return sorted_order
+
+
+class _EpochSampler(Sampler):
+    """Base for samplers that shuffle with ``seed + epoch``.
+
+    The epoch only changes through :meth:`set_epoch`, so iterating twice
+    without it repeats the same order; training loops call
+    :func:`set_loader_epoch` at the start of every epoch.
+    """
+
+    def __init__(self, shuffle: bool, seed: int):
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def set_epoch(self, epoch: int) -> None:
+        """Select the shuffle used by the next iteration."""
+        self.epoch = epoch
+
+    def _generator(self) -> torch.Generator:
+        generator = torch.Generator()
+        generator.manual_seed(self.seed + self.epoch)
+        return generator
+
+
+def set_loader_epoch(loader: Any, epoch: int) -> None:
+    """Point *loader*'s length-aware batch sampler at *epoch*.
+
+    Call at the start of every epoch, including the first one after a
+    resume.  Fabric-wrapped loaders set the epoch themselves from a count
+    of ``iter()`` calls that restarts at 0, so that count is moved too.
+    """
+    sampler = getattr(loader, "batch_sampler", None)
+    if isinstance(sampler, _EpochSampler):
+        sampler.set_epoch(epoch)
+    if hasattr(loader, "_num_iter_calls"):
+        loader._num_iter_calls = epoch
+
+
+class LengthBucketBatchSampler(_EpochSampler):
+    """Batch sampler grouping items of similar latent length.
+
+    Args:
+        lengths: Latent length of every dataset item.
+        batch_size: Items per batch.
+        shuffle: Randomise pools and batch order every epoch.
+        drop_last: Drop a final short batch within each pool.
+        pool_factor: Pool size in batches; larger pools give tighter length
+            grouping but less randomness.
+        seed: Base seed; epoch ``k`` uses ``seed + k``.
+    """
+
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        batch_size: int,
+        shuffle: bool = True,
+        drop_last: bool = False,
+        pool_factor: int = 50,
+        seed: int = 0,
+    ):
+        super().__init__(shuffle, seed)
+        self.lengths = list(lengths)
+        self.batch_size = max(1, int(batch_size))
+        self.drop_last = drop_last
+        self.pool_size = self.batch_size * max(1, int(pool_factor))
+
+    def _batches(self) -> List[List[int]]:
+        generator = self._generator()
+        if self.shuffle:
+            order = _sortish_order(self.lengths, self.pool_size, generator)
+        else:
+            order = sorted(range(len(self.lengths)), key=lambda i: self.lengths[i], reverse=True)
+        batches: List[List[int]] = []
+        for start in range(0, len(order), self.pool_size):
+            pool = order[start:start + self.pool_size]
+            for b in range(0, len(pool), self.batch_size):
+                batch = pool[b:b + self.batch_size]
+                if len(batch) == self.batch_size or not self.drop_last:
+                    batches.append(batch)
+        if self.shuffle:
+            perm = torch.randperm(len(batches), generator=generator).tolist()
+            batches = [batches[i] for i in perm]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        return iter(self._batches())
+
+    def __len__(self) -> int:
+        full_pools, rest = divmod(len(self.lengths), self.pool_size)
+        tail = rest // self.batch_size if self.drop_last else math.ceil(rest / self.batch_size)
+        return full_pools * (self.pool_size // self.batch_size) + tail
+
+
+def pack_rows(lengths: Sequence[int], pack_length: int) -> List[List[int]]:
+    """Split consecutive items into rows of at most *pack_length* aligned frames.
+
+    Next-fit over the given order: an item starts a new row when it does
+    not fit the current one.  Items longer than *pack_length* get a row of
+    their own.  :func:`collate_packed_batch` applies the same rule, so the
+    sampler and the collate function always agree on row boundaries.
+    """
+    rows: List[List[int]] = []
+    used = 0
+    for pos, length in enumerate(lengths):
+        size = _aligned(length)
+        if rows and used + size <= pack_length:
+            rows[-1].append(pos)
+            used += size
+        else:
+            rows.append([pos])
+            used = size
+    return rows
+
+
+class PackedBatchSampler(_EpochSampler):
+    """Batch sampler yielding items for ``rows_per_batch`` packed rows.
+
+    Items are ordered sortish (long clips first within each pool) and
+    packed next-fit into rows of at most ``pack_length`` frames; each batch
+    is the flat index list of consecutive rows.  Use together with
+    :func:`collate_packed_batch` and the same ``pack_length``.
+
+    Args:
+        lengths: Latent length of every dataset item.
+        pack_length: Maximum latent frames per packed row.
+        rows_per_batch: Packed rows per batch (the effective batch size).
+        shuffle: Randomise pools and batch order every epoch.
+        pool_factor: Pool size in rows.
+        seed: Base seed; epoch ``k`` uses ``seed + k``.
+    """
+
+    def __init__(
+        self,
+        lengths: Sequence[int],
+        pack_length: int,
+        rows_per_batch: int = 1,
+        shuffle: bool = True,
+        pool_factor: int = 50,
+        seed: int = 0,
+    ):
+        super().__init__(shuffle, seed)
+        self.lengths = list(lengths)
+        self.pack_length = int(pack_length)
+        self.rows_per_batch = max(1, int(rows_per_batch))
+        mean_length = sum(_aligned(n) for n in self.lengths) / max(1, len(self.lengths))
+        self.pool_size = max(1, int(pool_factor)) * max(1, int(self.pack_length // max(1.0, mean_length)))
+        self._cached_len: Optional[int] = None
+
+    def _batches(self) -> List[List[int]]:
+        generator = self._generator()
+        if self.shuffle:
+            order = _sortish_order(self.lengths, self.pool_size, generator)
+        else:
+            order = sorted(range(len(self.lengths)), key=lambda i: self.lengths[i], reverse=True)
+        rows = [[order[p] for p in row] for row in pack_rows([self.lengths[i] for i in order], self.pack_length)]
+        batches = [
+            [idx for row in rows[start:start + self.rows_per_batch] for idx in row]
+            for start in range(0, len(rows), self.rows_per_batch)
+        ]
+        if self.shuffle:
+            perm = torch.randperm(len(batches), generator=generator).tolist()
+            batches = [batches[i] for i in perm]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        batches = self._batches()
+        self._cached_len = len(batches)
+        return iter(batches)
+
+    def __len__(self) -> int:
+        # Row count depends on the shuffle; estimate from total aligned frames
+        # until the first epoch has run.
+        if self._cached_len is None:
+            total = sum(_aligned(n) for n in self.lengths)
+            rows = max(1, math.ceil(total / max(1, self.pack_length)))
+            return max(1, math.ceil(rows / self.rows_per_batch))
+        return self._cached_len
+
+
+def collate_packed_batch(
+    batch: List[Dict[str, Any]],
+    pack_length: int,
+    patch_size: int = DIT_PATCH_SIZE,
+) -> Dict[str, Any]:
+    """Collate items into packed rows for the DiT decoder.
+
+    Items are split into rows with :func:`pack_rows`; each clip is padded to
+    a multiple of *patch_size* and concatenated, and rows are padded to the
+    longest row.
+
+    Returns:
+        The usual batch keys plus ``segment_ids`` [B, T] (clip number per
+        latent frame, 0 for padding) and ``encoder_segment_ids`` [B, L]
+        (clip number per valid encoder token, 0 for padding/masked).
+    """
+    rows = pack_rows([s["target_latents"].shape[0] for s in batch], pack_length)
+
+    packed: Dict[str, List[torch.Tensor]] = {
+        "target_latents": [], "attention_mask": [], "context_latents": [], "segment_ids": [],
+        "encoder_hidden_states": [], "encoder_attention_mask": [], "encoder_segment_ids": [],
+    }
+    for row in rows:
+        parts: Dict[str, List[torch.Tensor]] = {key: [] for key in packed}
+        for clip, pos in enumerate(row, start=1):
+            sample = batch[pos]
+            length = sample["target_latents"].shape[0]
+            pad = _aligned(length, patch_size) - length
+            for key in ("target_latents", "attention_mask", "context_latents"):
+                tensor = sample[key]
+                if pad:
+                    tensor = torch.cat([tensor, tensor.new_zeros((pad,) + tuple(tensor.shape[1:]))], dim=0)
+                parts[key].append(tensor)
+            parts["segment_ids"].append(torch.full((length + pad,), clip, dtype=torch.long))
+            enc_mask = sample["encoder_attention_mask"]
+            parts["encoder_hidden_states"].append(sample["encoder_hidden_states"])
+            parts["encoder_attention_mask"].append(enc_mask)
+            parts["encoder_segment_ids"].append(torch.where(enc_mask > 0, clip, 0).long())
+        for key in packed:
+            packed[key].append(torch.cat(parts[key], dim=0))
+
+    out: Dict[str, Any] = {}
+    for key, tensors in packed.items():
+        max_len = max(t.shape[0] for t in tensors)
+        out[key] = torch.stack([
+            torch.cat([t, t.new_zeros((max_len - t.shape[0],) + tuple(t.shape[1:]))], dim=0)
+            if t.shape[0] < max_len else t
+            for t in tensors
+        ])
+    out["metadata"] = [[batch[pos]["metadata"] for pos in row] for row in rows]
+    return out
+
+
+class PaddingMeter:
+    """Accumulate real vs. padded latent frames and throughput over an epoch."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.real_tokens = 0
+        self.total_tokens = 0
+
+    def update(self, batch: Dict[str, Any]) -> None:
+        """Count frames of a collated batch (uses its CPU ``attention_mask``)."""
+        mask = batch["attention_mask"]
+        self.total_tokens += mask.numel()
+        self.real_tokens += int(mask.count_nonzero())
+
+    @property
+    def padding_ratio(self) -> float:
+        """Fraction of processed latent frames that were padding."""
+        return 1.0 - self.real_tokens / self.total_tokens if self.total_tokens else 0.0
+
+    def tokens_per_sec(self, elapsed: float) -> float:
+        """Real (non-padding) latent frames processed per second."""
+        return self.real_tokens / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,180 @@
+"""Tests for length-bucketed and packed batching."""
+
+import unittest
+
+import torch
+from torch.utils.data import DataLoader
+
+from acestep.training.batch_sampling import (
+    LengthBucketBatchSampler,
+    PackedBatchSampler,
+    PaddingMeter,
+    collate_packed_batch,
+    pack_rows,
+    set_loader_epoch,
+)
+from acestep.training.data_module import collate_preprocessed_batch
+
+
+def _sample(length, enc_length=3, seed=0):
+    gen = torch.Generator().manual_seed(seed)
+    return {
+        "target_latents": torch.randn(length, 4, generator=gen),
+        "attention_mask": torch.ones(length),
+        "encoder_hidden_states": torch.randn(enc_length, 8, generator=gen),
+        "encoder_attention_mask": torch.ones(enc_length),
+        "context_latents": torch.randn(length, 6, generator=gen),
+        "metadata": {"seed": seed},
+    }
+
+
+def _padding_ratio(batches, lengths):
+    padded = sum(max(lengths[i] for i in b) * len(b) for b in batches)
+    return 1.0 - sum(lengths) / padded
+
+
+class LengthBucketBatchSamplerTests(unittest.TestCase):
+    """Tests for sortish length bucketing."""
+
+    def setUp(self):
+        gen = torch.Generator().manual_seed(0)
+        self.lengths = torch.randint(250, 6000, (400,), generator=gen).tolist()
+
+    def test_covers_every_index_once_and_matches_len(self):
+        """Each epoch yields every item exactly once in len() batches."""
+        sampler = LengthBucketBatchSampler(self.lengths, batch_size=4, pool_factor=10)
+        batches = list(sampler)
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(len(self.lengths))))
+
+    def test_reduces_padding_and_reshuffles(self):
+        """Bucketed batches pad far less than random ones and differ per epoch."""
+        sampler = LengthBucketBatchSampler(self.lengths, batch_size=4, pool_factor=25)
+        first = list(sampler)
+        sampler.set_epoch(1)
+        self.assertNotEqual(first, list(sampler))
+        order = torch.randperm(len(self.lengths), generator=torch.Generator().manual_seed(1)).tolist()
+        random_batches = [order[i:i + 4] for i in range(0, len(order), 4)]
+        self.assertLess(_padding_ratio(first, self.lengths), 0.05)
+        self.assertGreater(_padding_ratio(random_batches, self.lengths), 0.3)
+
+    def test_epoch_only_changes_through_set_epoch(self):
+        """Iterating or taking len() does not advance the shuffle; a resumed run replays its epoch."""
+        sampler = LengthBucketBatchSampler(self.lengths, batch_size=4, pool_factor=25, seed=3)
+        first = list(sampler)
+        len(sampler)
+        self.assertEqual(list(sampler), first)
+        loader = DataLoader(range(len(self.lengths)), batch_sampler=sampler)
+        set_loader_epoch(loader, 5)
+        epoch_five = list(sampler)
+        resumed = LengthBucketBatchSampler(self.lengths, batch_size=4, pool_factor=25, seed=3)
+        set_loader_epoch(DataLoader(range(len(self.lengths)), batch_sampler=resumed), 5)
+        self.assertEqual(list(resumed), epoch_five)
+        self.assertNotEqual(epoch_five, first)
+
+    def test_set_loader_epoch_overrides_fabric_iteration_count(self):
+        """Fabric's own per-iter() epoch restarts at 0 on resume; the helper moves it to the real epoch."""
+        try:
+            from lightning_fabric.wrappers import _FabricDataLoader
+        except ImportError:
+            self.skipTest("lightning_fabric not installed")
+        sampler = LengthBucketBatchSampler(self.lengths, batch_size=4, pool_factor=25)
+        loader = _FabricDataLoader(DataLoader(range(len(self.lengths)), batch_sampler=sampler))
+        set_loader_epoch(loader, 7)
+        list(loader)
+        self.assertEqual(sampler.epoch, 7)
+
+    def test_drop_last(self):
+        """drop_last removes short batches and len() agrees."""
+        sampler = LengthBucketBatchSampler(list(range(1, 11)), batch_size=4, drop_last=True, pool_factor=1)
+        batches = list(sampler)
+        self.assertTrue(all(len(b) == 4 for b in batches))
+        self.assertEqual(len(batches), len(sampler))
+
+
+class PackingTests(unittest.TestCase):
+    """Tests for packed rows."""
+
+    def test_pack_rows_next_fit(self):
+        """Rows fill next-fit with patch-aligned lengths; oversize items stand alone."""
+        self.assertEqual(pack_rows([5, 4, 3, 20, 2], pack_length=10), [[0, 1], [2], [3], [4]])
+
+    def test_sampler_and_collate_agree(self):
+        """Collated rows respect pack_length and carry per-clip segment ids."""
+        lengths = [3, 7, 12, 4, 9, 2, 5, 6]
+        dataset = [_sample(n, seed=i) for i, n in enumerate(lengths)]
+        sampler = PackedBatchSampler(lengths, pack_length=16, rows_per_batch=2)
+        seen = []
+        for indices in sampler:
+            batch = collate_packed_batch([dataset[i] for i in indices], pack_length=16)
+            seen.extend(indices)
+            seg = batch["segment_ids"]
+            self.assertLessEqual(seg.shape[0], 2)
+            self.assertLessEqual(seg.shape[1], 16)
+            self.assertEqual(int(batch["attention_mask"].sum()), sum(lengths[i] for i in indices))
+            self.assertEqual(sum(len(row) for row in batch["metadata"]), len(indices))
+            for r, row in enumerate(batch["metadata"]):
+                self.assertEqual(int(seg[r].max()), len(row))
+                self.assertEqual(int(batch["encoder_segment_ids"][r].max()), len(row))
+        self.assertEqual(sorted(seen), list(range(len(lengths))))
+
+    def test_clip_boundaries_are_patch_aligned(self):
+        """Odd-length clips are padded so the next clip starts on a patch boundary."""
+        batch = collate_packed_batch([_sample(3), _sample(4, seed=1)], pack_length=8)
+        self.assertEqual(batch["segment_ids"][0].tolist(), [1, 1, 1, 1, 2, 2, 2, 2])
+        self.assertEqual(batch["attention_mask"][0].tolist(), [1, 1, 1, 0, 1, 1, 1, 1])
+        self.assertTrue(torch.equal(batch["target_latents"][0, 4:], _sample(4, seed=1)["target_latents"]))
+
+    def test_padding_meter(self):
+        """Padding ratio and throughput follow the attention masks."""
+        meter = PaddingMeter()
+        meter.update(collate_preprocessed_batch([_sample(2), _sample(6)]))
+        self.assertAlmostEqual(meter.padding_ratio, 1 / 3)
+        self.assertAlmostEqual(meter.tokens_per_sec(2.0), 4.0)
+
+
+class PackedDecoderTests(unittest.TestCase):
+    """The DiT decoder must keep packed clips independent."""
+
+    def test_packed_clip_matches_unpacked(self):
+        """A clip's output is the same alone or packed next to another clip."""
+        from acestep.models.turbo.configuration_acestep_v15 import AceStepConfig
+        from acestep.models.turbo.modeling_acestep_v15_turbo import AceStepDiTModel
+
+        torch.manual_seed(0)
+        config = AceStepConfig(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=2, num_attention_heads=4,
+            num_key_value_heads=2, head_dim=8, text_hidden_dim=16, in_channels=16 + 8,
+            audio_acoustic_hidden_dim=8, sliding_window=2,
+        )
+        config._attn_implementation = "sdpa"
+        decoder = AceStepDiTModel(config).eval()
+
+        def clip(length, enc_length):
+            return (torch.randn(1, length, 8), torch.randn(1, length, 16), torch.randn(1, enc_length, 32))
+
+        xa, ca, ea = clip(6, 3)
+        xb, cb, eb = clip(4, 5)
+        t = torch.full((1,), 0.5)
+
+        def run(x, c, e, **kwargs):
+            with torch.no_grad():
+                return decoder(
+                    hidden_states=x, timestep=t, timestep_r=t, attention_mask=torch.ones(x.shape[:2]),
+                    encoder_hidden_states=e, encoder_attention_mask=torch.ones(e.shape[:2]),
+                    context_latents=c, use_cache=False, **kwargs,
+                )[0]
+
+        alone_a = run(xa, ca, ea)
+        alone_b = run(xb, cb, eb)
+        packed = run(
+            torch.cat([xa, xb], 1), torch.cat([ca, cb], 1), torch.cat([ea, eb], 1),
+            segment_ids=torch.tensor([[1] * 6 + [2] * 4]),
+            encoder_segment_ids=torch.tensor([[1] * 3 + [2] * 5]),
+        )
+        torch.testing.assert_close(packed[:, :6], alone_a, atol=1e-5, rtol=1e-4)
+        torch.testing.assert_close(packed[:, 6:], alone_b, atol=1e-5, rtol=1e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
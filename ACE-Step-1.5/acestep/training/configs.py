@@ -99,6 +99,9 @@ class TrainingConfig:
         mixed_precision: Preferred precision mode for logging/config tracking
         seed: Random seed for reproducibility
         output_dir: Directory to save checkpoints and logs
+        deferred_metrics: Keep loss and non-finite-gradient counters on the
+            device and read them back only at logging steps instead of
+            synchronizing on every micro-step
     """
     # Fixed for turbo model
     shift: float = 3.0  # Fixed: turbo uses shift=3.0
@@ -126,6 +129,7 @@ class TrainingConfig:
     
     # Logging
     log_every_n_steps: int = 10
+    deferred_metrics: bool = False
 
     # Validation (for loss curve and best-checkpoint tracking)
     val_split: float = 0.0
@@ -158,5 +162,6 @@ class TrainingConfig:
             "persistent_workers": self.persistent_workers,
             "pin_memory_device": self.pin_memory_device,
             "log_every_n_steps": self.log_every_n_steps,
+            "deferred_metrics": self.deferred_metrics,
             "val_split": self.val_split,
         }
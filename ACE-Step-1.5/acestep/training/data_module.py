@@ -8,10 +8,18 @@ Supports both raw audio loading and preprocessed tensor loading.
 import os
 import json
 import random
+from functools import partial
 from typing import Optional, List, Dict, Any, Tuple
 from loguru import logger
 
+from acestep.training.batch_sampling import (
+    LengthBucketBatchSampler,
+    PackedBatchSampler,
+    collate_packed_batch,
+    dataset_latent_lengths,
+)
 from acestep.training.path_safety import safe_path
+from acestep.training.sharded_dataset import ShardedTensorDataset, is_sharded_dataset
 
 import torch
 import torchaudio
@@ -87,10 +95,22 @@ class PreprocessedTensorDataset(Dataset):
                 f"{len(self.sample_paths) - len(self.valid_paths)} missing"
             )
         
+        self._latent_lengths: Optional[List[int]] = None
+
         logger.info(
             f"PreprocessedTensorDataset: {len(self.valid_paths)} samples "
             f"from {self.tensor_dir}"
         )
+
+    @property
+    def latent_lengths(self) -> List[int]:
+        """Latent length ``T`` of every sample (read once, memory-mapped)."""
+        if self._latent_lengths is None:
+            self._latent_lengths = [
+                int(torch.load(p, map_location='cpu', weights_only=True, mmap=True)["target_latents"].shape[0])
+                for p in self.valid_paths
+            ]
+        return self._latent_lengths
     
     def _resolve_manifest_path(self, raw: str) -> Optional[str]:
         """Resolve a single manifest sample path to a validated absolute path.
@@ -149,6 +169,18 @@ class PreprocessedTensorDataset(Dataset):
         }
 
 
+def open_preprocessed_dataset(tensor_dir: str) -> Dataset:
+    """Open a preprocessed dataset in either on-disk format.
+
+    Directories containing a ``shards_index.json`` are read through the
+    memory-mapped :class:`ShardedTensorDataset`; anything else falls back to
+    per-sample ``.pt`` files via :class:`PreprocessedTensorDataset`.
+    """
+    if is_sharded_dataset(safe_path(tensor_dir)):
+        return ShardedTensorDataset(tensor_dir)
+    return PreprocessedTensorDataset(tensor_dir)
+
+
 def collate_preprocessed_batch(batch: List[Dict]) -> Dict[str, torch.Tensor]:
     """Collate function for preprocessed tensor batches.
     
@@ -234,15 +266,26 @@ class PreprocessedDataModule(LightningDataModule if LIGHTNING_AVAILABLE else obj
         persistent_workers: bool = True,
         pin_memory_device: str = "",
         val_split: float = 0.0,
+        length_bucketing: bool = False,
+        pack_sequences: bool = False,
+        pack_length: int = 0,
+        seed: int = 0,
     ):
         """Initialize the data module.
         
         Args:
-            tensor_dir: Directory containing preprocessed .pt files
+            tensor_dir: Directory containing preprocessed .pt files or a
+                sharded dataset (``shards_index.json``)
             batch_size: Training batch size
             num_workers: Number of data loading workers
             pin_memory: Whether to pin memory for faster GPU transfer
             val_split: Fraction of data for validation (0 = no validation)
+            length_bucketing: Group similar latent lengths into batches
+                (shuffled per epoch) to reduce padding
+            pack_sequences: Concatenate several clips into packed rows of at
+                most ``pack_length`` frames; ``batch_size`` counts rows
+            pack_length: Latent frames per packed row (0 = longest sample)
+            seed: Base seed for the length-aware samplers
         """
         if LIGHTNING_AVAILABLE:
             super().__init__()
@@ -255,6 +298,10 @@ class PreprocessedDataModule(LightningDataModule if LIGHTNING_AVAILABLE else obj
         self.persistent_workers = persistent_workers
         self.pin_memory_device = pin_memory_device
         self.val_split = val_split
+        self.length_bucketing = length_bucketing
+        self.pack_sequences = pack_sequences
+        self.pack_length = pack_length
+        self.seed = seed
         
         self.train_dataset = None
         self.val_dataset = None
@@ -263,7 +310,7 @@ class PreprocessedDataModule(LightningDataModule if LIGHTNING_AVAILABLE else obj
         """Setup datasets."""
         if stage == 'fit' or stage is None:
             # Create full dataset
-            full_dataset = PreprocessedTensorDataset(self.tensor_dir)
+            full_dataset = open_preprocessed_dataset(self.tensor_dir)
             
             # Split if validation requested
             if self.val_split > 0 and len(full_dataset) > 1:
@@ -277,20 +324,41 @@ class PreprocessedDataModule(LightningDataModule if LIGHTNING_AVAILABLE else obj
                 self.train_dataset = full_dataset
                 self.val_dataset = None
     
+    def _batching_kwargs(self, dataset, shuffle: bool) -> Dict[str, Any]:
+        """Sampler/collate DataLoader arguments for the configured batching mode."""
+        if self.pack_sequences:
+            lengths = dataset_latent_lengths(dataset)
+            pack_length = self.pack_length or max(lengths, default=1)
+            return dict(
+                batch_sampler=PackedBatchSampler(
+                    lengths, pack_length, rows_per_batch=self.batch_size, shuffle=shuffle, seed=self.seed,
+                ),
+                collate_fn=partial(collate_packed_batch, pack_length=pack_length),
+            )
+        if self.length_bucketing:
+            return dict(
+                batch_sampler=LengthBucketBatchSampler(
+                    dataset_latent_lengths(dataset), self.batch_size, shuffle=shuffle, seed=self.seed,
+                ),
+                collate_fn=collate_preprocessed_batch,
+            )
+        return dict(
+            batch_size=self.batch_size,
+            shuffle=shuffle,
+            collate_fn=collate_preprocessed_batch,
+        )
+
     def train_dataloader(self) -> DataLoader:
         """Create training dataloader."""
         prefetch_factor = None if self.num_workers == 0 else self.prefetch_factor
         persistent_workers = False if self.num_workers == 0 else self.persistent_workers
         kwargs = dict(
             dataset=self.train_dataset,
-            batch_size=self.batch_size,
-            shuffle=True,
             num_workers=self.num_workers,
             pin_memory=self.pin_memory,
-            collate_fn=collate_preprocessed_batch,
-            drop_last=False,
             prefetch_factor=prefetch_factor,
             persistent_workers=persistent_workers,
+            **self._batching_kwargs(self.train_dataset, shuffle=True),
         )
         if self.pin_memory_device:
             kwargs["pin_memory_device"] = self.pin_memory_device
@@ -304,13 +372,11 @@ class PreprocessedDataModule(LightningDataModule if LIGHTNING_AVAILABLE else obj
         persistent_workers = False if self.num_workers == 0 else self.persistent_workers
         kwargs = dict(
             dataset=self.val_dataset,
-            batch_size=self.batch_size,
-            shuffle=False,
             num_workers=self.num_workers,
             pin_memory=self.pin_memory,
-            collate_fn=collate_preprocessed_batch,
             prefetch_factor=prefetch_factor,
             persistent_workers=persistent_workers,
+            **self._batching_kwargs(self.val_dataset, shuffle=False),
         )
         if self.pin_memory_device:
             kwargs["pin_memory_device"] = self.pin_memory_device
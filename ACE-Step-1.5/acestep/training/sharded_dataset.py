@@ -0,0 +1,354 @@
+"""
+Sharded, memory-mapped storage for preprocessed training tensors.
+
+A sharded dataset directory holds a few large ``shard-NNNNN.bin`` files with
+the raw bytes of every sample's tensors laid out back to back, plus a
+``shards_index.json`` with per-sample offsets, dtypes, shapes, lengths and
+metadata.  Reading a sample is a slice of a memory-mapped shard -- no file
+open or unpickling per sample, and the OS page cache keeps hot shards
+resident across epochs.
+
+Layout of ``shards_index.json``::
+
+    {
+      "format": "acestep-sharded-tensors",
+      "version": 1,
+      "shards": ["shard-00000.bin", ...],
+      "samples": [
+        {
+          "name": "song",
+          "shard": 0,
+          "tensors": {"target_latents": [offset, "bfloat16", [T, 64]], ...},
+          "latent_length": T,
+          "encoder_length": L,
+          "metadata": {...}
+        },
+        ...
+      ]
+    }
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import torch
+from loguru import logger
+from torch.utils.data import Dataset
+
+from acestep.training.path_safety import safe_path
+
+INDEX_FILENAME = "shards_index.json"
+FORMAT_NAME = "acestep-sharded-tensors"
+FORMAT_VERSION = 1
+
+# Tensors stored per sample, in on-disk order.
+TENSOR_KEYS = (
+    "target_latents",
+    "attention_mask",
+    "encoder_hidden_states",
+    "encoder_attention_mask",
+    "context_latents",
+)
+
+# Every tensor starts on this byte boundary so dtype views stay aligned.
+_ALIGNMENT = 64
+DEFAULT_SHARD_SIZE_MB = 1024
+
+_DTYPES = {
+    str(dtype).replace("torch.", ""): dtype
+    for dtype in (torch.float32, torch.float16, torch.bfloat16, torch.float64, torch.int64, torch.int32, torch.bool)
+}
+
+
+def is_sharded_dataset(tensor_dir: str) -> bool:
+    """Return True if *tensor_dir* contains a sharded dataset index."""
+    return os.path.isfile(os.path.join(tensor_dir, INDEX_FILENAME))
+
+
+def _read_index(tensor_dir: str) -> Dict[str, Any]:
+    """Load and validate ``shards_index.json`` from *tensor_dir*."""
+    with open(os.path.join(tensor_dir, INDEX_FILENAME), "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("format") != FORMAT_NAME or index.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported sharded dataset in {tensor_dir}: "
+            f"format={index.get('format')!r} version={index.get('version')!r}"
+        )
+    return index
+
+
+class ShardedDatasetWriter:
+    """Append preprocessed samples to shard files and write the index.
+
+    Re-opening an existing sharded directory appends new shards after the
+    existing ones, so preprocessing stays resumable.  The index is only
+    rewritten on :meth:`close`, so an interrupted run never references
+    partially written shards.
+
+    Example::
+
+        with ShardedDatasetWriter(out_dir) as writer:
+            writer.add("song", sample_dict)
+    """
+
+    def __init__(self, output_dir: str, shard_size_mb: int = DEFAULT_SHARD_SIZE_MB):
+        """Open *output_dir* for writing.
+
+        Args:
+            output_dir: Destination directory (created if missing).
+            shard_size_mb: Start a new shard once the current one exceeds
+                this size.
+        """
+        self.output_dir = output_dir
+        self.shard_size_bytes = max(1, int(shard_size_mb)) * 1024 * 1024
+        os.makedirs(output_dir, exist_ok=True)
+
+        if is_sharded_dataset(output_dir):
+            index = _read_index(output_dir)
+            self.shards: List[str] = list(index["shards"])
+            # Keyed by name so re-adding a sample is O(1); dicts keep order.
+            self.samples: Dict[str, Dict[str, Any]] = {s["name"]: s for s in index["samples"]}
+        else:
+            self.shards = []
+            self.samples = {}
+        self._file = None
+        self._pos = 0
+
+    @property
+    def names(self) -> Set[str]:
+        """Names of all samples already in the dataset."""
+        return set(self.samples)
+
+    def _open_next_shard(self) -> None:
+        """Close the current shard file and start a new one."""
+        if self._file is not None:
+            self._file.close()
+        name = f"shard-{len(self.shards):05d}.bin"
+        self._file = open(os.path.join(self.output_dir, name), "wb")
+        self._pos = 0
+        self.shards.append(name)
+
+    def add(self, name: str, sample: Dict[str, Any]) -> None:
+        """Append one sample.
+
+        Adding a name that already exists replaces its index entry; the old
+        bytes stay in their shard as dead space.
+
+        Args:
+            name: Unique sample name (usually the source file stem).
+            sample: Dict with the :data:`TENSOR_KEYS` tensors and an optional
+                ``metadata`` dict, as produced by preprocessing.
+        """
+        if self._file is None or self._pos >= self.shard_size_bytes:
+            self._open_next_shard()
+
+        tensors: Dict[str, list] = {}
+        for key in TENSOR_KEYS:
+            tensor = sample[key].detach().cpu().contiguous()
+            dtype_name = str(tensor.dtype).replace("torch.", "")
+            if dtype_name not in _DTYPES:
+                raise ValueError(f"Unsupported dtype for {key}: {tensor.dtype}")
+            pad = (-self._pos) % _ALIGNMENT
+            if pad:
+                self._file.write(b"\0" * pad)
+                self._pos += pad
+            data = tensor.reshape(-1).view(torch.uint8).numpy().tobytes()
+            self._file.write(data)
+            tensors[key] = [self._pos, dtype_name, list(tensor.shape)]
+            self._pos += len(data)
+
+        self.samples.pop(name, None)  # a replaced sample moves to the end
+        self.samples[name] = {
+            "name": name,
+            "shard": len(self.shards) - 1,
+            "tensors": tensors,
+            "latent_length": int(sample["target_latents"].shape[0]),
+            "encoder_length": int(sample["encoder_hidden_states"].shape[0]),
+            "metadata": sample.get("metadata", {}),
+        }
+
+    def read_tensor(self, name: str, key: str) -> torch.Tensor:
+        """Read one stored tensor of sample *name* into memory.
+
+        Only samples from shards that are already closed (i.e. written by a
+        previous run) can be read back.
+
+        Raises:
+            KeyError: If *name* or *key* is not in the index.
+        """
+        record = self.samples.get(name)
+        if record is None:
+            raise KeyError(name)
+        offset, dtype_name, shape = record["tensors"][key]
+        dtype = _DTYPES[dtype_name]
+        numel = 1
+        for dim in shape:
+            numel *= dim
+        nbytes = numel * torch.empty(0, dtype=dtype).element_size()
+        with open(os.path.join(self.output_dir, self.shards[record["shard"]]), "rb") as f:
+            f.seek(offset)
+            data = bytearray(f.read(nbytes))
+        if len(data) != nbytes:
+            raise ValueError(f"Truncated shard data for {name}/{key}")
+        return torch.frombuffer(data, dtype=torch.uint8).view(dtype).view(shape)
+
+    def close(self) -> str:
+        """Flush the last shard and atomically write the index.
+
+        Returns:
+            Path to the written index file.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        index = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "shards": self.shards,
+            "samples": list(self.samples.values()),
+            "num_samples": len(self.samples),
+        }
+        index_path = os.path.join(self.output_dir, INDEX_FILENAME)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, default=str)
+        os.replace(tmp_path, index_path)
+        return index_path
+
+    def __enter__(self) -> "ShardedDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ShardedTensorDataset(Dataset):
+    """Dataset over a sharded directory written by :class:`ShardedDatasetWriter`.
+
+    Shards are memory-mapped lazily (per DataLoader worker) and every
+    returned tensor is a zero-copy view into the mapping.  The views are
+    copy-on-write: in-place edits never reach the file.
+    """
+
+    def __init__(self, tensor_dir: str):
+        """Open a sharded dataset directory.
+
+        Args:
+            tensor_dir: Directory containing ``shards_index.json``.
+
+        Raises:
+            ValueError: If tensor_dir is not an existing sharded dataset,
+                escapes the safe root, or references unsafe shard paths.
+        """
+        validated_dir = safe_path(tensor_dir)
+        if not is_sharded_dataset(validated_dir):
+            raise ValueError(f"Not a sharded dataset directory: {tensor_dir}")
+        self.tensor_dir = validated_dir
+        index = _read_index(validated_dir)
+        self.shard_paths = [safe_path(name, base=validated_dir) for name in index["shards"]]
+        self.samples: List[Dict[str, Any]] = index["samples"]
+        self._buffers: Dict[int, torch.Tensor] = {}
+
+        logger.info(
+            f"ShardedTensorDataset: {len(self.samples)} samples in "
+            f"{len(self.shard_paths)} shards from {self.tensor_dir}"
+        )
+
+    @property
+    def latent_lengths(self) -> List[int]:
+        """Latent length ``T`` of every sample, without touching the shards."""
+        return [s["latent_length"] for s in self.samples]
+
+    def _buffer(self, shard: int) -> torch.Tensor:
+        """Return a uint8 tensor over the memory-mapped shard."""
+        buf = self._buffers.get(shard)
+        if buf is None:
+            path = self.shard_paths[shard]
+            nbytes = os.path.getsize(path)
+            storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=nbytes)
+            buf = torch.empty(0, dtype=torch.uint8).set_(storage)
+            self._buffers[shard] = buf
+        return buf
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Mappings are per process; workers re-open shards on first access.
+        state = self.__dict__.copy()
+        state["_buffers"] = {}
+        return state
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        """Return zero-copy tensor views for one sample."""
+        record = self.samples[idx]
+        buf = self._buffer(record["shard"])
+        out: Dict[str, Any] = {}
+        for key, (offset, dtype_name, shape) in record["tensors"].items():
+            dtype = _DTYPES[dtype_name]
+            numel = 1
+            for dim in shape:
+                numel *= dim
+            nbytes = numel * torch.empty(0, dtype=dtype).element_size()
+            out[key] = buf[offset:offset + nbytes].view(dtype).view(shape)
+        out["metadata"] = record.get("metadata", {})
+        return out
+
+
+def convert_pt_dir_to_shards(
+    tensor_dir: str,
+    output_dir: str,
+    shard_size_mb: int = DEFAULT_SHARD_SIZE_MB,
+    sample_paths: Optional[Iterable[str]] = None,
+) -> Dict[str, Any]:
+    """Convert a directory of per-sample ``.pt`` files to the sharded format.
+
+    Samples already present in *output_dir* (by file stem) are skipped, so
+    the conversion can be resumed or re-run after adding new files.
+
+    Args:
+        tensor_dir: Source directory of preprocessed ``.pt`` files.
+        output_dir: Destination sharded directory (may equal *tensor_dir*).
+        shard_size_mb: Target shard size in MiB.
+        sample_paths: Explicit ``.pt`` paths; defaults to the samples that
+            ``PreprocessedTensorDataset`` would load from *tensor_dir*.
+
+    Returns:
+        Dict with ``converted``, ``skipped``, ``failed``, ``total`` and
+        ``output_dir``.
+    """
+    if sample_paths is None:
+        from acestep.training.data_module import PreprocessedTensorDataset
+
+        sample_paths = PreprocessedTensorDataset(tensor_dir).valid_paths
+    sample_paths = list(sample_paths)
+
+    converted = skipped = failed = 0
+    with ShardedDatasetWriter(output_dir, shard_size_mb=shard_size_mb) as writer:
+        existing = writer.names
+        for path in sample_paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name in existing:
+                skipped += 1
+                continue
+            try:
+                data = torch.load(path, map_location="cpu", weights_only=True)
+                writer.add(name, data)
+                existing.add(name)
+                converted += 1
+            except Exception as exc:
+                failed += 1
+                logger.error(f"Failed to convert {path}: {exc}")
+
+    logger.info(
+        f"Converted {converted} samples to shards in {output_dir} "
+        f"({skipped} already present, {failed} failed)"
+    )
+    return {
+        "converted": converted,
+        "skipped": skipped,
+        "failed": failed,
+        "total": len(sample_paths),
+        "output_dir": output_dir,
+    }
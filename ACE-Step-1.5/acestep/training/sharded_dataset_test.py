@@ -0,0 +1,140 @@
+"""Tests for the sharded, memory-mapped preprocessed dataset format."""
+
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+import torch
+
+from acestep.training.data_module import collate_preprocessed_batch, open_preprocessed_dataset
+from acestep.training.path_safety import set_safe_root
+from acestep.training.sharded_dataset import (
+    INDEX_FILENAME,
+    ShardedDatasetWriter,
+    ShardedTensorDataset,
+    convert_pt_dir_to_shards,
+)
+
+
+def _sample(length, dtype=torch.bfloat16, seed=0):
+    """Build a preprocessed sample with distinct lengths per tensor group."""
+    gen = torch.Generator().manual_seed(seed)
+    return {
+        "target_latents": torch.randn(length, 8, generator=gen).to(dtype),
+        "attention_mask": torch.ones(length, dtype=dtype),
+        "encoder_hidden_states": torch.randn(length // 2 + 1, 16, generator=gen).to(dtype),
+        "encoder_attention_mask": torch.ones(length // 2 + 1, dtype=dtype),
+        "context_latents": torch.randn(length, 12, generator=gen).to(dtype),
+        "metadata": {"caption": f"sample {seed}"},
+    }
+
+
+class ShardedDatasetTests(unittest.TestCase):
+    """Round-trip and loader behaviour of the sharded format."""
+
+    def setUp(self):
+        set_safe_root(tempfile.gettempdir())
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _assert_same(self, actual, expected):
+        for key in ("target_latents", "attention_mask", "encoder_hidden_states",
+                    "encoder_attention_mask", "context_latents"):
+            self.assertEqual(actual[key].dtype, expected[key].dtype, key)
+            self.assertTrue(torch.equal(actual[key], expected[key]), key)
+        self.assertEqual(actual["metadata"], expected["metadata"])
+
+    def test_round_trip_with_zero_copy_views(self):
+        """Samples read back equal and are views into one mapped shard."""
+        samples = [_sample(10 + i, dtype, seed=i) for i, dtype in enumerate((torch.bfloat16, torch.float32))]
+        with ShardedDatasetWriter(self.root) as writer:
+            for i, sample in enumerate(samples):
+                writer.add(f"s{i}", sample)
+
+        ds = ShardedTensorDataset(self.root)
+        self.assertEqual(len(ds), 2)
+        self.assertEqual(ds.latent_lengths, [10, 11])
+        first, second = ds[0], ds[1]
+        self._assert_same(first, samples[0])
+        self._assert_same(second, samples[1])
+        ptr = ds._buffer(0).untyped_storage().data_ptr()
+        self.assertEqual(first["target_latents"].untyped_storage().data_ptr(), ptr)
+        self.assertEqual(second["context_latents"].untyped_storage().data_ptr(), ptr)
+
+    def test_small_shard_size_rotates_and_append_resumes(self):
+        """Writers start new shards past the size limit and append on reopen."""
+        big = _sample(40000, torch.float32)
+        with ShardedDatasetWriter(self.root, shard_size_mb=1) as writer:
+            writer.add("a", big)
+            writer.add("b", _sample(5, seed=1))
+        with ShardedDatasetWriter(self.root, shard_size_mb=1) as writer:
+            self.assertEqual(writer.names, {"a", "b"})
+            writer.add("c", _sample(6, seed=2))
+
+        with open(os.path.join(self.root, INDEX_FILENAME)) as f:
+            index = json.load(f)
+        self.assertEqual(len(index["shards"]), 3)
+        ds = ShardedTensorDataset(self.root)
+        self._assert_same(ds[0], big)
+        self._assert_same(ds[2], _sample(6, seed=2))
+
+    def test_pickled_dataset_reopens_mapping(self):
+        """Worker copies must not carry the parent's mappings."""
+        with ShardedDatasetWriter(self.root) as writer:
+            writer.add("a", _sample(4))
+        ds = ShardedTensorDataset(self.root)
+        ds[0]
+        clone = pickle.loads(pickle.dumps(ds))
+        self.assertEqual(clone._buffers, {})
+        self._assert_same(clone[0], _sample(4))
+
+    def test_convert_pt_dir_and_data_module_detection(self):
+        """Converted directories are picked up by open_preprocessed_dataset."""
+        pt_dir = os.path.join(self.root, "pt")
+        os.makedirs(pt_dir)
+        for i in range(3):
+            torch.save(_sample(5 + i, seed=i), os.path.join(pt_dir, f"song{i}.pt"))
+
+        self.assertNotIsInstance(open_preprocessed_dataset(pt_dir), ShardedTensorDataset)
+        out_dir = os.path.join(self.root, "sharded")
+        result = convert_pt_dir_to_shards(pt_dir, out_dir)
+        self.assertEqual((result["converted"], result["skipped"], result["failed"]), (3, 0, 0))
+        self.assertEqual(convert_pt_dir_to_shards(pt_dir, out_dir)["skipped"], 3)
+
+        ds = open_preprocessed_dataset(out_dir)
+        self.assertIsInstance(ds, ShardedTensorDataset)
+        by_name = {s["name"]: i for i, s in enumerate(ds.samples)}
+        self._assert_same(ds[by_name["song1"]], _sample(6, seed=1))
+        batch = collate_preprocessed_batch([ds[0], ds[1], ds[2]])
+        self.assertEqual(tuple(batch["target_latents"].shape), (3, 7, 8))
+
+    def test_re_adding_replaces_and_read_tensor_round_trips(self):
+        """A re-added name keeps one index entry; stored tensors read back."""
+        first, second = _sample(6, seed=1), _sample(9, torch.float32, seed=2)
+        with ShardedDatasetWriter(self.root) as writer:
+            writer.add("song", first)
+        with ShardedDatasetWriter(self.root) as writer:
+            self.assertTrue(torch.equal(writer.read_tensor("song", "target_latents"), first["target_latents"]))
+            writer.add("song", second)
+            with self.assertRaises(KeyError):
+                writer.read_tensor("missing", "target_latents")
+
+        ds = ShardedTensorDataset(self.root)
+        self.assertEqual(len(ds), 1)
+        self._assert_same(ds[0], second)
+
+    def test_rejects_unknown_format(self):
+        """An index from another format or version is refused."""
+        with open(os.path.join(self.root, INDEX_FILENAME), "w") as f:
+            json.dump({"format": "other", "version": 1, "shards": [], "samples": []}, f)
+        with self.assertRaises(ValueError):
+            ShardedTensorDataset(self.root)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""
+Training-step loss and gradient book-keeping.
+
+The LoRA/LoKr loops historically read every micro-step loss back with
+``.item()`` and checked each gradient tensor with ``torch.isfinite(...).all()``
+before the optimizer step.  Each of those is a device-to-host sync that
+drains the CUDA queue, so the GPU idles while Python waits.
+
+``StepMetrics`` keeps that behaviour by default (eager mode).  In deferred
+mode the running loss sums and non-finite-gradient counters live in device
+tensors and are only read back when a value is actually reported (logging
+steps and epoch ends).  With a fused Adam/AdamW optimizer a step with
+non-finite gradients is skipped on the device through the optimizer's
+``found_inf`` input, the same mechanism ``torch.amp.GradScaler`` uses;
+other optimizers need one readback per optimizer step to decide.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+import torch
+
+
+@lru_cache(maxsize=None)
+def fused_adamw_available(device_type: str) -> bool:
+    """Return whether ``AdamW(fused=True)`` works for parameters on ``device_type``."""
+    if device_type == "cuda":
+        return True
+    if device_type != "cpu":
+        return False
+    try:
+        torch.optim.AdamW([torch.zeros(1, requires_grad=True)], fused=True)
+    except (RuntimeError, ValueError):
+        return False
+    return True
+
+
+def _skips_on_device(optimizer) -> bool:
+    """Return whether ``optimizer`` honours a ``found_inf`` tensor without host sync."""
+    optimizer = getattr(optimizer, "optimizer", optimizer)  # unwrap Fabric optimizers
+    return isinstance(optimizer, (torch.optim.Adam, torch.optim.AdamW)) and bool(optimizer.defaults.get("fused"))
+
+
+class StepMetrics:
+    """Loss and non-finite-gradient counters for one training run.
+
+    The loops call :meth:`add_loss` after each backward pass,
+    :meth:`check_grads` and :meth:`optimizer_step` around the optimizer
+    step, :meth:`finish_step` once per optimizer step, and the ``read_*``
+    methods only where a number is reported.
+    """
+
+    def __init__(self, device: torch.device, deferred: bool = False):
+        """
+        Args:
+            device: Device the losses and gradients live on.
+            deferred: Keep counters on ``device`` instead of reading every step back.
+        """
+        self.deferred = deferred
+        self.device = torch.device(device)
+        self._micro_steps = 0
+        self._armed = False
+        if deferred:
+            def zero() -> torch.Tensor:
+                return torch.zeros((), dtype=torch.float32, device=self.device)
+
+            self._loss_sum = zero()
+            self._step_loss = zero()
+            self._epoch_loss = zero()
+            self._epoch_updates = zero()
+            self._found_inf = zero()
+            self._skipped = zero()
+        else:
+            self._loss_sum = 0.0
+            self._step_loss = 0.0
+            self._epoch_loss = 0.0
+            self._epoch_updates = 0
+
+    def add_loss(self, loss: torch.Tensor) -> None:
+        """Accumulate one micro-step's (already accumulation-scaled) loss."""
+        if self.deferred:
+            self._loss_sum.add_(loss.detach().float())
+        else:
+            self._loss_sum += loss.item()
+        self._micro_steps += 1
+
+    @property
+    def micro_steps(self) -> int:
+        """Micro-steps accumulated since the last optimizer step."""
+        return self._micro_steps
+
+    def read_pending_loss(self) -> float:
+        """Return the average loss of the unfinished accumulation window."""
+        return float(self._loss_sum) / max(self._micro_steps, 1)
+
+    def check_grads(self, params: List[torch.nn.Parameter], optimizer) -> Tuple[int, int]:
+        """
+        Check gradients for NaN/Inf before the optimizer step.
+
+        Returns:
+            ``(nonfinite, total)`` tensor counts the caller must act on.  When
+            the optimizer can skip on the device, ``nonfinite`` is always 0:
+            :meth:`optimizer_step` hands it the flag instead.
+        """
+        grads = [p.grad for p in params if p.grad is not None]
+        if not self.deferred:
+            return sum(1 for g in grads if not torch.isfinite(g).all()), len(grads)
+        if not grads:
+            self._found_inf.zero_()
+            return 0, 0
+        nonfinite = torch.stack([torch.isfinite(g).all() for g in grads]).logical_not().sum()
+        self._found_inf.copy_(nonfinite.gt(0))
+        if _skips_on_device(optimizer):
+            self._armed = True
+            return 0, len(grads)
+        return int(nonfinite.item()), len(grads)
+
+    def optimizer_step(self, optimizer) -> None:
+        """Run ``optimizer.step()``, letting a fused optimizer skip non-finite steps itself."""
+        if not self._armed:
+            optimizer.step()
+            return
+        inner = getattr(optimizer, "optimizer", optimizer)
+        inner.grad_scale, inner.found_inf = None, self._found_inf
+        try:
+            optimizer.step()
+        finally:
+            del inner.grad_scale, inner.found_inf
+
+    def discard_step(self) -> None:
+        """Drop the accumulated loss of a step the host decided to skip."""
+        if self.deferred:
+            self._loss_sum.zero_()
+        else:
+            self._loss_sum = 0.0
+        self._micro_steps = 0
+        self._armed = False
+
+    def finish_step(self) -> None:
+        """Close the accumulation window after an optimizer step."""
+        steps = max(self._micro_steps, 1)
+        if self.deferred:
+            torch.div(self._loss_sum, steps, out=self._step_loss)
+            if self._armed:
+                # Device-skipped steps count as skipped, not towards the epoch loss.
+                kept = self._found_inf.logical_not()
+                self._epoch_loss.add_(torch.where(kept, self._step_loss, torch.zeros_like(self._step_loss)))
+                self._epoch_updates.add_(kept.float())
+                self._skipped.add_(self._found_inf)
+            else:
+                self._epoch_loss.add_(self._step_loss)
+                self._epoch_updates.add_(1.0)
+            self._loss_sum.zero_()
+        else:
+            self._step_loss = self._loss_sum / steps
+            self._epoch_loss += self._step_loss
+            self._epoch_updates += 1
+            self._loss_sum = 0.0
+        self._micro_steps = 0
+        self._armed = False
+
+    def read_step(self) -> Tuple[float, int]:
+        """
+        Return the last step's loss and the steps skipped on device since the last read.
+
+        In deferred mode this is a single device-to-host transfer.
+        """
+        if not self.deferred:
+            return self._step_loss, 0
+        loss, skipped = torch.stack([self._step_loss, self._skipped]).tolist()
+        self._skipped.zero_()
+        return loss, int(skipped)
+
+    def read_epoch(self) -> float:
+        """Return the average step loss of the epoch and reset the epoch counters."""
+        if not self.deferred:
+            avg = self._epoch_loss / max(self._epoch_updates, 1)
+            self._epoch_loss, self._epoch_updates = 0.0, 0
+            return avg
+        total, updates = torch.stack([self._epoch_loss, self._epoch_updates]).tolist()
+        self._epoch_loss.zero_()
+        self._epoch_updates.zero_()
+        return total / max(updates, 1.0)
+
+    def read_last_loss(self) -> float:
+        """Return the last finished step's loss."""
+        return float(self._step_loss)
@@ -0,0 +1,222 @@
+"""Tests for deferred training-step metrics, counted with a host-sync harness."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from acestep.training import path_safety
+from acestep.training.configs import TrainingConfig
+from acestep.training.step_metrics import StepMetrics, fused_adamw_available
+from acestep.training.trainer import LoRATrainer
+
+_ACESTEP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SYNC_METHODS = ("item", "tolist", "__bool__", "__float__", "__int__")
+
+
+class _SyncCounter:
+    """Count tensor-to-host readbacks issued from ``acestep`` code.
+
+    On CUDA each of these methods blocks until the queue drains; on CPU they
+    are cheap but are the same call sites, so counting them is a faithful
+    proxy.  Calls from torch internals (e.g. optimizer step counters that
+    live on the host) are ignored.
+    """
+
+    def __init__(self):
+        """Start with no recorded syncs."""
+        self.count = 0
+        self._originals = {}
+
+    def __enter__(self):
+        """Patch the readback methods on ``torch.Tensor``."""
+        for name in _SYNC_METHODS:
+            original = getattr(torch.Tensor, name)
+            self._originals[name] = original
+            setattr(torch.Tensor, name, self._wrap(original))
+        return self
+
+    def __exit__(self, *exc):
+        """Restore the original methods."""
+        for name, original in self._originals.items():
+            setattr(torch.Tensor, name, original)
+
+    def _wrap(self, original):
+        """Return ``original`` wrapped to count calls from repo code."""
+        def wrapper(tensor, *args, **kwargs):
+            caller = sys._getframe(1).f_code.co_filename
+            if caller.startswith(_ACESTEP_DIR) and not caller.endswith("_test.py"):
+                self.count += 1
+            return original(tensor, *args, **kwargs)
+
+        return wrapper
+
+
+def _model_and_params():
+    """Return a seeded linear layer and its parameters."""
+    torch.manual_seed(0)
+    model = nn.Linear(4, 4)
+    return model, list(model.parameters())
+
+
+def _micro_step(model, metrics, scale=0.5):
+    """Run forward/backward on random data and record the scaled loss."""
+    x = torch.randn(2, 4)
+    loss = F.mse_loss(model(x), torch.zeros_like(x)) * scale
+    loss.backward()
+    metrics.add_loss(loss)
+
+
+class StepMetricsTests(unittest.TestCase):
+    """Eager and deferred modes must agree; deferred must not sync per step."""
+
+    def test_eager_mode_syncs_every_micro_step_and_grad(self):
+        """The historical path reads back each loss and checks each gradient."""
+        model, params = _model_and_params()
+        optimizer = torch.optim.AdamW(params, lr=1e-3)
+        metrics = StepMetrics(torch.device("cpu"))
+        with _SyncCounter() as syncs:
+            for _ in range(2):
+                _micro_step(model, metrics)
+            metrics.check_grads(params, optimizer)
+        self.assertEqual(syncs.count, 2 + len(params))
+
+    @unittest.skipUnless(fused_adamw_available("cpu"), "fused AdamW on CPU requires torch>=2.4")
+    def test_deferred_mode_syncs_only_on_read(self):
+        """Steps run without readbacks; one read returns the same loss as eager mode."""
+        losses = {}
+        for deferred in (False, True):
+            model, params = _model_and_params()
+            optimizer = torch.optim.AdamW(params, lr=1e-3, fused=deferred)
+            metrics = StepMetrics(torch.device("cpu"), deferred=deferred)
+            torch.manual_seed(1)
+            with _SyncCounter() as syncs:
+                for _ in range(3):
+                    for _ in range(2):
+                        _micro_step(model, metrics)
+                    self.assertEqual(metrics.check_grads(params, optimizer), (0, len(params)))
+                    metrics.optimizer_step(optimizer)
+                    optimizer.zero_grad(set_to_none=True)
+                    metrics.finish_step()
+                step_syncs = syncs.count
+                losses[deferred] = (metrics.read_step()[0], metrics.read_epoch())
+            if deferred:
+                self.assertEqual(step_syncs, 0)
+                self.assertEqual(syncs.count, 2)
+        for eager_value, deferred_value in zip(losses[False], losses[True]):
+            self.assertAlmostEqual(eager_value, deferred_value, places=5)
+
+    @unittest.skipUnless(fused_adamw_available("cpu"), "fused AdamW on CPU requires torch>=2.4")
+    def test_nonfinite_step_is_skipped_on_device(self):
+        """A fused optimizer leaves parameters untouched and the skip is reported later."""
+        model, params = _model_and_params()
+        optimizer = torch.optim.AdamW(params, lr=1e-1, fused=True)
+        metrics = StepMetrics(torch.device("cpu"), deferred=True)
+        before = [p.detach().clone() for p in params]
+        _micro_step(model, metrics)
+        params[0].grad[0, 0] = float("nan")
+        with _SyncCounter() as syncs:
+            metrics.check_grads(params, optimizer)
+            metrics.optimizer_step(optimizer)
+            metrics.finish_step()
+        self.assertEqual(syncs.count, 0)
+        for p, b in zip(params, before):
+            self.assertTrue(torch.equal(p.detach(), b))
+        self.assertFalse(hasattr(optimizer, "found_inf"))
+        self.assertEqual(metrics.read_step()[1], 1)
+        self.assertEqual(metrics.read_epoch(), 0.0)
+
+    def test_non_fused_optimizer_reads_back_once_per_step(self):
+        """Without device-side skipping the host decides with a single readback."""
+        model, params = _model_and_params()
+        optimizer = torch.optim.SGD(params, lr=1e-3)
+        metrics = StepMetrics(torch.device("cpu"), deferred=True)
+        _micro_step(model, metrics)
+        params[1].grad[0] = float("inf")
+        with _SyncCounter() as syncs:
+            self.assertEqual(metrics.check_grads(params, optimizer), (1, len(params)))
+        self.assertEqual(syncs.count, 1)
+
+
+class _TinyModule(nn.Module):
+    """Stand-in for ``PreprocessedLoRAModule`` with a one-layer decoder."""
+
+    def __init__(self):
+        """Build the decoder on CPU."""
+        super().__init__()
+        self.model = nn.Module()
+        self.model.decoder = nn.Linear(4, 4)
+        self.device = torch.device("cpu")
+        self.device_type = "cpu"
+        self.training_losses = []
+
+    def training_step(self, batch, record_loss=True):
+        """Regress the decoder output to zero."""
+        loss = F.mse_loss(self.model.decoder(batch), torch.zeros_like(batch)).float()
+        if record_loss:
+            self.training_losses.append(loss.item())
+        return loss
+
+
+class _DataModule:
+    """Data module serving a fixed list of batches."""
+
+    def __init__(self, batches):
+        """Store the batches."""
+        self._batches = batches
+
+    def train_dataloader(self):
+        """Return the batches as the loader."""
+        return self._batches
+
+
+class BasicLoopSyncTests(unittest.TestCase):
+    """The basic LoRA loop should only read metrics back when it reports them."""
+
+    def setUp(self):
+        """Allow the trainer to write under a temporary directory."""
+        self._tmp = tempfile.TemporaryDirectory()
+        self._old_root = path_safety.get_safe_root()
+        path_safety.set_safe_root(self._tmp.name)
+
+    def tearDown(self):
+        """Restore the safe root."""
+        path_safety.set_safe_root(self._old_root)
+        self._tmp.cleanup()
+
+    def _run(self, deferred):
+        """Train the tiny module and return ``(updates, sync_count)``."""
+        torch.manual_seed(0)
+        config = TrainingConfig(
+            output_dir=os.path.join(self._tmp.name, "out"),
+            gradient_accumulation_steps=2,
+            max_epochs=2,
+            save_every_n_epochs=100,
+            log_every_n_steps=2,
+            deferred_metrics=deferred,
+        )
+        trainer = LoRATrainer(dit_handler=None, lora_config=None, training_config=config)
+        trainer.module = _TinyModule()
+        batches = [torch.randn(2, 4) for _ in range(8)]
+        with mock.patch("acestep.training.trainer.save_lora_weights"), _SyncCounter() as syncs:
+            updates = list(trainer._train_basic(_DataModule(batches), None))
+        return updates, syncs.count
+
+    def test_deferred_loop_matches_eager_with_fewer_syncs(self):
+        """Same reported losses; readbacks only at 4 log steps, 2 epoch ends and the final loss."""
+        eager_updates, eager_syncs = self._run(deferred=False)
+        deferred_updates, deferred_syncs = self._run(deferred=True)
+        self.assertEqual([u[0] for u in eager_updates], [u[0] for u in deferred_updates])
+        for (_, eager_loss, _), (_, deferred_loss, _) in zip(eager_updates[:-1], deferred_updates[:-1]):
+            self.assertAlmostEqual(eager_loss, deferred_loss, places=5)
+        self.assertEqual(eager_syncs, 16)  # one per micro-step
+        self.assertEqual(deferred_syncs, 4 + 2 + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
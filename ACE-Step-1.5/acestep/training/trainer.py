@@ -49,8 +49,10 @@ from acestep.training.lokr_utils import (
     save_lokr_training_checkpoint,
     check_lycoris_available,
 )
+from acestep.training.batch_sampling import set_loader_epoch
 from acestep.training.data_module import PreprocessedDataModule
 from acestep.training.path_safety import safe_path
+from acestep.training.step_metrics import StepMetrics, fused_adamw_available
 
 
 # Turbo model shift=3.0 discrete timesteps (8 steps, same as inference)
@@ -714,7 +716,9 @@ class LoRATrainer:
             logger.info("train_with_fabric using bitsandbytes 8-bit AdamW optimizer")
             optimizer = bnb.optim.AdamW8bit(trainable_params, **optimizer_kwargs)
         else:
-            if self.module.device.type == "cuda":
+            if self.module.device.type == "cuda" or (
+                self.training_config.deferred_metrics and fused_adamw_available(self.module.device.type)
+            ):
                 optimizer_kwargs["fused"] = True
             optimizer = AdamW(trainable_params, **optimizer_kwargs)
         
@@ -820,41 +824,40 @@ class LoRATrainer:
 
         # Training loop
         accumulation_step = 0
-        accumulated_loss = 0.0
+        metrics = StepMetrics(self.module.device, deferred=self.training_config.deferred_metrics)
         optimizer.zero_grad(set_to_none=True)
 
         self.module.model.decoder.train()
 
         for epoch in range(start_epoch, self.training_config.max_epochs):
-            epoch_loss = 0.0
-            num_updates = 0
+            set_loader_epoch(train_loader, epoch)
             epoch_start_time = time.time()
             
             for batch_idx, batch in enumerate(train_loader):
                 # Check for stop signal
                 if training_state and training_state.get("should_stop", False):
-                    yield global_step, accumulated_loss / max(accumulation_step, 1), "⏹️ Training stopped by user"
+                    yield global_step, metrics.read_pending_loss(), "⏹️ Training stopped by user"
                     return
                 
                 # Forward pass
-                loss = self.module.training_step(batch)
+                loss = self.module.training_step(batch, record_loss=not metrics.deferred)
                 loss = loss / self.training_config.gradient_accumulation_steps
                 
                 # Backward pass
                 self.fabric.backward(loss)
-                accumulated_loss += loss.item()
+                metrics.add_loss(loss)
                 accumulation_step += 1
                 
                 # Optimizer step
                 if accumulation_step >= self.training_config.gradient_accumulation_steps:
-                    nonfinite_grads, grad_tensors = _count_nonfinite_grads(trainable_params)
+                    nonfinite_grads, grad_tensors = metrics.check_grads(trainable_params, optimizer)
                     if nonfinite_grads > 0:
                         optimizer.zero_grad(set_to_none=True)
                         yield global_step, float("nan"), (
                             f"⚠️ Non-finite gradients ({nonfinite_grads}/{grad_tensors}); "
                             "skipping optimizer step"
                         )
-                        accumulated_loss = 0.0
+                        metrics.discard_step()
                         accumulation_step = 0
                         continue
 
@@ -865,15 +868,21 @@ class LoRATrainer:
                         error_if_nonfinite=False,
                     )
                     
-                    optimizer.step()
+                    metrics.optimizer_step(optimizer)
                     scheduler.step()
                     optimizer.zero_grad(set_to_none=True)
                     
                     global_step += 1
+                    metrics.finish_step()
+                    accumulation_step = 0
                     
                     # Log
-                    avg_loss = accumulated_loss / accumulation_step
                     if global_step % self.training_config.log_every_n_steps == 0:
+                        avg_loss, skipped = metrics.read_step()
+                        if skipped:
+                            yield global_step, avg_loss, (
+                                f"⚠️ Non-finite gradients; skipped {skipped} optimizer step(s) on device"
+                            )
                         if training_state is not None:
                             if ema_loss is None:
                                 ema_loss = avg_loss
@@ -885,23 +894,18 @@ class LoRATrainer:
                         self.fabric.log("train/loss", avg_loss, step=global_step)
                         self.fabric.log("train/lr", scheduler.get_last_lr()[0], step=global_step)
                         yield global_step, avg_loss, f"Epoch {epoch+1}/{self.training_config.max_epochs}, Step {global_step}, Loss: {avg_loss:.4f}"
-                    
-                    epoch_loss += avg_loss
-                    num_updates += 1
-                    accumulated_loss = 0.0
-                    accumulation_step = 0
 
             # Flush remainder to avoid dropping gradients when epoch length is not
             # divisible by gradient_accumulation_steps.
             if accumulation_step > 0:
-                nonfinite_grads, grad_tensors = _count_nonfinite_grads(trainable_params)
+                nonfinite_grads, grad_tensors = metrics.check_grads(trainable_params, optimizer)
                 if nonfinite_grads > 0:
                     optimizer.zero_grad(set_to_none=True)
                     yield global_step, float("nan"), (
                         f"⚠️ Non-finite gradients ({nonfinite_grads}/{grad_tensors}); "
                         "skipping optimizer remainder step"
                     )
-                    accumulated_loss = 0.0
+                    metrics.discard_step()
                     accumulation_step = 0
                 else:
                     self.fabric.clip_gradients(
@@ -911,33 +915,34 @@ class LoRATrainer:
                         error_if_nonfinite=False,
                     )
 
-                    optimizer.step()
+                    metrics.optimizer_step(optimizer)
                     scheduler.step()
                     optimizer.zero_grad(set_to_none=True)
 
-                global_step += 1
-                avg_loss = accumulated_loss / accumulation_step
-                if global_step % self.training_config.log_every_n_steps == 0:
-                    if training_state is not None:
-                        if ema_loss is None:
-                            ema_loss = avg_loss
-                        else:
-                            ema_loss = ema_alpha * avg_loss + (1 - ema_alpha) * ema_loss
-                        training_state["plot_steps"].append(global_step)
-                        training_state["plot_loss"].append(avg_loss)
-                        training_state["plot_ema"].append(ema_loss)
-                    self.fabric.log("train/loss", avg_loss, step=global_step)
-                    self.fabric.log("train/lr", scheduler.get_last_lr()[0], step=global_step)
-                    yield global_step, avg_loss, f"Epoch {epoch+1}/{self.training_config.max_epochs}, Step {global_step}, Loss: {avg_loss:.4f}"
-
-                    epoch_loss += avg_loss
-                    num_updates += 1
-                    accumulated_loss = 0.0
+                    global_step += 1
+                    metrics.finish_step()
                     accumulation_step = 0
+                    if global_step % self.training_config.log_every_n_steps == 0:
+                        avg_loss, skipped = metrics.read_step()
+                        if skipped:
+                            yield global_step, avg_loss, (
+                                f"⚠️ Non-finite gradients; skipped {skipped} optimizer step(s) on device"
+                            )
+                        if training_state is not None:
+                            if ema_loss is None:
+                                ema_loss = avg_loss
+                            else:
+                                ema_loss = ema_alpha * avg_loss + (1 - ema_alpha) * ema_loss
+                            training_state["plot_steps"].append(global_step)
+                            training_state["plot_loss"].append(avg_loss)
+                            training_state["plot_ema"].append(ema_loss)
+                        self.fabric.log("train/loss", avg_loss, step=global_step)
+                        self.fabric.log("train/lr", scheduler.get_last_lr()[0], step=global_step)
+                        yield global_step, avg_loss, f"Epoch {epoch+1}/{self.training_config.max_epochs}, Step {global_step}, Loss: {avg_loss:.4f}"
             
             # End of epoch
             epoch_time = time.time() - epoch_start_time
-            avg_epoch_loss = epoch_loss / max(num_updates, 1)
+            avg_epoch_loss = metrics.read_epoch()
             if training_state is not None:
                 if ema_loss is None:
                     ema_loss = avg_epoch_loss
@@ -960,10 +965,10 @@ class LoRATrainer:
                 with torch.no_grad():
                     for val_batch in val_loader:
                         v_loss = self.module.training_step(val_batch, record_loss=False)
-                        total_val_loss += v_loss.item()
+                        total_val_loss += v_loss.detach()  # read back once below
                         n_val += 1
                 self.module.model.decoder.train()
-                val_loss = total_val_loss / max(n_val, 1)
+                val_loss = float(total_val_loss) / max(n_val, 1)
                 if training_state is not None:
                     training_state["plot_val_steps"].append(global_step)
                     training_state["plot_val_loss"].append(val_loss)
@@ -999,7 +1004,7 @@ class LoRATrainer:
         final_path = os.path.join(self.training_config.output_dir, "final")
         save_lora_weights(self.module.model, final_path)
         
-        final_loss = self.module.training_losses[-1] if self.module.training_losses else 0.0
+        final_loss = self.module.training_losses[-1] if self.module.training_losses else metrics.read_last_loss()
         yield global_step, final_loss, f"✅ Training complete! LoRA saved to {final_path}"
     
     def _train_basic(
@@ -1044,25 +1049,24 @@ class LoRATrainer:
         
         global_step = 0
         accumulation_step = 0
-        accumulated_loss = 0.0
+        metrics = StepMetrics(self.module.device, deferred=self.training_config.deferred_metrics)
         optimizer.zero_grad(set_to_none=True)
         
         self.module.model.decoder.train()
         
         for epoch in range(self.training_config.max_epochs):
-            epoch_loss = 0.0
-            num_updates = 0
+            set_loader_epoch(train_loader, epoch)
             epoch_start_time = time.time()
             
             for batch in train_loader:
                 if training_state and training_state.get("should_stop", False):
-                    yield global_step, accumulated_loss / max(accumulation_step, 1), "⏹️ Training stopped"
+                    yield global_step, metrics.read_pending_loss(), "⏹️ Training stopped"
                     return
                 
-                loss = self.module.training_step(batch)
+                loss = self.module.training_step(batch, record_loss=not metrics.deferred)
                 loss = loss / self.training_config.gradient_accumulation_steps
                 loss.backward()
-                accumulated_loss += loss.item()
+                metrics.add_loss(loss)
                 accumulation_step += 1
                 
                 if accumulation_step >= self.training_config.gradient_accumulation_steps:
@@ -1071,15 +1075,12 @@ class LoRATrainer:
                     scheduler.step()
                     optimizer.zero_grad(set_to_none=True)
                     global_step += 1
+                    metrics.finish_step()
+                    accumulation_step = 0
                     
-                    avg_loss = accumulated_loss / accumulation_step
                     if global_step % self.training_config.log_every_n_steps == 0:
+                        avg_loss, _ = metrics.read_step()
                         yield global_step, avg_loss, f"Epoch {epoch+1}, Step {global_step}, Loss: {avg_loss:.4f}"
-                    
-                    epoch_loss += avg_loss
-                    num_updates += 1
-                    accumulated_loss = 0.0
-                    accumulation_step = 0
 
             if accumulation_step > 0:
                 torch.nn.utils.clip_grad_norm_(trainable_params, self.training_config.max_grad_norm)
@@ -1087,18 +1088,15 @@ class LoRATrainer:
                 scheduler.step()
                 optimizer.zero_grad(set_to_none=True)
                 global_step += 1
+                metrics.finish_step()
+                accumulation_step = 0
 
-                avg_loss = accumulated_loss / accumulation_step
                 if global_step % self.training_config.log_every_n_steps == 0:
+                    avg_loss, _ = metrics.read_step()
                     yield global_step, avg_loss, f"Epoch {epoch+1}, Step {global_step}, Loss: {avg_loss:.4f}"
-
-                epoch_loss += avg_loss
-                num_updates += 1
-                accumulated_loss = 0.0
-                accumulation_step = 0
             
             epoch_time = time.time() - epoch_start_time
-            avg_epoch_loss = epoch_loss / max(num_updates, 1)
+            avg_epoch_loss = metrics.read_epoch()
             yield global_step, avg_epoch_loss, f"✅ Epoch {epoch+1}/{self.training_config.max_epochs} in {epoch_time:.1f}s"
             
             if (epoch + 1) % self.training_config.save_every_n_epochs == 0:
@@ -1108,7 +1106,7 @@ class LoRATrainer:
         
         final_path = os.path.join(self.training_config.output_dir, "final")
         save_lora_weights(self.module.model, final_path)
-        final_loss = self.module.training_losses[-1] if self.module.training_losses else 0.0
+        final_loss = self.module.training_losses[-1] if self.module.training_losses else metrics.read_last_loss()
         yield global_step, final_loss, f"✅ Training complete! LoRA saved to {final_path}"
     
     def stop(self):
@@ -1150,7 +1148,7 @@ class PreprocessedLoKRModule(nn.Module):
         self.config = model.config
         self.training_losses = []
 
-    def training_step(self, batch: Dict[str, torch.Tensor]) -> torch.Tensor:
+    def training_step(self, batch: Dict[str, torch.Tensor], record_loss: bool = True) -> torch.Tensor:
         """Single LoKr training step."""
         if self.device_type in ("cuda", "xpu", "mps"):
             autocast_ctx = torch.autocast(device_type=self.device_type, dtype=self.dtype)
@@ -1198,7 +1196,8 @@ class PreprocessedLoKRModule(nn.Module):
             diffusion_loss = F.mse_loss(decoder_outputs[0], flow)
 
         diffusion_loss = diffusion_loss.float()
-        self.training_losses.append(diffusion_loss.item())
+        if record_loss:
+            self.training_losses.append(diffusion_loss.item())
         return diffusion_loss
 
 
@@ -1402,7 +1401,9 @@ class LoKRTrainer:
             "lr": self.training_config.learning_rate,
             "weight_decay": self.training_config.weight_decay,
         }
-        if self.module.device.type == "cuda":
+        if self.module.device.type == "cuda" or (
+            self.training_config.deferred_metrics and fused_adamw_available(self.module.device.type)
+        ):
             optimizer_kwargs["fused"] = True
         optimizer = AdamW(trainable_params, **optimizer_kwargs)
 
@@ -1436,36 +1437,35 @@ class LoKRTrainer:
         train_loader = self.fabric.setup_dataloaders(train_loader)
 
         accumulation_step = 0
-        accumulated_loss = 0.0
+        metrics = StepMetrics(self.module.device, deferred=self.training_config.deferred_metrics)
         global_step = 0
         optimizer.zero_grad(set_to_none=True)
         self.module.model.decoder.train()
 
         for epoch in range(self.training_config.max_epochs):
-            epoch_loss = 0.0
-            num_updates = 0
+            set_loader_epoch(train_loader, epoch)
             epoch_start_time = time.time()
 
             for batch in train_loader:
                 if training_state and training_state.get("should_stop", False):
-                    yield global_step, accumulated_loss / max(accumulation_step, 1), "⏹️ Training stopped by user"
+                    yield global_step, metrics.read_pending_loss(), "⏹️ Training stopped by user"
                     return
 
-                loss = self.module.training_step(batch)
+                loss = self.module.training_step(batch, record_loss=not metrics.deferred)
                 loss = loss / self.training_config.gradient_accumulation_steps
-
                 self.fabric.backward(loss)
-                accumulated_loss += loss.item()
+                metrics.add_loss(loss)
                 accumulation_step += 1
 
                 if accumulation_step >= self.training_config.gradient_accumulation_steps:
                     if manual_nonfinite_check:
-                        nonfinite_grads, grad_tensors, nonfinite_details = _count_nonfinite_grads_detailed(
-                            trainable_params,
-                            param_name_lookup,
-                            detail_limit=10,
-                        )
+                        nonfinite_grads, grad_tensors = metrics.check_grads(trainable_params, optimizer)
                         if nonfinite_grads > 0:
+                            _, _, nonfinite_details = _count_nonfinite_grads_detailed(
+                                trainable_params,
+                                param_name_lookup,
+                                detail_limit=10,
+                            )
                             if nonfinite_details:
                                 logger.warning(
                                     f"LoKr non-finite gradients ({nonfinite_grads}/{grad_tensors}) at epoch "
@@ -1477,7 +1477,7 @@ class LoKRTrainer:
                                 f"⚠️ Non-finite gradients ({nonfinite_grads}/{grad_tensors}); "
                                 "skipping optimizer step (see logs for tensor names)"
                             )
-                            accumulated_loss = 0.0
+                            metrics.discard_step()
                             accumulation_step = 0
                             continue
 
@@ -1487,14 +1487,19 @@ class LoKRTrainer:
                         max_norm=self.training_config.max_grad_norm,
                         error_if_nonfinite=False,
                     )
-
-                    optimizer.step()
+                    metrics.optimizer_step(optimizer)
                     scheduler.step()
                     optimizer.zero_grad(set_to_none=True)
                     global_step += 1
+                    metrics.finish_step()
+                    accumulation_step = 0
 
-                    avg_loss = accumulated_loss / accumulation_step
                     if global_step % self.training_config.log_every_n_steps == 0:
+                        avg_loss, skipped = metrics.read_step()
+                        if skipped:
+                            yield global_step, avg_loss, (
+                                f"⚠️ Non-finite gradients; skipped {skipped} optimizer step(s) on device"
+                            )
                         self.fabric.log("train/loss", avg_loss, step=global_step)
                         self.fabric.log("train/lr", scheduler.get_last_lr()[0], step=global_step)
                         yield global_step, avg_loss, (
@@ -1502,19 +1507,15 @@ class LoKRTrainer:
                             f"Step {global_step}, Loss: {avg_loss:.4f}"
                         )
 
-                    epoch_loss += avg_loss
-                    num_updates += 1
-                    accumulated_loss = 0.0
-                    accumulation_step = 0
-
             if accumulation_step > 0:
                 if manual_nonfinite_check:
-                    nonfinite_grads, grad_tensors, nonfinite_details = _count_nonfinite_grads_detailed(
-                        trainable_params,
-                        param_name_lookup,
-                        detail_limit=10,
-                    )
+                    nonfinite_grads, grad_tensors = metrics.check_grads(trainable_params, optimizer)
                     if nonfinite_grads > 0:
+                        _, _, nonfinite_details = _count_nonfinite_grads_detailed(
+                            trainable_params,
+                            param_name_lookup,
+                            detail_limit=10,
+                        )
                         if nonfinite_details:
                             logger.warning(
                                 f"LoKr non-finite remainder gradients ({nonfinite_grads}/{grad_tensors}) at epoch "
@@ -1526,7 +1527,7 @@ class LoKRTrainer:
                             f"⚠️ Non-finite gradients ({nonfinite_grads}/{grad_tensors}); "
                             "skipping optimizer remainder step (see logs for tensor names)"
                         )
-                        accumulated_loss = 0.0
+                        metrics.discard_step()
                         accumulation_step = 0
                         continue
 
@@ -1536,13 +1537,19 @@ class LoKRTrainer:
                     max_norm=self.training_config.max_grad_norm,
                     error_if_nonfinite=False,
                 )
-
-                optimizer.step()
+                metrics.optimizer_step(optimizer)
                 scheduler.step()
                 optimizer.zero_grad(set_to_none=True)
                 global_step += 1
-                avg_loss = accumulated_loss / accumulation_step
+                metrics.finish_step()
+                accumulation_step = 0
+
                 if global_step % self.training_config.log_every_n_steps == 0:
+                    avg_loss, skipped = metrics.read_step()
+                    if skipped:
+                        yield global_step, avg_loss, (
+                            f"⚠️ Non-finite gradients; skipped {skipped} optimizer step(s) on device"
+                        )
                     self.fabric.log("train/loss", avg_loss, step=global_step)
                     self.fabric.log("train/lr", scheduler.get_last_lr()[0], step=global_step)
                     yield global_step, avg_loss, (
@@ -1550,13 +1557,8 @@ class LoKRTrainer:
                         f"Step {global_step}, Loss: {avg_loss:.4f}"
                     )
 
-                epoch_loss += avg_loss
-                num_updates += 1
-                accumulated_loss = 0.0
-                accumulation_step = 0
-
             epoch_time = time.time() - epoch_start_time
-            avg_epoch_loss = epoch_loss / max(num_updates, 1)
+            avg_epoch_loss = metrics.read_epoch()
 
             self.fabric.log("train/epoch_loss", avg_epoch_loss, step=epoch + 1)
             yield global_step, avg_epoch_loss, (
@@ -1587,7 +1589,7 @@ class LoKRTrainer:
             final_path,
             metadata=final_metadata,
         )
-        final_loss = self.module.training_losses[-1] if self.module.training_losses else 0.0
+        final_loss = self.module.training_losses[-1] if self.module.training_losses else metrics.read_last_loss()
         yield global_step, final_loss, f"✅ Training complete! LoKr saved to {final_path}"
 
     def _train_basic(
@@ -1627,24 +1629,23 @@ class LoKRTrainer:
 
         global_step = 0
         accumulation_step = 0
-        accumulated_loss = 0.0
+        metrics = StepMetrics(self.module.device, deferred=self.training_config.deferred_metrics)
         optimizer.zero_grad(set_to_none=True)
         self.module.model.decoder.train()
 
         for epoch in range(self.training_config.max_epochs):
-            epoch_loss = 0.0
-            num_updates = 0
+            set_loader_epoch(train_loader, epoch)
             epoch_start_time = time.time()
 
             for batch in train_loader:
                 if training_state and training_state.get("should_stop", False):
-                    yield global_step, accumulated_loss / max(accumulation_step, 1), "⏹️ Training stopped"
+                    yield global_step, metrics.read_pending_loss(), "⏹️ Training stopped"
                     return
 
-                loss = self.module.training_step(batch)
+                loss = self.module.training_step(batch, record_loss=not metrics.deferred)
                 loss = loss / self.training_config.gradient_accumulation_steps
                 loss.backward()
-                accumulated_loss += loss.item()
+                metrics.add_loss(loss)
                 accumulation_step += 1
 
                 if accumulation_step >= self.training_config.gradient_accumulation_steps:
@@ -1653,34 +1654,28 @@ class LoKRTrainer:
                     scheduler.step()
                     optimizer.zero_grad(set_to_none=True)
                     global_step += 1
+                    metrics.finish_step()
+                    accumulation_step = 0
 
-                    avg_loss = accumulated_loss / accumulation_step
                     if global_step % self.training_config.log_every_n_steps == 0:
+                        avg_loss, _ = metrics.read_step()
                         yield global_step, avg_loss, f"Epoch {epoch+1}, Step {global_step}, Loss: {avg_loss:.4f}"
 
-                    epoch_loss += avg_loss
-                    num_updates += 1
-                    accumulated_loss = 0.0
-                    accumulation_step = 0
-
             if accumulation_step > 0:
                 torch.nn.utils.clip_grad_norm_(trainable_params, self.training_config.max_grad_norm)
                 optimizer.step()
                 scheduler.step()
                 optimizer.zero_grad(set_to_none=True)
                 global_step += 1
+                metrics.finish_step()
+                accumulation_step = 0
 
-                avg_loss = accumulated_loss / accumulation_step
                 if global_step % self.training_config.log_every_n_steps == 0:
+                    avg_loss, _ = metrics.read_step()
                     yield global_step, avg_loss, f"Epoch {epoch+1}, Step {global_step}, Loss: {avg_loss:.4f}"
 
-                epoch_loss += avg_loss
-                num_updates += 1
-                accumulated_loss = 0.0
-                accumulation_step = 0
-
             epoch_time = time.time() - epoch_start_time
-            avg_epoch_loss = epoch_loss / max(num_updates, 1)
+            avg_epoch_loss = metrics.read_epoch()
             yield global_step, avg_epoch_loss, f"✅ Epoch {epoch+1}/{self.training_config.max_epochs} in {epoch_time:.1f}s"
 
             if (epoch + 1) % self.training_config.save_every_n_epochs == 0:
@@ -1706,7 +1701,7 @@ class LoKRTrainer:
             final_path,
             metadata=final_metadata,
         )
-        final_loss = self.module.training_losses[-1] if self.module.training_losses else 0.0
+        final_loss = self.module.training_losses[-1] if self.module.training_losses else metrics.read_last_loss()
         yield global_step, final_loss, f"✅ Training complete! LoKr saved to {final_path}"
 
     def stop(self):
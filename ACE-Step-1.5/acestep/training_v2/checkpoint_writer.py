@@ -0,0 +1,226 @@
+"""
+Background checkpoint writer for Side-Step training.
+
+A synchronous ``save_checkpoint`` pickles the optimizer state, encodes the
+adapter safetensors and hits the disk while the GPU sits idle.  With
+``AsyncCheckpointWriter`` the training thread only snapshots the state
+dicts into host memory; serialisation and I/O run on a background thread.
+
+Each checkpoint is written into a hidden temporary sibling directory and
+renamed into place once every file is on disk, so an interrupted save
+never leaves a half-written ``epoch_N`` behind for ``--resume-from`` to
+pick up; staging directories left by a killed process are removed before
+the first save into the same directory.  Pruning old checkpoints
+(keep-last-N) runs on the same thread.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_DIR_RE = re.compile(r"^epoch_(\d+)$")
+_STAGING_DIR_RE = re.compile(r"^\..+\.(tmp|old)-")
+
+# Parent directories already cleared of staging dirs left by a killed run.
+_swept_parents: set = set()
+_swept_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Host snapshots
+# ---------------------------------------------------------------------------
+
+def snapshot_to_host(obj: Any) -> Any:
+    """Deep-copy *obj* with every tensor copied to CPU memory.
+
+    Nested dicts, lists and tuples (state dicts, optimizer param groups)
+    are rebuilt; other leaves are deep-copied.  Device tensors are copied
+    into pinned buffers without blocking and synchronised once at the end,
+    so a large optimizer state costs one wait instead of one per tensor.
+    """
+    issued = []
+    result = _snapshot(obj, issued)
+    if issued:
+        torch.cuda.synchronize()
+    return result
+
+
+def _snapshot(obj: Any, issued: list) -> Any:
+    if isinstance(obj, torch.Tensor):
+        tensor = obj.detach()
+        if tensor.device.type == "cuda":
+            host = torch.empty(tensor.shape, dtype=tensor.dtype, device="cpu", pin_memory=True)
+            host.copy_(tensor, non_blocking=True)
+            issued.append(host)
+            return host
+        return tensor.to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return type(obj)((key, _snapshot(value, issued)) for key, value in obj.items())
+    if isinstance(obj, list):
+        return [_snapshot(value, issued) for value in obj]
+    if isinstance(obj, tuple):
+        return tuple(_snapshot(value, issued) for value in obj)
+    return copy.deepcopy(obj)
+
+
+# ---------------------------------------------------------------------------
+# Rotation
+# ---------------------------------------------------------------------------
+
+def prune_checkpoints(checkpoints_root: str, keep_last_n: int) -> list:
+    """Delete all but the newest *keep_last_n* ``epoch_N`` directories.
+
+    ``keep_last_n <= 0`` keeps everything.  Returns the removed paths.
+    """
+    if keep_last_n <= 0 or not os.path.isdir(checkpoints_root):
+        return []
+    epochs = []
+    for name in os.listdir(checkpoints_root):
+        match = _EPOCH_DIR_RE.match(name)
+        path = os.path.join(checkpoints_root, name)
+        if match and os.path.isdir(path):
+            epochs.append((int(match.group(1)), path))
+    epochs.sort()
+    removed = []
+    for _, path in epochs[:-keep_last_n]:
+        shutil.rmtree(path, ignore_errors=True)
+        removed.append(path)
+    if removed:
+        logger.info("[Side-Step] Pruned %d old checkpoint(s), keeping the last %d", len(removed), keep_last_n)
+    return removed
+
+
+def remove_stale_staging_dirs(parent: str) -> list:
+    """Delete hidden ``.<name>.tmp-*`` / ``.<name>.old-*`` dirs in *parent*.
+
+    These only survive when a process dies mid-save.  Returns the removed
+    paths.
+    """
+    if not os.path.isdir(parent):
+        return []
+    removed = []
+    for name in os.listdir(parent):
+        path = os.path.join(parent, name)
+        if _STAGING_DIR_RE.match(name) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    if removed:
+        logger.info("[Side-Step] Removed %d staging dir(s) left by an interrupted save", len(removed))
+    return removed
+
+
+def _commit_atomically(ckpt_dir: str, write_fn: Callable[[str], None]) -> None:
+    """Run ``write_fn(tmp_dir)`` and rename *tmp_dir* to *ckpt_dir*."""
+    ckpt_dir = os.path.abspath(ckpt_dir)
+    parent, name = os.path.split(ckpt_dir)
+    os.makedirs(parent, exist_ok=True)
+    # Sweep once per directory and process, before this process stages
+    # anything there, so only a previous run's leftovers can match.
+    with _swept_lock:
+        if parent not in _swept_parents:
+            remove_stale_staging_dirs(parent)
+            _swept_parents.add(parent)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{name}.tmp-", dir=parent)
+    try:
+        write_fn(tmp_dir)
+        if os.path.isdir(ckpt_dir):
+            # Overwriting an existing checkpoint: move it aside first so the
+            # new one still lands with a single rename.
+            stale = tempfile.mkdtemp(prefix=f".{name}.old-", dir=parent)
+            os.replace(ckpt_dir, os.path.join(stale, name))
+            os.replace(tmp_dir, ckpt_dir)
+            shutil.rmtree(stale, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, ckpt_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Writer
+# ---------------------------------------------------------------------------
+
+class AsyncCheckpointWriter:
+    """Write checkpoints from a background thread.
+
+    ``submit`` blocks while *max_pending* saves are queued or in flight,
+    which bounds the host memory held by snapshots.  A failed write is
+    logged and re-raised from the next ``submit``, ``wait`` or ``close``.
+    """
+
+    def __init__(self, max_pending: int = 1, keep_last_n: int = 0) -> None:
+        self.max_pending = max(1, int(max_pending))
+        self.keep_last_n = max(0, int(keep_last_n))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="side-step-checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, ckpt_dir: str, write_fn: Callable[[str], None]) -> None:
+        """Queue ``write_fn(tmp_dir)`` to produce *ckpt_dir* atomically.
+
+        *write_fn* must only touch host snapshots, never live training
+        state, since it runs concurrently with the next training steps.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncCheckpointWriter is closed")
+        self._raise_error()
+        start = time.perf_counter()
+        self._slots.acquire()
+        waited = time.perf_counter() - start
+        if waited > 0.1:
+            logger.info("[Side-Step] Waited %.1fs for a pending checkpoint write", waited)
+        self._queue.put((ckpt_dir, write_fn))
+
+    def wait(self) -> None:
+        """Block until every queued checkpoint has been written."""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the background thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.join()
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError(f"Background checkpoint write failed: {error}") from error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            ckpt_dir, write_fn = item
+            try:
+                _commit_atomically(ckpt_dir, write_fn)
+                prune_checkpoints(os.path.dirname(os.path.abspath(ckpt_dir)), self.keep_last_n)
+            except BaseException as exc:
+                logger.error("[Side-Step] Checkpoint write to %s failed: %s", ckpt_dir, exc)
+                self._error = exc
+            finally:
+                self._slots.release()
+                self._queue.task_done()
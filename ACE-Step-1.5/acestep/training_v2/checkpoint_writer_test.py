@@ -0,0 +1,131 @@
+"""Unit tests for the background checkpoint writer."""
+
+import os
+import tempfile
+import threading
+import unittest
+
+import torch
+
+from acestep.training_v2.checkpoint_writer import (
+    AsyncCheckpointWriter,
+    prune_checkpoints,
+    snapshot_to_host,
+)
+
+
+class SnapshotTests(unittest.TestCase):
+    """Snapshots must not alias live training state."""
+
+    def test_snapshot_copies_tensors_and_nested_containers(self):
+        """Mutating the source after the snapshot leaves the copy untouched."""
+        weight = torch.ones(3)
+        state = {"state": {0: {"exp_avg": weight, "step": torch.tensor(4.0)}}, "param_groups": [{"lr": 1e-4, "params": [0]}]}
+        snap = snapshot_to_host(state)
+        weight.add_(1.0)
+        state["param_groups"][0]["lr"] = 0.5
+        self.assertTrue(torch.equal(snap["state"][0]["exp_avg"], torch.ones(3)))
+        self.assertEqual(snap["param_groups"][0]["lr"], 1e-4)
+        self.assertEqual(snap["state"][0]["step"].device.type, "cpu")
+
+
+class AsyncCheckpointWriterTests(unittest.TestCase):
+    """Atomic commits, bounded queueing, rotation and error propagation."""
+
+    def setUp(self):
+        """Write checkpoints under a temporary root."""
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self._tmp.name, "checkpoints")
+
+    def tearDown(self):
+        """Remove the temporary root."""
+        self._tmp.cleanup()
+
+    def _ckpt(self, epoch):
+        """Return the directory for ``epoch``."""
+        return os.path.join(self.root, f"epoch_{epoch}")
+
+    def test_writes_land_atomically_and_round_trip(self):
+        """The final directory only appears once the write has finished."""
+        writer = AsyncCheckpointWriter()
+        release = threading.Event()
+        state = snapshot_to_host({"optimizer_state_dict": {"w": torch.arange(4.0)}})
+
+        def write(out_dir):
+            release.wait(5)
+            torch.save(state, os.path.join(out_dir, "training_state.pt"))
+
+        writer.submit(self._ckpt(1), write)
+        self.assertFalse(os.path.exists(self._ckpt(1)))
+        release.set()
+        writer.close()
+        loaded = torch.load(os.path.join(self._ckpt(1), "training_state.pt"))
+        self.assertTrue(torch.equal(loaded["optimizer_state_dict"]["w"], torch.arange(4.0)))
+        self.assertEqual(os.listdir(self.root), ["epoch_1"])
+
+    def test_submit_blocks_while_max_pending_writes_are_in_flight(self):
+        """A second save waits for the first when only one may be pending."""
+        writer = AsyncCheckpointWriter(max_pending=1)
+        release = threading.Event()
+        writer.submit(self._ckpt(1), lambda out_dir: release.wait(5))
+        second = threading.Thread(target=writer.submit, args=(self._ckpt(2), lambda out_dir: None))
+        second.start()
+        second.join(0.2)
+        self.assertTrue(second.is_alive())
+        release.set()
+        second.join(5)
+        self.assertFalse(second.is_alive())
+        writer.close()
+        self.assertEqual(sorted(os.listdir(self.root)), ["epoch_1", "epoch_2"])
+
+    def test_keep_last_n_prunes_older_epochs(self):
+        """Only the newest checkpoints survive, ordered by epoch number."""
+        writer = AsyncCheckpointWriter(max_pending=2, keep_last_n=2)
+        for epoch in (1, 2, 10, 11):
+            writer.submit(self._ckpt(epoch), lambda out_dir: None)
+        writer.close()
+        self.assertEqual(sorted(os.listdir(self.root)), ["epoch_10", "epoch_11"])
+
+    def test_failed_write_leaves_no_directory_and_is_reraised(self):
+        """A crashing write cleans up its temporary directory and surfaces later."""
+        writer = AsyncCheckpointWriter()
+
+        def fail(out_dir):
+            open(os.path.join(out_dir, "partial"), "w").close()
+            raise OSError("disk full")
+
+        writer.submit(self._ckpt(1), fail)
+        with self.assertRaisesRegex(RuntimeError, "disk full"):
+            writer.wait()
+        writer.close()
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_overwrite_replaces_existing_checkpoint(self):
+        """Re-saving an epoch swaps in the new files."""
+        os.makedirs(self._ckpt(1))
+        open(os.path.join(self._ckpt(1), "old"), "w").close()
+        writer = AsyncCheckpointWriter()
+        writer.submit(self._ckpt(1), lambda out_dir: open(os.path.join(out_dir, "new"), "w").close())
+        writer.close()
+        self.assertEqual(os.listdir(self._ckpt(1)), ["new"])
+
+    def test_staging_dirs_from_a_killed_run_are_removed(self):
+        """The first save into a directory clears earlier ``.*.tmp-*`` / ``.*.old-*`` leftovers."""
+        for name in (".epoch_3.tmp-abc", ".epoch_2.old-def", ".hidden", "best"):
+            os.makedirs(os.path.join(self.root, name))
+        writer = AsyncCheckpointWriter()
+        writer.submit(self._ckpt(4), lambda out_dir: None)
+        writer.close()
+        self.assertEqual(sorted(os.listdir(self.root)), [".hidden", "best", "epoch_4"])
+
+    def test_prune_ignores_non_epoch_entries(self):
+        """Temporary and unrelated directories are never pruned."""
+        for name in ("epoch_1", "epoch_2", ".epoch_3.tmp-x", "best"):
+            os.makedirs(os.path.join(self.root, name))
+        removed = prune_checkpoints(self.root, 1)
+        self.assertEqual(removed, [self._ckpt(1)])
+        self.assertEqual(sorted(os.listdir(self.root)), [".epoch_3.tmp-x", "best", "epoch_2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -201,6 +201,24 @@ def _add_common_training_args(parser: argparse.ArgumentParser) -> None:
         default=_DEFAULT_NUM_WORKERS > 0,
         help="Keep workers alive between epochs (default: True; False on Windows)",
     )
+    g_data.add_argument(
+        "--length-bucketing",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Batch clips of similar length together to cut padding (default: False)",
+    )
+    g_data.add_argument(
+        "--pack-sequences",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Pack several short clips into one row with per-clip attention; --batch-size counts rows (default: False)",
+    )
+    g_data.add_argument(
+        "--pack-length",
+        type=int,
+        default=0,
+        help="Latent frames per packed row, 25 per second (default: 0 = longest clip)",
+    )
 
     # -- Training hyperparams ------------------------------------------------
     g_train = parser.add_argument_group("Training")
@@ -247,6 +265,9 @@ def _add_common_training_args(parser: argparse.ArgumentParser) -> None:
     g_ckpt.add_argument("--output-dir", type=str, required=True, help="Output directory for LoRA weights")
     g_ckpt.add_argument("--save-every", type=int, default=10, help="Save checkpoint every N epochs (default: 10)")
     g_ckpt.add_argument("--resume-from", type=str, default=None, help="Path to checkpoint dir to resume from")
+    g_ckpt.add_argument("--async-checkpoint", action=argparse.BooleanOptionalAction, default=False, help="Write checkpoints from a background thread (default: off)")
+    g_ckpt.add_argument("--max-pending-saves", type=int, default=1, help="Background checkpoint writes in flight before saving blocks (default: 1)")
+    g_ckpt.add_argument("--keep-last", type=int, default=0, help="Keep only the newest N epoch checkpoints; 0=keep all (default: 0)")
 
     # -- Logging / TensorBoard -----------------------------------------------
     g_log = parser.add_argument_group("Logging / TensorBoard")
@@ -261,7 +282,10 @@ def _add_common_training_args(parser: argparse.ArgumentParser) -> None:
     g_pre.add_argument("--audio-dir", type=str, default=None, help="Source audio directory (preprocessing)")
     g_pre.add_argument("--dataset-json", type=str, default=None, help="Labeled dataset JSON file (preprocessing)")
     g_pre.add_argument("--tensor-output", type=str, default=None, help="Output directory for .pt tensor files (preprocessing)")
+    g_pre.add_argument("--tensor-format", type=str, default="pt", choices=["pt", "sharded"], help="Preprocessed output format: per-sample .pt files or memory-mapped shards (default: pt)")
     g_pre.add_argument("--max-duration", type=float, default=240.0, help="Max audio duration in seconds (default: 240)")
+    g_pre.add_argument("--preprocess-workers", type=int, default=2, help="CPU threads decoding audio ahead of the GPU; 0=inline (default: 2)")
+    g_pre.add_argument("--preprocess-batch-size", type=int, default=1, help="Max same-length clips encoded per batch (default: 1)")
 
 
 def _add_fixed_args(parser: argparse.ArgumentParser) -> None:
@@ -275,6 +299,7 @@ def _add_estimation_args(parser: argparse.ArgumentParser) -> None:
     """Add arguments for the estimate subcommand."""
     g = parser.add_argument_group("Estimation")
     g.add_argument("--estimate-batches", type=int, default=None, help="Number of batches for estimation (default: auto from GPU)")
+    g.add_argument("--micro-batches", type=int, default=1, help="Batches joined into each estimation backward pass (default: 1)")
     g.add_argument("--top-k", type=int, default=16, help="Number of top modules to select (default: 16)")
     g.add_argument("--granularity", type=str, default="module", choices=["layer", "module"], help="Estimation granularity (default: module)")
     g.add_argument("--output", type=str, default=None, dest="estimate_output", help="Path to write module config JSON (estimate only)")
@@ -151,6 +151,9 @@ def build_configs(args: argparse.Namespace) -> Tuple[AdapterConfig, TrainingConf
         pin_memory=args.pin_memory,
         prefetch_factor=prefetch_factor,
         persistent_workers=persistent_workers,
+        length_bucketing=getattr(args, "length_bucketing", False),
+        pack_sequences=getattr(args, "pack_sequences", False),
+        pack_length=getattr(args, "pack_length", 0),
         # V2 extensions
         adapter_type=adapter_type,
         optimizer_type=getattr(args, "optimizer_type", "adamw"),
@@ -167,12 +170,16 @@ def build_configs(args: argparse.Namespace) -> Tuple[AdapterConfig, TrainingConf
         device=gpu_info.device,
         precision=gpu_info.precision,
         resume_from=args.resume_from,
+        async_checkpoint=getattr(args, "async_checkpoint", False),
+        max_pending_checkpoints=getattr(args, "max_pending_saves", 1),
+        keep_last_n_checkpoints=getattr(args, "keep_last", 0),
         log_dir=args.log_dir,
         log_every=args.log_every,
         log_heavy_every=args.log_heavy_every,
         sample_every_n_epochs=args.sample_every_n_epochs,
         # Estimation / selective (may not exist on all subcommands)
         estimate_batches=getattr(args, "estimate_batches", None),
+        estimate_micro_batches=getattr(args, "micro_batches", 1),
         top_k=getattr(args, "top_k", 16),
         granularity=getattr(args, "granularity", "module"),
         module_config=getattr(args, "module_config", None),
@@ -183,7 +190,10 @@ def build_configs(args: argparse.Namespace) -> Tuple[AdapterConfig, TrainingConf
         audio_dir=args.audio_dir,
         dataset_json=args.dataset_json,
         tensor_output=args.tensor_output,
+        tensor_format=getattr(args, "tensor_format", "pt"),
         max_duration=args.max_duration,
+        preprocess_workers=getattr(args, "preprocess_workers", 2),
+        preprocess_batch_size=getattr(args, "preprocess_batch_size", 1),
     )
 
     return adapter_cfg, train_cfg
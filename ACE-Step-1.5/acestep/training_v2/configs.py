@@ -119,6 +119,15 @@ class TrainingConfigV2(TrainingConfig):
     pin_memory_device: str = ""
     """Device for pinned memory ("" = default CUDA device)."""
 
+    length_bucketing: bool = False
+    """Batch clips of similar latent length together to reduce padding."""
+
+    pack_sequences: bool = False
+    """Pack several clips into one row with per-clip attention masks."""
+
+    pack_length: int = 0
+    """Latent frames per packed row (0 = longest clip in the dataset)."""
+
     # --- Optimizer / Scheduler ------------------------------------------------
     optimizer_type: str = "adamw"
     """Optimizer: 'adamw', 'adamw8bit', 'adafactor', 'prodigy'."""
@@ -176,6 +185,15 @@ class TrainingConfigV2(TrainingConfig):
     resume_from: Optional[str] = None
     """Path to checkpoint directory to resume training from."""
 
+    async_checkpoint: bool = False
+    """Snapshot state to host memory and write checkpoints on a background thread."""
+
+    max_pending_checkpoints: int = 1
+    """Background checkpoint writes allowed in flight before saving blocks."""
+
+    keep_last_n_checkpoints: int = 0
+    """Keep only the newest N ``epoch_*`` checkpoints (0 = keep all)."""
+
     # --- Extended TensorBoard logging ---------------------------------------
     log_dir: Optional[str] = None
     """TensorBoard log directory.  Defaults to {output_dir}/runs."""
@@ -194,6 +212,9 @@ class TrainingConfigV2(TrainingConfig):
     estimate_batches: Optional[int] = None
     """Number of batches for gradient estimation (None = auto from GPU)."""
 
+    estimate_micro_batches: int = 1
+    """Batches joined into each estimation backward pass."""
+
     top_k: int = 16
     """Number of top modules to select during estimation."""
 
@@ -222,9 +243,18 @@ class TrainingConfigV2(TrainingConfig):
     tensor_output: Optional[str] = None
     """Output directory for preprocessed .pt tensor files."""
 
+    tensor_format: str = "pt"
+    """Preprocessed output format: 'pt' (per-sample files) or 'sharded'."""
+
     max_duration: float = 240.0
     """Maximum audio duration in seconds (preprocessing)."""
 
+    preprocess_workers: int = 2
+    """CPU threads decoding audio ahead of the GPU stage (0 = inline)."""
+
+    preprocess_batch_size: int = 1
+    """Maximum number of same-length clips encoded per batch."""
+
     # -----------------------------------------------------------------------
     # Helpers
     # -----------------------------------------------------------------------
@@ -246,6 +276,9 @@ class TrainingConfigV2(TrainingConfig):
                 "prefetch_factor": self.prefetch_factor,
                 "persistent_workers": self.persistent_workers,
                 "pin_memory_device": self.pin_memory_device,
+                "length_bucketing": self.length_bucketing,
+                "pack_sequences": self.pack_sequences,
+                "pack_length": self.pack_length,
                 "optimizer_type": self.optimizer_type,
                 "scheduler_type": self.scheduler_type,
                 "gradient_checkpointing": self.gradient_checkpointing,
@@ -262,11 +295,15 @@ class TrainingConfigV2(TrainingConfig):
                 "device": self.device,
                 "precision": self.precision,
                 "resume_from": self.resume_from,
+                "async_checkpoint": self.async_checkpoint,
+                "max_pending_checkpoints": self.max_pending_checkpoints,
+                "keep_last_n_checkpoints": self.keep_last_n_checkpoints,
                 "log_dir": self.log_dir,
                 "log_every": self.log_every,
                 "log_heavy_every": self.log_heavy_every,
                 "sample_every_n_epochs": self.sample_every_n_epochs,
                 "estimate_batches": self.estimate_batches,
+                "estimate_micro_batches": self.estimate_micro_batches,
                 "top_k": self.top_k,
                 "granularity": self.granularity,
                 "module_config": self.module_config,
@@ -276,7 +313,10 @@ class TrainingConfigV2(TrainingConfig):
                 "audio_dir": self.audio_dir,
                 "dataset_json": self.dataset_json,
                 "tensor_output": self.tensor_output,
+                "tensor_format": self.tensor_format,
                 "max_duration": self.max_duration,
+                "preprocess_workers": self.preprocess_workers,
+                "preprocess_batch_size": self.preprocess_batch_size,
             }
         )
         return base
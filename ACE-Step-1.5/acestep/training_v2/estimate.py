@@ -13,6 +13,8 @@ from __future__ import annotations
 
 import json
 import logging
+from contextlib import nullcontext
+from functools import partial
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
@@ -34,14 +36,20 @@ def run_estimation(
     progress_callback: Optional[Callable] = None,
     cancel_check: Optional[Callable] = None,
     cfg_ratio: float = 0.0,
+    micro_batches: int = 1,
 ) -> List[Dict[str, Any]]:
     """Run gradient sensitivity analysis and return ranked modules.
 
+    Gradients are reduced to per-module norms by hooks as soon as each
+    parameter's gradient is accumulated and are freed immediately, so
+    peak memory stays close to a forward/backward pass without weight
+    gradients instead of full-attention LoRA training.
+
     Args:
         checkpoint_dir: Path to model checkpoints.
         variant: Model variant (turbo, base, sft).
         dataset_dir: Directory with preprocessed .pt files.
-        num_batches: Number of forward/backward passes for estimation.
+        num_batches: Number of batches used for estimation.
         batch_size: Samples per estimation batch.
         top_k: Number of top modules to return.
         granularity: ``"module"`` or ``"layer"``.
@@ -51,6 +59,10 @@ def run_estimation(
             has a ``null_condition_emb``, CFG dropout is applied to
             ``encoder_hidden_states`` so sensitivity reflects the same
             masking used during training.
+        micro_batches: Batches joined into one forward/backward pass
+            (default 1).  Fewer, larger passes finish sooner; activation
+            memory grows with the joined batch.  A failing pass is left
+            out of the scores.
 
     Returns:
         List of dicts ``[{"module": name, "sensitivity": float}, ...]``
@@ -62,7 +74,6 @@ def run_estimation(
         unload_models,
     )
     from acestep.training_v2.gpu_utils import detect_gpu
-    from acestep.training_v2.timestep_sampling import sample_timesteps
     from acestep.training.data_module import PreprocessedDataModule
 
     gpu = detect_gpu()
@@ -76,9 +87,11 @@ def run_estimation(
         mcfg = read_model_config(checkpoint_dir, variant)
     except (FileNotFoundError, json.JSONDecodeError):
         mcfg = {}
-    timestep_mu = mcfg.get("timestep_mu", -0.4)
-    timestep_sigma = mcfg.get("timestep_sigma", 1.0)
-    data_proportion = mcfg.get("data_proportion", 0.5)
+    timestep_params = {
+        "timestep_mu": mcfg.get("timestep_mu", -0.4),
+        "timestep_sigma": mcfg.get("timestep_sigma", 1.0),
+        "data_proportion": mcfg.get("data_proportion", 0.5),
+    }
 
     logger.info("[Side-Step] Loading model for estimation (variant=%s)", variant)
     model = load_decoder_for_training(
@@ -97,14 +110,6 @@ def run_estimation(
         unload_models(model)
         return []
 
-    # Build parameter name -> target module mapping for fast lookup
-    param_to_module: Dict[str, str] = {}
-    for pname, _ in model.named_parameters():
-        for mod_name in target_modules:
-            if mod_name in pname:
-                param_to_module[pname] = mod_name
-                break
-
     # Load data
     data_module = PreprocessedDataModule(
         tensor_dir=dataset_dir,
@@ -115,105 +120,48 @@ def run_estimation(
     data_module.setup("fit")
     loader = data_module.train_dataloader()
 
-    # Accumulate gradient norms per module
-    grad_accum: Dict[str, float] = {name: 0.0 for name in target_modules}
+    # Autocast for mixed precision
+    if device_type in ("cuda", "xpu", "mps"):
+        autocast_ctx = partial(torch.autocast, device_type=device_type, dtype=dtype)
+    else:
+        autocast_ctx = nullcontext
 
+    micro_batches = max(1, int(micro_batches))
     batches_done = 0
-    for batch in loader:
-        if batches_done >= num_batches:
-            break
-        if cancel_check and cancel_check():
-            break
-
-        # Enable gradients ONLY on targetable parameters
-        for pname, param in model.named_parameters():
-            param.requires_grad = pname in param_to_module
+    group: List[Dict[str, Any]] = []
+    collector = GradNormCollector(model, target_modules)
 
+    def _backward_group() -> None:
         try:
-            # Move batch to device
-            target_latents = batch["target_latents"].to(device, dtype=dtype)
-            attention_mask = batch["attention_mask"].to(device, dtype=dtype)
-            encoder_hidden_states = batch["encoder_hidden_states"].to(device, dtype=dtype)
-            encoder_attention_mask = batch["encoder_attention_mask"].to(device, dtype=dtype)
-            context_latents = batch["context_latents"].to(device, dtype=dtype)
-
-            bsz = target_latents.shape[0]
-
-            # Autocast for mixed precision
-            if device_type in ("cuda", "xpu", "mps"):
-                autocast_ctx = torch.autocast(device_type=device_type, dtype=dtype)
-            else:
-                from contextlib import nullcontext
-                autocast_ctx = nullcontext()
-
-            with autocast_ctx:
-                # ---- CFG dropout (match training when cfg_ratio > 0) ----
-                if cfg_ratio > 0.0 and hasattr(model, "null_condition_emb"):
-                    from acestep.training_v2.fixed_lora_module import apply_cfg_dropout
-                    encoder_hidden_states = apply_cfg_dropout(
-                        encoder_hidden_states,
-                        model.null_condition_emb,
-                        cfg_ratio=cfg_ratio,
-                    )
-
-                # Flow matching noise
-                x0 = target_latents
-                x1 = torch.randn_like(x0)
-
-                # Continuous timestep sampling (matches trainer_fixed)
-                t, _r = sample_timesteps(
-                    batch_size=bsz,
-                    device=device,
-                    dtype=dtype,
-                    data_proportion=data_proportion,
-                    timestep_mu=timestep_mu,
-                    timestep_sigma=timestep_sigma,
-                    use_meanflow=False,
-                )
-                t_ = t.unsqueeze(-1).unsqueeze(-1)
-
-                # Interpolate
-                xt = t_ * x1 + (1.0 - t_) * x0
-
-                # Real decoder forward pass
-                decoder_outputs = model.decoder(
-                    hidden_states=xt,
-                    timestep=t,
-                    timestep_r=t,
-                    attention_mask=attention_mask,
-                    encoder_hidden_states=encoder_hidden_states,
-                    encoder_attention_mask=encoder_attention_mask,
-                    context_latents=context_latents,
-                )
-
-                # Flow matching loss
-                flow = x1 - x0
-                loss = F.mse_loss(decoder_outputs[0], flow)
-
+            with autocast_ctx():
+                loss = _estimation_loss(model, concat_batches(group), device, dtype, cfg_ratio, timestep_params)
             loss.backward()
-
-            # Accumulate gradient norms per module
-            for pname, param in model.named_parameters():
-                if param.grad is not None and pname in param_to_module:
-                    mod_name = param_to_module[pname]
-                    grad_accum[mod_name] += param.grad.norm().item()
-
+            del loss
+            collector.commit()
         except Exception as e:
+            collector.discard()
             logger.warning("[Side-Step] Estimation batch %d failed: %s", batches_done, e)
         finally:
-            model.zero_grad()
-            for param in model.parameters():
-                param.requires_grad = False
+            model.zero_grad(set_to_none=True)
+            group.clear()
 
-        batches_done += 1
-        if progress_callback:
-            progress_callback(batches_done, num_batches, "")
+    with collector:
+        for batch in loader:
+            if batches_done >= num_batches:
+                break
+            if cancel_check and cancel_check():
+                break
+            group.append(batch)
+            batches_done += 1
+            if len(group) == micro_batches:
+                _backward_group()
+            if progress_callback:
+                progress_callback(batches_done, num_batches, "")
+        if group:
+            _backward_group()
 
     # Normalize and rank
-    if batches_done > 0:
-        for name in grad_accum:
-            grad_accum[name] /= batches_done
-
+    grad_accum = collector.scores()
     ranked = sorted(grad_accum.items(), key=lambda x: x[1], reverse=True)
     results = [
         {"module": name, "sensitivity": score}
@@ -221,8 +169,9 @@ def run_estimation(
     ]
 
     logger.info(
-        "[Side-Step] Estimation complete (%d batches): top module = %s (%.6f)",
+        "[Side-Step] Estimation complete (%d batches, %d steps): top module = %s (%.6f)",
         batches_done,
+        collector.steps,
         results[0]["module"] if results else "none",
         results[0]["sensitivity"] if results else 0.0,
     )
@@ -233,6 +182,182 @@ def run_estimation(
     return results
 
 
+_BATCH_TENSOR_KEYS = (
+    "target_latents",
+    "attention_mask",
+    "encoder_hidden_states",
+    "encoder_attention_mask",
+    "context_latents",
+)
+
+
+def concat_batches(batches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Join collated batches into one, zero-padding the sequence dimension.
+
+    Gives the same tensors as ``collate_preprocessed_batch`` over all of
+    the batches' samples.
+    """
+    if len(batches) == 1:
+        return batches[0]
+    joined: Dict[str, Any] = {}
+    for key in _BATCH_TENSOR_KEYS:
+        tensors = [b[key] for b in batches]
+        longest = max(t.shape[1] for t in tensors)
+        joined[key] = torch.cat([
+            F.pad(t, (0, 0) * (t.dim() - 2) + (0, longest - t.shape[1])) for t in tensors
+        ])
+    return joined
+
+
+def _estimation_loss(
+    model: nn.Module,
+    batch: Dict[str, Any],
+    device: Any,
+    dtype: torch.dtype,
+    cfg_ratio: float,
+    timestep_params: Dict[str, float],
+) -> torch.Tensor:
+    """Flow-matching loss of one batch (same forward as ``FixedLoRAModule.training_step``)."""
+    from acestep.training_v2.timestep_sampling import sample_timesteps
+
+    # Move batch to device
+    target_latents = batch["target_latents"].to(device, dtype=dtype)
+    attention_mask = batch["attention_mask"].to(device, dtype=dtype)
+    encoder_hidden_states = batch["encoder_hidden_states"].to(device, dtype=dtype)
+    encoder_attention_mask = batch["encoder_attention_mask"].to(device, dtype=dtype)
+    context_latents = batch["context_latents"].to(device, dtype=dtype)
+
+    bsz = target_latents.shape[0]
+
+    # ---- CFG dropout (match training when cfg_ratio > 0) ----
+    if cfg_ratio > 0.0 and hasattr(model, "null_condition_emb"):
+        from acestep.training_v2.fixed_lora_module import apply_cfg_dropout
+        encoder_hidden_states = apply_cfg_dropout(
+            encoder_hidden_states,
+            model.null_condition_emb,
+            cfg_ratio=cfg_ratio,
+        )
+
+    # Flow matching noise
+    x0 = target_latents
+    x1 = torch.randn_like(x0)
+
+    # Continuous timestep sampling (matches trainer_fixed)
+    t, _r = sample_timesteps(
+        batch_size=bsz,
+        device=device,
+        dtype=dtype,
+        use_meanflow=False,
+        **timestep_params,
+    )
+    t_ = t.unsqueeze(-1).unsqueeze(-1)
+
+    # Interpolate
+    xt = t_ * x1 + (1.0 - t_) * x0
+
+    # Real decoder forward pass
+    decoder_outputs = model.decoder(
+        hidden_states=xt,
+        timestep=t,
+        timestep_r=t,
+        attention_mask=attention_mask,
+        encoder_hidden_states=encoder_hidden_states,
+        encoder_attention_mask=encoder_attention_mask,
+        context_latents=context_latents,
+    )
+
+    # Flow matching loss
+    flow = x1 - x0
+    return F.mse_loss(decoder_outputs[0], flow)
+
+
+def build_param_module_map(model: nn.Module, target_modules: List[str]) -> Dict[str, str]:
+    """Map parameter names to the target module that owns them.
+
+    Walks each target module's own parameters once (prefix lookup) instead
+    of scanning every parameter name against every module name.  When
+    targets nest, the first target in *target_modules* wins.
+    """
+    param_to_module: Dict[str, str] = {}
+    for mod_name in target_modules:
+        try:
+            module = model.get_submodule(mod_name)
+        except AttributeError:
+            continue
+        for pname, _ in module.named_parameters(prefix=mod_name):
+            param_to_module.setdefault(pname, mod_name)
+    return param_to_module
+
+
+class GradNormCollector:
+    """Accumulate per-module gradient norms without keeping gradients.
+
+    Inside the ``with`` block only target-module parameters require grad,
+    and each one carries a post-accumulate hook that adds ``||grad||`` to a
+    device-side per-module sum and drops ``.grad`` right away.  Sums are
+    read back once, in :meth:`scores`.
+    """
+
+    def __init__(self, model: nn.Module, target_modules: List[str]) -> None:
+        self.model = model
+        self.modules = list(target_modules)
+        self.param_to_module = build_param_module_map(model, self.modules)
+        self.steps = 0
+        self._index = {name: i for i, name in enumerate(self.modules)}
+        self._sums: Optional[torch.Tensor] = None
+        self._pending: Optional[torch.Tensor] = None
+        self._handles: list = []
+        self._saved_requires_grad: Dict[str, bool] = {}
+
+    def __enter__(self) -> "GradNormCollector":
+        device = next(self.model.parameters()).device
+        self._sums = torch.zeros(len(self.modules), dtype=torch.float32, device=device)
+        self._pending = torch.zeros_like(self._sums)
+        for pname, param in self.model.named_parameters():
+            self._saved_requires_grad[pname] = param.requires_grad
+            param.requires_grad_(pname in self.param_to_module)
+            if pname in self.param_to_module:
+                self._handles.append(
+                    param.register_post_accumulate_grad_hook(
+                        self._make_hook(self._index[self.param_to_module[pname]])
+                    )
+                )
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        for handle in self._handles:
+            handle.remove()
+        self._handles.clear()
+        for pname, param in self.model.named_parameters():
+            param.requires_grad_(self._saved_requires_grad.get(pname, False))
+            param.grad = None
+        self._saved_requires_grad.clear()
+
+    def _make_hook(self, index: int) -> Callable[[torch.Tensor], None]:
+        def _hook(param: torch.Tensor) -> None:
+            self._pending[index] += param.grad.detach().float().norm().to(self._pending.device)
+            param.grad = None
+
+        return _hook
+
+    def commit(self) -> None:
+        """Count the norms accumulated since the last commit as one step."""
+        self._sums += self._pending
+        self._pending.zero_()
+        self.steps += 1
+
+    def discard(self) -> None:
+        """Drop the norms of a failed step."""
+        self._pending.zero_()
+
+    def scores(self) -> Dict[str, float]:
+        """Return the mean per-step gradient norm of every target module."""
+        if self._sums is None or self.steps == 0:
+            return {name: 0.0 for name in self.modules}
+        values = (self._sums / self.steps).tolist()
+        return dict(zip(self.modules, values))
+
+
 def _find_attention_modules(model: nn.Module, granularity: str) -> List[str]:
     """Find attention module names in the model.
 
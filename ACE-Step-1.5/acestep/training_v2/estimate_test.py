@@ -0,0 +1,139 @@
+"""Unit tests for hook-based gradient sensitivity collection."""
+
+import unittest
+
+import torch
+import torch.nn as nn
+
+from acestep.training_v2.estimate import (
+    GradNormCollector,
+    _find_attention_modules,
+    build_param_module_map,
+    concat_batches,
+)
+from acestep.training.data_module import collate_preprocessed_batch
+
+
+class _Attn(nn.Module):
+    """Attention block with ACE-Step projection names."""
+
+    def __init__(self, width):
+        """Create the four projections."""
+        super().__init__()
+        self.q_proj = nn.Linear(width, width)
+        self.k_proj = nn.Linear(width, width)
+        self.v_proj = nn.Linear(width, width)
+        self.o_proj = nn.Linear(width, width)
+
+    def forward(self, x):
+        """Mix the projections so each one receives a gradient."""
+        return self.o_proj(self.q_proj(x) * self.k_proj(x) + self.v_proj(x))
+
+
+class _Decoder(nn.Module):
+    """Stack of attention blocks plus a non-targeted output head."""
+
+    def __init__(self, width=8, depth=11):
+        """Use enough layers that ``layers.1`` and ``layers.11`` coexist."""
+        super().__init__()
+        self.layers = nn.ModuleList(nn.ModuleDict({"self_attn": _Attn(width)}) for _ in range(depth))
+        self.head = nn.Linear(width, width)
+
+    def forward(self, x):
+        """Run every block then the head."""
+        for layer in self.layers:
+            x = x + layer["self_attn"](x)
+        return self.head(x)
+
+
+def _reference_scores(model, modules, batches):
+    """Legacy computation: full gradients, then summed per-parameter norms."""
+    param_map = build_param_module_map(model, modules)
+    scores = {name: 0.0 for name in modules}
+    for x in batches:
+        for pname, param in model.named_parameters():
+            param.requires_grad = pname in param_map
+        model(x).pow(2).mean().backward()
+        for pname, param in model.named_parameters():
+            if param.grad is not None:
+                scores[param_map[pname]] += param.grad.norm().item()
+        model.zero_grad(set_to_none=True)
+    return {name: score / len(batches) for name, score in scores.items()}
+
+
+class GradNormCollectorTests(unittest.TestCase):
+    """Streaming norms must match the full-gradient computation."""
+
+    def setUp(self):
+        """Build a seeded model and a few batches."""
+        torch.manual_seed(0)
+        self.model = _Decoder()
+        self.model.requires_grad_(False)
+        self.batches = [torch.randn(2, 8) for _ in range(3)]
+
+    def test_param_map_is_prefix_exact(self):
+        """``layers.1`` must not claim parameters of ``layers.11``."""
+        modules = _find_attention_modules(self.model, "module")
+        param_map = build_param_module_map(self.model, modules)
+        self.assertEqual(param_map["layers.10.self_attn.q_proj.weight"], "layers.10.self_attn.q_proj")
+        self.assertEqual(len(param_map), len(modules) * 2)
+        self.assertNotIn("head.weight", param_map)
+
+    def test_scores_match_full_gradient_norms_and_free_grads(self):
+        """Per-backward sums equal the legacy scores and no ``.grad`` survives."""
+        modules = _find_attention_modules(self.model, "module")
+        expected = _reference_scores(self.model, modules, self.batches)
+        self.model.requires_grad_(False)
+        with GradNormCollector(self.model, modules) as collector:
+            for x in self.batches:
+                self.model(x).pow(2).mean().backward()
+                self.assertTrue(all(p.grad is None for p in self.model.parameters()))
+                collector.commit()
+        scores = collector.scores()
+        for name in modules:
+            self.assertAlmostEqual(scores[name], expected[name], places=5)
+        self.assertFalse(any(p.requires_grad for p in self.model.parameters()))
+
+    def test_layer_granularity_and_discarded_steps(self):
+        """Block-level targets aggregate their projections; discarded passes do not count."""
+        modules = _find_attention_modules(self.model, "layer")
+        self.assertEqual(modules[0], "layers.0.self_attn")
+        with GradNormCollector(self.model, modules) as collector:
+            self.model(self.batches[0]).pow(2).mean().backward()
+            collector.discard()
+            self.model(self.batches[0]).pow(2).mean().backward()
+            collector.commit()
+        self.assertEqual(collector.steps, 1)
+        expected = _reference_scores(self.model, modules, self.batches[:1])
+        self.assertAlmostEqual(collector.scores()[modules[3]], expected[modules[3]], places=5)
+
+
+class ConcatBatchesTests(unittest.TestCase):
+    """Joining collated batches for one backward pass."""
+
+    def test_matches_collating_all_samples_at_once(self):
+        """Batches of different padded lengths join like one collated batch."""
+        samples = [
+            {
+                "target_latents": torch.randn(length, 4),
+                "attention_mask": torch.ones(length),
+                "context_latents": torch.randn(length, 5),
+                "encoder_hidden_states": torch.randn(enc, 3),
+                "encoder_attention_mask": torch.ones(enc),
+                "metadata": {},
+            }
+            for length, enc in ((6, 2), (3, 4), (9, 1), (4, 3), (2, 2))
+        ]
+        joined = concat_batches([
+            collate_preprocessed_batch(samples[:2]),
+            collate_preprocessed_batch(samples[2:3]),
+            collate_preprocessed_batch(samples[3:]),
+        ])
+        expected = collate_preprocessed_batch(samples)
+        for key, tensor in joined.items():
+            self.assertTrue(torch.equal(tensor, expected[key]), key)
+        self.assertEqual(joined["target_latents"].shape, (5, 9, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -149,6 +149,12 @@ class FixedLoRAModule(nn.Module):
         # Model config (for timestep params read at runtime)
         self.config = model.config
 
+        # Packed rows need 4D block masks, which flash-attention cannot take.
+        if getattr(training_config, "pack_sequences", False) and \
+                getattr(self.config, "_attn_implementation", None) == "flash_attention_2":
+            self.config._attn_implementation = "sdpa"
+            logger.info("[INFO] Sequence packing enabled -- using sdpa attention instead of flash_attention_2")
+
         # -- Null condition embedding for CFG dropout ------------------------
         # ``model.null_condition_emb`` is a Parameter on the top-level model
         # (not the decoder).
@@ -238,7 +244,9 @@ class FixedLoRAModule(nn.Module):
         Args:
             batch: Dict with keys ``target_latents``, ``attention_mask``,
                 ``encoder_hidden_states``, ``encoder_attention_mask``,
-                ``context_latents``.
+                ``context_latents``.  Packed batches additionally carry
+                ``segment_ids`` / ``encoder_segment_ids``; clips in a packed
+                row share one timestep and the loss skips padding frames.
 
         Returns:
             Scalar loss tensor (``float32`` for stable backward).
@@ -257,6 +265,12 @@ class FixedLoRAModule(nn.Module):
             encoder_hidden_states = batch["encoder_hidden_states"].to(self.device, dtype=self.dtype, non_blocking=nb)
             encoder_attention_mask = batch["encoder_attention_mask"].to(self.device, dtype=self.dtype, non_blocking=nb)
             context_latents = batch["context_latents"].to(self.device, dtype=self.dtype, non_blocking=nb)
+            packed_kwargs = {}
+            if "segment_ids" in batch:
+                packed_kwargs = {
+                    "segment_ids": batch["segment_ids"].to(self.device, non_blocking=nb),
+                    "encoder_segment_ids": batch["encoder_segment_ids"].to(self.device, non_blocking=nb),
+                }
 
             bsz = target_latents.shape[0]
 
@@ -298,11 +312,18 @@ class FixedLoRAModule(nn.Module):
                 encoder_hidden_states=encoder_hidden_states,
                 encoder_attention_mask=encoder_attention_mask,
                 context_latents=context_latents,
+                **packed_kwargs,
             )
 
             # ---- Flow matching loss ----------------------------------------
             flow = x1 - x0
-            diffusion_loss = F.mse_loss(decoder_outputs[0], flow)
+            if packed_kwargs:
+                # Packed rows end in padding; average over real frames only
+                frame_mask = attention_mask.unsqueeze(-1)
+                sq_err = (decoder_outputs[0] - flow).pow(2) * frame_mask
+                diffusion_loss = sq_err.sum() / (frame_mask.sum() * flow.shape[-1]).clamp_min(1.0)
+            else:
+                diffusion_loss = F.mse_loss(decoder_outputs[0], flow)
 
         # fp32 for stable backward
         diffusion_loss = diffusion_loss.float()
@@ -8,6 +8,22 @@ loads models **sequentially** to minimise peak VRAM:
     Pass 1 (Light ~3 GB):  VAE + Text Encoder  -> intermediate ``.tmp.pt``
     Pass 2 (Heavy ~6 GB):  DIT encoder          -> final ``.pt``
 
+Within each pass, CPU threads decode audio (pass 1) or load intermediates
+(pass 2) ahead of the GPU stage, same-length clips are encoded as one
+batch, and saves run on a background thread.  Per-stage files/sec are
+logged at the end of each pass.
+
+Output formats:
+    * ``pt`` (default): one ``.pt`` file per sample
+    * ``sharded``: large memory-mapped shard files plus ``shards_index.json``
+      (see ``acestep.training.sharded_dataset``), much faster to load for
+      datasets of thousands of clips
+
+Re-runs are incremental: ``preprocess_manifest.json`` records content hashes
+of each sample's audio, text inputs and model checkpoints (see
+``preprocess_manifest``).  Unchanged samples are reused; text-only changes
+keep the stored VAE latent and re-run just the text and DiT-encoder stages.
+
 Input modes:
     * With ``--dataset-json``: rich per-sample metadata (lyrics, genre, BPM, …)
     * Without JSON: scan directory, default to ``[Instrumental]``, filename caption
@@ -16,18 +32,32 @@ Input modes:
 from __future__ import annotations
 
 import logging
+from contextlib import closing
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional
 
 import torch
 
 # Split-out helpers
+from acestep.training.sharded_dataset import ShardedDatasetWriter
 from acestep.training_v2.preprocess_discovery import (
     discover_audio_files as _discover_audio_files,
     load_dataset_metadata as _load_dataset_metadata,
     load_sample_metadata as _load_sample_metadata,
     select_genre_indices as _select_genre_indices,
 )
+from acestep.training_v2.preprocess_manifest import (
+    PreprocessManifest,
+    model_fingerprints,
+)
+from acestep.training_v2.preprocess_pipeline import (
+    BackgroundWriter,
+    StageStats,
+    chunked,
+    group_by_length,
+    prefetch,
+    run_batched,
+)
 from acestep.training_v2.preprocess_prompt import (
     build_simple_prompt as _build_simple_prompt,
 )
@@ -54,6 +84,9 @@ def preprocess_audio_files(
     precision: str = "auto",
     progress_callback: Optional[Callable] = None,
     cancel_check: Optional[Callable] = None,
+    output_format: str = "pt",
+    num_workers: int = 2,
+    batch_size: int = 1,
 ) -> Dict[str, Any]:
     """Preprocess audio files into .pt tensor format (two-pass pipeline).
 
@@ -81,12 +114,23 @@ def preprocess_audio_files(
         precision: Target precision (``"auto"`` to auto-detect).
         progress_callback: ``(current, total, message) -> None``.
         cancel_check: ``() -> bool`` -- return True to cancel.
+        output_format: ``"pt"`` for per-sample files or ``"sharded"`` for
+            memory-mapped shards in *output_dir*.
+        num_workers: CPU threads decoding audio ahead of the GPU stage
+            (``0`` decodes inline).
+        batch_size: Maximum number of same-length clips encoded together.
 
     Returns:
-        Dict with keys: ``processed``, ``failed``, ``total``, ``output_dir``.
+        Dict with keys: ``processed``, ``failed``, ``total``, ``output_dir``,
+        ``reused`` (samples skipped as current), ``recomputed`` (samples
+        re-encoded) and ``text_only`` (the recomputed samples whose VAE
+        latent was kept).
     """
     from acestep.training_v2.gpu_utils import detect_gpu
 
+    if output_format not in ("pt", "sharded"):
+        raise ValueError(f"Unknown output_format: {output_format!r} (expected 'pt' or 'sharded')")
+
     gpu = detect_gpu(device, precision)
     dev = gpu.device
     prec = gpu.precision
@@ -98,7 +142,10 @@ def preprocess_audio_files(
     audio_files = _discover_audio_files(audio_dir, dataset_json)
     if not audio_files:
         logger.warning("[Side-Step] No audio files found")
-        return {"processed": 0, "failed": 0, "total": 0, "output_dir": str(out_path)}
+        return {
+            "processed": 0, "failed": 0, "total": 0, "output_dir": str(out_path),
+            "reused": 0, "recomputed": 0, "text_only": 0,
+        }
 
     total = len(audio_files)
     logger.info("[Side-Step] Found %d audio files to preprocess", total)
@@ -114,39 +161,85 @@ def preprocess_audio_files(
             if not sm.get("custom_tag"):
                 sm["custom_tag"] = ds_tag
 
-    # -- Pass 1: VAE + Text Encoder -----------------------------------------
-    intermediates, pass1_failed = _pass1_light(
-        audio_files=audio_files,
-        sample_meta=sample_meta,
-        ds_meta=ds_meta,
-        out_path=out_path,
-        checkpoint_dir=checkpoint_dir,
-        variant=variant,
-        device=dev,
-        precision=prec,
-        max_duration=max_duration,
-        progress_callback=progress_callback,
-        cancel_check=cancel_check,
+    writer = ShardedDatasetWriter(str(out_path)) if output_format == "sharded" else None
+    stored_names = writer.names if writer is not None else set()
+
+    def has_output(stem: str) -> bool:
+        if writer is not None:
+            return stem in stored_names
+        return (out_path / f"{stem}.pt").is_file()
+
+    def load_stored_latent(stem: str) -> torch.Tensor:
+        if writer is not None:
+            return writer.read_tensor(stem, "target_latents")
+        data = torch.load(str(out_path / f"{stem}.pt"), map_location="cpu", weights_only=False)
+        return data["target_latents"]
+
+    # -- Plan incremental work from the manifest -----------------------------
+    manifest = PreprocessManifest(out_path)
+    genre_indices = _select_genre_indices(total, ds_meta.get("genre_ratio", 0))
+    plan = manifest.plan(
+        audio_files,
+        manifest.audio_hashes(audio_files, num_workers),
+        text_inputs=lambda i, af: _text_inputs(i, af, sample_meta, ds_meta, genre_indices),
+        models=model_fingerprints(checkpoint_dir, variant),
+        settings={"max_duration": max_duration, "precision": prec},
+        has_output=has_output,
     )
-
-    # -- Pass 2: DIT Encoder ------------------------------------------------
-    processed, pass2_failed = _pass2_heavy(
-        intermediates=intermediates,
-        out_path=out_path,
-        checkpoint_dir=checkpoint_dir,
-        variant=variant,
-        device=dev,
-        precision=prec,
-        progress_callback=progress_callback,
-        cancel_check=cancel_check,
+    logger.info(
+        "[Side-Step] Manifest: %d reused, %d text-only recompute, %d full recompute",
+        len(plan.reuse), len(plan.text), len(plan.full),
     )
 
+    try:
+        # -- Pass 1: VAE + Text Encoder -------------------------------------
+        intermediates, pass1_failed = _pass1_light(
+            audio_files=audio_files,
+            sample_meta=sample_meta,
+            ds_meta=ds_meta,
+            out_path=out_path,
+            checkpoint_dir=checkpoint_dir,
+            variant=variant,
+            device=dev,
+            precision=prec,
+            max_duration=max_duration,
+            progress_callback=progress_callback,
+            cancel_check=cancel_check,
+            done_names=plan.reuse,
+            num_workers=num_workers,
+            batch_size=batch_size,
+            text_only=plan.text,
+            load_stored_latent=load_stored_latent,
+        )
+
+        # -- Pass 2: DIT Encoder --------------------------------------------
+        processed, pass2_failed = _pass2_heavy(
+            intermediates=intermediates,
+            out_path=out_path,
+            checkpoint_dir=checkpoint_dir,
+            variant=variant,
+            device=dev,
+            precision=prec,
+            progress_callback=progress_callback,
+            cancel_check=cancel_check,
+            writer=writer,
+            batch_size=batch_size,
+            on_written=lambda stem: manifest.record(stem, plan.entries[stem]),
+        )
+    finally:
+        if writer is not None:
+            writer.close()
+        manifest.save()
+
     failed = pass1_failed + pass2_failed
     result = {
         "processed": processed,
         "failed": failed,
         "total": total,
         "output_dir": str(out_path),
+        "reused": len(plan.reuse),
+        "recomputed": len(plan.text) + len(plan.full),
+        "text_only": len(plan.text),
     }
     logger.info(
         "[Side-Step] Preprocessing complete: %d/%d processed, %d failed",
@@ -155,6 +248,45 @@ def preprocess_audio_files(
     return result
 
 
+def _text_inputs(
+    index: int,
+    af: Path,
+    sample_meta: Dict[str, Dict[str, Any]],
+    ds_meta: Dict[str, Any],
+    genre_indices: set,
+) -> Dict[str, Any]:
+    """Return everything the text stage consumes for one sample.
+
+    Shared by pass 1 and the manifest, so editing any of these fields
+    invalidates exactly the text-derived tensors.
+    """
+    sm = sample_meta.get(af.name, {})
+    lyrics = sm.get("lyrics", "[Instrumental]")
+    prompt = _build_simple_prompt(
+        sm,
+        tag_position=ds_meta.get("tag_position", "prepend"),
+        use_genre=index in genre_indices,
+    )
+    return {
+        "prompt": prompt,
+        "lyrics": lyrics,
+        "metadata": {
+            "audio_path": str(af),
+            "filename": af.name,
+            "caption": sm.get("caption", af.stem),
+            "lyrics": lyrics,
+            "duration": sm.get("duration", 0),
+            "bpm": sm.get("bpm"),
+            "keyscale": sm.get("keyscale", ""),
+            "timesignature": sm.get("timesignature", ""),
+            "genre": sm.get("genre", ""),
+            "is_instrumental": sm.get("is_instrumental", True),
+            "custom_tag": sm.get("custom_tag", ""),
+            "prompt_override": sm.get("prompt_override"),
+        },
+    }
+
+
 # ---------------------------------------------------------------------------
 # Pass 1 -- Light models (VAE + Text Encoder)
 # ---------------------------------------------------------------------------
@@ -171,12 +303,29 @@ def _pass1_light(
     max_duration: float,
     progress_callback: Optional[Callable],
     cancel_check: Optional[Callable],
+    done_names: Optional[set] = None,
+    num_workers: int = 2,
+    batch_size: int = 1,
+    text_only: Optional[set] = None,
+    load_stored_latent: Optional[Callable[[str], torch.Tensor]] = None,
 ) -> tuple[List[Path], int]:
     """Load audio, VAE-encode, text-encode, save intermediates.
 
+    *num_workers* threads decode and resample audio while the GPU encodes
+    the previous batch; up to *batch_size* clips of identical length go
+    through the VAE and text encoder together.  Samples in *text_only*
+    reuse their stored VAE latent and only run the text encoder.
+
     Args:
         ds_meta: Dataset-level metadata (``tag_position``, ``genre_ratio``,
             ``custom_tag``) from the JSON's top-level ``metadata`` block.
+        done_names: Sample stems whose stored output is current.  When
+            ``None``, any existing final ``.pt`` counts as done.
+        num_workers: Audio decoding threads (``0`` decodes inline).
+        batch_size: Maximum number of clips encoded together.
+        text_only: Sample stems whose audio is unchanged since the last run.
+        load_stored_latent: ``stem -> [T, 64]`` latent of a stored sample,
+            required when *text_only* is non-empty.
 
     Returns ``(list_of_intermediate_paths, fail_count)``.
     """
@@ -192,11 +341,7 @@ def _pass1_light(
     from acestep.training.dataset_builder_modules.preprocess_lyrics import encode_lyrics
 
     dtype = _resolve_dtype(precision)
-
-    logger.info("[Side-Step] Pass 1/2: Loading VAE + Text Encoder ...")
-    vae = load_vae(checkpoint_dir, device, precision)
-    tokenizer, text_enc = load_text_encoder(checkpoint_dir, device, precision)
-    silence_latent = load_silence_latent(checkpoint_dir, device, precision, variant=variant)
+    text_only = text_only or set()
 
     intermediates: List[Path] = []
     failed = 0
@@ -214,93 +359,153 @@ def _pass1_light(
     if tag_position != "prepend":
         logger.info("[Side-Step] tag_position=%s (from dataset metadata)", tag_position)
 
-    try:
-        for i, af in enumerate(audio_files):
-            if cancel_check and cancel_check():
-                logger.info("[Side-Step] Cancelled at %d/%d", i, total)
-                break
-
-            if progress_callback:
-                progress_callback(i, total, f"[Pass 1] {af.name}")
-
-            # Skip if final .pt already exists (resumable)
-            final_pt = out_path / f"{af.stem}.pt"
-            if final_pt.exists():
-                logger.info("[Side-Step] Skipping (final exists): %s", af.name)
-                continue
+    # Skip samples whose final output already exists (resumable)
+    pending = []
+    for i, af in enumerate(audio_files):
+        if done_names is None:
+            current = (out_path / f"{af.stem}.pt").exists()
+        else:
+            current = af.stem in done_names
+        if current:
+            logger.info("[Side-Step] Skipping (final exists): %s", af.name)
+            continue
+        pending.append((i, af))
+    done = 0
+    if not pending:
+        if progress_callback:
+            progress_callback(total, total, "[Pass 1] Done")
+        return intermediates, failed
 
-            try:
-                # 1. Load audio (stereo, 48 kHz)
-                audio, _sr = load_audio_stereo(str(af), _TARGET_SR, max_duration)
-                audio = audio.unsqueeze(0).to(device=device, dtype=vae.dtype)
+    logger.info("[Side-Step] Pass 1/2: Loading VAE + Text Encoder ...")
+    vae = load_vae(checkpoint_dir, device, precision)
+    tokenizer, text_enc = load_text_encoder(checkpoint_dir, device, precision)
+    silence_latent = load_silence_latent(checkpoint_dir, device, precision, variant=variant)
+    silence_cpu = silence_latent.cpu()
 
-                # 2. VAE encode (tiled for long audio)
-                with torch.no_grad():
-                    target_latents = _tiled_vae_encode(vae, audio, dtype)
+    stats = StageStats()
+    saver = BackgroundWriter(max_pending=max(2, 2 * batch_size))
 
+    def _decode(entry):
+        af = entry[1]
+        if af.stem in text_only:
+            try:
+                with stats.time("reuse"):
+                    return "latent", load_stored_latent(af.stem)
+            except Exception as exc:
+                logger.warning("[Side-Step] Stored latent for %s unusable (%s); re-encoding audio", af.name, exc)
+        with stats.time("decode"):
+            audio, _sr = load_audio_stereo(str(af), _TARGET_SR, max_duration)
+        return "audio", audio
+
+    def _group_key(entry):
+        kind, data = entry[2]
+        # Stored latents skip the VAE, so any of them can share a batch.
+        return (kind, data.shape[-1] if kind == "audio" else 0)
+
+    def _fail(name, exc):
+        nonlocal failed
+        failed += 1
+        logger.error("[Side-Step] Pass 1 FAIL %s: %s", name, exc)
+
+    def _decoded(loaded):
+        for (i, af), audio, error in loaded:
+            if error is not None:
+                _fail(af.name, error)
+                continue
+            yield i, af, audio
+
+    def _encode(group):
+        kind = group[0][2][0]
+        if kind == "audio":
+            # 1. VAE encode (tiled for long audio); clips in a group share a length
+            with stats.time("vae", len(group)):
+                audio = torch.stack([entry[2][1] for entry in group])
+                audio = audio.to(device=device, dtype=vae.dtype)
+                with torch.no_grad():
+                    target_latents = _tiled_vae_encode(vae, audio, dtype).cpu()
                 # Free raw audio immediately -- no longer needed after VAE encode
                 del audio
+            # Clone so each saved latent owns its storage, not the whole batch's
+            latents = [target_latents[j].clone() for j in range(len(group))]
+            del target_latents
+        else:
+            # Audio unchanged since the last run: keep the stored VAE latent
+            latents = [entry[2][1] for entry in group]
+
+        # 2. Text encode -- prompts are padded to a fixed length by the
+        # tokenizer, so the whole group encodes as one batch.
+        inputs = [_text_inputs(i, af, sample_meta, ds_meta, genre_indices) for i, af, _d in group]
+        with stats.time("text", len(group)):
+            with torch.no_grad():
+                text_hs, text_mask = encode_text(
+                    text_enc, tokenizer, [x["prompt"] for x in inputs], device, dtype,
+                )
+                lyric_hs, lyric_mask = encode_lyrics(
+                    text_enc, tokenizer, [x["lyrics"] for x in inputs], device, dtype,
+                )
+            text_hs, text_mask = text_hs.cpu(), text_mask.cpu()
+            lyric_hs, lyric_mask = lyric_hs.cpu(), lyric_mask.cpu()
+
+        # 3. Split the batch back into per-sample intermediates
+        samples = []
+        for j, ((_i, af, _d), latent, x) in enumerate(zip(group, latents, inputs)):
+            latent_length = latent.shape[0]
+            samples.append((af, {
+                "target_latents": latent,
+                "attention_mask": torch.ones(latent_length, dtype=dtype),
+                "text_hidden_states": text_hs[j:j + 1].clone(),
+                "text_attention_mask": text_mask[j:j + 1].clone(),
+                "lyric_hidden_states": lyric_hs[j:j + 1].clone(),
+                "lyric_attention_mask": lyric_mask[j:j + 1].clone(),
+                "silence_latent": silence_cpu,
+                "latent_length": latent_length,
+                "metadata": x["metadata"],
+            }))
+        return samples
+
+    def _save(sample, tmp_path):
+        with stats.time("save"):
+            torch.save(sample, tmp_path)
+
+    def _collect(saved):
+        for (tmp_path, name), error in saved:
+            if error is not None:
+                _fail(name, error)
+                continue
+            intermediates.append(tmp_path)
+            logger.info("[Side-Step] Pass 1 OK: %s", name)
 
-                latent_length = target_latents.shape[1]
-                attention_mask = torch.ones(1, latent_length, device=device, dtype=dtype)
-
-                # 3. Text encode
-                sm = sample_meta.get(af.name, {})
-                caption = sm.get("caption", af.stem)
-                lyrics = sm.get("lyrics", "[Instrumental]")
-
-                # Build text prompt using dataset-level tag_position and genre_ratio
-                use_genre = i in genre_indices
-                text_prompt = _build_simple_prompt(sm, tag_position=tag_position, use_genre=use_genre)
-
-                with torch.no_grad():
-                    text_hs, text_mask = encode_text(text_enc, tokenizer, text_prompt, device, dtype)
-                    lyric_hs, lyric_mask = encode_lyrics(text_enc, tokenizer, lyrics, device, dtype)
-
-                # 4. Save intermediate
-                tmp_path = out_path / f"{af.stem}.tmp.pt"
-                torch.save({
-                    "target_latents": target_latents.squeeze(0).cpu(),
-                    "attention_mask": attention_mask.squeeze(0).cpu(),
-                    "text_hidden_states": text_hs.cpu(),
-                    "text_attention_mask": text_mask.cpu(),
-                    "lyric_hidden_states": lyric_hs.cpu(),
-                    "lyric_attention_mask": lyric_mask.cpu(),
-                    "silence_latent": silence_latent.cpu(),
-                    "latent_length": latent_length,
-                    "metadata": {
-                        "audio_path": str(af),
-                        "filename": af.name,
-                        "caption": caption,
-                        "lyrics": lyrics,
-                        "duration": sm.get("duration", 0),
-                        "bpm": sm.get("bpm"),
-                        "keyscale": sm.get("keyscale", ""),
-                        "timesignature": sm.get("timesignature", ""),
-                        "genre": sm.get("genre", ""),
-                        "is_instrumental": sm.get("is_instrumental", True),
-                        "custom_tag": sm.get("custom_tag", ""),
-                        "prompt_override": sm.get("prompt_override"),
-                    },
-                }, tmp_path)
-
-                # Free GPU tensors from this iteration before the next one
-                del target_latents, attention_mask, text_hs, text_mask
-                del lyric_hs, lyric_mask
+    loaded = prefetch(_decode, pending, num_workers, depth=max(2 * num_workers, 2 * batch_size))
+    try:
+        with closing(loaded):
+            for group in group_by_length(_decoded(loaded), batch_size, key=_group_key):
+                if cancel_check and cancel_check():
+                    logger.info("[Side-Step] Cancelled at %d/%d", done, total)
+                    break
+
+                if progress_callback:
+                    extra = f" (+{len(group) - 1})" if len(group) > 1 else ""
+                    progress_callback(done, total, f"[Pass 1] {group[0][1].name}{extra}")
+                done += len(group)
+
+                samples = run_batched(_encode, group, lambda entry, exc: _fail(entry[1].name, exc))
+                del group
+                for af, sample in samples:
+                    # 4. Save intermediate on the writer thread
+                    tmp_path = out_path / f"{af.stem}.tmp.pt"
+                    _collect(saver.submit((tmp_path, af.name), _save, sample, tmp_path))
+                del samples
+
+                # Free GPU memory from this batch before the next one
                 if torch.cuda.is_available():
                     torch.cuda.empty_cache()
 
-                intermediates.append(tmp_path)
-                logger.info("[Side-Step] Pass 1 OK: %s", af.name)
-
-            except Exception as exc:
-                failed += 1
-                logger.error("[Side-Step] Pass 1 FAIL %s: %s", af.name, exc)
-
     finally:
+        _collect(saver.close())
         logger.info("[Side-Step] Unloading VAE + Text Encoder ...")
         unload_models(vae, text_enc, tokenizer, silence_latent)
 
+    stats.log("Pass 1", len(intermediates))
     if progress_callback:
         progress_callback(total, total, "[Pass 1] Done")
 
@@ -320,9 +525,18 @@ def _pass2_heavy(
     precision: str,
     progress_callback: Optional[Callable],
     cancel_check: Optional[Callable],
+    writer: Optional[ShardedDatasetWriter] = None,
+    batch_size: int = 1,
+    on_written: Optional[Callable[[str], None]] = None,
 ) -> tuple[int, int]:
     """Run DIT encoder on intermediates and write final .pt files.
 
+    A background thread loads the next intermediates while the encoder
+    runs, and up to *batch_size* samples are encoded together (text and
+    lyric states have fixed padded lengths, so any samples batch).  When
+    *writer* is given, samples are appended to its shards instead.
+    *on_written* is called with each sample stem once its output is stored.
+
     Returns ``(processed_count, fail_count)``.
     """
     if not intermediates:
@@ -331,100 +545,139 @@ def _pass2_heavy(
     from acestep.training_v2.model_loader import (
         load_decoder_for_training,
         unload_models,
-        _resolve_dtype,
     )
     from acestep.training.dataset_builder_modules.preprocess_encoder import run_encoder
     from acestep.training.dataset_builder_modules.preprocess_context import build_context_latents
 
-    dtype = _resolve_dtype(precision)
-
     logger.info("[Side-Step] Pass 2/2: Loading DIT model (variant=%s) ...", variant)
     model = load_decoder_for_training(checkpoint_dir, variant, device, precision)
+    model_device = next(model.parameters()).device
+    model_dtype = next(model.parameters()).dtype
 
     processed = 0
     failed = 0
+    done = 0
     total = len(intermediates)
-
-    try:
-        for i, tmp_path in enumerate(intermediates):
-            if cancel_check and cancel_check():
-                logger.info("[Side-Step] Cancelled at %d/%d", i, total)
-                break
-
-            if progress_callback:
-                progress_callback(i, total, f"[Pass 2] {tmp_path.stem}")
-
-            try:
-                data = torch.load(str(tmp_path), weights_only=False)
-
-                # Move tensors directly to model device/dtype (single .to()
-                # avoids creating throwaway intermediate GPU copies).
-                model_device = next(model.parameters()).device
-                model_dtype = next(model.parameters()).dtype
-
-                text_hs = data["text_hidden_states"].to(model_device, dtype=model_dtype)
-                text_mask = data["text_attention_mask"].to(model_device, dtype=model_dtype)
-                lyric_hs = data["lyric_hidden_states"].to(model_device, dtype=model_dtype)
-                lyric_mask = data["lyric_attention_mask"].to(model_device, dtype=model_dtype)
-                silence_latent = data["silence_latent"].to(model_device, dtype=model_dtype)
-                latent_length = data["latent_length"]
-
-                # DIT encoder pass (adapter-agnostic: same tensors for
-                # LoRA and LoKR -- only the adapter injection differs).
-                encoder_hs, encoder_mask = run_encoder(
-                    model,
-                    text_hidden_states=text_hs,
-                    text_attention_mask=text_mask,
-                    lyric_hidden_states=lyric_hs,
-                    lyric_attention_mask=lyric_mask,
-                    device=str(model_device),
-                    dtype=model_dtype,
-                )
-
-                # Free encoder inputs immediately after use
-                del text_hs, text_mask, lyric_hs, lyric_mask
-
+    stats = StageStats()
+    saver = BackgroundWriter(max_pending=max(2, 2 * batch_size))
+
+    def _load(tmp_path):
+        with stats.time("load"):
+            return torch.load(str(tmp_path), weights_only=False)
+
+    def _fail(tmp_path, exc):
+        nonlocal failed
+        failed += 1
+        logger.error("[Side-Step] Pass 2 FAIL %s: %s", tmp_path.stem, exc)
+
+    def _loaded(loaded):
+        for tmp_path, data, error in loaded:
+            if error is not None:
+                _fail(tmp_path, error)
+                continue
+            yield tmp_path, data
+
+    def _encode(group):
+        with stats.time("encoder", len(group)):
+            def _cat(key):
+                # Single .to() straight to model device/dtype avoids
+                # throwaway intermediate GPU copies.
+                return torch.cat([data[key] for _p, data in group]).to(model_device, dtype=model_dtype)
+
+            refer_packed = refer_order = None
+            if len(group) > 1:
+                # One empty timbre reference per sample; the default is a
+                # single reference assigned to batch row 0.
+                refer_packed = torch.zeros(len(group), 1, 64, device=model_device, dtype=model_dtype)
+                refer_order = torch.arange(len(group), device=model_device)
+
+            # DIT encoder pass (adapter-agnostic: same tensors for
+            # LoRA and LoKR -- only the adapter injection differs).
+            encoder_hs, encoder_mask = run_encoder(
+                model,
+                text_hidden_states=_cat("text_hidden_states"),
+                text_attention_mask=_cat("text_attention_mask"),
+                lyric_hidden_states=_cat("lyric_hidden_states"),
+                lyric_attention_mask=_cat("lyric_attention_mask"),
+                device=str(model_device),
+                dtype=model_dtype,
+                refer_audio_hidden_states_packed=refer_packed,
+                refer_audio_order_mask=refer_order,
+            )
+            encoder_hs, encoder_mask = encoder_hs.cpu(), encoder_mask.cpu()
+
+            samples = []
+            for j, (tmp_path, data) in enumerate(group):
                 # Build context latents (silence-based, standard text2music)
+                silence_latent = data["silence_latent"].to(model_device, dtype=model_dtype)
                 if silence_latent.dim() == 2:
                     silence_latent = silence_latent.unsqueeze(0)
-
                 context_latents = build_context_latents(
-                    silence_latent, latent_length, str(model_device), model_dtype,
+                    silence_latent, data["latent_length"], str(model_device), model_dtype,
                 )
-                del silence_latent
-
-                # Write final .pt  (strip ".tmp" from "song.tmp.pt" -> "song.pt")
-                base_name = tmp_path.name.replace(".tmp.pt", ".pt")
-                final_path = out_path / base_name
-                meta = data["metadata"]
-                torch.save({
+                samples.append((tmp_path, {
                     "target_latents": data["target_latents"],
                     "attention_mask": data["attention_mask"],
-                    "encoder_hidden_states": encoder_hs.squeeze(0).cpu(),
-                    "encoder_attention_mask": encoder_mask.squeeze(0).cpu(),
+                    "encoder_hidden_states": encoder_hs[j].clone(),
+                    "encoder_attention_mask": encoder_mask[j].clone(),
                     "context_latents": context_latents.squeeze(0).cpu(),
-                    "metadata": meta,
-                }, final_path)
+                    "metadata": data["metadata"],
+                }))
+        return samples
+
+    def _save(tmp_path, sample):
+        with stats.time("save"):
+            # Write final .pt  (strip ".tmp" from "song.tmp.pt" -> "song.pt")
+            final_path = out_path / tmp_path.name.replace(".tmp.pt", ".pt")
+            if writer is not None:
+                writer.add(final_path.stem, sample)
+            else:
+                torch.save(sample, final_path)
+            # Remove intermediate
+            tmp_path.unlink(missing_ok=True)
+
+    def _collect(saved):
+        nonlocal processed
+        for tmp_path, error in saved:
+            if error is not None:
+                _fail(tmp_path, error)
+                continue
+            processed += 1
+            if on_written is not None:
+                on_written(tmp_path.name[: -len(".tmp.pt")])
+            logger.info("[Side-Step] Pass 2 OK: %s", tmp_path.stem)
 
-                # Free all GPU tensors and the loaded data dict before next iter
-                del encoder_hs, encoder_mask, context_latents, data
+    loaded = prefetch(_load, intermediates, num_workers=1, depth=max(2, 2 * batch_size))
+    try:
+        with closing(loaded):
+            for group in chunked(_loaded(loaded), batch_size):
+                if cancel_check and cancel_check():
+                    logger.info("[Side-Step] Cancelled at %d/%d", done, total)
+                    break
+
+                if progress_callback:
+                    extra = f" (+{len(group) - 1})" if len(group) > 1 else ""
+                    progress_callback(done, total, f"[Pass 2] {group[0][0].stem}{extra}")
+                done += len(group)
+
+                samples = run_batched(_encode, group, lambda entry, exc: _fail(entry[0], exc))
+                del group
+                for tmp_path, sample in samples:
+                    _collect(saver.submit(tmp_path, _save, tmp_path, sample))
+                del samples
+
+                # Free GPU memory from this batch before the next one
                 if torch.cuda.is_available():
                     torch.cuda.empty_cache()
 
-                # Remove intermediate
-                tmp_path.unlink(missing_ok=True)
-
-                processed += 1
-                logger.info("[Side-Step] Pass 2 OK: %s", tmp_path.stem)
-
-            except Exception as exc:
-                failed += 1
-                logger.error("[Side-Step] Pass 2 FAIL %s: %s", tmp_path.stem, exc)
-
     finally:
+        # Sharded writes run on the saver thread; finish them before the
+        # caller closes the shard writer.
+        _collect(saver.close())
         logger.info("[Side-Step] Unloading DIT model ...")
         unload_models(model)
 
+    stats.log("Pass 2", processed)
     if progress_callback:
         progress_callback(total, total, "[Pass 2] Done")
 
@@ -0,0 +1,223 @@
+"""
+Content-hash manifest for incremental preprocessing.
+
+``preprocess_manifest.json`` in the output directory records, per sample,
+what each stored tensor was computed from:
+
+* ``latent_key`` -- audio content hash, ``max_duration``, VAE identity and
+  precision (VAE latent).
+* ``text_key`` -- text prompt, lyrics, stored metadata, text-encoder
+  identity and precision (text/lyric states and metadata).
+* ``encoder_key`` -- ``text_key`` plus DiT identity and variant (condition
+  encoder output and silence context).
+
+A re-run compares these keys against the current inputs and plans each
+sample as ``reuse`` (nothing changed), ``text`` (audio unchanged, so the
+stored VAE latent is kept and only the text and DiT-encoder stages run)
+or ``full``.  Audio hashes are cached by file size and mtime so unchanged
+files are not re-read.  Model identities fingerprint the checkpoint
+directories by file names, sizes and mtimes rather than hashing weights.
+
+Extracted from ``preprocess.py`` to keep that module under the LOC limit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from acestep.audio_hashing import get_audio_hasher
+from acestep.training_v2.preprocess_pipeline import prefetch
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "preprocess_manifest.json"
+MANIFEST_FORMAT = "side-step-preprocess-manifest"
+MANIFEST_VERSION = 1
+
+
+# ---------------------------------------------------------------------------
+# Hashing
+# ---------------------------------------------------------------------------
+
+def digest(*parts: Any) -> str:
+    """Return a short stable hash of JSON-serialisable *parts*."""
+    blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def fingerprint_dir(path: Path) -> str:
+    """Identify a checkpoint directory by its files' names, sizes and mtimes.
+
+    Returns ``"missing"`` when *path* does not exist.
+    """
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    if path.is_file():
+        st = path.stat()
+        return digest(path.name, st.st_size, st.st_mtime_ns)
+    entries = []
+    for f in sorted(p for p in path.rglob("*") if p.is_file()):
+        st = f.stat()
+        entries.append((f.relative_to(path).as_posix(), st.st_size, st.st_mtime_ns))
+    return digest(entries)
+
+
+def model_fingerprints(checkpoint_dir: str, variant: str) -> Dict[str, str]:
+    """Return identities of the VAE, text encoder and DiT used by preprocessing."""
+    from acestep.training_v2.model_loader import _resolve_model_dir
+
+    ckpt = Path(checkpoint_dir)
+    try:
+        dit = fingerprint_dir(_resolve_model_dir(ckpt, variant))
+    except FileNotFoundError:
+        dit = "missing"
+    return {
+        "vae": fingerprint_dir(ckpt / "vae"),
+        "text": fingerprint_dir(ckpt / "Qwen3-Embedding-0.6B"),
+        "dit": digest(variant, dit, fingerprint_dir(ckpt / "silence_latent.pt")),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Manifest
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ManifestPlan:
+    """Per-sample work decided by :meth:`PreprocessManifest.plan`."""
+
+    reuse: Set[str] = field(default_factory=set)
+    """Sample stems whose stored tensors are current."""
+
+    text: Set[str] = field(default_factory=set)
+    """Stems that keep their VAE latent but re-run text + DiT encoding."""
+
+    full: Set[str] = field(default_factory=set)
+    """Stems that are (re)computed from audio."""
+
+    entries: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    """Manifest entry to record for each stem once it is written."""
+
+
+class PreprocessManifest:
+    """Load, plan against and save ``preprocess_manifest.json``."""
+
+    def __init__(self, output_dir: Path) -> None:
+        self.path = Path(output_dir) / MANIFEST_FILENAME
+        self.samples: Dict[str, Dict[str, Any]] = {}
+        self.existed = self.path.is_file()
+        if self.existed:
+            try:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+                if raw.get("format") == MANIFEST_FORMAT and raw.get("version") == MANIFEST_VERSION:
+                    self.samples = dict(raw.get("samples", {}))
+                else:
+                    logger.warning("[Side-Step] Ignoring manifest with unknown format: %s", self.path)
+            except (json.JSONDecodeError, OSError, AttributeError) as exc:
+                logger.warning("[Side-Step] Ignoring unreadable manifest %s: %s", self.path, exc)
+
+    def audio_hashes(self, audio_files: List[Path], num_workers: int = 2) -> Dict[Path, Optional[str]]:
+        """Return content hashes, reusing recorded ones whose size and mtime match."""
+        by_path = {e.get("audio_path"): e for e in self.samples.values()}
+
+        def _hash(af: Path) -> str:
+            st = af.stat()
+            known = by_path.get(str(af))
+            if known and known.get("size") == st.st_size and known.get("mtime_ns") == st.st_mtime_ns:
+                return known["audio_sha256"]
+            return get_audio_hasher().hash_file(str(af))
+
+        hashes: Dict[Path, Optional[str]] = {}
+        for af, sha, error in prefetch(_hash, audio_files, num_workers, depth=4 * max(1, num_workers)):
+            if error is not None:
+                logger.warning("[Side-Step] Could not hash %s: %s", af.name, error)
+            hashes[af] = sha
+        return hashes
+
+    def plan(
+        self,
+        audio_files: List[Path],
+        audio_hashes: Dict[Path, Optional[str]],
+        text_inputs: Callable[[int, Path], Dict[str, Any]],
+        models: Dict[str, str],
+        settings: Dict[str, Any],
+        has_output: Callable[[str], bool],
+    ) -> ManifestPlan:
+        """Decide which samples can be reused, re-encoded from text, or redone.
+
+        Args:
+            audio_hashes: Output of :meth:`audio_hashes`.
+            text_inputs: ``(index, path) -> dict`` of everything the text
+                stage consumes (prompt, lyrics, stored metadata).
+            models: Output of :func:`model_fingerprints`.
+            settings: Options affecting the VAE stage (``max_duration``,
+                ``precision``).
+            has_output: ``stem -> bool``, whether a final sample is stored.
+
+        Outputs that predate the manifest are adopted as current.
+        """
+        plan = ManifestPlan()
+        for i, af in enumerate(audio_files):
+            stem = af.stem
+            sha = audio_hashes.get(af)
+            text_key = digest(text_inputs(i, af), models["text"], settings.get("precision"))
+            entry = {
+                "audio_path": str(af),
+                "audio_sha256": sha,
+                "latent_key": digest(sha, models["vae"], settings) if sha else None,
+                "text_key": text_key,
+                "encoder_key": digest(text_key, models["dit"]),
+            }
+            if sha is not None:
+                st = af.stat()
+                entry["size"], entry["mtime_ns"] = st.st_size, st.st_mtime_ns
+            plan.entries[stem] = entry
+
+            old = self.samples.get(stem)
+            if not has_output(stem) or sha is None:
+                plan.full.add(stem)
+            elif not self.existed:
+                plan.reuse.add(stem)
+            elif old is None or old.get("latent_key") != entry["latent_key"]:
+                plan.full.add(stem)
+            elif old.get("text_key") != text_key or old.get("encoder_key") != entry["encoder_key"]:
+                plan.text.add(stem)
+            else:
+                plan.reuse.add(stem)
+
+        if not self.existed and plan.reuse:
+            logger.warning(
+                "[Side-Step] %d existing outputs predate the preprocessing manifest; "
+                "assuming they are current (delete them to force re-encoding)",
+                len(plan.reuse),
+            )
+        for stem in plan.reuse:
+            self.samples[stem] = plan.entries[stem]
+        # Invalidate stale entries up front so a failed recompute is never
+        # mistaken for a current output on the next run.
+        for stem in plan.text | plan.full:
+            self.samples.pop(stem, None)
+        return plan
+
+    def record(self, stem: str, entry: Dict[str, Any]) -> None:
+        """Mark *stem* as written from the inputs described by *entry*."""
+        self.samples[stem] = entry
+
+    def save(self) -> None:
+        """Atomically write the manifest."""
+        data = {
+            "format": MANIFEST_FORMAT,
+            "version": MANIFEST_VERSION,
+            "samples": dict(sorted(self.samples.items())),
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=1, default=str), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self.existed = True
@@ -0,0 +1,104 @@
+"""Unit tests for the incremental preprocessing manifest."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from acestep.training_v2.preprocess_manifest import (
+    PreprocessManifest,
+    fingerprint_dir,
+)
+
+_MODELS = {"vae": "v1", "text": "t1", "dit": "d1"}
+_SETTINGS = {"max_duration": 240.0, "precision": "bf16"}
+
+
+class PreprocessManifestTests(unittest.TestCase):
+    """Planning decisions and hash caching."""
+
+    def setUp(self):
+        """Create an output directory and two audio files."""
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.files = []
+        for name in ("a.wav", "b.wav"):
+            path = self.root / name
+            path.write_bytes(name.encode() * 100)
+            self.files.append(path)
+        self.captions = {"a.wav": "warm", "b.wav": "dark"}
+
+    def tearDown(self):
+        """Remove the temporary tree."""
+        self._tmp.cleanup()
+
+    def _plan(self, manifest, models=_MODELS, has_output=lambda stem: True):
+        """Plan against the current captions and record every sample as written."""
+        plan = manifest.plan(
+            self.files,
+            manifest.audio_hashes(self.files),
+            text_inputs=lambda i, af: {"prompt": self.captions[af.name]},
+            models=models,
+            settings=_SETTINGS,
+            has_output=has_output,
+        )
+        for stem in plan.text | plan.full:
+            manifest.record(stem, plan.entries[stem])
+        manifest.save()
+        return plan
+
+    def test_legacy_outputs_are_adopted_then_tracked(self):
+        """Without a manifest, existing outputs are reused and recorded."""
+        plan = self._plan(PreprocessManifest(self.root))
+        self.assertEqual(plan.reuse, {"a", "b"})
+        reloaded = PreprocessManifest(self.root)
+        self.assertEqual(set(reloaded.samples), {"a", "b"})
+        self.assertEqual(self._plan(reloaded).reuse, {"a", "b"})
+
+    def test_text_and_model_changes_plan_text_only_work(self):
+        """Caption or DiT changes keep the latent; VAE changes redo everything."""
+        self._plan(PreprocessManifest(self.root), has_output=lambda stem: False)
+        self.captions["a.wav"] = "warm, edited"
+        plan = self._plan(PreprocessManifest(self.root))
+        self.assertEqual((plan.reuse, plan.text, plan.full), ({"b"}, {"a"}, set()))
+
+        plan = self._plan(PreprocessManifest(self.root), models={**_MODELS, "dit": "d2"})
+        self.assertEqual(plan.text, {"a", "b"})
+
+        plan = self._plan(PreprocessManifest(self.root), models={**_MODELS, "dit": "d2", "vae": "v2"})
+        self.assertEqual(plan.full, {"a", "b"})
+
+    def test_missing_output_or_unrecorded_sample_is_recomputed(self):
+        """A stored output without a manifest entry is never trusted once a manifest exists."""
+        self._plan(PreprocessManifest(self.root), has_output=lambda stem: False)
+        manifest = PreprocessManifest(self.root)
+        manifest.samples.pop("a")
+        manifest.save()
+        plan = self._plan(PreprocessManifest(self.root), has_output=lambda stem: stem != "b")
+        self.assertEqual(plan.full, {"a", "b"})
+
+    def test_unchanged_files_are_not_rehashed(self):
+        """Recorded hashes are reused while size and mtime match."""
+        self._plan(PreprocessManifest(self.root), has_output=lambda stem: False)
+        manifest = PreprocessManifest(self.root)
+        with mock.patch("acestep.training_v2.preprocess_manifest.get_audio_hasher") as hasher:
+            manifest.audio_hashes(self.files)
+        hasher.return_value.hash_file.assert_not_called()
+
+        self.files[0].write_bytes(b"replaced take")
+        plan = self._plan(PreprocessManifest(self.root))
+        self.assertEqual(plan.full, {"a"})
+
+    def test_fingerprint_dir_tracks_file_changes(self):
+        """Adding a checkpoint file changes the directory identity."""
+        ckpt = self.root / "ckpt"
+        self.assertEqual(fingerprint_dir(ckpt), "missing")
+        ckpt.mkdir()
+        (ckpt / "config.json").write_text("{}")
+        before = fingerprint_dir(ckpt)
+        (ckpt / "model.safetensors").write_bytes(b"weights")
+        self.assertNotEqual(fingerprint_dir(ckpt), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
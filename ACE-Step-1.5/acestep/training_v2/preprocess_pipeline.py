@@ -0,0 +1,258 @@
+"""
+Overlapped producer/consumer helpers for Side-Step preprocessing.
+
+Both preprocessing passes used to load, encode and save one file at a
+time, leaving the GPU idle during audio decoding and disk I/O.  These
+helpers let a pool of CPU threads decode ahead of the GPU stage through a
+bounded window, group same-length clips so the encoders run batched, push
+saves to a background thread and time every stage so files/sec can be
+reported.
+
+Extracted from ``preprocess.py`` to keep that module under the LOC limit.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Stage timing
+# ---------------------------------------------------------------------------
+
+class StageStats:
+    """Thread-safe per-stage file counts and busy time.
+
+    Busy time is summed across threads, so a stage run by several workers
+    can report more files/sec than the wall-clock rate of the whole pass.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}
+        self._started = time.perf_counter()
+
+    def add(self, stage: str, files: int, seconds: float) -> None:
+        """Record *files* processed by *stage* in *seconds*."""
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0, 0.0])
+            entry[0] += files
+            entry[1] += seconds
+
+    @contextmanager
+    def time(self, stage: str, files: int = 1) -> Iterator[None]:
+        """Time the enclosed block as *files* processed by *stage*."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, files, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return ``{stage: {"files", "seconds", "files_per_sec"}}`` in first-seen order."""
+        with self._lock:
+            stages = {name: tuple(entry) for name, entry in self._stages.items()}
+        return {
+            name: {
+                "files": files,
+                "seconds": seconds,
+                "files_per_sec": files / seconds if seconds > 0 else 0.0,
+            }
+            for name, (files, seconds) in stages.items()
+        }
+
+    def log(self, label: str, total_files: int) -> None:
+        """Log every stage plus the wall-clock rate for *total_files*."""
+        for name, entry in self.summary().items():
+            logger.info(
+                "[Side-Step] %s %-7s %4d files in %7.1fs busy (%.2f files/s)",
+                label, name, entry["files"], entry["seconds"], entry["files_per_sec"],
+            )
+        wall = time.perf_counter() - self._started
+        if total_files and wall > 0:
+            logger.info(
+                "[Side-Step] %s overall %4d files in %7.1fs wall (%.2f files/s)",
+                label, total_files, wall, total_files / wall,
+            )
+
+
+# ---------------------------------------------------------------------------
+# Producers
+# ---------------------------------------------------------------------------
+
+def prefetch(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    num_workers: int = 2,
+    depth: int = 4,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """Run ``fn(item)`` on a thread pool ahead of the consumer.
+
+    Yields ``(item, result, None)`` or ``(item, None, error)`` in input
+    order.  At most *depth* calls are queued or running at once, which
+    bounds the memory held by decoded audio.  ``num_workers <= 0`` runs
+    everything inline.  Closing the generator early cancels queued calls.
+    """
+    if num_workers <= 0:
+        for item in items:
+            try:
+                yield item, fn(item), None
+            except Exception as exc:
+                yield item, None, exc
+        return
+
+    depth = max(depth, num_workers)
+    pool = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="side-step-prefetch")
+    window: Deque[Tuple[Any, Future]] = deque()
+    source = iter(items)
+    try:
+        for item in source:
+            window.append((item, pool.submit(fn, item)))
+            if len(window) >= depth:
+                break
+        while window:
+            item, future = window.popleft()
+            # Refill before waiting so the workers never starve.
+            for nxt in source:
+                window.append((nxt, pool.submit(fn, nxt)))
+                break
+            try:
+                result, error = future.result(), None
+            except Exception as exc:
+                result, error = None, exc
+            yield item, result, error
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def group_by_length(
+    entries: Iterable[Any],
+    batch_size: int,
+    key: Callable[[Any], Hashable],
+    lookahead: Optional[int] = None,
+) -> Iterator[List[Any]]:
+    """Group entries sharing ``key(entry)`` into batches of up to *batch_size*.
+
+    At most *lookahead* entries (default ``4 * batch_size``) are held back
+    waiting for partners; when the buffer is full the largest bucket is
+    flushed.  Leftover buckets are flushed in first-seen order at the end.
+    """
+    if batch_size <= 1:
+        for entry in entries:
+            yield [entry]
+        return
+
+    lookahead = max(lookahead or 4 * batch_size, batch_size)
+    buckets: Dict[Hashable, List[Any]] = {}
+    held = 0
+    for entry in entries:
+        k = key(entry)
+        bucket = buckets.setdefault(k, [])
+        bucket.append(entry)
+        held += 1
+        if len(bucket) >= batch_size:
+            held -= len(buckets.pop(k))
+            yield bucket
+        elif held >= lookahead:
+            fullest = max(buckets, key=lambda b: len(buckets[b]))
+            flushed = buckets.pop(fullest)
+            held -= len(flushed)
+            yield flushed
+    yield from buckets.values()
+
+
+def chunked(entries: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split *entries* into consecutive lists of up to *size* items."""
+    batch: List[Any] = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= max(1, size):
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ---------------------------------------------------------------------------
+# Consumers
+# ---------------------------------------------------------------------------
+
+def run_batched(
+    fn: Callable[[List[Any]], List[Any]],
+    batch: List[Any],
+    on_error: Callable[[Any, BaseException], None],
+) -> List[Any]:
+    """Return ``fn(batch)``, retrying one entry at a time if the batch fails.
+
+    A batch can fail where single entries succeed (e.g. out of memory), so
+    a failed batch is split and only the entries that still fail are
+    reported through ``on_error(entry, error)``.
+    """
+    try:
+        return fn(batch)
+    except Exception as exc:
+        if len(batch) == 1:
+            on_error(batch[0], exc)
+            return []
+        logger.warning(
+            "[Side-Step] Batch of %d failed (%s); retrying one at a time", len(batch), exc,
+        )
+    results: List[Any] = []
+    for entry in batch:
+        try:
+            results.extend(fn([entry]))
+        except Exception as exc:
+            on_error(entry, exc)
+    return results
+
+
+class BackgroundWriter:
+    """Run save calls in order on one background thread.
+
+    ``submit`` blocks while *max_pending* saves are outstanding and returns
+    the saves that have finished since the last call as ``(tag, error)``
+    pairs, so the caller can count successes and failures as it goes.
+    """
+
+    def __init__(self, max_pending: int = 4) -> None:
+        self.max_pending = max(1, int(max_pending))
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="side-step-writer")
+        self._pending: Deque[Tuple[Any, Future]] = deque()
+
+    def submit(self, tag: Any, fn: Callable[..., Any], *args: Any) -> List[Tuple[Any, Optional[BaseException]]]:
+        """Queue ``fn(*args)`` and return the saves that have completed."""
+        self._pending.append((tag, self._pool.submit(fn, *args)))
+        done = []
+        while self._pending and (len(self._pending) > self.max_pending or self._pending[0][1].done()):
+            done.append(self._pop())
+        return done
+
+    def drain(self) -> List[Tuple[Any, Optional[BaseException]]]:
+        """Wait for every outstanding save and return their outcomes."""
+        done = []
+        while self._pending:
+            done.append(self._pop())
+        return done
+
+    def close(self) -> List[Tuple[Any, Optional[BaseException]]]:
+        """Drain and stop the background thread."""
+        try:
+            return self.drain()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def _pop(self) -> Tuple[Any, Optional[BaseException]]:
+        tag, future = self._pending.popleft()
+        try:
+            future.result()
+        except Exception as exc:
+            return tag, exc
+        return tag, None
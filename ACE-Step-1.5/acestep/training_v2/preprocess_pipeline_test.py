@@ -0,0 +1,149 @@
+"""Unit tests for the overlapped preprocessing helpers."""
+
+import threading
+import time
+import unittest
+
+from acestep.training_v2.preprocess_pipeline import (
+    BackgroundWriter,
+    StageStats,
+    chunked,
+    group_by_length,
+    prefetch,
+    run_batched,
+)
+
+
+class PrefetchTests(unittest.TestCase):
+    """Ordering, bounded look-ahead, errors and early close."""
+
+    def test_results_keep_input_order_and_errors_are_yielded(self):
+        """Slow early items do not reorder results; failures become error entries."""
+        def work(n):
+            time.sleep(0.02 if n == 0 else 0.0)
+            if n == 3:
+                raise ValueError("bad file")
+            return n * 10
+
+        out = list(prefetch(work, range(6), num_workers=3, depth=4))
+        self.assertEqual([item for item, _r, _e in out], list(range(6)))
+        self.assertEqual([r for _i, r, e in out if e is None], [0, 10, 20, 40, 50])
+        self.assertIsInstance(out[3][2], ValueError)
+
+    def test_in_flight_work_is_bounded_by_depth(self):
+        """No more than ``depth`` items are started ahead of the consumer."""
+        started = []
+        lock = threading.Lock()
+
+        def work(n):
+            with lock:
+                started.append(n)
+            return n
+
+        gen = prefetch(work, range(100), num_workers=2, depth=3)
+        next(gen)
+        time.sleep(0.05)
+        self.assertLessEqual(len(started), 4)
+        gen.close()
+        self.assertLess(len(started), 10)
+
+    def test_inline_mode(self):
+        """``num_workers=0`` runs on the calling thread."""
+        caller = threading.get_ident()
+        out = list(prefetch(lambda n: threading.get_ident(), [1, 2], num_workers=0))
+        self.assertEqual([r for _i, r, _e in out], [caller, caller])
+
+
+class GroupingTests(unittest.TestCase):
+    """Same-length grouping and plain chunking."""
+
+    def test_groups_share_a_key_and_respect_batch_size(self):
+        """Every entry is emitted exactly once in a single-key batch."""
+        lengths = [5, 7, 5, 5, 7, 9, 5]
+        groups = list(group_by_length(enumerate(lengths), 2, key=lambda e: e[1]))
+        self.assertTrue(all(len({e[1] for e in g}) == 1 and len(g) <= 2 for g in groups))
+        self.assertEqual(sorted(e[0] for g in groups for e in g), list(range(len(lengths))))
+        self.assertEqual(groups[0], [(0, 5), (2, 5)])
+
+    def test_lookahead_bounds_held_entries(self):
+        """With all-distinct keys, nothing waits past the look-ahead window."""
+        emitted = []
+        source = iter(range(10))
+
+        def entries():
+            for n in source:
+                emitted.append(n)
+                yield n
+
+        gen = group_by_length(entries(), 2, key=lambda n: n, lookahead=3)
+        self.assertEqual(next(gen), [0])
+        self.assertEqual(len(emitted), 3)
+
+    def test_batch_size_one_and_chunked(self):
+        """Batch size 1 passes entries through; chunking keeps order."""
+        self.assertEqual(list(group_by_length([3, 3], 1, key=lambda n: n)), [[3], [3]])
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+class RunBatchedTests(unittest.TestCase):
+    """A failing batch is split so only bad entries fail."""
+
+    def test_split_retry_reports_only_failing_entries(self):
+        """The batch call fails; singles succeed except the bad entry."""
+        calls = []
+        errors = []
+
+        def fn(batch):
+            calls.append(list(batch))
+            if len(batch) > 1 or batch[0] == "bad":
+                raise RuntimeError("out of memory")
+            return [batch[0].upper()]
+
+        out = run_batched(fn, ["a", "bad", "c"], lambda entry, exc: errors.append(entry))
+        self.assertEqual(out, ["A", "C"])
+        self.assertEqual(errors, ["bad"])
+        self.assertEqual(len(calls), 4)
+
+
+class BackgroundWriterTests(unittest.TestCase):
+    """Ordered background saves with bounded backlog."""
+
+    def test_all_outcomes_are_reported_once(self):
+        """Successes and failures come back through submit or close."""
+        writer = BackgroundWriter(max_pending=2)
+        written = []
+        outcomes = []
+
+        def save(n):
+            if n == 2:
+                raise OSError("disk full")
+            written.append(n)
+
+        for n in range(5):
+            outcomes.extend(writer.submit(n, save, n))
+            self.assertLessEqual(len(writer._pending), 2)
+        outcomes.extend(writer.close())
+        self.assertEqual(written, [0, 1, 3, 4])
+        self.assertEqual([tag for tag, _e in outcomes], list(range(5)))
+        self.assertIsInstance(dict(outcomes)[2], OSError)
+
+
+class StageStatsTests(unittest.TestCase):
+    """Files/sec bookkeeping."""
+
+    def test_summary_rates(self):
+        """Rates divide files by accumulated busy seconds."""
+        stats = StageStats()
+        stats.add("vae", 4, 2.0)
+        stats.add("vae", 2, 1.0)
+        with stats.time("save"):
+            pass
+        summary = stats.summary()
+        self.assertEqual(list(summary), ["vae", "save"])
+        self.assertEqual(summary["vae"]["files"], 6)
+        self.assertAlmostEqual(summary["vae"]["files_per_sec"], 2.0)
+        self.assertEqual(summary["save"]["files"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Unit tests for batched pass 1 and incremental, manifest-driven preprocessing."""
+
+import json
+import tempfile
+import unittest
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from acestep.training_v2.preprocess import _pass1_light, preprocess_audio_files
+
+_LENGTHS = {"a.wav": 9600, "b.wav": 19200, "c.wav": 9600, "d.wav": 9600}
+
+
+class _FakeVAE(nn.Module):
+    """Deterministic VAE stand-in producing ``[B, 64, S / 480]`` latents."""
+
+    def __init__(self):
+        """Track batch sizes seen by ``encode``."""
+        super().__init__()
+        self.scale = nn.Parameter(torch.ones(64, 1))
+        self.batches = []
+
+    @property
+    def dtype(self):
+        """Mirror the diffusers ``dtype`` attribute."""
+        return self.scale.dtype
+
+    def encode(self, audio):
+        """Average-pool the mono mix into 64 scaled channels."""
+        self.batches.append(audio.shape[0])
+        pooled = F.avg_pool1d(audio.mean(1, keepdim=True), 480)
+        latent = pooled * self.scale
+        return SimpleNamespace(latent_dist=SimpleNamespace(sample=lambda: latent))
+
+
+class _FakeTextEncoder(nn.Module):
+    """Embedding plus a cumulative sum standing in for the text model."""
+
+    def __init__(self):
+        """Create a small embedding table."""
+        super().__init__()
+        self.embed_tokens = nn.Embedding(128, 8)
+
+    def forward(self, input_ids):
+        """Return per-row hidden states that depend on every earlier token."""
+        return SimpleNamespace(last_hidden_state=self.embed_tokens(input_ids).cumsum(1))
+
+
+def _tokenizer(text, padding, max_length, truncation, return_tensors):
+    """Character tokenizer padding every prompt to ``max_length``."""
+    texts = [text] if isinstance(text, str) else list(text)
+    ids = torch.zeros(len(texts), max_length, dtype=torch.long)
+    mask = torch.zeros(len(texts), max_length, dtype=torch.long)
+    for row, t in enumerate(texts):
+        codes = [ord(ch) % 128 for ch in t[:max_length]]
+        ids[row, :len(codes)] = torch.tensor(codes, dtype=torch.long)
+        mask[row, :len(codes)] = 1
+    return SimpleNamespace(input_ids=ids, attention_mask=mask)
+
+
+class _FakeDiT(nn.Module):
+    """DiT stand-in whose condition encoder packs lyric and text states."""
+
+    def __init__(self):
+        """Attach a parameter-free encoder."""
+        super().__init__()
+        self.weight = nn.Parameter(torch.ones(1))
+        self.encoder = self._encode
+
+    def _encode(self, text_hidden_states, text_attention_mask, lyric_hidden_states,
+                lyric_attention_mask, **_refer):
+        """Concatenate lyric and text sequences with their masks."""
+        return (
+            torch.cat([lyric_hidden_states, text_hidden_states], dim=1),
+            torch.cat([lyric_attention_mask, text_attention_mask], dim=1),
+        )
+
+
+def _load_audio(path, _sr, _max_duration):
+    """Return seeded stereo audio whose length and content follow the file bytes."""
+    path = Path(path)
+    seed = sum(map(ord, path.name))
+    if path.is_file():
+        seed += sum(path.read_bytes())
+    gen = torch.Generator().manual_seed(seed)
+    return torch.randn(2, _LENGTHS[path.name], generator=gen), 48000
+
+
+@contextmanager
+def _fake_models(vae):
+    """Patch model loading and audio decoding with the fakes above."""
+    loader = "acestep.training_v2.model_loader"
+    with mock.patch(f"{loader}.load_vae", return_value=vae), \
+            mock.patch(f"{loader}.load_text_encoder", return_value=(_tokenizer, _FakeTextEncoder())), \
+            mock.patch(f"{loader}.load_silence_latent", return_value=torch.zeros(1, 40, 64)), \
+            mock.patch(f"{loader}.load_decoder_for_training", return_value=_FakeDiT()), \
+            mock.patch(f"{loader}.unload_models"), \
+            mock.patch(
+                "acestep.training.dataset_builder_modules.preprocess_audio.load_audio_stereo",
+                side_effect=_load_audio,
+            ):
+        yield
+
+
+class Pass1BatchingTests(unittest.TestCase):
+    """Batched pass 1 writes the same intermediates as the one-by-one path."""
+
+    def _run(self, out_dir, batch_size, num_workers):
+        """Run pass 1 on the fake models; return intermediates, failures, VAE batches."""
+        torch.manual_seed(0)
+        vae = _FakeVAE()
+        with _fake_models(vae):
+            paths, failed = _pass1_light(
+                audio_files=[Path(f"/data/{name}") for name in (*_LENGTHS, "missing.wav")],
+                sample_meta={"b.wav": {"caption": "bright synth", "lyrics": "la la"}},
+                ds_meta={},
+                out_path=Path(out_dir),
+                checkpoint_dir="unused",
+                variant="turbo",
+                device="cpu",
+                precision="fp32",
+                max_duration=240.0,
+                progress_callback=None,
+                cancel_check=None,
+                num_workers=num_workers,
+                batch_size=batch_size,
+            )
+        return paths, failed, vae.batches
+
+    def test_batched_intermediates_match_sequential(self):
+        """Same-length clips share a VAE batch and produce identical tensors."""
+        with tempfile.TemporaryDirectory() as seq_dir, tempfile.TemporaryDirectory() as batch_dir:
+            seq_paths, seq_failed, seq_batches = self._run(seq_dir, batch_size=1, num_workers=0)
+            paths, failed, batches = self._run(batch_dir, batch_size=2, num_workers=2)
+
+            self.assertEqual((seq_failed, failed), (1, 1))
+            self.assertEqual(seq_batches, [1, 1, 1, 1])
+            self.assertEqual(sorted(batches), [1, 1, 2])
+            self.assertEqual(sorted(p.name for p in paths), sorted(p.name for p in seq_paths))
+            for seq_path in seq_paths:
+                expected = torch.load(seq_path, weights_only=False)
+                actual = torch.load(Path(batch_dir) / seq_path.name, weights_only=False)
+                self.assertEqual(actual["metadata"], expected["metadata"])
+                self.assertEqual(actual["latent_length"], expected["latent_length"])
+                for key in ("target_latents", "attention_mask", "text_hidden_states",
+                            "text_attention_mask", "lyric_hidden_states", "lyric_attention_mask"):
+                    self.assertEqual(actual[key].shape, expected[key].shape, key)
+                    self.assertTrue(torch.allclose(actual[key], expected[key], atol=1e-6), key)
+                # Per-sample tensors must not drag the whole batch's storage along.
+                latents = actual["target_latents"]
+                self.assertEqual(latents.untyped_storage().nbytes(), latents.numel() * latents.element_size())
+
+
+class IncrementalPreprocessTests(unittest.TestCase):
+    """Re-runs only recompute what the manifest says has changed."""
+
+    def setUp(self):
+        """Write three audio files and a dataset JSON."""
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.out_dir = self.root / "tensors"
+        self.dataset_json = self.root / "dataset.json"
+        for name in ("a.wav", "b.wav", "c.wav"):
+            (self.root / name).write_bytes(name.encode())
+        self.samples = [
+            {"filename": name, "audio_path": name, "caption": f"{name} caption", "lyrics": "[Instrumental]"}
+            for name in ("a.wav", "b.wav", "c.wav")
+        ]
+        self._write_json()
+
+    def tearDown(self):
+        """Remove the temporary tree."""
+        self._tmp.cleanup()
+
+    def _write_json(self):
+        """Persist the current sample list."""
+        self.dataset_json.write_text(json.dumps({"samples": self.samples}), encoding="utf-8")
+
+    def _run(self, output_format="pt"):
+        """Preprocess on the fakes; return the result and the VAE batch sizes."""
+        vae = _FakeVAE()
+        with _fake_models(vae):
+            result = preprocess_audio_files(
+                audio_dir=None,
+                output_dir=str(self.out_dir),
+                checkpoint_dir=str(self.root / "checkpoints"),
+                dataset_json=str(self.dataset_json),
+                device="cpu",
+                precision="fp32",
+                output_format=output_format,
+                num_workers=2,
+                batch_size=2,
+            )
+        return result, vae.batches
+
+    def test_text_edits_keep_latents_and_audio_edits_redo_them(self):
+        """Unchanged samples are reused, caption edits skip the VAE, new audio is re-encoded."""
+        first, batches = self._run()
+        self.assertEqual((first["processed"], first["reused"], first["recomputed"]), (3, 0, 3))
+        self.assertEqual(sum(batches), 3)
+        latent_b = torch.load(self.out_dir / "b.pt", weights_only=False)["target_latents"]
+
+        again, batches = self._run()
+        self.assertEqual((again["processed"], again["reused"], again["recomputed"]), (0, 3, 0))
+        self.assertEqual(batches, [])
+
+        self.samples[1]["caption"] = "b caption, edited"
+        self._write_json()
+        edited, batches = self._run()
+        self.assertEqual((edited["reused"], edited["recomputed"], edited["text_only"]), (2, 1, 1))
+        self.assertEqual(batches, [])
+        stored = torch.load(self.out_dir / "b.pt", weights_only=False)
+        self.assertTrue(torch.equal(stored["target_latents"], latent_b))
+        self.assertEqual(stored["metadata"]["caption"], "b caption, edited")
+
+        (self.root / "c.wav").write_bytes(b"new take")
+        replaced, batches = self._run()
+        self.assertEqual((replaced["reused"], replaced["recomputed"], replaced["text_only"]), (2, 1, 0))
+        self.assertEqual(sum(batches), 1)
+
+    def test_sharded_output_reuses_stored_latents(self):
+        """Text-only recomputes read the latent back from the shards."""
+        from acestep.training.path_safety import get_safe_root, set_safe_root
+        from acestep.training.sharded_dataset import ShardedTensorDataset
+
+        self._run(output_format="sharded")
+        self.samples[0]["lyrics"] = "[verse] hello"
+        self._write_json()
+        result, batches = self._run(output_format="sharded")
+        self.assertEqual((result["processed"], result["text_only"]), (1, 1))
+        self.assertEqual(batches, [])
+        previous_root = get_safe_root()
+        set_safe_root(str(self.root))
+        self.addCleanup(set_safe_root, previous_root)
+        ds = ShardedTensorDataset(str(self.out_dir))
+        self.assertEqual(len(ds), 3)
+        record = next(ds[i] for i in range(len(ds)) if ds.samples[i]["name"] == "a")
+        self.assertEqual(record["metadata"]["lyrics"], "[verse] hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,6 +18,7 @@ from typing import Any, Dict, Generator, List, Optional, Tuple
 
 import torch
 
+from acestep.training.batch_sampling import PaddingMeter, set_loader_epoch
 from acestep.training_v2.optim import build_optimizer, build_scheduler
 from acestep.training_v2.tensorboard_utils import TrainingLogger
 from acestep.training_v2.trainer_helpers import configure_memory_features, save_checkpoint, save_final
@@ -170,9 +171,11 @@ def run_basic_training_loop(
     module.model.decoder.train()
 
     for epoch in range(start_epoch, cfg.max_epochs):
+        set_loader_epoch(train_loader, epoch)
         epoch_loss = 0.0
         num_updates = 0
         epoch_start = time.time()
+        padding = PaddingMeter()
 
         for batch in train_loader:
             if training_state and training_state.get("should_stop", False):
@@ -181,6 +184,7 @@ def run_basic_training_loop(
                 tb.close()
                 return
 
+            padding.update(batch)
             loss = module.training_step(batch)
             loss = loss / cfg.gradient_accumulation_steps
             loss.backward()
@@ -219,9 +223,15 @@ def run_basic_training_loop(
         epoch_time = time.time() - epoch_start
         avg_epoch_loss = epoch_loss / max(num_updates, 1)
         tb.log_epoch_loss(avg_epoch_loss, epoch + 1)
+        tokens_per_sec = padding.tokens_per_sec(epoch_time)
+        tb.log_scalar("data/padding_ratio", padding.padding_ratio, epoch + 1)
+        tb.log_scalar("data/tokens_per_sec", tokens_per_sec, epoch + 1)
         yield TrainingUpdate(
             step=global_step, loss=avg_epoch_loss,
-            msg=f"[OK] Epoch {epoch + 1}/{cfg.max_epochs} in {epoch_time:.1f}s",
+            msg=(
+                f"[OK] Epoch {epoch + 1}/{cfg.max_epochs} in {epoch_time:.1f}s, "
+                f"padding {padding.padding_ratio:.1%}, {tokens_per_sec:.0f} latent frames/s"
+            ),
             kind="epoch", epoch=epoch + 1, max_epochs=cfg.max_epochs, epoch_time=epoch_time,
         )
 
@@ -26,9 +26,11 @@ from typing import Any, Dict, Generator, Optional, Tuple
 import torch
 import torch.nn as nn
 from acestep.training_v2.optim import build_optimizer, build_scheduler
+from acestep.training.batch_sampling import PaddingMeter, set_loader_epoch
 from acestep.training.data_module import PreprocessedDataModule
 
 # V2 modules
+from acestep.training_v2.checkpoint_writer import AsyncCheckpointWriter
 from acestep.training_v2.configs import TrainingConfigV2
 from acestep.training_v2.tensorboard_utils import TrainingLogger
 from acestep.training_v2.ui import TrainingUpdate
@@ -92,6 +94,7 @@ class FixedLoRATrainer:
 
         self.module: Optional[FixedLoRAModule] = None
         self.fabric: Optional[Any] = None
+        self.checkpoint_writer: Optional[AsyncCheckpointWriter] = None
         self.is_training = False
 
     # ------------------------------------------------------------------
@@ -149,6 +152,10 @@ class FixedLoRATrainer:
                 prefetch_factor=cfg.prefetch_factor if num_workers > 0 else None,
                 persistent_workers=cfg.persistent_workers if num_workers > 0 else False,
                 pin_memory_device=cfg.pin_memory_device,
+                length_bucketing=getattr(cfg, "length_bucketing", False),
+                pack_sequences=getattr(cfg, "pack_sequences", False),
+                pack_length=getattr(cfg, "pack_length", 0),
+                seed=cfg.seed,
             )
             data_module.setup("fit")
 
@@ -158,6 +165,12 @@ class FixedLoRATrainer:
 
             yield TrainingUpdate(0, 0.0, f"[OK] Loaded {len(data_module.train_dataset)} preprocessed samples", kind="info")
 
+            if getattr(cfg, "async_checkpoint", False):
+                self.checkpoint_writer = AsyncCheckpointWriter(
+                    max_pending=getattr(cfg, "max_pending_checkpoints", 1),
+                    keep_last_n=getattr(cfg, "keep_last_n_checkpoints", 0),
+                )
+
             # -- Dispatch to Fabric or basic loop ---------------------------
             if _FABRIC_AVAILABLE:
                 yield from self._train_fabric(data_module, training_state)
@@ -169,6 +182,7 @@ class FixedLoRATrainer:
             yield TrainingUpdate(0, 0.0, f"[FAIL] Training failed: {exc}", kind="fail")
         finally:
             self.is_training = False
+            self._close_checkpoint_writer()
 
     def stop(self) -> None:
         self.is_training = False
@@ -198,6 +212,15 @@ class FixedLoRATrainer:
     ) -> None:
         save_checkpoint(self, optimizer, scheduler, epoch, global_step, ckpt_dir)
 
+    def _close_checkpoint_writer(self) -> None:
+        writer, self.checkpoint_writer = self.checkpoint_writer, None
+        if writer is None:
+            return
+        try:
+            writer.close()
+        except Exception as exc:
+            logger.error("[Side-Step] %s", exc)
+
     def _save_final(self, output_dir: str) -> None:
         save_final(self, output_dir)
 
@@ -350,9 +373,11 @@ class FixedLoRATrainer:
         self.module.model.decoder.train()
 
         for epoch in range(start_epoch, cfg.max_epochs):
+            set_loader_epoch(train_loader, epoch)
             epoch_loss = 0.0
             num_updates = 0
             epoch_start = time.time()
+            padding = PaddingMeter()
 
             for _batch_idx, batch in enumerate(train_loader):
                 # Stop signal
@@ -365,6 +390,7 @@ class FixedLoRATrainer:
                     tb.close()
                     return
 
+                padding.update(batch)
                 loss = self.module.training_step(batch)
                 loss = loss / cfg.gradient_accumulation_steps
                 self.fabric.backward(loss)
@@ -437,9 +463,15 @@ class FixedLoRATrainer:
             epoch_time = time.time() - epoch_start
             avg_epoch_loss = epoch_loss / max(num_updates, 1)
             tb.log_epoch_loss(avg_epoch_loss, epoch + 1)
+            tokens_per_sec = padding.tokens_per_sec(epoch_time)
+            tb.log_scalar("data/padding_ratio", padding.padding_ratio, epoch + 1)
+            tb.log_scalar("data/tokens_per_sec", tokens_per_sec, epoch + 1)
             yield TrainingUpdate(
                 step=global_step, loss=avg_epoch_loss,
-                msg=f"[OK] Epoch {epoch + 1}/{cfg.max_epochs} in {epoch_time:.1f}s, Loss: {avg_epoch_loss:.4f}",
+                msg=(
+                    f"[OK] Epoch {epoch + 1}/{cfg.max_epochs} in {epoch_time:.1f}s, Loss: {avg_epoch_loss:.4f}, "
+                    f"padding {padding.padding_ratio:.1%}, {tokens_per_sec:.0f} latent frames/s"
+                ),
                 kind="epoch", epoch=epoch + 1, max_epochs=cfg.max_epochs, epoch_time=epoch_time,
             )
 
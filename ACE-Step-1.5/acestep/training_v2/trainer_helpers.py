@@ -11,7 +11,7 @@ from __future__ import annotations
 import logging
 import os
 from pathlib import Path
-from typing import Any, Generator, Optional, Tuple
+from typing import Any, Callable, Generator, Optional, Tuple
 
 import torch
 import torch.nn as nn
@@ -22,9 +22,11 @@ from acestep.training.lora_utils import (
     save_lora_weights,
 )
 from acestep.training.lokr_utils import (
+    save_lokr_state_dict,
     save_lokr_weights,
     load_lokr_weights,
 )
+from acestep.training_v2.checkpoint_writer import prune_checkpoints, snapshot_to_host
 from acestep.training_v2.ui import TrainingUpdate
 
 logger = logging.getLogger(__name__)
@@ -145,16 +147,7 @@ def save_adapter_flat(trainer: Any, output_dir: str) -> None:
     os.makedirs(output_dir, exist_ok=True)
 
     if trainer.adapter_type == "lokr":
-        if module.lycoris_net is None:
-            logger.error(
-                "[BUG] adapter_type is 'lokr' but lycoris_net is None -- "
-                "cannot save LoKR weights.  This indicates a configuration or "
-                "injection error.  Refusing to silently save as LoRA."
-            )
-            raise RuntimeError(
-                "LoKR adapter type was requested but no LyCORIS network is "
-                "attached to the training module.  Cannot save weights."
-            )
+        _require_lycoris_net(module)
         lokr_meta = {"lokr_config": module.adapter_config.to_dict()}
         save_lokr_weights(module.lycoris_net, output_dir, metadata=lokr_meta)
     else:
@@ -167,6 +160,61 @@ def save_adapter_flat(trainer: Any, output_dir: str) -> None:
             save_lora_weights(module.model, output_dir)
 
 
+def _require_lycoris_net(module: Any) -> None:
+    """Refuse to save a LoKR run that has no LyCORIS network attached."""
+    if module.lycoris_net is None:
+        logger.error(
+            "[BUG] adapter_type is 'lokr' but lycoris_net is None -- "
+            "cannot save LoKR weights.  This indicates a configuration or "
+            "injection error.  Refusing to silently save as LoRA."
+        )
+        raise RuntimeError(
+            "LoKR adapter type was requested but no LyCORIS network is "
+            "attached to the training module.  Cannot save weights."
+        )
+
+
+def snapshot_adapter(trainer: Any) -> Callable[[str], None]:
+    """Copy the adapter weights to host memory.
+
+    Returns a function that writes them flat into a directory in the same
+    layout as :func:`save_adapter_flat`.  The returned function never
+    reads live parameters, so it may run while training continues.
+    """
+    module = trainer.module
+    assert module is not None
+
+    if trainer.adapter_type == "lokr":
+        _require_lycoris_net(module)
+        lokr_state = snapshot_to_host(module.lycoris_net.state_dict())
+        lokr_meta = {"lokr_config": module.adapter_config.to_dict()}
+        return lambda output_dir: save_lokr_state_dict(lokr_state, output_dir, metadata=lokr_meta)
+
+    decoder = _unwrap_decoder(module.model)
+    if hasattr(decoder, "save_pretrained"):
+        trainable = {name for name, p in decoder.named_parameters() if p.requires_grad}
+        adapter_state = snapshot_to_host(
+            {k: v for k, v in decoder.state_dict().items() if k in trainable}
+        )
+
+        def _write_peft(output_dir: str) -> None:
+            decoder.save_pretrained(output_dir, state_dict=adapter_state)
+            logger.info("[OK] LoRA adapter saved to %s", output_dir)
+
+        return _write_peft
+
+    # Fallback for non-PEFT models (mirrors save_lora_weights)
+    lora_state = snapshot_to_host(
+        {name: p for name, p in module.model.named_parameters() if "lora_" in name}
+    )
+
+    def _write_plain(output_dir: str) -> None:
+        os.makedirs(output_dir, exist_ok=True)
+        torch.save(lora_state, os.path.join(output_dir, "lora_weights.pt"))
+
+    return _write_plain
+
+
 def save_checkpoint(
     trainer: Any, optimizer: Any, scheduler: Any,
     epoch: int, global_step: int, ckpt_dir: str,
@@ -177,15 +225,50 @@ def save_checkpoint(
     are saved flat in *ckpt_dir* (same layout as ``save_final``), so
     users can point inference tools directly at any checkpoint.
     ``training_state.pt`` is saved alongside for resume support.
+
+    When ``trainer.checkpoint_writer`` is set, only host snapshots are
+    taken here and the files are written by the background writer.
     """
+    keep_last_n = getattr(trainer.training_config, "keep_last_n_checkpoints", 0)
+    writer = getattr(trainer, "checkpoint_writer", None)
+    if writer is not None:
+        write_adapter = snapshot_adapter(trainer)
+        optimizer_state = snapshot_to_host(optimizer.state_dict())
+        scheduler_state = snapshot_to_host(scheduler.state_dict())
+
+        def _write(out_dir: str) -> None:
+            write_adapter(out_dir)
+            _write_training_state(out_dir, epoch, global_step, optimizer_state, scheduler_state)
+
+        writer.submit(ckpt_dir, _write)
+        logger.info(
+            "Training checkpoint queued for %s (epoch %d, step %d)",
+            ckpt_dir, epoch, global_step,
+        )
+        return
+
     save_adapter_flat(trainer, ckpt_dir)
+    _write_training_state(
+        ckpt_dir, epoch, global_step, optimizer.state_dict(), scheduler.state_dict(),
+    )
+    logger.info(
+        "Training checkpoint saved to %s (epoch %d, step %d)",
+        ckpt_dir, epoch, global_step,
+    )
+    prune_checkpoints(os.path.dirname(os.path.abspath(ckpt_dir)), keep_last_n)
+
 
+def _write_training_state(
+    ckpt_dir: str, epoch: int, global_step: int,
+    optimizer_state: dict, scheduler_state: dict,
+) -> None:
+    """Write ``training_state.pt`` and its safetensors progress twin."""
     # Save optimizer / scheduler / progress for resume
     training_state = {
         "epoch": epoch,
         "global_step": global_step,
-        "optimizer_state_dict": optimizer.state_dict(),
-        "scheduler_state_dict": scheduler.state_dict(),
+        "optimizer_state_dict": optimizer_state,
+        "scheduler_state_dict": scheduler_state,
     }
     state_path = os.path.join(ckpt_dir, "training_state.pt")
     torch.save(training_state, state_path)
@@ -204,14 +287,16 @@ def save_checkpoint(
     except Exception as exc:
         logger.debug("Could not write training_state.safetensors: %s", exc)
 
-    logger.info(
-        "Training checkpoint saved to %s (epoch %d, step %d)",
-        ckpt_dir, epoch, global_step,
-    )
-
 
 def save_final(trainer: Any, output_dir: str) -> None:
-    """Save final adapter weights (inference-ready, no training state)."""
+    """Save final adapter weights (inference-ready, no training state).
+
+    Pending background checkpoint writes are flushed first so a failed
+    write surfaces before the run reports success.
+    """
+    writer = getattr(trainer, "checkpoint_writer", None)
+    if writer is not None:
+        writer.wait()
     save_adapter_flat(trainer, output_dir)
     verify_saved_adapter(output_dir)
 
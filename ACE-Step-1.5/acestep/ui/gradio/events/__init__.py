@@ -823,10 +823,19 @@ def setup_event_handlers(demo, dit_handler, llm_handler, dataset_handler, datase
         )
     
     # ========== Convert To Codes Handlers ==========
+    def make_convert_to_codes_handler(idx):
+        return lambda audio, batch_idx, queue: res_h.convert_result_audio_to_codes(
+            dit_handler, audio, idx, batch_idx, queue
+        )
+
     for btn_idx in range(1, 9):
         results_section[f"convert_to_codes_btn_{btn_idx}"].click(
-            fn=lambda audio: res_h.convert_result_audio_to_codes(dit_handler, audio),
-            inputs=[results_section[f"generated_audio_{btn_idx}"]],
+            fn=make_convert_to_codes_handler(btn_idx),
+            inputs=[
+                results_section[f"generated_audio_{btn_idx}"],
+                results_section["current_batch_index"],
+                results_section["batch_queue"],
+            ],
             outputs=[
                 results_section[f"codes_display_{btn_idx}"],
                 results_section[f"details_accordion_{btn_idx}"],
@@ -117,12 +117,40 @@ def send_audio_to_repaint(audio_file, lm_metadata, current_lyrics, current_capti
     return (audio_file, gr.update(value="Repaint"), lyrics, caption, *mode_updates)
 
 
-def convert_result_audio_to_codes(dit_handler, generated_audio):
+def _retained_pred_latents(sample_idx, current_batch_index, batch_queue):
+    """Return the retained ``pred_latents`` row for a result slot, if any.
+
+    Args:
+        sample_idx: 1-based result slot index.
+        current_batch_index: Batch currently shown in the results panel.
+        batch_queue: Batch queue dict holding ``extra_outputs`` per batch.
+
+    Returns:
+        ``[1, T, D]`` latent tensor, or ``None`` when nothing is retained.
+    """
+    if sample_idx is None or not batch_queue or current_batch_index not in batch_queue:
+        return None
+    extra_outputs = batch_queue[current_batch_index].get("extra_outputs") or {}
+    pred_latents = extra_outputs.get("pred_latents")
+    idx0 = sample_idx - 1
+    if pred_latents is None or idx0 < 0 or idx0 >= pred_latents.shape[0]:
+        return None
+    return pred_latents[idx0:idx0 + 1]
+
+
+def convert_result_audio_to_codes(dit_handler, generated_audio, sample_idx=None,
+                                  current_batch_index=None, batch_queue=None):
     """Convert a generated audio sample to LM audio codes.
 
+    Tokenizes the batch's retained ``pred_latents`` directly when available
+    and only falls back to re-encoding the audio file otherwise.
+
     Args:
         dit_handler: DiT handler instance.
         generated_audio: File path to the generated audio.
+        sample_idx: Optional 1-based result slot index.
+        current_batch_index: Optional batch index shown in the results panel.
+        batch_queue: Optional batch queue holding retained latents.
 
     Returns:
         Tuple of ``(codes_display_update, details_accordion_update)``.
@@ -134,7 +162,10 @@ def convert_result_audio_to_codes(dit_handler, generated_audio):
         gr.Warning(t("messages.service_not_initialized"))
         return gr.skip(), gr.skip()
     try:
-        codes_string = dit_handler.convert_src_audio_to_codes(generated_audio)
+        pred_latents = _retained_pred_latents(sample_idx, current_batch_index, batch_queue)
+        codes_string = dit_handler.convert_result_to_codes(
+            pred_latents=pred_latents, audio_file=generated_audio
+        )
         if not codes_string or codes_string.startswith("❌"):
             gr.Warning(f"Failed to convert audio to codes: {codes_string}")
             return gr.skip(), gr.skip()
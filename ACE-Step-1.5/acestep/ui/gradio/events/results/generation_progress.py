@@ -214,6 +214,16 @@ def generate_with_progress(
     )
     time_module.sleep(0.1)
 
+    if auto_lrc:
+        # One decoder probe pass and parallel DTW for every sample up front
+        auto_lrc_start = time_module.time()
+        _run_auto_lrc(
+            dit_handler, result.extra_outputs, min(len(audios), 8),
+            audio_duration, vocal_language, inference_steps,
+            final_lrcs_list, final_subtitles_list,
+        )
+        total_auto_lrc_time += time_module.time() - auto_lrc_start
+
     for i in range(8):
         if i >= len(audios):
             continue
@@ -265,15 +275,6 @@ def generate_with_progress(
         scores_ui_updates[i] = score_str
         final_scores_list[i] = score_str
 
-        if auto_lrc:
-            auto_lrc_start = time_module.time()
-            _run_auto_lrc(
-                dit_handler, result.extra_outputs, i,
-                audio_duration, vocal_language, inference_steps,
-                final_lrcs_list, final_subtitles_list,
-            )
-            total_auto_lrc_time += time_module.time() - auto_lrc_start
-
         # STEP 1: yield audio + clear LRC
         cur_audio = [gr.skip()] * 8
         cur_audio[i] = audio_path
@@ -381,14 +382,15 @@ def _extract_sample_tensor(extra_outputs, sample_idx):
         return None
 
 
-def _run_auto_lrc(dit_handler, extra_outputs, sample_idx,
+def _run_auto_lrc(dit_handler, extra_outputs, num_samples,
                   audio_duration, vocal_language, inference_steps,
                   final_lrcs_list, final_subtitles_list):
-    """Run automatic LRC generation for a single sample in-place.
+    """Run automatic LRC generation for the first *num_samples* samples in-place.
 
-    Updates *final_lrcs_list* and *final_subtitles_list* at *sample_idx*.
+    All samples share one batched ``get_lyric_timestamps_batch`` call.
+    Updates *final_lrcs_list* and *final_subtitles_list* per sample.
     """
-    logger.info(f"[auto_lrc] Starting LRC generation for sample {sample_idx + 1}")
+    logger.info(f"[auto_lrc] Starting LRC generation for {num_samples} samples")
     try:
         pred_latents = extra_outputs.get("pred_latents")
         enc_hs = extra_outputs.get("encoder_hidden_states")
@@ -397,30 +399,43 @@ def _run_auto_lrc(dit_handler, extra_outputs, sample_idx,
         lyric_ids = extra_outputs.get("lyric_token_idss")
 
         if not all(x is not None for x in [pred_latents, enc_hs, enc_am, ctx_lat, lyric_ids]):
-            logger.warning(f"[auto_lrc] Missing required extra_outputs for sample {sample_idx + 1}")
+            logger.warning("[auto_lrc] Missing required extra_outputs for LRC generation")
+            return
+
+        num_samples = min(num_samples, pred_latents.shape[0])
+        if num_samples <= 0:
             return
 
         actual_duration = audio_duration
         if actual_duration is None or actual_duration <= 0:
             actual_duration = pred_latents.shape[1] / 25.0
 
-        lrc_result = dit_handler.get_lyric_timestamp(
-            pred_latent=pred_latents[sample_idx:sample_idx + 1],
-            encoder_hidden_states=enc_hs[sample_idx:sample_idx + 1],
-            encoder_attention_mask=enc_am[sample_idx:sample_idx + 1],
-            context_latents=ctx_lat[sample_idx:sample_idx + 1],
-            lyric_token_ids=lyric_ids[sample_idx:sample_idx + 1],
+        lrc_results = dit_handler.get_lyric_timestamps_batch(
+            pred_latent=pred_latents[:num_samples],
+            encoder_hidden_states=enc_hs[:num_samples],
+            encoder_attention_mask=enc_am[:num_samples],
+            context_latents=ctx_lat[:num_samples],
+            lyric_token_ids=lyric_ids[:num_samples],
             total_duration_seconds=float(actual_duration),
             vocal_language=vocal_language or "en",
             inference_steps=int(inference_steps),
             seed=42,
         )
+    except Exception as e:
+        logger.warning(f"[auto_lrc] Failed to generate LRC: {e}")
+        return
 
-        if lrc_result.get("success"):
+    for sample_idx, lrc_result in enumerate(lrc_results):
+        if not lrc_result.get("success"):
+            logger.warning(
+                f"[auto_lrc] Failed to generate LRC for sample {sample_idx + 1}: {lrc_result.get('error')}"
+            )
+            continue
+        try:
             lrc_text = lrc_result.get("lrc_text", "")
             final_lrcs_list[sample_idx] = lrc_text
             logger.info(f"[auto_lrc] LRC text length for sample {sample_idx + 1}: {len(lrc_text)}")
             vtt_path = lrc_to_vtt_file(lrc_text, total_duration=float(actual_duration))
             final_subtitles_list[sample_idx] = vtt_path
-    except Exception as e:
-        logger.warning(f"[auto_lrc] Failed to generate LRC for sample {sample_idx + 1}: {e}")
+        except Exception as e:
+            logger.warning(f"[auto_lrc] Failed to write subtitles for sample {sample_idx + 1}: {e}")
@@ -355,7 +355,7 @@ def test_streaming_mode(base_url: str, api_key: Optional[str] = None) -> bool:
 
         if resp.status_code == 200:
             content_parts = []
-            audio_url = None
+            audio_parts = []
 
             print("\n接收流式数据:")
             for line in resp.iter_lines(decode_unicode=True):
@@ -387,9 +387,11 @@ def test_streaming_mode(base_url: str, api_key: Optional[str] = None) -> bool:
 
                     if "audio" in delta and delta["audio"]:
                         audio_item = delta["audio"][0]
-                        audio_url = audio_item.get("audio_url", {}).get("url", "")
-                        if audio_url:
-                            print(f"  音频数据已接收 (长度: {len(audio_url)} 字符)")
+                        audio_piece = audio_item.get("audio_url", {}).get("url", "")
+                        if audio_piece:
+                            # 长音频分多个 delta 发送，按顺序拼接
+                            audio_parts.append(audio_piece)
+                            print(f"  音频数据已接收 (长度: {len(audio_piece)} 字符)")
 
                     if finish_reason:
                         print(f"  完成原因: {finish_reason}")
@@ -400,6 +402,7 @@ def test_streaming_mode(base_url: str, api_key: Optional[str] = None) -> bool:
             full_content = "".join(content_parts)
             print(f"\n完整内容:\n{full_content}")
 
+            audio_url = "".join(audio_parts)
             if audio_url:
                 filepath = save_audio(audio_url, "test_streaming.mp3")
                 print(f"\n音频已保存: {filepath}")
@@ -15,12 +15,10 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import base64
 import functools
 import json
 import os
 import sys
-import tempfile
 import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
@@ -39,6 +37,8 @@ from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
+from acestep.api.fake_backend import FakeBackend, FakeDiTHandler, FakeLLMHandler
+from acestep.api.http.base64_audio import base64_to_temp_file, iter_audio_data_url, iter_json_with_audio
 from acestep.handler import AceStepHandler
 from acestep.llm_inference import LLMHandler
 from acestep.inference import (
@@ -291,22 +291,6 @@ def _extract_tagged_content(text: str) -> tuple[str, str, str]:
     return prompt, lyrics, remaining
 
 
-def _base64_to_temp_file(b64_data: str, audio_format: str = "mp3") -> str:
-    """Save base64 audio data to temporary file."""
-    if "," in b64_data:
-        b64_data = b64_data.split(",", 1)[1]
-
-    audio_bytes = base64.b64decode(b64_data)
-    suffix = f".{audio_format}" if not audio_format.startswith(".") else audio_format
-    fd, path = tempfile.mkstemp(suffix=suffix, prefix="openrouter_audio_")
-    os.close(fd)
-
-    with open(path, "wb") as f:
-        f.write(audio_bytes)
-
-    return path
-
-
 def _extract_prompt_and_lyrics(messages: List[ChatMessage]) -> tuple[str, str, str, List[str]]:
     """
     Extract prompt (caption), lyrics, sample_query, and audio paths from messages.
@@ -349,7 +333,7 @@ def _extract_prompt_and_lyrics(messages: List[ChatMessage]) -> tuple[str, str, s
                                 audio_format = audio_data.get("format", "mp3")
                                 if b64_data:
                                     try:
-                                        path = _base64_to_temp_file(b64_data, audio_format)
+                                        path = base64_to_temp_file(b64_data, audio_format)
                                         audio_paths.append(path)
                                     except Exception:
                                         pass
@@ -380,34 +364,6 @@ def _extract_prompt_and_lyrics(messages: List[ChatMessage]) -> tuple[str, str, s
     return prompt, lyrics, sample_query, audio_paths
 
 
-def _read_audio_as_base64(file_path: str) -> str:
-    """Read audio file and return Base64 encoded string."""
-    with open(file_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
-
-
-def _audio_to_base64_url(audio_path: str, audio_format: str = "mp3") -> str:
-    """Convert audio file to base64 data URL (OpenRouter format)."""
-    if not audio_path or not os.path.exists(audio_path):
-        return ""
-
-    mime_types = {
-        "mp3": "audio/mpeg",
-        "wav": "audio/wav",
-        "flac": "audio/flac",
-        "ogg": "audio/ogg",
-        "m4a": "audio/mp4",
-        "aac": "audio/aac",
-    }
-    mime_type = mime_types.get(audio_format.lower(), "audio/mpeg")
-
-    with open(audio_path, "rb") as f:
-        audio_data = f.read()
-
-    b64_data = base64.b64encode(audio_data).decode("utf-8")
-    return f"data:{mime_type};base64,{b64_data}"
-
-
 def _format_lm_content(result: Dict[str, Any]) -> str:
     """
     Format LM generation result as content string.
@@ -507,9 +463,11 @@ def create_app() -> FastAPI:
         for p in [cache_root, tmp_root]:
             os.makedirs(p, exist_ok=True)
 
-        # Initialize handlers
-        handler = AceStepHandler()
-        llm_handler = LLMHandler()
+        # Initialize handlers (CPU stand-ins in fake-backend mode, see acestep.api.fake_backend)
+        fake_backend = FakeBackend.from_env()
+        handler = FakeDiTHandler(fake_backend) if fake_backend else AceStepHandler()
+        llm_handler = FakeLLMHandler(fake_backend) if fake_backend else LLMHandler()
+        app.state.generate_music = fake_backend.generate_music if fake_backend else generate_music
 
         app.state.handler = handler
         app.state.llm_handler = llm_handler
@@ -525,6 +483,19 @@ def create_app() -> FastAPI:
         # =================================================================
         # Initialize models at startup
         # =================================================================
+        if fake_backend is not None:
+            print(f"[OpenRouter API] Fake backend enabled ({fake_backend.latency.describe()}); no models are loaded")
+            handler.initialize_service()
+            app.state._initialized = True
+            _, app.state._llm_initialized = llm_handler.initialize(
+                lm_model_path=os.getenv("ACESTEP_LM_MODEL_PATH", "acestep-5Hz-lm-0.6B"), backend="fake",
+            )
+            try:
+                yield
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+            return
+
         print("[OpenRouter API] Initializing models at startup...")
 
         config_path = os.getenv("ACESTEP_CONFIG_PATH", "acestep-v15-turbo")
@@ -850,7 +821,7 @@ def create_app() -> FastAPI:
                 audio_format=audio_config.format or "mp3",
             )
 
-            result = generate_music(
+            result = app.state.generate_music(
                 dit_handler=h,
                 llm_handler=llm,
                 params=params,
@@ -980,14 +951,14 @@ def create_app() -> FastAPI:
                     return
 
                 # Send audio data
+                # (consecutive deltas whose urls concatenate to the data URL)
                 audio_path = audio_result.get("audio_path")
                 if audio_path and os.path.exists(audio_path):
-                    b64_url = _audio_to_base64_url(audio_path, "mp3")
-                    if b64_url:
+                    for piece in iter_audio_data_url(audio_path, "mp3"):
                         audio_list = [
                             AudioOutputItem(
                                 type="audio_url",
-                                audio_url=AudioUrlContent(url=b64_url)
+                                audio_url=AudioUrlContent(url=piece)
                             )
                         ]
                         yield _make_stream_chunk(
@@ -995,12 +966,7 @@ def create_app() -> FastAPI:
                             audio=audio_list
                         )
                         await asyncio.sleep(0)
-                        print("[OpenRouter API] Stream: Audio data sent")
-                    else:
-                        yield _make_stream_chunk(
-                            completion_id, created_timestamp, request.model,
-                            content="\n\nError: Failed to encode audio"
-                        )
+                    print("[OpenRouter API] Stream: Audio data sent")
                 else:
                     yield _make_stream_chunk(
                         completion_id, created_timestamp, request.model,
@@ -1035,18 +1001,20 @@ def create_app() -> FastAPI:
         # Format content with LM results
         text_content = _format_lm_content(result)
 
-        # Build audio in OpenRouter format
+        # Build audio in OpenRouter format; the data URL is spliced in while
+        # the body streams, so a placeholder holds its spot
         audio_list = None
+        placeholder = f"__audio_url_{completion_id}__"
         audio_path = result.get("audio_path")
         if audio_path and os.path.exists(audio_path):
-            b64_url = _audio_to_base64_url(audio_path, "mp3")
-            if b64_url:
-                audio_list = [
-                    AudioOutputItem(
-                        type="audio_url",
-                        audio_url=AudioUrlContent(url=b64_url)
-                    )
-                ]
+            audio_list = [
+                AudioOutputItem(
+                    type="audio_url",
+                    audio_url=AudioUrlContent(url=placeholder)
+                )
+            ]
+        else:
+            audio_path = None
 
         response = ChatCompletionResponse(
             id=completion_id,
@@ -1070,7 +1038,12 @@ def create_app() -> FastAPI:
             ),
         )
 
-        return response
+        if audio_path is None:
+            return response
+        return StreamingResponse(
+            iter_json_with_audio(response.model_dump_json(), placeholder, audio_path, "mp3"),
+            media_type="application/json",
+        )
     
     @app.get("/health")
     async def health_check():
@@ -1110,10 +1083,25 @@ def main() -> None:
         default=os.getenv("OPENROUTER_API_KEY"),
         help="API key for authentication",
     )
+    parser.add_argument(
+        "--fake-backend",
+        action="store_true",
+        default=_env_bool("ACESTEP_FAKE_BACKEND", False),
+        help="Serve with CPU stand-in handlers that sleep instead of generating (for load tests)",
+    )
+    parser.add_argument(
+        "--fake-latency",
+        type=str,
+        default=os.getenv("ACESTEP_FAKE_LATENCY", ""),
+        help="Fake backend latency model, e.g. 'base=0.3,step=0.1,jitter=0.1'",
+    )
     args = parser.parse_args()
     
     if args.api_key:
         os.environ["OPENROUTER_API_KEY"] = args.api_key
+    if args.fake_backend:
+        os.environ["ACESTEP_FAKE_BACKEND"] = "true"
+        os.environ["ACESTEP_FAKE_LATENCY"] = args.fake_latency
     
     uvicorn.run(
         "openrouter.openrouter_api_server:app",
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Lyric Token Span Mapping Benchmark for ACE-Step 1.5
+
+Compares the single-pass byte-table span mapper used by the lyric aligner
+and scorer against the previous prefix re-decoding approach, on Latin and
+CJK lyrics of increasing length.  Runs on CPU only.
+
+Usage:
+    python scripts/benchmark_token_spans.py                                        # Text tokenizer from ./checkpoints
+    python scripts/benchmark_token_spans.py --tokenizer ./checkpoints/Qwen3-Embedding-0.6B
+    python scripts/benchmark_token_spans.py --train-bpe                            # Tiny byte-level BPE, no checkpoint needed
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from acestep.core.scoring.token_spans import decode_token_pieces, get_token_byte_table
+
+LATIN_LINES = [
+    "[Verse]",
+    "Walking down the boulevard, the neon's burning bright",
+    "Every little heartbeat is a drum inside the night",
+    "[Chorus]",
+    "Hold on, hold on, we're dancing till the morning light",
+]
+CJK_LINES = [
+    "[Verse]",
+    "夜晚的街道 霓虹在闪烁",
+    "每一次心跳 都是夜里的鼓声",
+    "[Chorus]",
+    "抱紧我 我们一起跳到天亮",
+]
+
+
+def _prefix_decode_pieces(tokenizer, token_ids):
+    """Previous implementation: re-decode every prefix and diff the bytes."""
+    pieces, prev = [], b""
+    for i in range(len(token_ids)):
+        current = tokenizer.decode(token_ids[:i + 1], skip_special_tokens=False).encode("utf-8", errors="surrogatepass")
+        try:
+            pieces.append(current[len(prev):].decode("utf-8") if len(current) >= len(prev) else "")
+        except UnicodeDecodeError:
+            pieces.append("")
+        prev = current
+    return pieces
+
+
+def _train_bpe():
+    """Train a small byte-level BPE on the sample lyrics."""
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    tok = Tokenizer(models.BPE())
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(vocab_size=1000, initial_alphabet=pre_tokenizers.ByteLevel.alphabet())
+    tok.train_from_iterator(LATIN_LINES + CJK_LINES, trainer)
+    return PreTrainedTokenizerFast(tokenizer_object=tok)
+
+
+def _lyrics_ids(tokenizer, lines, target_tokens):
+    """Repeat *lines* until the lyrics reach roughly *target_tokens* tokens."""
+    block = tokenizer.encode("\n".join(lines) + "\n", add_special_tokens=False)
+    repeats = max(1, target_tokens // max(1, len(block)))
+    return (block * repeats)[:target_tokens]
+
+
+def _time(fn, repeat):
+    """Return the best wall time of *repeat* calls to *fn*."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lyric token span mapping")
+    parser.add_argument("--tokenizer", type=str, default=os.path.join(PROJECT_ROOT, "checkpoints", "Qwen3-Embedding-0.6B"),
+                        help="Tokenizer directory (default: the DiT text encoder in ./checkpoints)")
+    parser.add_argument("--train-bpe", action="store_true", help="Use a tiny trained byte-level BPE instead")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[250, 500, 1000, 2000], help="Lyric lengths in tokens")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+
+    if args.train_bpe or not os.path.isdir(args.tokenizer):
+        if not args.train_bpe:
+            print(f"Tokenizer not found at {args.tokenizer}; using a trained byte-level BPE")
+        tokenizer = _train_bpe()
+    else:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+
+    start = time.perf_counter()
+    table = get_token_byte_table(tokenizer)
+    print(f"Byte table: {len(table._bytes)} tokens, byte_level={table.byte_level}, "
+          f"built in {(time.perf_counter() - start) * 1000:.1f} ms (once per tokenizer)")
+
+    print(f"{'lyrics':<6} {'tokens':>7} {'prefix decode':>14} {'span mapper':>12} {'speedup':>8}  match")
+    for name, lines in (("latin", LATIN_LINES), ("cjk", CJK_LINES)):
+        for length in args.lengths:
+            ids = _lyrics_ids(tokenizer, lines, length)
+            old = _time(lambda: _prefix_decode_pieces(tokenizer, ids), args.repeat)
+            new = _time(lambda: decode_token_pieces(ids, tokenizer, table), args.repeat)
+            text = "".join(decode_token_pieces(ids, tokenizer, table))
+            match = text == tokenizer.decode(ids, skip_special_tokens=False)
+            print(f"{name:<6} {len(ids):>7} {old * 1000:>11.1f} ms {new * 1000:>9.2f} ms "
+                  f"{old / max(new, 1e-9):>7.0f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
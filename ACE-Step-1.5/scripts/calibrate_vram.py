@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+VRAM Calibration Script for ACE-Step 1.5
+
+Traces the DiT decoder, VAE decode and LM forward under FakeTensorMode and
+stores a per-model VRAM profile that gpu_config, the handler's VRAM guard and
+the API admission check consult.  No GPU is needed and weights are never
+loaded; only the model configs are read.
+
+Usage:
+    python scripts/calibrate_vram.py                                   # Default DiT model
+    python scripts/calibrate_vram.py --model acestep-v15-base
+    python scripts/calibrate_vram.py --lm acestep-5Hz-lm-1.7B          # Also profile an LM
+    python scripts/calibrate_vram.py --durations 30 60 120 240         # Custom duration grid
+    python scripts/calibrate_vram.py --output-dir /tmp/vram_profiles   # Custom profile directory
+
+Profiles are written to ACESTEP_VRAM_PROFILE_DIR (default:
+.cache/acestep/vram_profiles/<model>.json).
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import torch
+
+from acestep.core.system.vram_calibration import (
+    DEFAULT_DURATIONS,
+    calibrate_checkpoints,
+    save_vram_profile,
+)
+
+
+def _summarize(profile) -> None:
+    """Print weights and activation estimates for a few batch/duration points."""
+    print(f"  weights: {profile.weight_gb():.2f} GB")
+    use_cfg = "turbo" not in profile.model_name.lower()
+    for duration in (60, 240, 600):
+        row = ", ".join(
+            f"bs{bs}={profile.activation_gb(bs, duration, use_cfg=use_cfg):.2f}" for bs in (1, 2, 4, 8)
+        )
+        print(f"  activations @ {duration}s (GB): {row}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate ACE-Step VRAM profiles on fake tensors")
+    parser.add_argument("--checkpoint-dir", default=os.path.join(PROJECT_ROOT, "checkpoints"))
+    parser.add_argument("--model", default="acestep-v15-turbo", help="DiT model folder to profile")
+    parser.add_argument("--lm", default=None, help="Optional LM model folder to profile")
+    parser.add_argument("--dtype", default="bfloat16", choices=["bfloat16", "float16", "float32"])
+    parser.add_argument("--durations", type=float, nargs="+", default=list(DEFAULT_DURATIONS))
+    parser.add_argument("--output-dir", default=None, help="Profile directory (overrides ACESTEP_VRAM_PROFILE_DIR)")
+    args = parser.parse_args()
+
+    dtype = getattr(torch, args.dtype)
+    targets = [(args.model, False)] + ([(args.lm, True)] if args.lm else [])
+    for model_name, is_lm in targets:
+        print(f"Calibrating {model_name} ({args.dtype}) ...")
+        profile = calibrate_checkpoints(
+            args.checkpoint_dir, model_name, dtype=dtype, durations=args.durations, is_lm=is_lm
+        )
+        path = save_vram_profile(profile, args.output_dir)
+        _summarize(profile)
+        print(f"  saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Convert preprocessed .pt tensor directories to the sharded format.
+
+Packs every per-sample ``.pt`` file into a few large memory-mapped shard
+files plus ``shards_index.json`` (see ``acestep.training.sharded_dataset``).
+Training picks the sharded format automatically when ``--dataset-dir``
+points at the output directory.  Re-running skips samples already converted.
+
+Usage:
+    python scripts/convert_to_shards.py --tensor-dir ./datasets/preprocessed
+    python scripts/convert_to_shards.py --tensor-dir ./pt --output-dir ./sharded --shard-size-mb 512
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to path
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from acestep.training.sharded_dataset import DEFAULT_SHARD_SIZE_MB, convert_pt_dir_to_shards
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert preprocessed .pt files to memory-mapped shards")
+    parser.add_argument("--tensor-dir", required=True, help="Directory of preprocessed .pt files")
+    parser.add_argument("--output-dir", default=None, help="Sharded output directory (default: --tensor-dir)")
+    parser.add_argument("--shard-size-mb", type=int, default=DEFAULT_SHARD_SIZE_MB,
+                        help=f"Target shard size in MiB (default: {DEFAULT_SHARD_SIZE_MB})")
+    args = parser.parse_args()
+
+    result = convert_pt_dir_to_shards(
+        args.tensor_dir, args.output_dir or args.tensor_dir, shard_size_mb=args.shard_size_mb
+    )
+    print(
+        f"[OK] {result['converted']} converted, {result['skipped']} skipped, "
+        f"{result['failed']} failed -> {result['output_dir']}"
+    )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
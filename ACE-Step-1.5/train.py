@@ -171,6 +171,9 @@ def _run_preprocess(args) -> int:
     print(f"  Checkpoint:    {args.checkpoint_dir}")
     print(f"  Model variant: {args.model_variant}")
     print(f"  Max duration:  {getattr(args, 'max_duration', 240.0)}s")
+    print(f"  Format:        {getattr(args, 'tensor_format', 'pt')}")
+    print(f"  Workers:       {getattr(args, 'preprocess_workers', 2)}")
+    print(f"  Batch size:    {getattr(args, 'preprocess_batch_size', 1)}")
     print("=" * 60)
     print("[INFO] Two-pass pipeline (sequential model loading for low VRAM)")
 
@@ -184,6 +187,9 @@ def _run_preprocess(args) -> int:
             dataset_json=dataset_json,
             device=getattr(args, "device", "auto"),
             precision=getattr(args, "precision", "auto"),
+            output_format=getattr(args, "tensor_format", "pt"),
+            num_workers=getattr(args, "preprocess_workers", 2),
+            batch_size=getattr(args, "preprocess_batch_size", 1),
         )
     except Exception as exc:
         print(f"[FAIL] Preprocessing failed: {exc}", file=sys.stderr)
@@ -194,6 +200,10 @@ def _run_preprocess(args) -> int:
 
     print(f"\n[OK] Preprocessing complete:")
     print(f"     Processed: {result['processed']}/{result['total']}")
+    if result.get("reused"):
+        print(f"     Reused:    {result['reused']} (unchanged since last run)")
+    if result.get("recomputed"):
+        print(f"     Recomputed: {result['recomputed']} ({result.get('text_only', 0)} text-only)")
     if result["failed"]:
         print(f"     Failed:    {result['failed']}")
     print(f"     Output:    {result['output_dir']}")
@@ -208,6 +218,7 @@ def _run_estimate(args) -> int:
     from acestep.training_v2.estimate import run_estimation
 
     num_batches = getattr(args, "estimate_batches", 5) or 5
+    micro_batches = getattr(args, "micro_batches", 1) or 1
 
     # Show summary before starting
     print("\n" + "=" * 60)
@@ -216,7 +227,7 @@ def _run_estimate(args) -> int:
     print(f"  Checkpoint:    {args.checkpoint_dir}")
     print(f"  Model variant: {args.model_variant}")
     print(f"  Dataset:       {args.dataset_dir}")
-    print(f"  Batches:       {num_batches}")
+    print(f"  Batches:       {num_batches} ({micro_batches} per backward)")
     print(f"  Top-K:         {getattr(args, 'top_k', 16)}")
     print(f"  Granularity:   {getattr(args, 'granularity', 'module')}")
     print("=" * 60)
@@ -230,6 +241,7 @@ def _run_estimate(args) -> int:
             batch_size=args.batch_size,
             top_k=getattr(args, "top_k", 16) or 16,
             granularity=getattr(args, "granularity", "module") or "module",
+            micro_batches=micro_batches,
         )
     except Exception as exc:
         print(f"[FAIL] Estimation failed: {exc}", file=sys.stderr)
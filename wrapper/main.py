@@ -1,7 +1,10 @@
 """
 ACE-Step lego wrapper service.
 
-Exposes a single simplified POST /lego endpoint for the VST and iOS clients.
+Exposes a simplified POST /lego endpoint for the VST and iOS clients, plus
+POST /lego/multi, which generates several stems over one source in a single
+ACE-Step job (one upload, one source encode, one DiT batch) and returns them
+as a zip.
 Internally handles:
   - GPU token acquisition from gpu-queue-service
   - Model load / unload lifecycle on the ACE-Step container
@@ -14,18 +17,41 @@ Environment variables:
   QUEUE_TOKENS       GPU tokens to acquire per job   (default 1000)
   WRAPPER_PORT       Port this service listens on    (default 8002)
   ACESTEP_API_KEY    API key for ACE-Step if set     (optional)
+  WRAPPER_FAKE_BACKEND  Replace the gpu-queue-service with an in-process lock
+                     and read WAV durations without ffprobe, for load tests
+                     on a CPU box against an api_server started with
+                     --fake-backend (default false)
+  WRAPPER_LEASE_IDLE     Seconds a session keeps the GPU token and the loaded
+                     model after its last request; 0 unloads after every
+                     request (default 45)
+  WRAPPER_LEASE_MAX      Hard cap in seconds on one lease, after which the GPU
+                     is handed back to the queue (default 600)
+  WRAPPER_LEASE_COOLDOWN Seconds after a capped lease during which that
+                     session runs cold instead of leasing again (default 30)
+
+Session leases: a user layering several stems over one bounce would
+otherwise pay a full /v1/load + /v1/unload per stem.  Requests carrying
+the same session_id (or, without one, from the same client address) reuse
+the warm model while the lease is alive; a request from another session
+waits for in-flight work to finish and then takes the GPU over.
 """
 
+import asyncio
+import io
+import json
 import os
 import time
 import tempfile
 import subprocess
+import wave
+import zipfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
 import uvicorn
-from fastapi import FastAPI, File, Form, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, Request, UploadFile, HTTPException
 from fastapi.responses import StreamingResponse
 
 # ---------------------------------------------------------------------------
@@ -37,6 +63,11 @@ QUEUE_URL     = os.getenv("QUEUE_URL",     "http://gpu-queue-service:8085").rstr
 QUEUE_TOKENS  = int(os.getenv("QUEUE_TOKENS", "1000"))
 WRAPPER_PORT  = int(os.getenv("WRAPPER_PORT", "8002"))
 API_KEY       = os.getenv("ACESTEP_API_KEY", "")
+FAKE_BACKEND  = os.getenv("WRAPPER_FAKE_BACKEND", "").strip().lower() in ("1", "true", "yes", "on")
+
+LEASE_IDLE     = float(os.getenv("WRAPPER_LEASE_IDLE", "45"))
+LEASE_MAX      = float(os.getenv("WRAPPER_LEASE_MAX", "600"))
+LEASE_COOLDOWN = float(os.getenv("WRAPPER_LEASE_COOLDOWN", "30"))
 
 INFERENCE_STEPS   = 50
 DEFAULT_BATCH     = 1
@@ -53,6 +84,9 @@ ALLOWED_TRACKS = set(TRACK_CAPTIONS.keys())
 
 app = FastAPI(title="ACE-Step Wrapper")
 
+# Stands in for the gpu-queue-service when WRAPPER_FAKE_BACKEND is set
+_fake_gpu_token = asyncio.Lock()
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -73,11 +107,22 @@ def _probe_duration(path: str) -> Optional[float]:
         )
         return float(result.stdout.strip())
     except Exception:
-        return None
+        pass
+    if FAKE_BACKEND:
+        try:
+            with wave.open(path, "rb") as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except Exception:
+            pass
+    return None
 
 
 async def _acquire_gpu_token(client: httpx.AsyncClient, session_id: str) -> bool:
     """Post a task to the gpu-queue-service to claim GPU tokens."""
+    if FAKE_BACKEND:
+        # One job on the "GPU" at a time, so load/unload never interleave.
+        await _fake_gpu_token.acquire()
+        return True
     try:
         resp = await client.post(
             f"{QUEUE_URL}/tasks",
@@ -91,6 +136,9 @@ async def _acquire_gpu_token(client: httpx.AsyncClient, session_id: str) -> bool
 
 async def _release_gpu_token(client: httpx.AsyncClient, session_id: str) -> None:
     """Release GPU tokens back to the queue."""
+    if FAKE_BACKEND:
+        _fake_gpu_token.release()
+        return
     try:
         await client.post(
             f"{QUEUE_URL}/task/status",
@@ -107,6 +155,8 @@ async def _load_model(client: httpx.AsyncClient) -> None:
         headers=_acestep_headers(),
         timeout=120,  # first load from disk can take a moment
     )
+    if resp.status_code == 409:
+        return  # worker-pool server: models stay loaded in its GPU workers
     if resp.status_code != 200:
         raise HTTPException(502, f"ACE-Step /v1/load failed: {resp.text}")
 
@@ -131,7 +181,10 @@ async def _submit_lego(
     key_scale: str,
     audio_duration: float,
     batch_size: int,
+    track_names: Optional[List[str]] = None,
+    track_captions: Optional[List[str]] = None,
 ) -> str:
+    """Submit a lego job; with ``track_names`` every listed stem runs in one batch."""
     with open(audio_path, "rb") as fh:
         files = {"ctx_audio": (Path(audio_path).name, fh, "audio/wav")}
         data = {
@@ -150,6 +203,10 @@ async def _submit_lego(
         }
         if key_scale:
             data["key_scale"] = key_scale
+        if track_names:
+            # batch_size is per track; lists go out as repeated form fields
+            data["track_names"] = track_names
+            data["track_captions"] = track_captions or []
         resp = await client.post(
             f"{ACESTEP_URL}/release_task",
             headers=_acestep_headers(),
@@ -183,12 +240,9 @@ async def _poll_until_done(client: httpx.AsyncClient, task_id: str) -> dict:
     raise HTTPException(504, "ACE-Step generation timed out")
 
 
-async def _download_first_audio(client: httpx.AsyncClient, result_data: dict) -> bytes:
-    import json
-    files = json.loads(result_data["result"])
-    first_file_path = files[0]["file"]
+async def _download_audio(client: httpx.AsyncClient, file_path: str) -> bytes:
     resp = await client.get(
-        f"{ACESTEP_URL}{first_file_path}",
+        f"{ACESTEP_URL}{file_path}",
         headers=_acestep_headers(),
         timeout=60,
     )
@@ -197,18 +251,211 @@ async def _download_first_audio(client: httpx.AsyncClient, result_data: dict) ->
     return resp.content
 
 
+async def _download_first_audio(client: httpx.AsyncClient, result_data: dict) -> bytes:
+    files = json.loads(result_data["result"])
+    return await _download_audio(client, files[0]["file"])
+
+
+async def _download_track_audios(client: httpx.AsyncClient, result_data: dict) -> List[Tuple[str, bytes]]:
+    """Download every audio of a multi-track job as (track_name, bytes), in output order."""
+    files = [f for f in json.loads(result_data["result"]) if f.get("file")]
+    contents = await asyncio.gather(*(_download_audio(client, f["file"]) for f in files))
+    return [(f.get("track_name", ""), content) for f, content in zip(files, contents)]
+
+
+# ---------------------------------------------------------------------------
+# Session leases
+# ---------------------------------------------------------------------------
+
+class _Lease:
+    """GPU token + loaded model held on behalf of one session."""
+
+    def __init__(self, session: str, keep_warm: bool):
+        self.session = session
+        self.queue_session_id = f"acestep-{int(time.time() * 1000)}"
+        self.keep_warm = keep_warm    # False while the session is cooling down
+        self.acquired_at = time.monotonic()
+        self.last_used = self.acquired_at
+        self.in_flight = 0
+        self.uses = 0
+        self.draining = False         # another session is waiting for the GPU
+        self.expiry: Optional[asyncio.Task] = None
+
+    def capped(self, now: float) -> bool:
+        return now - self.acquired_at >= LEASE_MAX
+
+
+class _SessionLeases:
+    """Keeps the model warm between requests of the same session.
+
+    At most one lease exists at a time (the wrapper drives a single ACE-Step
+    container).  Requests of the leasing session join it; a request from any
+    other session marks it draining, waits for its in-flight jobs and then
+    unloads, releases the token and starts its own lease.  An idle lease is
+    released after LEASE_IDLE seconds; a lease older than LEASE_MAX admits no
+    new requests, and its session then runs cold for LEASE_COOLDOWN seconds
+    so it cannot immediately re-grab the GPU ahead of other queue tenants.
+    """
+
+    def __init__(self):
+        self._cond = asyncio.Condition()
+        self._lease: Optional[_Lease] = None
+        self._cooldown_until: Dict[str, float] = {}
+        self.requests = 0
+        self.warm_hits = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.unloads = 0
+        self.unload_seconds = 0.0
+
+    @asynccontextmanager
+    async def hold(self, session: str) -> AsyncIterator[bool]:
+        """Hold the GPU with the model loaded for one request; yields whether it was warm."""
+        lease, warm = await self._enter(session)
+        try:
+            yield warm
+        finally:
+            await self._exit(lease)
+
+    async def _enter(self, session: str):
+        async with self._cond:
+            self.requests += 1
+            while self._lease is not None:
+                lease = self._lease
+                now = time.monotonic()
+                if lease.capped(now) and lease.keep_warm:
+                    lease.keep_warm = False
+                    self._cooldown_until[lease.session] = now + LEASE_COOLDOWN
+                if lease.session == session and lease.keep_warm and not lease.draining:
+                    if lease.expiry is not None:
+                        lease.expiry.cancel()
+                        lease.expiry = None
+                    lease.in_flight += 1
+                    lease.uses += 1
+                    self.warm_hits += 1
+                    return lease, True
+                if lease.in_flight == 0:
+                    await self._release(lease)
+                    break
+                lease.draining = True
+                await self._cond.wait()
+
+            now = time.monotonic()
+            for key in [k for k, until in self._cooldown_until.items() if until <= now]:
+                del self._cooldown_until[key]
+            lease = _Lease(session, keep_warm=LEASE_IDLE > 0 and session not in self._cooldown_until)
+            async with httpx.AsyncClient() as client:
+                if not await _acquire_gpu_token(client, lease.queue_session_id):
+                    raise HTTPException(503, "GPU queue unavailable")
+                t0 = time.monotonic()
+                try:
+                    await _load_model(client)
+                except BaseException:
+                    await _unload_model(client)
+                    await _release_gpu_token(client, lease.queue_session_id)
+                    raise
+            self.loads += 1
+            self.load_seconds += time.monotonic() - t0
+            lease.in_flight = 1
+            lease.uses = 1
+            self._lease = lease
+            return lease, False
+
+    async def _exit(self, lease: _Lease) -> None:
+        async with self._cond:
+            lease.in_flight -= 1
+            lease.last_used = time.monotonic()
+            if lease.in_flight == 0 and self._lease is lease:
+                if lease.capped(lease.last_used) and lease.keep_warm:
+                    lease.keep_warm = False
+                    self._cooldown_until[lease.session] = lease.last_used + LEASE_COOLDOWN
+                if lease.keep_warm and not lease.draining:
+                    lease.expiry = asyncio.create_task(self._expire(lease))
+                else:
+                    await self._release(lease)
+            self._cond.notify_all()
+
+    async def _expire(self, lease: _Lease) -> None:
+        await asyncio.sleep(LEASE_IDLE)
+        async with self._cond:
+            if self._lease is lease and lease.in_flight == 0:
+                lease.expiry = None
+                await self._release(lease)
+                self._cond.notify_all()
+
+    async def _release(self, lease: _Lease) -> None:
+        """Unload the model and give the token back; caller holds the condition."""
+        self._lease = None
+        if lease.expiry is not None and lease.expiry is not asyncio.current_task():
+            lease.expiry.cancel()
+        lease.expiry = None
+        async with httpx.AsyncClient() as client:
+            t0 = time.monotonic()
+            await _unload_model(client)
+            self.unloads += 1
+            self.unload_seconds += time.monotonic() - t0
+            await _release_gpu_token(client, lease.queue_session_id)
+
+    async def close(self) -> None:
+        """Release the current lease, if any."""
+        async with self._cond:
+            if self._lease is not None and self._lease.in_flight == 0:
+                await self._release(self._lease)
+
+    def snapshot(self) -> dict:
+        """Lease settings, warm-hit rate and load time saved, for /health."""
+        avg_load = self.load_seconds / self.loads if self.loads else 0.0
+        avg_unload = self.unload_seconds / self.unloads if self.unloads else 0.0
+        lease = self._lease
+        now = time.monotonic()
+        active = None
+        if lease is not None:
+            active = {
+                "session": lease.session,
+                "age_seconds": round(now - lease.acquired_at, 1),
+                "idle_seconds": round(now - lease.last_used, 1) if lease.in_flight == 0 else 0.0,
+                "in_flight": lease.in_flight,
+                "uses": lease.uses,
+                "draining": lease.draining,
+            }
+        return {
+            "idle_seconds": LEASE_IDLE,
+            "max_seconds": LEASE_MAX,
+            "cooldown_seconds": LEASE_COOLDOWN,
+            "requests": self.requests,
+            "warm_hits": self.warm_hits,
+            "warm_hit_rate": round(self.warm_hits / self.requests, 3) if self.requests else 0.0,
+            "loads": self.loads,
+            "avg_load_seconds": round(avg_load, 2),
+            "avg_unload_seconds": round(avg_unload, 2),
+            # Each warm hit skipped one load and one unload
+            "saved_load_seconds": round(self.warm_hits * (avg_load + avg_unload), 1),
+            "active": active,
+        }
+
+
+_leases = _SessionLeases()
+
+
+@app.on_event("shutdown")
+async def _release_lease_on_shutdown() -> None:
+    await _leases.close()
+
+
 # ---------------------------------------------------------------------------
 # Endpoint
 # ---------------------------------------------------------------------------
 
 @app.post("/lego")
 async def lego(
+    request:        Request,
     audio_file:     UploadFile = File(...),
     track_type:     str        = Form(...),
     bpm:            int        = Form(...),
     key_scale:      str        = Form(""),
     batch_size:     int        = Form(DEFAULT_BATCH),
     caption:        str        = Form(""),
+    session_id:     str        = Form(""),
 ):
     """
     Generate a stem over the provided audio using ACE-Step lego mode.
@@ -218,9 +465,9 @@ async def lego(
     key_scale:  optional, e.g. "F# minor" (model handles ambiguous keys well)
     batch_size: 1 or 2 (T4 default: 1)
     caption:    override the default caption for the track type
+    session_id: optional; consecutive requests with the same id reuse the
+                warm model (defaults to the client address)
     """
-    import asyncio
-
     if track_type not in ALLOWED_TRACKS:
         raise HTTPException(400, f"track_type must be one of {sorted(ALLOWED_TRACKS)}")
 
@@ -237,18 +484,11 @@ async def lego(
         if audio_duration is None:
             raise HTTPException(400, "Could not determine audio duration — is ffprobe installed?")
 
-        session_id = f"acestep-{int(time.time() * 1000)}"
-
-        async with httpx.AsyncClient() as client:
-            # 1. Acquire GPU token
-            ok = await _acquire_gpu_token(client, session_id)
-            if not ok:
-                raise HTTPException(503, "GPU queue unavailable")
-
-            try:
-                # 2. Load model onto GPU
-                await _load_model(client)
+        session = session_id.strip() or (request.client.host if request.client else "anonymous")
 
+        # 1-2. Acquire GPU token and load model, or join the session's warm lease
+        async with _leases.hold(session):
+            async with httpx.AsyncClient() as client:
                 # 3. Submit generation
                 task_id = await _submit_lego(
                     client, audio_path, track_type, effective_caption,
@@ -260,11 +500,7 @@ async def lego(
 
                 # 5. Download first audio candidate
                 audio_bytes = await _download_first_audio(client, result_data)
-
-            finally:
-                # 6. Always unload model and release token
-                await _unload_model(client)
-                await _release_gpu_token(client, session_id)
+        # 6. The lease unloads the model and releases the token once idle
 
         return StreamingResponse(
             iter([audio_bytes]),
@@ -279,6 +515,101 @@ async def lego(
             pass
 
 
+@app.post("/lego/multi")
+async def lego_multi(
+    request:        Request,
+    audio_file:     UploadFile = File(...),
+    track_types:    List[str]  = Form(...),
+    bpm:            int        = Form(...),
+    key_scale:      str        = Form(""),
+    batch_size:     int        = Form(DEFAULT_BATCH),
+    captions:       List[str]  = Form([]),
+    session_id:     str        = Form(""),
+):
+    """
+    Generate several stems over the provided audio in one ACE-Step job.
+
+    track_types: repeated field (or comma-separated) of vocals | backing_vocals | drums
+    bpm:         integer BPM of the source audio
+    key_scale:   optional, e.g. "F# minor"
+    batch_size:  candidates per stem (T4 default: 1)
+    captions:    optional repeated field aligned with track_types; blank
+                 entries use the default caption for that track
+    session_id:  optional; shares the warm-model lease with /lego
+
+    Returns a zip with one <track>.mp3 per stem (<track>_<n>.mp3 when
+    batch_size > 1).  If the server returns fewer candidates than requested
+    for any stem (e.g. its VRAM guard shrank the batch), the request fails
+    with 502 instead of returning a partial zip.
+    """
+    tracks = [t.strip() for value in track_types for t in value.split(",") if t.strip()]
+    if not tracks:
+        raise HTTPException(400, "track_types must name at least one track")
+    unknown = [t for t in tracks if t not in ALLOWED_TRACKS]
+    if unknown:
+        raise HTTPException(400, f"track_types must be among {sorted(ALLOWED_TRACKS)}, got {unknown}")
+    if len(set(tracks)) != len(tracks):
+        raise HTTPException(400, "track_types must not repeat a track; use batch_size for more candidates")
+
+    track_captions = [
+        (captions[i].strip() if i < len(captions) else "") or TRACK_CAPTIONS[track]
+        for i, track in enumerate(tracks)
+    ]
+
+    suffix = Path(audio_file.filename or "audio.wav").suffix or ".wav"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(await audio_file.read())
+        audio_path = tmp.name
+
+    try:
+        audio_duration = _probe_duration(audio_path)
+        if audio_duration is None:
+            raise HTTPException(400, "Could not determine audio duration — is ffprobe installed?")
+
+        session = session_id.strip() or (request.client.host if request.client else "anonymous")
+
+        async with _leases.hold(session):
+            async with httpx.AsyncClient() as client:
+                # One job: the source is uploaded and encoded once, all stems share the DiT batch
+                task_id = await _submit_lego(
+                    client, audio_path, tracks[0], track_captions[0],
+                    bpm, key_scale, audio_duration, batch_size,
+                    track_names=tracks, track_captions=track_captions,
+                )
+                result_data = await _poll_until_done(client, task_id)
+                stems = await _download_track_audios(client, result_data)
+
+        # The server's batch limit depends on free VRAM at run time, so a
+        # short result can only be detected after the job.
+        counts: Dict[str, int] = {}
+        for track, _content in stems:
+            counts[track] = counts.get(track, 0) + 1
+        missing = [t for t in tracks if counts.get(t, 0) < max(1, batch_size)]
+        if missing:
+            raise HTTPException(
+                502,
+                f"ACE-Step returned {len(stems)} of {len(tracks) * max(1, batch_size)} stems "
+                f"(incomplete: {', '.join(missing)}); retry with fewer track_types or a smaller batch_size",
+            )
+
+        buf = io.BytesIO()
+        written: Dict[str, int] = {}
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+            for track, content in stems:
+                written[track] = written.get(track, 0) + 1
+                name = track if batch_size <= 1 else f"{track}_{written[track]}"
+                zf.writestr(f"{name}.mp3", content)
+
+        headers = {"Content-Disposition": 'attachment; filename="stems.zip"'}
+        return StreamingResponse(iter([buf.getvalue()]), media_type="application/zip", headers=headers)
+
+    finally:
+        try:
+            os.unlink(audio_path)
+        except Exception:
+            pass
+
+
 @app.get("/health")
 async def health():
     """Check wrapper and ACE-Step health."""
@@ -293,6 +624,7 @@ async def health():
         "wrapper": "ok",
         "acestep": "ok" if ace_ok else "unreachable",
         "acestep_url": ACESTEP_URL,
+        "leases": _leases.snapshot(),
     }
 
 
@@ -301,5 +633,4 @@ async def health():
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    import asyncio
     uvicorn.run("main:app", host="0.0.0.0", port=WRAPPER_PORT, reload=False)
@@ -0,0 +1,248 @@
+"""Unit tests for the wrapper's session leases and multi-stem endpoint."""
+
+import asyncio
+import contextlib
+import io
+import unittest
+import zipfile
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+
+
+class _Clock:
+    """Manually advanced monotonic clock for lease ages."""
+
+    def __init__(self):
+        """Start at an arbitrary non-zero time."""
+        self.now = 1000.0
+
+    def __call__(self):
+        """Return the current time."""
+        return self.now
+
+
+class _Backend:
+    """Stands in for the gpu-queue-service and ACE-Step load/unload calls."""
+
+    def __init__(self):
+        """Start with no token held and an empty call log."""
+        self.held = set()
+        self.events = []
+        self.errors = []
+        self.fail_load = False
+
+    async def acquire(self, _client, token):
+        """Claim a token."""
+        self.held.add(token)
+        self.events.append("acquire")
+        return True
+
+    async def release(self, _client, token):
+        """Give a token back; releasing one twice is recorded as an error."""
+        if token not in self.held:
+            self.errors.append(f"double release of {token}")
+        self.held.discard(token)
+        self.events.append("release")
+
+    async def load(self, _client):
+        """Load the model, or fail when asked to."""
+        self.events.append("load")
+        if self.fail_load:
+            raise HTTPException(502, "load failed")
+
+    async def unload(self, _client):
+        """Unload the model."""
+        self.events.append("unload")
+
+
+class SessionLeaseTests(unittest.IsolatedAsyncioTestCase):
+    """Joining, handing over, expiring and capping leases."""
+
+    def setUp(self):
+        """Stub the GPU queue and model calls, shrink the idle timeout and fake the clock."""
+        self.backend = _Backend()
+        self.clock = _Clock()
+        tokens = iter(range(1, 1000))  # distinct queue session ids per lease
+        patches = [
+            mock.patch.object(main, "_acquire_gpu_token", self.backend.acquire),
+            mock.patch.object(main, "_release_gpu_token", self.backend.release),
+            mock.patch.object(main, "_load_model", self.backend.load),
+            mock.patch.object(main, "_unload_model", self.backend.unload),
+            mock.patch.object(main, "time", SimpleNamespace(monotonic=self.clock, time=lambda: next(tokens))),
+            mock.patch.object(main, "LEASE_IDLE", 0.05),
+            mock.patch.object(main, "LEASE_MAX", 600.0),
+            mock.patch.object(main, "LEASE_COOLDOWN", 30.0),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.leases = main._SessionLeases()
+
+    def tearDown(self):
+        """No token may ever be released twice."""
+        self.assertEqual(self.backend.errors, [])
+
+    async def _request(self, session):
+        """Run one request and return whether the model was warm."""
+        async with self.leases.hold(session) as warm:
+            return warm
+
+    async def test_same_session_reuses_the_warm_model_until_idle(self):
+        """Back-to-back requests load once; the idle timer then unloads once."""
+        self.assertFalse(await self._request("a"))
+        self.assertTrue(await self._request("a"))
+        self.assertEqual(self.backend.events, ["acquire", "load"])
+        await asyncio.sleep(0.15)
+        self.assertEqual(self.backend.events, ["acquire", "load", "unload", "release"])
+        self.assertIsNone(self.leases.snapshot()["active"])
+        self.assertEqual(self.leases.snapshot()["warm_hits"], 1)
+
+    async def test_other_session_waits_for_in_flight_jobs(self):
+        """A second session takes over only after the first session's job finishes."""
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def _long_job():
+            async with self.leases.hold("a"):
+                started.set()
+                await finish.wait()
+
+        first = asyncio.create_task(_long_job())
+        await started.wait()
+        second = asyncio.create_task(self._request("b"))
+        await asyncio.sleep(0.01)
+        self.assertFalse(second.done())
+        self.assertTrue(self.leases.snapshot()["active"]["draining"])
+        # The leasing session does not join a draining lease either.
+        third = asyncio.create_task(self._request("a"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.backend.events, ["acquire", "load"])
+
+        finish.set()
+        await first
+        self.assertFalse(await second)
+        self.assertFalse(await third)
+        self.assertEqual(self.backend.events[:6], ["acquire", "load", "unload", "release", "acquire", "load"])
+        self.assertEqual(self.backend.events.count("load"), 3)
+
+    async def test_expiry_and_cancellation_never_double_release(self):
+        """Handover before expiry, a cancelled waiter and shutdown release each token once."""
+        await self._request("a")
+        await self._request("b")  # takes over the idle lease, cancelling its timer
+        await asyncio.sleep(0.15)  # a's timer would have fired by now
+        self.assertEqual(self.backend.events.count("release"), 2)
+
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def _long_job():
+            async with self.leases.hold("c"):
+                started.set()
+                await finish.wait()
+
+        job = asyncio.create_task(_long_job())
+        await started.wait()
+        waiter = asyncio.create_task(self._request("d"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        finish.set()
+        await job
+        await self.leases.close()
+        await self.leases.close()
+        self.assertEqual(self.backend.held, set())
+        self.assertEqual(self.backend.events.count("acquire"), self.backend.events.count("release"))
+
+    async def test_capped_session_runs_cold_for_the_cooldown(self):
+        """After LEASE_MAX the session reloads per request until LEASE_COOLDOWN has passed."""
+        main.LEASE_MAX = 100.0
+        await self._request("a")
+        self.clock.now += 101
+        self.assertFalse(await self._request("a"))
+        # Cold lease: unloaded right after the request, no idle timer.
+        self.assertEqual(self.backend.events, ["acquire", "load", "unload", "release"] * 2)
+        self.clock.now += 20
+        self.assertFalse(await self._request("a"))
+        self.assertIsNone(self.leases.snapshot()["active"])
+        self.clock.now += 11
+        self.assertFalse(await self._request("a"))
+        self.assertTrue(await self._request("a"))
+        self.assertEqual(self.backend.events.count("load"), 4)
+
+    async def test_failed_load_gives_the_token_back(self):
+        """A load error unloads, releases the token and leaves no lease behind."""
+        self.backend.fail_load = True
+        with self.assertRaises(HTTPException):
+            await self._request("a")
+        self.assertEqual(self.backend.events, ["acquire", "load", "unload", "release"])
+        self.backend.fail_load = False
+        self.assertFalse(await self._request("b"))
+        self.assertEqual(len(self.backend.held), 1)
+
+
+class LegoMultiTests(unittest.TestCase):
+    """/lego/multi returns every requested stem or fails."""
+
+    def setUp(self):
+        """Stub duration probing, the lease and the ACE-Step job."""
+        self.stems = []
+
+        @contextlib.asynccontextmanager
+        async def _hold(_session):
+            yield False
+
+        async def _submit(*_args, **_kwargs):
+            return "task"
+
+        async def _poll(_client, _task_id):
+            return {}
+
+        async def _download(_client, _result):
+            return self.stems
+
+        patches = [
+            mock.patch.object(main, "_probe_duration", lambda _path: 30.0),
+            mock.patch.object(main, "_leases", SimpleNamespace(hold=_hold)),
+            mock.patch.object(main, "_submit_lego", _submit),
+            mock.patch.object(main, "_poll_until_done", _poll),
+            mock.patch.object(main, "_download_track_audios", _download),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = TestClient(main.app)
+
+    def _post(self, batch_size):
+        """Request vocals and drums with ``batch_size`` candidates each."""
+        return self.client.post(
+            "/lego/multi",
+            files={"audio_file": ("a.wav", b"RIFF")},
+            data={"track_types": "vocals,drums", "bpm": "120", "batch_size": str(batch_size)},
+        )
+
+    def test_complete_result_is_zipped(self):
+        """Every candidate of every stem lands in the zip."""
+        self.stems = [("vocals", b"v1"), ("vocals", b"v2"), ("drums", b"d1"), ("drums", b"d2")]
+        resp = self._post(2)
+        self.assertEqual(resp.status_code, 200)
+        names = zipfile.ZipFile(io.BytesIO(resp.content)).namelist()
+        self.assertEqual(sorted(names), ["drums_1.mp3", "drums_2.mp3", "vocals_1.mp3", "vocals_2.mp3"])
+
+    def test_shrunk_batch_fails_instead_of_returning_a_partial_zip(self):
+        """A missing stem or a missing candidate is a 502 naming the incomplete stems."""
+        self.stems = [("vocals", b"v1")]
+        resp = self._post(1)
+        self.assertEqual(resp.status_code, 502)
+        self.assertIn("drums", resp.json()["detail"])
+        self.stems = [("vocals", b"v1"), ("vocals", b"v2"), ("drums", b"d1")]
+        resp = self._post(2)
+        self.assertEqual(resp.status_code, 502)
+        self.assertIn("3 of 4", resp.json()["detail"])
+
+
+if __name__ == "__main__":
+    unittest.main()